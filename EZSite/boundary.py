@@ -0,0 +1,133 @@
+from collections import namedtuple
+import numpy as np
+from loguru import logger
+from EZSite.mesh import SiteMesh
+
+
+def tributary_areas(x:np.ndarray, seg_thick:np.ndarray)->np.ndarray:
+    """
+    tributary area of every point on a line with a (possibly different) thickness for each segment
+    x: np.ndarray, sorted coordinates of the points
+    seg_thick: np.ndarray, thickness of each segment, len(seg_thick) == len(x)-1
+    return: np.ndarray, tributary area of each point
+    """
+    x = np.asarray(x, dtype=float)
+    if x.size < 2:
+        return np.zeros_like(x)
+    seg_area = np.diff(x)*np.asarray(seg_thick, dtype=float)
+    return 0.5*(np.r_[0.0, seg_area] + np.r_[seg_area, 0.0])
+
+
+def LK_dashpot_coefficients(rho:float, vs:float, nu:float = 0.25)->dict[int,float]:
+    """
+    Lysmer-Kuhlemeyer dashpot coefficient per unit area
+    rho: float(ton/m^3), density of the underlying elastic half-space
+    vs: float(m/s), shear wave velocity of the underlying elastic half-space
+    nu: float, poisson ratio of the underlying elastic half-space, used for the P wave velocity
+    return: dict, {1: rho*vs (shear, horizontal), 2: rho*vp (normal, vertical)}
+    """
+    if not 0.0 <= nu < 0.5:
+        raise ValueError(f'Poisson ratio {nu} must be in [0, 0.5)!')
+    vp = vs*np.sqrt(2.0*(1.0-nu)/(1.0-2.0*nu))
+    return {1: rho*vs, 2: rho*vp}
+
+
+def owned_by_rank(x:np.ndarray, xmin:float, xmax:float, is_last_rank:bool)->np.ndarray:
+    """
+    mask of the points owned by one rank, points on the right split line belong to the next rank
+    x: np.ndarray, x coordinates
+    xmin, xmax: float, split boundary of the rank
+    is_last_rank: bool, the last rank also owns the points on its right split line
+    """
+    x = np.asarray(x, dtype=float)
+    mask = (x >= xmin) & (x < xmax)
+    if is_last_rank:
+        mask |= x == xmax
+    return mask
+
+
+PeriodicBoundary = namedtuple('PeriodicBoundary', ['Left', 'Right', 'Base', 'LeftDOF', 'RightDOF', 'BaseDOF'])
+
+
+def match_by_coordinate(query:np.ndarray, target:np.ndarray, tol:float = 1e-3)->tuple[np.ndarray,np.ndarray]:
+    """
+    match 1D coordinates of query points to target points in O(N log N) by sorting + binary search
+    query, target: np.ndarray, coordinates to match
+    tol: float, matching tolerance
+    return: (query_index, target_index) of the matched points
+    """
+    query = np.asarray(query, dtype=float)
+    target = np.asarray(target, dtype=float)
+    if query.size == 0 or target.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    order = np.argsort(target, kind='stable')
+    sorted_target = target[order]
+    pos = np.searchsorted(sorted_target, query)
+    # nearest of the two neighbours in the sorted target
+    lo = np.clip(pos-1, 0, target.size-1)
+    hi = np.clip(pos, 0, target.size-1)
+    use_hi = np.abs(sorted_target[hi]-query) < np.abs(sorted_target[lo]-query)
+    nearest = np.where(use_hi, hi, lo)
+    matched = np.abs(sorted_target[nearest]-query) <= tol
+    return np.flatnonzero(matched), order[nearest[matched]]
+
+
+def _column_pairs(mesh:SiteMesh, x_outer:float, x_inner:float, tol:float)->np.ndarray:
+    """
+    node tag pairs(outer, inner) of a free-field column, matched by y coordinate
+    """
+    outer = np.flatnonzero(np.abs(mesh.x-x_outer) <= tol)
+    inner = np.flatnonzero(np.abs(mesh.x-x_inner) <= tol)
+    io, ii = match_by_coordinate(mesh.y[outer], mesh.y[inner], tol)
+    if io.size < outer.size:
+        logger.warning(f'{outer.size-io.size} nodes at x={x_outer} have no periodic partner at x={x_inner}!')
+    pairs = np.column_stack((mesh.node_tags[outer[io]], mesh.node_tags[inner[ii]]))
+    return pairs[np.argsort(mesh.y[outer[io]], kind='stable')]
+
+
+def periodic_boundary_pairs(mesh:SiteMesh, column_width:tuple[float,float] = None, tol:float = 1e-3)->PeriodicBoundary:
+    """
+    derive the periodic boundary(tied column) node pairs from mesh coordinates
+    Same layout as EqualDOFnodes_01/02/Base_Info.dat:
+        Left: (outer, inner) pairs of the left free-field column, eqDOF 1 2
+        Right: (outer, inner) pairs of the right free-field column, eqDOF 1 2
+        Base: (left bottom corner, base node) pairs, eqDOF 1
+    mesh: SiteMesh, nodes of the whole site
+    column_width: (left, right) free-field column width, default=None uses the nearest x column to the boundary
+    tol: float, coordinate tolerance
+    """
+    ux = np.unique(np.round(mesh.x/tol)*tol)
+    if ux.size < 4:
+        raise ValueError(f'Only {ux.size} distinct x coordinates, can not build periodic boundary columns!')
+    x_left, x_right = ux[0], ux[-1]
+    if column_width is None:
+        x_left_inner, x_right_inner = ux[1], ux[-2]
+    else:
+        x_left_inner, x_right_inner = x_left+column_width[0], x_right-column_width[1]
+    left = _column_pairs(mesh, x_left, x_left_inner, tol)
+    right = _column_pairs(mesh, x_right, x_right_inner, tol)
+    
+    # base nodes are tied to the left bottom corner, inner column nodes are already tied by the column pairs
+    y_base = mesh.y.min()
+    base_idx = np.flatnonzero(np.abs(mesh.y-y_base) <= tol)
+    base_idx = base_idx[np.argsort(mesh.x[base_idx], kind='stable')]
+    base_tags = mesh.node_tags[base_idx]
+    master = base_tags[0]
+    slaves = base_tags[~np.isin(base_tags, np.r_[master, left[:, 1], right[:, 1]])]
+    base = np.column_stack((np.full(slaves.size, master), slaves))
+    return PeriodicBoundary(left, right, base, [1, 2], [1, 2], [1])
+
+
+def local_constraint_pairs(pairs:np.ndarray, local_mesh:SiteMesh)->tuple[np.ndarray,np.ndarray]:
+    """
+    partition-aware constraint set: pairs with at least one node in this part of the model
+    pairs: np.ndarray(K,2), node tag pairs
+    local_mesh: SiteMesh, nodes of this part of the model
+    return: (qualified pairs, tags of the nodes missing in this part)
+    """
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    local = local_mesh.has_nodes(pairs)
+    qualified = pairs[local.any(axis=1)]
+    missing = np.unique(qualified[~local[local.any(axis=1)]])
+    return qualified, missing
+
@@ -0,0 +1,217 @@
+from collections import namedtuple
+import numpy as np
+import openseespy.opensees as ops
+from loguru import logger
+from EZSite.comm import send_arrays, recv_arrays
+
+
+ModelArrays = namedtuple('ModelArrays', ['NodeTags', 'Coords', 'EleTags', 'EleNodes', 'EleCommands', 'Fixes', 'Loads'])
+BuildPlan = namedtuple('BuildPlan', ['NP', 'EleOwner', 'Member', 'FixOwner', 'LoadOwner'])
+
+
+def model_arrays(node_tags, coords, ele_tags, ele_nodes, ele_commands, fixes = (), loads = ())->ModelArrays:
+    """
+    the whole model as arrays, input of ParallelModelBuilder
+    node_tags: (N,) node tags
+    coords: (N,ndm) node coordinates
+    ele_tags: (E,) element tags
+    ele_nodes: (E,k) element node tags, rows of elements with fewer nodes are padded with -1
+    ele_commands: list of (type, args) per element, or one (type, args) for all,
+                  the element is defined as ops.element(type, tag, *nodes, *args)
+    fixes: (F,1+ndf) rows of node tag and fix flags
+    loads: (L,1+ndf) rows of node tag and nodal load values
+    """
+    ele_tags = np.asarray(ele_tags, dtype=np.int64).ravel()
+    if len(ele_commands) == 2 and isinstance(ele_commands[0], str):
+        ele_commands = [ele_commands]*ele_tags.size
+    if len(ele_commands) != ele_tags.size:
+        raise ValueError(f'{ele_tags.size} elements but {len(ele_commands)} element commands!')
+    node_tags = np.asarray(node_tags, dtype=np.int64).ravel()
+    coords = np.asarray(coords, dtype=float).reshape(node_tags.size, -1)
+    fixes = np.asarray(fixes, dtype=np.int64)
+    fixes = fixes.reshape(len(fixes), -1) if fixes.size else np.zeros((0, 1), dtype=np.int64)
+    loads = np.asarray(loads, dtype=float)
+    loads = loads.reshape(len(loads), -1) if loads.size else np.zeros((0, 1))
+    return ModelArrays(node_tags, coords, ele_tags, np.asarray(ele_nodes, dtype=np.int64).reshape(ele_tags.size, -1),
+                       [(str(kind), tuple(args)) for kind, args in ele_commands], fixes, loads)
+
+
+def _node_index(model:ModelArrays, tags)->np.ndarray:
+    order = np.argsort(model.NodeTags, kind='stable')
+    tags = np.asarray(tags, dtype=np.int64)
+    pos = np.clip(np.searchsorted(model.NodeTags, tags, sorter=order), 0, max(model.NodeTags.size-1, 0))
+    index = order[pos] if model.NodeTags.size else pos
+    if tags.size and not (model.NodeTags[index] == tags).all():
+        raise KeyError(f'Node tags {np.unique(tags[model.NodeTags[index] != tags])[:10].tolist()} not found in the model!')
+    return index
+
+
+def element_centroids(model:ModelArrays)->np.ndarray:
+    """
+    mean coordinates of the nodes of every element, shape (E,ndm)
+    """
+    valid = model.EleNodes >= 0
+    xy = model.Coords[_node_index(model, np.where(valid, model.EleNodes, model.NodeTags[0]))]
+    return (xy*valid[..., None]).sum(axis=1)/np.maximum(valid.sum(axis=1), 1)[:, None]
+
+
+def assign_elements(centroids:np.ndarray, NP:int, weights:np.ndarray = None)->np.ndarray:
+    """
+    owner rank of every element, contiguous strips of (weighted) equal size along the longest axis of the model
+    centroids: np.ndarray(E,ndm), see element_centroids
+    weights: np.ndarray(E,), default=None, cost of each element(1 for every element if None)
+    """
+    centroids = np.asarray(centroids, dtype=float).reshape(len(centroids), -1)
+    weights = np.ones(centroids.shape[0]) if weights is None else np.asarray(weights, dtype=float)
+    if NP == 1 or centroids.shape[0] == 0:
+        return np.zeros(centroids.shape[0], dtype=np.int64)
+    axis = int(np.argmax(np.ptp(centroids, axis=0)))
+    # sort along the axis, ties by the other axes, so every strip is a compact block
+    keys = [centroids[:, i] for i in range(centroids.shape[1]) if i != axis][::-1]+[centroids[:, axis]]
+    order = np.lexsort(keys)
+    cum = np.cumsum(weights[order])
+    owner = np.empty(centroids.shape[0], dtype=np.int64)
+    owner[order] = np.clip(((cum-0.5*weights[order])*NP/cum[-1]).astype(np.int64), 0, NP-1)
+    return owner
+
+
+def _least_loaded(member:np.ndarray, NP:int)->np.ndarray:
+    # owner of every column: the least loaded rank holding it
+    load = np.zeros(NP, dtype=np.int64)
+    owner = np.empty(member.shape[1], dtype=np.int64)
+    for i in range(member.shape[1]):
+        candidates = np.flatnonzero(member[:, i])
+        owner[i] = candidates[np.argmin(load[candidates])]
+        load[owner[i]] += 1
+    return owner
+
+
+def plan_model(model:ModelArrays, NP:int, weights:np.ndarray = None)->BuildPlan:
+    """
+    split the whole model into NP parts, for all ranks at once
+    Elements are assigned by assign_elements, every rank holds the nodes of its elements(interface nodes are replicated),
+    nodes without elements go to rank 0. Every fix belongs to the least loaded rank holding the node, every load to the
+    lowest rank holding the node, so each is defined exactly once.
+    return: BuildPlan
+        EleOwner: np.ndarray(E,), owner rank of each element
+        Member: np.ndarray(NP,N) bool, True if the rank holds the node
+        FixOwner, LoadOwner: np.ndarray(F,), np.ndarray(L,), owner rank of each fix and load
+    """
+    owner = assign_elements(element_centroids(model), NP, weights)
+    member = np.zeros((NP, model.NodeTags.size), dtype=bool)
+    valid = model.EleNodes >= 0
+    rows = _node_index(model, model.EleNodes[valid])
+    member[np.broadcast_to(owner[:, None], model.EleNodes.shape)[valid], rows] = True
+    member[0, ~member.any(axis=0)] = True
+    fix_owner = _least_loaded(member[:, _node_index(model, model.Fixes[:, 0])], NP)
+    load_owner = np.argmax(member[:, _node_index(model, model.Loads[:, 0].astype(np.int64))], axis=0)
+    return BuildPlan(NP, owner, member, fix_owner, load_owner)
+
+
+class ParallelModelBuilder:
+    """
+    builds the part of this rank from the arrays of the whole model, for any number of ranks(NP=1 builds everything)
+        model: ModelArrays, see model_arrays
+        weights: np.ndarray(E,), default=None, element costs of the split(see assign_elements)
+    Every rank plans the split of the whole model, which is cheap next to the solve for models that fit on one rank.
+    """
+    def __init__(self, model:ModelArrays, weights:np.ndarray = None):
+        self.model = model
+        self.PID = ops.getPID()
+        self.NP = ops.getNP()
+        self.Parallel = self.NP > 1
+        self.plan = plan_model(model, self.NP, weights)
+        self._member = self.plan.Member[self.PID]
+        self._lowest = np.argmax(self.plan.Member, axis=0)
+        if self.Parallel and not (self.plan.EleOwner == self.PID).any():
+            logger.warning(f'No elements on rank {self.PID}, the model is too small for {self.NP} ranks!')
+
+    @property
+    def node_tags(self)->np.ndarray:
+        return self.model.NodeTags[self._member]
+
+    @property
+    def ele_tags(self)->np.ndarray:
+        return self.model.EleTags[self.plan.EleOwner == self.PID]
+
+    def owner_of(self, tag:int)->int:
+        """
+        rank reporting a node: the lowest rank holding it
+        """
+        return int(self._lowest[_node_index(self.model, [tag])[0]])
+
+    def build(self, ts_tag:int = 1, pattern_tag:int = 1)->None:
+        """
+        define the nodes, elements, fixes and loads of this rank,
+        the loads go to a Plain pattern of a Linear timeSeries(on every rank)
+        """
+        self.define_nodes()
+        self.define_elements()
+        self.define_fixes()
+        if self.model.Loads.shape[0]:
+            ops.timeSeries('Linear', ts_tag)
+            self.define_loads(pattern_tag, ts_tag)
+        logger.success(f'Rank {self.PID}/{self.NP}: {self._member.sum()} nodes, {self.ele_tags.size} elements, '
+                       f'{(self.plan.FixOwner == self.PID).sum()} fixes, {(self.plan.LoadOwner == self.PID).sum()} loads')
+
+    def define_nodes(self)->None:
+        for tag, xy in zip(self.model.NodeTags[self._member], self.model.Coords[self._member]):
+            ops.node(int(tag), *xy.tolist())
+
+    def define_elements(self)->None:
+        for i in np.flatnonzero(self.plan.EleOwner == self.PID):
+            kind, args = self.model.EleCommands[i]
+            nodes = self.model.EleNodes[i]
+            ops.element(kind, int(self.model.EleTags[i]), *nodes[nodes >= 0].tolist(), *args)
+
+    def define_fixes(self)->None:
+        for row in self.model.Fixes[self.plan.FixOwner == self.PID]:
+            ops.fix(int(row[0]), *row[1:].tolist())
+
+    def define_loads(self, pattern_tag:int, ts_tag:int, loads:np.ndarray = None)->None:
+        """
+        Plain pattern with the loads owned by this rank(the pattern is created on every rank)
+        loads: np.ndarray(L,1+ndf), default=None(the model loads), rows of node tag and load values
+        """
+        if loads is None:
+            loads, owner = self.model.Loads, self.plan.LoadOwner
+        else:
+            loads = np.asarray(loads, dtype=float).reshape(len(loads), -1)
+            owner = self._lowest[_node_index(self.model, loads[:, 0].astype(np.int64))]
+        ops.pattern('Plain', pattern_tag, ts_tag)
+        for row in loads[owner == self.PID]:
+            ops.load(int(row[0]), *row[1:].tolist())
+
+    def set_solver(self, numberer:str = 'RCM', serial_system:str = 'ProfileSPD')->None:
+        """
+        numberer and system of equations for the current NP
+        parallel: 'ParallelPlain'/'ParallelRCM' and 'Mumps'(the only parallel solver), serial: numberer and serial_system
+        numberer: str, default='RCM', 'Plain' or 'RCM'
+        """
+        if self.Parallel:
+            ops.numberer(f'Parallel{numberer}')
+            ops.system('Mumps')
+        else:
+            ops.numberer(numberer)
+            ops.system(serial_system)
+
+    def gather_nodal(self, response:str = 'disp')->tuple[np.ndarray,np.ndarray]:
+        """
+        nodal response of all nodes on rank 0, every node read on the lowest rank holding it
+        response: str, default='disp', 'disp', 'vel', 'accel' or 'reaction'
+        return: node tags and responses(N,ndf) on rank 0, (None, None) on the other ranks
+        """
+        func = dict(disp=ops.nodeDisp, vel=ops.nodeVel, accel=ops.nodeAccel, reaction=ops.nodeReaction)[response]
+        tags = self.model.NodeTags[self._lowest == self.PID]
+        values = np.array([func(int(tag)) for tag in tags], dtype=float)
+        if not self.Parallel:
+            return tags, values
+        if self.PID != 0:
+            send_arrays(0, dict(tags=tags, values=values))
+            return None, None
+        parts = [dict(tags=tags, values=values)]+[recv_arrays(pid) for pid in range(1, self.NP)]
+        parts = [part for part in parts if part['tags'].size]
+        tags = np.concatenate([part['tags'] for part in parts])
+        values = np.concatenate([part['values'] for part in parts])
+        order = np.argsort(tags)
+        return tags[order], values[order]
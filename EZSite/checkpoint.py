@@ -0,0 +1,241 @@
+from pathlib import Path
+import json
+import os
+import time
+import numpy as np
+import openseespy.opensees as ops
+from loguru import logger
+from EZSite.comm import allgather_array
+
+
+def nodal_state(node_tags:np.ndarray)->dict[str,np.ndarray]:
+    """
+    committed displacement, velocity and acceleration of all DOFs of the nodes, shape (N,max ndf) each,
+    the rows of nodes with fewer DOFs(e.g. the mid-side nodes of 9_4_QuadUP) are padded with zeros
+    """
+    fields = dict()
+    for name, func in (('disp', ops.nodeDisp), ('vel', ops.nodeVel), ('accel', ops.nodeAccel)):
+        rows = [func(int(tag)) for tag in node_tags]
+        values = np.zeros((len(rows), max(map(len, rows), default=0)))
+        for i, row in enumerate(rows):
+            values[i, :len(row)] = row
+        fields[name] = values
+    return fields
+
+
+def set_nodal_state(node_tags:np.ndarray, fields:dict[str,np.ndarray])->None:
+    """
+    set and commit the nodal displacement, velocity and acceleration(see nodal_state)
+    """
+    ndf = [ops.getNDF(int(tag))[0] for tag in node_tags]
+    for name, func in (('disp', ops.setNodeDisp), ('vel', ops.setNodeVel), ('accel', ops.setNodeAccel)):
+        for tag, n, values in zip(node_tags, ndf, fields[name]):
+            for dof, value in enumerate(values[:n], 1):
+                func(int(tag), dof, float(value), '-commit')
+
+
+def _replace(file_path:Path, write)->None:
+    # write to a temporary file and rename it, a killed job never leaves a half written checkpoint
+    tmp = file_path.with_name(f'.{file_path.name}.tmp')
+    with open(tmp, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, file_path)
+
+
+class CheckpointPolicy:
+    """
+    adaptive checkpoint interval, the checkpoint time stays under max_overhead of the analysis time
+    After every checkpoint the interval is set to checkpoint cost/(max_overhead*step cost), the costs are running means
+    of the wall time(the slowest rank in parallel, so all ranks keep the same interval).
+        max_overhead: float, default=0.02, checkpoint time / analysis time
+        first: int, default=50, steps before the first checkpoint
+        min_interval, max_interval: int, default=10, 1000, bounds of the interval in steps
+        smoothing: float, default=0.5, weight of the newest measurement in the running means
+    """
+    def __init__(self, max_overhead:float = 0.02, first:int = 50, min_interval:int = 10, max_interval:int = 1000,
+                 smoothing:float = 0.5):
+        self.max_overhead = max_overhead
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.smoothing = smoothing
+        self.interval = first
+        self.last = 0
+        self.step_cost = None
+        self.checkpoint_cost = None
+        self.analysis_time = 0.0
+        self.checkpoint_time = 0.0
+        self._mark = time.perf_counter()
+
+    def start(self, step:int = 0)->None:
+        """
+        start measuring at step(the resumed step)
+        """
+        self.last = step
+        self._mark = time.perf_counter()
+
+    def due(self, step:int)->bool:
+        return step-self.last >= self.interval
+
+    def _mean(self, old:float, new:float)->float:
+        return new if old is None else (1-self.smoothing)*old+self.smoothing*new
+
+    def update(self, step:int, seconds:float)->None:
+        """
+        record a checkpoint of seconds written at step and set the next interval, collective in parallel
+        """
+        step_cost = (time.perf_counter()-self._mark-seconds)/max(step-self.last, 1)
+        step_cost, seconds = allgather_array(np.array([step_cost, seconds])).max(axis=0)
+        self.analysis_time += step_cost*(step-self.last)
+        self.checkpoint_time += seconds
+        self.step_cost = self._mean(self.step_cost, step_cost)
+        self.checkpoint_cost = self._mean(self.checkpoint_cost, seconds)
+        interval = self.checkpoint_cost/(self.max_overhead*max(self.step_cost, 1e-12))
+        self.interval = int(np.clip(np.ceil(interval), self.min_interval, self.max_interval))
+        self.last = step
+        self._mark = time.perf_counter()
+
+    @property
+    def overhead(self)->float:
+        return self.checkpoint_time/max(self.analysis_time, 1e-12)
+
+
+class Checkpointer:
+    """
+    checkpoints of the transient loop of this rank in <directory>/rank<PID>/
+    A checkpoint is step_<step>.npz(nodal state and extra arrays) and step_<step>.json(step, time, dt, recorder file offsets
+    and extra state), the JSON is written last, so a checkpoint is complete only if its JSON exists. The last `keep`
+    checkpoints are kept. The nodal kinematic state is restored with setNodeDisp/Vel/Accel, the timeSeries position with
+    setTime.
+    WARNING: the material history(yield surfaces, stresses, pore pressure build-up) and element state are NOT saved, a
+             resumed run continues with the material state of the rebuilt model(the end of gravity). It is a different
+             analysis from the uninterrupted run, only an approximation, so restore needs allow_inexact=True.
+             The domain state can't be saved instead: ops.database/save/restore ends the process on restore of a
+             quadUP/PressureDependMultiYield02 model(OpenSeesPy 3.6.0.3 and 3.7.1.2). With elastic materials the nodal
+             state is the whole state and the resume is exact.
+        directory: str|Path, default='checkpoints'
+        node_tags: np.ndarray, nodes of this rank
+        policy: CheckpointPolicy, default=None(CheckpointPolicy())
+        keep: int, default=2
+    """
+    def __init__(self, directory = 'checkpoints', node_tags = None, policy:CheckpointPolicy = None, keep:int = 2):
+        self.directory = Path(directory)/f'rank{ops.getPID():03d}'
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.node_tags = np.asarray(node_tags, dtype=np.int64)
+        self.policy = CheckpointPolicy() if policy is None else policy
+        self.keep = keep
+        self.recorder_files = []
+
+    def steps(self)->list[int]:
+        """
+        steps of the complete checkpoints of this rank, ascending
+        """
+        return sorted(int(path.stem.split('_')[1]) for path in self.directory.glob('step_*.json'))
+
+    def maybe_save(self, step:int, dt:float, arrays:dict = None, state:dict = None)->bool:
+        """
+        save a checkpoint at step if the policy says it is due, arrays/state are callables returning the extra
+        arrays/state, so they are only collected when a checkpoint is written
+        """
+        if not self.policy.due(step):
+            return False
+        start = time.perf_counter()
+        # the state first, it may wait for background writers the arrays depend on
+        state = state() if state is not None else None
+        self.save(step, dt, arrays() if arrays is not None else None, state)
+        self.policy.update(step, time.perf_counter()-start)
+        logger.debug(f'Next checkpoint in {self.policy.interval} steps')
+        return True
+
+    def save(self, step:int, dt:float, arrays:dict = None, state:dict = None)->Path:
+        """
+        write a checkpoint of the current committed state
+        arrays: dict, default=None, extra arrays(e.g. the reducer state)
+        state: dict, default=None, extra JSON-able state(e.g. the writer chunk index)
+        """
+        arrays = dict() if arrays is None else arrays
+        offsets = {str(file): Path(file).stat().st_size for file in self.recorder_files if Path(file).exists()}
+        _replace(self.directory/f'step_{step:06d}.npz',
+                 lambda f: np.savez(f, node_tags=self.node_tags, **nodal_state(self.node_tags), **arrays))
+        meta = dict(step=step, time=ops.getTime(), dt=dt, recorders=offsets, state=state or dict())
+        _replace(self.directory/f'step_{step:06d}.json', lambda f: f.write(json.dumps(meta).encode()))
+        for old in self.steps()[:-self.keep]:
+            for suffix in ('.json', '.npz'):
+                (self.directory/f'step_{old:06d}{suffix}').unlink(missing_ok=True)
+        logger.debug(f'Checkpoint at step {step}(t={meta["time"]:.4f}s)')
+        return self.directory/f'step_{step:06d}.json'
+
+    def latest(self)->int:
+        """
+        last step with a complete checkpoint on every rank, None if there is none, collective in parallel
+        """
+        steps = self.steps()
+        counts = allgather_array(np.array([len(steps)]))[:, 0]
+        if counts.min() == 0:
+            return None
+        # pad to the same length for the gather
+        padded = np.full(counts.max(), -1, dtype=np.int64)
+        padded[:len(steps)] = steps
+        gathered = allgather_array(padded)
+        common = set(gathered[0].tolist())
+        for ranks in gathered[1:]:
+            common &= set(ranks.tolist())
+        common.discard(-1)
+        return max(common) if common else None
+
+    def load(self, step:int)->tuple[dict,dict]:
+        """
+        JSON meta(step, time, dt, recorders, state) and arrays of the checkpoint at step
+        """
+        with open(self.directory/f'step_{step:06d}.json') as f:
+            meta = json.load(f)
+        with np.load(self.directory/f'step_{step:06d}.npz') as data:
+            arrays = {name: data[name] for name in data.files}
+        return meta, arrays
+
+    def restore(self, allow_inexact:bool = False)->tuple[dict,dict]:
+        """
+        restore the nodal state and the domain time of the last good checkpoint(see latest)
+        allow_inexact: bool, default=False, must be True: only the nodal state is restored, NOT the material/element
+                       state(see the class WARNING), raise RuntimeError otherwise
+        return: meta and arrays of the checkpoint(see load), (None, None) if there is no checkpoint
+        """
+        if not allow_inexact:
+            raise RuntimeError('A checkpoint restores only the nodal state, not the material/element state, the resumed '
+                               'run is not the uninterrupted analysis! Pass allow_inexact=True to resume anyway.')
+        step = self.latest()
+        if step is None:
+            logger.warning(f'No checkpoint found in {self.directory}, starting from step 0')
+            return None, None
+        meta, arrays = self.load(step)
+        if not np.array_equal(arrays['node_tags'], self.node_tags):
+            raise ValueError(f'Checkpoint at step {step} was written for other nodes(a different partition?)')
+        set_nodal_state(self.node_tags, arrays)
+        ops.setTime(meta['time'])
+        self.policy.start(step)
+        logger.warning(f'INEXACT resume from the checkpoint at step {step}(t={meta["time"]:.4f}s): nodal state restored, '
+                       f'material/element state(yield surfaces, stresses) is the one of the rebuilt model, results differ '
+                       f'from the uninterrupted run!')
+        return meta, arrays
+
+    def keep_recorder_output(self, meta:dict)->list[Path]:
+        """
+        before the recorders are created again on resume(which truncates their files): cut every recorder file of the
+        checkpoint to its offset at the checkpoint(the last complete line) and rename it to <stem>_upto<step><suffix>
+        return: the renamed files
+        """
+        kept = []
+        for file, offset in meta['recorders'].items():
+            file = Path(file)
+            if not file.exists():
+                continue
+            with open(file, 'rb+') as f:
+                head = f.read(offset)
+                f.truncate(head.rfind(b'\n')+1)
+            target = file.with_name(f'{file.stem}_upto{meta["step"]:06d}{file.suffix}')
+            os.replace(file, target)
+            kept.append(target)
+        if kept:
+            logger.info(f'Recorder output up to step {meta["step"]} kept in {len(kept)} *_upto{meta["step"]:06d} files')
+        return kept
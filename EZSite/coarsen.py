@@ -0,0 +1,237 @@
+from collections import namedtuple
+from pathlib import Path
+import json
+import shutil
+import numpy as np
+from loguru import logger
+from EZSite.mesh import SiteMesh
+
+
+CoarseMesh = namedtuple('CoarseMesh', ('Mesh', 'Hanging', 'Removed', 'Merged'))
+HANGING_NODE_INFO = 'HangingNodeInfo.dat'
+
+
+def max_frequency(velocity, dt:float, energy:float = 0.95)->float:
+    """
+    maximum frequency of a motion, below it lies `energy` of the Fourier power of the acceleration(the derivative of
+    the velocity record)
+    """
+    acc = np.gradient(np.asarray(velocity, dtype=float), dt)
+    power = np.abs(np.fft.rfft(acc))**2
+    cum = np.cumsum(power)/power.sum()
+    return float(np.fft.rfftfreq(acc.size, dt)[np.searchsorted(cum, energy)])
+
+
+def max_element_size(vs, fmax:float, points_per_wavelength:float = 10)->np.ndarray:
+    """
+    largest element size along the wave path that resolves fmax, vs/(points_per_wavelength*fmax)
+    """
+    return np.asarray(vs, dtype=float)/(points_per_wavelength*fmax)
+
+
+def vertical_neighbours(mesh:SiteMesh)->np.ndarray:
+    """
+    row of the element above every element(sharing its top edge), -1 if there is none
+    """
+    nodes = mesh.ele_nodes
+    edges = np.sort(np.stack([nodes, np.roll(nodes, -1, axis=1)], axis=2).reshape(-1, 2), axis=1)
+    owner = np.repeat(np.arange(mesh.num_elements), 4)
+    keys = edges[:, 0]*(int(nodes.max())+1)+edges[:, 1]
+    order = np.argsort(keys, kind='stable')
+    shared = keys[order[1:]] == keys[order[:-1]]
+    first, second = owner[order[:-1][shared]], owner[order[1:][shared]]
+    # only the horizontal edges join vertical neighbours
+    d = np.abs(np.diff(mesh.coords_of(edges[order[:-1][shared]]), axis=1))[:, 0]
+    horizontal = d[:, 0] > d[:, 1]
+    first, second = first[horizontal], second[horizontal]
+    cy = mesh.coords[mesh.ele_node_index][..., 1].mean(axis=1)
+    swap = cy[first] > cy[second]
+    lower, upper = np.where(swap, second, first), np.where(swap, first, second)
+    above = np.full(mesh.num_elements, -1, dtype=np.int64)
+    above[lower] = upper
+    return above
+
+
+def merge_quads(lower, upper)->tuple[list[int],list[tuple[int,int,int,int]]]:
+    """
+    nodes(counterclockwise) of the quad covering two stacked quads, and the (middle, i, j, k) rows of the two nodes of
+    their shared edge: the middle node lies on edge i-j of the merged quad, k is a third node of it
+    """
+    lower, upper = list(lower), list(upper)
+    shared = [n for n in lower if n in upper]
+    # p -> q is the shared edge in the order of the lower quad, the upper quad runs it backwards
+    p = shared[0] if lower[(lower.index(shared[0])+1) % 4] == shared[1] else shared[1]
+    q = shared[1] if p == shared[0] else shared[0]
+    r = upper[(upper.index(p)+1) % 4]
+    s = upper[(upper.index(q)-1) % 4]
+    merged = [r if n == p else s if n == q else n for n in lower]
+    ip, iq = merged.index(r), merged.index(s)
+    middle = [(p, merged[ip-1], r, merged[(ip+1) % 4]), (q, s, merged[(iq+1) % 4], merged[iq-1])]
+    return merged, middle
+
+
+def _quad_area(xy:np.ndarray)->float:
+    x, y = xy[:, 0], xy[:, 1]
+    return 0.5*float(np.dot(x, np.roll(y, -1))-np.dot(y, np.roll(x, -1)))
+
+
+def _candidate_pairs(mesh:SiteMesh, hmax:np.ndarray, eligible:np.ndarray)->list:
+    # (lower row, upper row, merged nodes, middle rows) of the stacked pairs that satisfy the size criterion,
+    # pairs are counted from the bottom of every stack of eligible elements of one material, so they line up
+    above = vertical_neighbours(mesh)
+    below = np.full(mesh.num_elements, -1, dtype=np.int64)
+    below[above[above >= 0]] = np.flatnonzero(above >= 0)
+    same = lambda a, b: b >= 0 and eligible[b] and mesh.mat_tags[a] == mesh.mat_tags[b]
+    pairs = []
+    for start in np.flatnonzero(eligible):
+        if same(start, below[start]):
+            continue
+        a = start
+        while a >= 0 and same(a, above[a]):
+            b = above[a]
+            merged, middle = merge_quads(mesh.ele_nodes[a], mesh.ele_nodes[b])
+            xy = mesh.coords_of(merged)
+            area = _quad_area(mesh.coords_of(mesh.ele_nodes[a]))+_quad_area(mesh.coords_of(mesh.ele_nodes[b]))
+            # the middle nodes must lie on the edges of the merged quad
+            if np.ptp(xy[:, 1]) <= min(hmax[a], hmax[b]) and abs(_quad_area(xy)-area) <= 1e-6*area:
+                pairs.append((a, b, merged, middle))
+            # the stack ends at a material boundary, the next material starts its own stack
+            a = above[b] if same(b, above[b]) else -1
+    return pairs
+
+
+def _merge(mesh:SiteMesh, pairs:list)->tuple[np.ndarray,np.ndarray,list,np.ndarray]:
+    # element rows kept, their nodes, the hanging node rows and the removed nodes after merging the pairs
+    ele_nodes = mesh.ele_nodes.copy()
+    keep = np.ones(mesh.num_elements, dtype=bool)
+    for a, b, merged, _ in pairs:
+        ele_nodes[a] = merged
+        keep[b] = False
+    used = np.unique(ele_nodes[keep])
+    hanging, removed = dict(), set()
+    for *_, middle in pairs:
+        for row in middle:
+            if row[0] in used:
+                hanging.setdefault(int(row[0]), tuple(int(n) for n in row))
+            else:
+                removed.add(int(row[0]))
+    return keep, ele_nodes, list(hanging.values()), np.array(sorted(removed), dtype=np.int64)
+
+
+def coarsen_mesh(mesh:SiteMesh, hmax:np.ndarray, eligible:np.ndarray, protected = (), max_passes:int = 3)->CoarseMesh:
+    """
+    merge stacked pairs of eligible quads of the same material while the merged height(y extent) stays below hmax of
+    both, repeated up to max_passes times(every pass can halve the rows of a layer again)
+    A middle node still used by another element becomes a hanging node tied to the edge of the merged quad, the
+    others are removed. Pairs are dropped if they would leave a protected node(fixes, equalDOFs, mass) or a node of an
+    earlier tie hanging, remove a tie node, or merge an element holding a tie.
+    hmax: np.ndarray(E,), largest allowed element size, see max_element_size
+    eligible: np.ndarray(E,) bool, elements that may be merged
+    return: CoarseMesh
+        Mesh: SiteMesh, coarsened mesh(merged elements keep the tag of the lower element)
+        Hanging: np.ndarray(H,4), rows of hanging node, edge nodes i and j, third node k of the merged quad
+        Removed: np.ndarray, removed node tags
+        Merged: int, merged element pairs
+    """
+    protected = {int(tag) for tag in protected}
+    hmax = np.asarray(hmax, dtype=float).copy()
+    eligible = np.asarray(eligible, dtype=bool).copy()
+    hanging, removed, merged = [], [], 0
+    for _ in range(max_passes):
+        pairs = _candidate_pairs(mesh, hmax, eligible)
+        tie_nodes = {n for row in hanging for n in row}
+        while pairs:
+            keep, ele_nodes, new_hanging, new_removed = _merge(mesh, pairs)
+            bad = {row[0] for row in new_hanging if row[0] in protected | tie_nodes}
+            bad |= tie_nodes & set(new_removed.tolist())
+            if not bad:
+                break
+            pairs = [pair for pair in pairs if not bad & {row[0] for row in pair[3]}]
+        if not pairs:
+            break
+        hanging += new_hanging
+        removed += new_removed.tolist()
+        merged += len(pairs)
+        # elements holding a tie are not merged again
+        hosts = {n for row in new_hanging for n in row[1:]}
+        eligible = eligible & ~np.isin(ele_nodes, list(hosts)).any(axis=1)
+        nodes = np.setdiff1d(mesh.node_tags, new_removed)
+        mesh = SiteMesh(nodes, mesh.coords_of(nodes), mesh.ele_tags[keep], ele_nodes[keep], mesh.mat_tags[keep])
+        hmax, eligible = hmax[keep], eligible[keep]
+    hanging = np.array(hanging, dtype=np.int64).reshape(-1, 4)
+    return CoarseMesh(mesh, hanging, np.array(sorted(removed), dtype=np.int64), merged)
+
+
+def _read(file_path:Path)->list[list[str]]:
+    with open(file_path, 'r') as f:
+        return [line.split() for line in f if line.strip()]
+
+
+def read_site_mesh(src_dir)->SiteMesh:
+    """
+    SiteMesh of nodeInfo.dat and elementInfo.dat of a site data directory
+    """
+    src_dir = Path(src_dir)
+    nodes = np.array(_read(src_dir/'nodeInfo.dat'), dtype=float)
+    elements = np.array(_read(src_dir/'elementInfo.dat'), dtype=np.int64)
+    return SiteMesh(nodes[:, 0], nodes[:, 1:3], elements[:, 0], elements[:, 1:5], elements[:, 5])
+
+
+def _constraint_files(src_dir:Path)->dict[str,int]:
+    # site files with node tag columns: file name -> number of leading node tags
+    files = {'fixedNodeInfo.dat': 1, 'massInfo.dat': 1}
+    files.update({path.name: 2 for path in src_dir.glob('EqualDOFnodes_*_Info.dat')})
+    return {name: ntags for name, ntags in files.items() if (src_dir/name).exists()}
+
+
+def coarsen_site_files(src_dir, dst_dir, hmax:np.ndarray, eligible:np.ndarray, max_passes:int = 3, info:dict = None)->dict:
+    """
+    write a coarsened copy of a site data directory(see coarsen_mesh), the hanging node ties in HangingNodeInfo.dat
+    (hanging, i, j, k per row) and the report in coarsen.json
+    Rows of fixedNodeInfo.dat, EqualDOFnodes_*_Info.dat and massInfo.dat with removed nodes are dropped(e.g. the
+    free-field column pairs of a merged row), other files are copied.
+    hmax, eligible: np.ndarray(E,), in the row order of elementInfo.dat
+    info: dict, default=None, extra entries of the report(e.g. the frequency criterion)
+    return: the report
+    """
+    src_dir, dst_dir = Path(src_dir), Path(dst_dir)
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    mesh = read_site_mesh(src_dir)
+    files = _constraint_files(src_dir)
+    protected = [int(row[i]) for name, ntags in files.items() for row in _read(src_dir/name) for i in range(ntags)]
+    coarse = coarsen_mesh(mesh, hmax, eligible, protected, max_passes)
+    removed = set(coarse.Removed.tolist())
+
+    with open(src_dir/'nodeInfo.dat', 'r') as f:
+        lines = [line for line in f if line.strip() and int(line.split()[0]) not in removed]
+    with open(dst_dir/'nodeInfo.dat', 'w') as f:
+        f.writelines(lines)
+    new = coarse.Mesh
+    with open(dst_dir/'elementInfo.dat', 'w') as f:
+        f.writelines(f'{tag:8d} ' + ' '.join(f'{n:9d}' for n in nodes) + f' {mat:6d} \n'
+                     for tag, nodes, mat in zip(new.ele_tags, new.ele_nodes, new.mat_tags))
+    dropped = dict()
+    for path in sorted(src_dir.iterdir()):
+        if path.name in ('nodeInfo.dat', 'elementInfo.dat', 'coarsen.json', HANGING_NODE_INFO) or not path.is_file():
+            continue
+        if path.name not in files:
+            shutil.copyfile(path, dst_dir/path.name)
+            continue
+        with open(path, 'r') as f:
+            lines = [line for line in f if line.strip()]
+        kept = [line for line in lines if not removed & {int(tag) for tag in line.split()[:files[path.name]]}]
+        dropped[path.name] = len(lines)-len(kept)
+        with open(dst_dir/path.name, 'w') as f:
+            f.writelines(kept)
+    with open(dst_dir/HANGING_NODE_INFO, 'w') as f:
+        f.writelines(' '.join(f'{n:8d}' for n in row) + '\n' for row in coarse.Hanging)
+
+    report = dict(info or dict())
+    report.update(nodes=[int(mesh.num_nodes), int(new.num_nodes)], elements=[int(mesh.num_elements), int(new.num_elements)],
+                  merged=int(coarse.Merged), removed=int(coarse.Removed.size), hanging=int(coarse.Hanging.shape[0]),
+                  dropped_rows=dropped)
+    with open(dst_dir/'coarsen.json', 'w') as f:
+        json.dump(report, f, indent=1)
+    logger.success(f'Site data coarsened into {dst_dir}: {mesh.num_elements} -> {new.num_elements} elements, '
+                   f'{mesh.num_nodes} -> {new.num_nodes} nodes, {coarse.Hanging.shape[0]} hanging node ties')
+    return report
@@ -0,0 +1,82 @@
+import json
+import numpy as np
+import openseespy.opensees as ops
+
+
+def _layout(arrays:dict)->list:
+    return [[name, array.dtype.str, list(array.shape)] for name, array in arrays.items()]
+
+
+def _pack(arrays:dict)->list[float]:
+    # one message of doubles, exact for node/element tags below 2**53
+    if not arrays:
+        return []
+    return np.concatenate([array.ravel().astype(float) for array in arrays.values()]).tolist()
+
+
+def _unpack(layout:list, payload)->dict[str,np.ndarray]:
+    # ops.recv/ops.Bcast return a plain float for a single value
+    payload = np.asarray(payload if payload is not None else [], dtype=float).ravel()
+    arrays, start = dict(), 0
+    for name, dtype, shape in layout:
+        size = int(np.prod(shape, dtype=np.int64))
+        arrays[name] = payload[start:start+size].astype(np.dtype(dtype)).reshape(shape)
+        start += size
+    return arrays
+
+
+def send_arrays(pid:int, arrays:dict)->None:
+    """
+    send named arrays to rank pid with ops.send(a JSON layout message, then one message of doubles)
+    """
+    arrays = {name: np.asarray(array) for name, array in arrays.items()}
+    layout = _layout(arrays)
+    ops.send('-pid', pid, json.dumps(layout))
+    if sum(array.size for array in arrays.values()) > 0:
+        ops.send('-pid', pid, *_pack(arrays))
+
+
+def recv_arrays(pid:int = 0)->dict[str,np.ndarray]:
+    """
+    receive named arrays sent by send_arrays from rank pid
+    """
+    layout = json.loads(ops.recv('-pid', pid))
+    total = sum(int(np.prod(shape, dtype=np.int64)) for _, _, shape in layout)
+    payload = ops.recv('-pid', pid) if total > 0 else []
+    return _unpack(layout, payload)
+
+
+def bcast_arrays(arrays:dict = None)->dict[str,np.ndarray]:
+    """
+    broadcast named arrays from rank 0 to all ranks with ops.Bcast
+    arrays: dict, name -> np.ndarray on rank 0, ignored on the other ranks
+    return: the arrays on every rank
+    """
+    if ops.getNP() == 1:
+        return {name: np.asarray(array) for name, array in arrays.items()}
+    if ops.getPID() == 0:
+        arrays = {name: np.asarray(array) for name, array in arrays.items()}
+        layout = _layout(arrays)
+        ops.Bcast(json.dumps(layout))
+        if sum(array.size for array in arrays.values()) > 0:
+            ops.Bcast(*_pack(arrays))
+        return arrays
+    # the other ranks pass a placeholder of the same type
+    layout = json.loads(ops.Bcast(''))
+    total = sum(int(np.prod(shape, dtype=np.int64)) for _, _, shape in layout)
+    payload = ops.Bcast(0.0) if total > 0 else []
+    return _unpack(layout, payload)
+
+
+def allgather_array(array)->np.ndarray:
+    """
+    gather one array of the same shape from every rank on all ranks, shape (NP,)+array.shape
+    """
+    array = np.asarray(array)
+    if ops.getNP() == 1:
+        return array[None]
+    if ops.getPID() == 0:
+        gathered = [array]+[recv_arrays(pid)['array'] for pid in range(1, ops.getNP())]
+        return bcast_arrays(dict(array=np.stack(gathered)))['array']
+    send_arrays(0, dict(array=array))
+    return bcast_arrays()['array']
@@ -0,0 +1,157 @@
+from collections import namedtuple
+from importlib import metadata
+from pathlib import Path
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+from loguru import logger
+from EZSite.mesh import SiteMesh
+
+
+# default cache of load_material_costs, EZSITE_COST_CACHE overrides it
+COST_CACHE_PATH = Path(os.environ.get('EZSITE_COST_CACHE', Path.home()/'.cache'/'EZSite'/'material_costs.json'))
+
+
+def material_cost_key(prop:namedtuple)->str:
+    """
+    cache key of a material benchmark: machine, OpenSeesPy version and all material parameters(the tag excluded)
+    """
+    try:
+        version = metadata.version('openseespy')
+    except metadata.PackageNotFoundError:
+        version = 'unknown'
+    params = {k: v for k, v in prop._asdict().items() if k not in ('matTag', 'note')}
+    text = json.dumps([platform.node(), platform.machine(), version, params], sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def _define_material(prop:namedtuple)->None:
+    from EZSite.opsmaterial import EZOpsMaterial
+    define = {'PressureDependMultiYield': EZOpsMaterial.define_PressureDependMultiYield,
+              'PressureDependMultiYield02': EZOpsMaterial.define_PressureDependMultiYield02,
+              'PressureDependMultiYield03': EZOpsMaterial.define_PressureDependMultiYield03,
+              'PressureIndependMultiYield': EZOpsMaterial.define_PressureIndependMultiYield}
+    define[prop.SoilType](prop)
+
+
+def _time_element(prop:namedtuple = None, nstep:int = 200, strain:float = 2e-3)->float:
+    """
+    seconds per step of one plane strain quad under confinement and cyclic shear, ElasticIsotropic if prop is None
+    Runs in the current OpenSees domain(it is wiped), use benchmark_materials to run it in a separate process.
+    """
+    import openseespy.opensees as ops
+    ops.wipe()
+    ops.model('basic', '-ndm', 2, '-ndf', 2)
+    for tag, (x, y) in enumerate([(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)], start=1):
+        ops.node(tag, x, y)
+    ops.fix(1, 1, 1)
+    ops.fix(2, 1, 1)
+    ops.equalDOF(3, 4, 1, 2)
+    if prop is None:
+        ops.nDMaterial('ElasticIsotropic', 1, 2.0e5, 0.3)
+        confinement = 100.0
+    else:
+        _define_material(prop._replace(matTag=1))
+        confinement = float(getattr(prop, 'refPress', 100.0))
+    ops.element('quad', 1, 1, 2, 3, 4, 1.0, 'PlaneStrain', 1)
+    ops.constraints('Transformation')
+    ops.numberer('Plain')
+    ops.system('BandGeneral')
+    ops.test('NormDispIncr', 1e-8, 50, 0)
+    ops.algorithm('Newton')
+
+    # elastic confinement
+    ops.timeSeries('Linear', 1)
+    ops.pattern('Plain', 1, 1)
+    ops.load(3, 0.0, -0.5*confinement)
+    ops.load(4, 0.0, -0.5*confinement)
+    ops.integrator('LoadControl', 0.1)
+    ops.analysis('Static')
+    ops.analyze(10)
+    ops.loadConst('-time', 0.0)
+    if prop is not None:
+        ops.updateMaterialStage('-material', 1, '-stage', 1)
+
+    # cyclic shear, top x displacement controlled(3 cycles)
+    ops.timeSeries('Trig', 2, 0.0, float(nstep), nstep/3.0)
+    ops.pattern('Plain', 2, 2)
+    ops.sp(3, 1, strain)
+    ops.integrator('LoadControl', 1.0)
+    ops.analysis('Static')
+    start = time.perf_counter()
+    for _ in range(nstep):
+        ops.analyze(1)
+    elapsed = time.perf_counter()-start
+    ops.wipe()
+    return elapsed/nstep
+
+
+def benchmark_materials(props:dict, nstep:int = 200, repeat:int = 3)->dict[str,float]:
+    """
+    per-element state determination cost of every material relative to an ElasticIsotropic element
+    The benchmark runs in a separate Python process, so the model in this process is not touched.
+    props: dict, name -> material namedtuple(SOIL_MAT_PROP)
+    nstep: int, default=200, cyclic shear steps
+    repeat: int, default=3, the fastest repetition is used
+    return: dict, name -> relative cost(>= 1)
+    """
+    payload = dict(nstep=nstep, repeat=repeat,
+                   props={name: dict(prop._asdict(), _fields=list(prop._fields)) for name, prop in props.items()})
+    result = subprocess.run([sys.executable, '-m', 'EZSite.costmodel'], input=json.dumps(payload), capture_output=True,
+                            text=True, check=True, cwd=Path(__file__).parent.parent)
+    costs = json.loads(result.stdout.strip().splitlines()[-1])
+    for name, cost in costs.items():
+        logger.info(f'Material {name}({props[name].SoilType}): relative state determination cost {cost:.2f}')
+    return costs
+
+
+def load_material_costs(props:dict, cache_path = COST_CACHE_PATH, refresh:bool = False, **kwargs)->dict[str,float]:
+    """
+    relative cost of every material, benchmarked once per machine and material parameters and cached as JSON
+    props: dict, name -> material namedtuple(SOIL_MAT_PROP)
+    cache_path: str|Path, default=COST_CACHE_PATH(~/.cache/EZSite/material_costs.json or $EZSITE_COST_CACHE)
+    refresh: bool, default=False, benchmark again even if cached
+    kwargs: passed to benchmark_materials
+    """
+    cache_path = Path(cache_path)
+    cache = dict()
+    if cache_path.exists() and not refresh:
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+    keys = {name: material_cost_key(prop) for name, prop in props.items()}
+    missing = {name: props[name] for name, key in keys.items() if key not in cache}
+    if missing:
+        logger.info(f'Benchmarking {len(missing)} materials: {list(missing)}')
+        for name, cost in benchmark_materials(missing, **kwargs).items():
+            cache[keys[name]] = cost
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, 'w') as f:
+            json.dump(cache, f, indent=1)
+    return {name: float(cache[key]) for name, key in keys.items()}
+
+
+def element_costs(mesh:SiteMesh, costs_by_tag:dict[int,float], default:float = 1.0)->np.ndarray:
+    """
+    cost of every element of the mesh from its material tag, default for materials without cost
+    """
+    mats = np.unique(mesh.mat_tags)
+    table = np.array([costs_by_tag.get(int(mat), default) for mat in mats], dtype=float)
+    return table[np.searchsorted(mats, mesh.mat_tags)]
+
+
+if __name__ == '__main__':
+    # benchmark worker of benchmark_materials: JSON payload on stdin, JSON costs on the last stdout line
+    payload = json.loads(sys.stdin.read())
+    nstep, repeat = payload['nstep'], payload['repeat']
+    reference = min(_time_element(None, nstep) for _ in range(repeat))
+    costs = dict()
+    for name, fields in payload['props'].items():
+        Prop = namedtuple('SoilProp', fields.pop('_fields'))
+        prop = Prop(**fields)
+        costs[name] = max(min(_time_element(prop, nstep) for _ in range(repeat))/reference, 1.0)
+    print(json.dumps(costs))
@@ -0,0 +1,120 @@
+from collections import namedtuple
+import numpy as np
+import openseespy.opensees as ops
+from loguru import logger
+
+
+DofEntry = namedtuple('DofEntry', ['Equation', 'NodeTag', 'DOF', 'Coords', 'EleTags', 'Layers'])
+
+
+class DofIndex:
+    """
+    equation number -> (node, DOF) of this rank, and the elements(material layers) of the node, for the diagnosis of
+    singular matrices(e.g. a zero pivot of ProfileSPD/Mumps)
+    The equations are numbered by the first analyze after ops.analysis(or a domainChange), the index is built on the
+    first query after that and built again when the equation, node or element count has changed or after invalidate.
+        ele_layers: dict, default=None, {element tag: material layer name}
+    """
+    def __init__(self, ele_layers:dict = None):
+        self.ele_layers = dict() if ele_layers is None else ele_layers
+        self._stamp = None
+
+    @staticmethod
+    def _domain_stamp()->tuple[int,int,int]:
+        return ops.systemSize(), len(ops.getNodeTags()), len(ops.getEleTags())
+
+    @property
+    def stale(self)->bool:
+        return self._stamp != self._domain_stamp()
+
+    def invalidate(self)->None:
+        """
+        build the index again on the next query
+        """
+        self._stamp = None
+
+    def domain_change(self)->None:
+        """
+        ops.domainChange() and invalidate, the equations are numbered again by the next analyze
+        """
+        ops.domainChange()
+        self.invalidate()
+
+    def build(self)->None:
+        """
+        one pass over the nodes and elements of this rank
+        """
+        stamp = self._domain_stamp()
+        if stamp[0] == 0:
+            raise RuntimeError('No equations numbered yet, run analyze once after ops.analysis!')
+        neq = stamp[0]
+        self.eq_node = np.full(neq, -1, dtype=np.int64)
+        self.eq_dof = np.full(neq, -1, dtype=np.int64)
+        node_eqs = dict()
+        num_dofs = 0
+        for tag in ops.getNodeTags():
+            eqs = np.asarray(ops.nodeDOFs(tag), dtype=np.int64)
+            num_dofs += eqs.size
+            node_eqs[tag] = eqs[eqs >= 0]
+            valid = (eqs >= 0) & (eqs < neq)
+            self.eq_node[eqs[valid]] = tag
+            self.eq_dof[eqs[valid]] = np.flatnonzero(valid)+1
+        self.node_elements = dict()
+        bandwidth = []
+        for ele in ops.getEleTags():
+            nodes = ops.eleNodes(ele)
+            for tag in nodes:
+                self.node_elements.setdefault(tag, []).append(ele)
+            eqs = np.concatenate([node_eqs.get(tag, np.zeros(0, dtype=np.int64)) for tag in nodes])
+            if eqs.size:
+                bandwidth.append(eqs.max()-eqs.min()+1)
+        self.bandwidth = np.array(bandwidth, dtype=np.int64)
+        self.num_nodes = stamp[1]
+        self.num_constrained = num_dofs-sum(eqs.size for eqs in node_eqs.values())
+        self._stamp = stamp
+
+    def _ensure(self)->None:
+        if self.stale:
+            self.build()
+
+    def lookup(self, equations)->tuple[np.ndarray,np.ndarray]:
+        """
+        node tags and DOFs(1-based) of the equations, -1 for equations not on this rank
+        """
+        self._ensure()
+        equations = np.atleast_1d(np.asarray(equations, dtype=np.int64))
+        valid = (equations >= 0) & (equations < self.eq_node.size)
+        nodes = np.where(valid, self.eq_node[np.where(valid, equations, 0)], -1)
+        dofs = np.where(valid, self.eq_dof[np.where(valid, equations, 0)], -1)
+        return nodes, dofs
+
+    def describe(self, equations)->list[DofEntry]:
+        """
+        node, DOF, coordinates, elements and material layers of the equations(None for equations not on this rank)
+        """
+        entries = []
+        for eq, node, dof in zip(np.atleast_1d(equations).tolist(), *self.lookup(equations)):
+            if node < 0:
+                entries.append(None)
+                continue
+            eles = self.node_elements.get(int(node), [])
+            layers = sorted({self.ele_layers[ele] for ele in eles if ele in self.ele_layers})
+            entries.append(DofEntry(int(eq), int(node), int(dof), ops.nodeCoord(int(node)), eles, layers))
+        return entries
+
+    def summary(self)->dict:
+        """
+        equation count and element bandwidth(equation span of the nodes of an element) of this rank
+        """
+        self._ensure()
+        bandwidth = self.bandwidth if self.bandwidth.size else np.zeros(1, dtype=np.int64)
+        return dict(rank=ops.getPID(), equations=int(self.eq_node.size), nodes=self.num_nodes,
+                    constrained_dofs=self.num_constrained, max_bandwidth=int(bandwidth.max()),
+                    mean_bandwidth=round(float(bandwidth.mean()), 1))
+
+    def log_summary(self)->dict:
+        summary = self.summary()
+        logger.info(f'Rank {summary["rank"]}: {summary["equations"]} equations on {summary["nodes"]} nodes, '
+                    f'{summary["constrained_dofs"]} constrained DOFs, bandwidth max {summary["max_bandwidth"]}, '
+                    f'mean {summary["mean_bandwidth"]}')
+        return summary
@@ -0,0 +1,123 @@
+from collections import namedtuple
+import numpy as np
+from EZSite.mesh import SiteMesh
+
+
+GeostaticState = namedtuple('GeostaticState', ('NodeTags', 'PorePressure', 'SigmaV', 'EleTags', 'EleStress'))
+
+
+def poisson_ratio(shear_modulus, bulk_modulus)->np.ndarray:
+    """
+    Poisson's ratio from shear and bulk modulus
+    """
+    G, K = np.asarray(shear_modulus, dtype=float), np.asarray(bulk_modulus, dtype=float)
+    return (3*K-2*G)/(2*(3*K+G))
+
+
+def rows_of(tags:np.ndarray, query)->np.ndarray:
+    """
+    row of every query tag in tags(all query tags must exist)
+    """
+    order = np.argsort(tags, kind='stable')
+    return order[np.searchsorted(tags, np.asarray(query, dtype=np.int64), sorter=order)]
+
+
+def _columns(mesh:SiteMesh, used:np.ndarray, tol:float)->tuple[np.ndarray,np.ndarray]:
+    # node rows sorted by column(x within tol) and descending y, and the column start flags
+    rows = np.flatnonzero(used)
+    key = np.round(mesh.x[rows]/tol).astype(np.int64)
+    order = rows[np.lexsort((-mesh.y[rows], key))]
+    key = np.round(mesh.x[order]/tol).astype(np.int64)
+    start = np.r_[True, key[1:] != key[:-1]]
+    return order, start
+
+
+def _group_cumsum(values:np.ndarray, start:np.ndarray)->np.ndarray:
+    total = np.cumsum(values)
+    offset = np.maximum.accumulate(np.where(start, np.arange(values.size), 0))
+    return total-total[offset]+values[offset]
+
+
+def vertical_stress(mesh:SiteMesh, rho_by_mat:dict[int,float], g:float = 9.81, tol:float = 1e-3)->np.ndarray:
+    """
+    total vertical overburden stress at every node(positive in compression), integrated down every vertical node column
+    The density of a segment between two nodes of a column is the mean density of the elements sharing that edge,
+    the mean of the two node densities if they are not connected. Nodes not used by any element get 0.
+    mesh: SiteMesh, whole site
+    rho_by_mat: dict, material tag -> mass density of the saturated soil
+    tol: float, default=1e-3, x tolerance of a node column
+    """
+    ele_rows = mesh.ele_node_index
+    ele_rho = np.array([rho_by_mat[int(tag)] for tag in mesh.mat_tags], dtype=float)
+    used = np.zeros(mesh.num_nodes, dtype=bool)
+    used[ele_rows.ravel()] = True
+    # node density: mean of the adjacent elements
+    node_rho = np.bincount(ele_rows.ravel(), np.repeat(ele_rho, 4), mesh.num_nodes)
+    node_rho /= np.maximum(np.bincount(ele_rows.ravel(), minlength=mesh.num_nodes), 1)
+    # edge density: mean of the elements sharing the edge
+    edges = np.sort(np.stack([ele_rows, np.roll(ele_rows, -1, axis=1)], axis=2).reshape(-1, 2), axis=1)
+    edge_keys = edges[:, 0]*mesh.num_nodes+edges[:, 1]
+    unique, inverse = np.unique(edge_keys, return_inverse=True)
+    edge_rho = np.bincount(inverse, np.repeat(ele_rho, 4))/np.bincount(inverse)
+
+    order, start = _columns(mesh, used, tol)
+    upper = np.r_[order[0], order[:-1]]
+    pair = np.sort(np.stack([order, upper], axis=1), axis=1)
+    pos = np.clip(np.searchsorted(unique, pair[:, 0]*mesh.num_nodes+pair[:, 1]), 0, unique.size-1)
+    connected = unique[pos] == pair[:, 0]*mesh.num_nodes+pair[:, 1]
+    rho = np.where(connected, edge_rho[pos], 0.5*(node_rho[order]+node_rho[upper]))
+    weight = np.where(start, 0.0, rho*g*(mesh.y[upper]-mesh.y[order]))
+    sigma = np.zeros(mesh.num_nodes)
+    sigma[order] = _group_cumsum(weight, start)
+    return sigma
+
+
+def hydrostatic_pore_pressure(mesh:SiteMesh, water_level:float, drained_tags = (), gamma_w:float = 9.81, tol:float = 1e-3)->np.ndarray:
+    """
+    hydrostatic pore pressure at every node, the water table of a column is the water level or the lowest drained node
+    (pore pressure fixed to 0) of the column below it, e.g. a submerged ground surface
+    drained_tags: iterable of int, nodes with pore pressure fixed to 0 below the water level
+    """
+    key = np.round(mesh.x/tol).astype(np.int64)
+    table = np.full(mesh.num_nodes, float(water_level))
+    drained = mesh.index_of(np.asarray(list(drained_tags), dtype=np.int64))
+    drained = drained[mesh.y[drained] < water_level]
+    if drained.size:
+        columns, inverse = np.unique(key, return_inverse=True)
+        lowest = np.full(columns.size, float(water_level))
+        np.minimum.at(lowest, np.searchsorted(columns, key[drained]), mesh.y[drained])
+        table = lowest[inverse]
+    return gamma_w*np.maximum(table-mesh.y, 0.0)
+
+
+def geostatic_state(mesh:SiteMesh, rho_by_mat:dict[int,float], nu_by_mat:dict[int,float], water_level:float,
+                    drained_tags = (), gamma_w:float = 9.81, g:float = 9.81)->GeostaticState:
+    """
+    at-rest(K0) state of a layered site from its overburden
+        PorePressure: hydrostatic pore pressure of every node(see hydrostatic_pore_pressure), 0 for nodes without elements
+        SigmaV: total vertical stress of every node(see vertical_stress)
+        EleStress: effective stress(xx, yy, zz, xy) at the element centroids in the OpenSees sign convention(compression < 0),
+                   horizontal = K0*vertical with K0 = nu/(1-nu) of the elastic stage
+    nu_by_mat: dict, material tag -> Poisson's ratio
+    """
+    pore = hydrostatic_pore_pressure(mesh, water_level, drained_tags, gamma_w)
+    sigma_v = vertical_stress(mesh, rho_by_mat, g)
+    ele_rows = mesh.ele_node_index
+    used = np.zeros(mesh.num_nodes, dtype=bool)
+    used[ele_rows.ravel()] = True
+    pore[~used] = 0.0
+    effective = np.maximum(sigma_v[ele_rows].mean(axis=1)-pore[ele_rows].mean(axis=1), 0.0)
+    nu = np.array([nu_by_mat[int(tag)] for tag in mesh.mat_tags], dtype=float)
+    k0 = nu/(1-nu)
+    stress = np.stack([-k0*effective, -effective, -k0*effective, np.zeros_like(effective)], axis=1)
+    return GeostaticState(mesh.node_tags, pore, sigma_v, mesh.ele_tags, stress)
+
+
+def pressure_dependent_modulus(ref_modulus, mean_stress, ref_press, d, min_ratio:float = 0.01)->np.ndarray:
+    """
+    small strain modulus of the multi yield materials at a mean effective stress, ref_modulus*(p'/ref_press)**d
+    mean_stress: mean effective stress p'(positive in compression), at least min_ratio*ref_press
+    """
+    ref_press = np.asarray(ref_press, dtype=float)
+    p = np.maximum(np.asarray(mean_stress, dtype=float), min_ratio*ref_press)
+    return np.asarray(ref_modulus, dtype=float)*(p/ref_press)**np.asarray(d, dtype=float)
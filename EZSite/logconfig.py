@@ -0,0 +1,185 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import os
+import sys
+import time
+import openseespy.opensees as ops
+from loguru import logger
+from EZSite.profiling import PROFILER
+from EZSite.sharedmesh import rss_breakdown
+
+
+PARALLEL_FORMAT = "{time:YY-MM-DD HH:mm:ss} |<lvl>{level:8}</>| PID:<cyan>{extra[PID]}</> NP:<green>{extra[NP]}</> | <cyan>{module} : {function}:{line:4}</> - <lvl>{message}</>"
+# per-item messages inside loops over nodes/elements, checked once before the loop(see hot_logging)
+_HOT_LOOP_LOGGING = True
+# set by configure_logging, see ensure_logging
+_CONFIGURED = False
+
+
+class RateLimiter:
+    """
+    loguru filter passing at most `burst` records of every call site per `period` seconds, the rest are counted
+        burst: int, default=5
+        period: float, default=60.0, seconds
+    """
+    def __init__(self, burst:int = 5, period:float = 60.0):
+        self.burst = burst
+        self.period = period
+        self._window = dict()
+        self.suppressed = defaultdict(int)
+
+    def __call__(self, record)->bool:
+        key = (record['name'], record['function'], record['line'])
+        now = record['time'].timestamp()
+        start, count = self._window.get(key, (now, 0))
+        if now-start > self.period:
+            start, count = now, 0
+        self._window[key] = (start, count+1)
+        if count < self.burst:
+            return True
+        self.suppressed[key] += 1
+        return False
+
+
+def _reset_peak_rss()->None:
+    # Linux >= 4.0: reset VmHWM to the current RSS, so the peak of every stage can be read at its end
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+class StageLog:
+    """
+    per-stage wall/CPU time, resident memory and log record counts of this rank
+    Records at or above the level of configure_logging are counted by a lightweight sink under the innermost open stage.
+    Memory(MB, Linux only): rss is the steady RSS at the end of the stage, peak_rss the highest RSS during the stage.
+    A stage is also a stage of EZSite.profiling.PROFILER while it is enabled.
+    """
+    def __init__(self):
+        self.stages = dict()
+        self._open = []
+        self._peaks = []
+        self.limiter = None
+
+    def _entry(self, name:str)->dict:
+        return self.stages.setdefault(name, dict(calls=0, wall=0.0, cpu=0.0, rss=0.0, peak_rss=0.0, records=defaultdict(int)))
+
+    def sink(self, message)->None:
+        stage = self._open[-1] if self._open else 'other'
+        self._entry(stage)['records'][message.record['level'].name] += 1
+
+    @contextmanager
+    def stage(self, name:str):
+        """
+        time a stage, e.g. `with STAGES.stage('gravity'): ...`
+        """
+        entry = self._entry(name)
+        if self._peaks:
+            # keep the peak of the enclosing stage before resetting it
+            self._peaks[-1] = max(self._peaks[-1], rss_breakdown().get('VmHWM', 0.0))
+        _reset_peak_rss()
+        self._open.append(name)
+        self._peaks.append(0.0)
+        profiled = PROFILER.enabled
+        if profiled:
+            PROFILER.start(name)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield entry
+        finally:
+            if profiled:
+                PROFILER.stop()
+            entry['calls'] += 1
+            entry['wall'] += time.perf_counter()-wall
+            entry['cpu'] += time.process_time()-cpu
+            memory = rss_breakdown()
+            peak = max(self._peaks.pop(), memory.get('VmHWM', 0.0))
+            entry['rss'] = memory.get('VmRSS', 0.0)
+            entry['peak_rss'] = max(entry['peak_rss'], peak)
+            self._open.pop()
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+
+    def summary(self)->dict:
+        summary = {name: dict(entry, records=dict(entry['records'])) for name, entry in self.stages.items()}
+        if self.limiter is not None and self.limiter.suppressed:
+            summary['suppressed'] = {f'{n}:{f}:{l}': c for (n, f, l), c in self.limiter.suppressed.items()}
+        return summary
+
+    def write(self, file_path)->Path:
+        """
+        write the stage summary as JSON
+        """
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(file_path, 'w') as f:
+            json.dump(self.summary(), f, indent=1)
+        return file_path
+
+    def log_summary(self)->None:
+        for name, entry in self.stages.items():
+            records = ', '.join(f'{level}:{count}' for level, count in entry['records'].items())
+            logger.info(f'Stage {name}: {entry["calls"]} calls, wall {entry["wall"]:.3f}s, cpu {entry["cpu"]:.3f}s, '
+                        f'RSS {entry["rss"]:.1f} MB(peak {entry["peak_rss"]:.1f} MB), records {records or 0}')
+        if self.limiter is not None and self.limiter.suppressed:
+            logger.info(f'{sum(self.limiter.suppressed.values())} repeated records suppressed at {len(self.limiter.suppressed)} call sites')
+
+
+STAGES = StageLog()
+
+
+def hot_logging()->bool:
+    """
+    True if per-item messages in loops over nodes/elements are logged(dev mode)
+    """
+    return _HOT_LOOP_LOGGING
+
+
+def configure_logging(mode:str = None, log_dir = 'logs', level:str = 'INFO', burst:int = 5, period:float = 60.0)->StageLog:
+    """
+    configure loguru for all EZSite modules
+    mode: str, default=None(environment variable EZSITE_LOG_MODE, 'dev' if not set)
+        dev: colored stderr of every rank(with PID/NP in parallel), per-item loop messages on
+        production: JSON lines per rank in log_dir/rank<PID>.jsonl, stderr only for SUCCESS and above on rank 0,
+                    repeated records of a call site rate-limited, per-item loop messages off
+    log_dir: str|Path, default='logs'
+    level: str, default='INFO', lowest level written to the JSON lines files and counted per stage(records below it are
+           not created at all unless another sink takes them, e.g. the DEBUG stderr of dev mode)
+    burst, period: RateLimiter parameters
+    return: STAGES, the stage aggregator
+    """
+    global _HOT_LOOP_LOGGING, _CONFIGURED
+    mode = os.environ.get('EZSITE_LOG_MODE', 'dev') if mode is None else mode
+    pid, NP = ops.getPID(), ops.getNP()
+    handlers = [dict(sink=STAGES.sink, level=level, format='{message}')]
+    if mode == 'dev':
+        _HOT_LOOP_LOGGING = True
+        STAGES.limiter = None
+        if NP > 1:
+            handlers.append(dict(sink=sys.stderr, format=PARALLEL_FORMAT, colorize=True))
+        else:
+            handlers.append(dict(sink=sys.stderr))
+    elif mode == 'production':
+        _HOT_LOOP_LOGGING = False
+        STAGES.limiter = RateLimiter(burst, period)
+        Path(log_dir).mkdir(parents=True, exist_ok=True)
+        handlers.append(dict(sink=Path(log_dir)/f'rank{pid:03d}.jsonl', level=level, serialize=True,
+                             filter=STAGES.limiter, enqueue=False, buffering=1 << 16))
+        if pid == 0:
+            handlers.append(dict(sink=sys.stderr, level='SUCCESS', format=PARALLEL_FORMAT, colorize=True))
+    else:
+        raise ValueError(f'Logging mode {mode} not supported!')
+    logger.configure(handlers=handlers, extra=dict(PID=pid, NP=NP))
+    _CONFIGURED = True
+    return STAGES
+
+
+def ensure_logging(**kwargs)->StageLog:
+    """
+    configure_logging(**kwargs) unless it has already been called, e.g. by __main__ or an earlier model
+    """
+    return STAGES if _CONFIGURED else configure_logging(**kwargs)
@@ -0,0 +1,150 @@
+from collections import namedtuple
+import numpy as np
+
+
+class SiteMesh:
+    """
+    Compact array representation of a 2D site mesh
+        node_tags: np.ndarray(N,), node tags
+        coords: np.ndarray(N,2), node x,y coordinates
+        ele_tags: np.ndarray(E,), element tags
+        ele_nodes: np.ndarray(E,4), element node tags
+        mat_tags: np.ndarray(E,), element material tags
+    Tag lookups use a dense tag->index array, so they are O(1) and vectorized, node tags must be >= 0.
+    """
+    def __init__(self, node_tags, coords, ele_tags=(), ele_nodes=(), mat_tags=()):
+        self.node_tags = np.asarray(node_tags, dtype=np.int64).ravel()
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        self.ele_tags = np.asarray(ele_tags, dtype=np.int64).ravel()
+        self.ele_nodes = np.asarray(ele_nodes, dtype=np.int64).reshape(-1, 4)
+        self.mat_tags = np.asarray(mat_tags, dtype=np.int64).ravel()
+        if self.coords.shape[0] != self.node_tags.size:
+            raise ValueError(f'{self.node_tags.size} node tags but {self.coords.shape[0]} coordinates!')
+        if (self.node_tags < 0).any():
+            # a negative tag would wrap around the dense index and overwrite the row of another tag
+            raise ValueError(f'Negative node tags {np.unique(self.node_tags[self.node_tags < 0])[:10].tolist()} not supported!')
+        self._node_index = self._dense_index(self.node_tags)
+
+    @staticmethod
+    def _dense_index(tags:np.ndarray)->np.ndarray:
+        index = np.full(int(tags.max())+1 if tags.size else 0, -1, dtype=np.int64)
+        index[tags] = np.arange(tags.size)
+        return index
+
+    @classmethod
+    def from_namedtuples(cls, nodes, elements=())->'SiteMesh':
+        """
+        build SiteMesh from the Node / QuadUPele namedtuples used in SlopeAnalysis2D
+        """
+        node_tags = [node.tag for node in nodes]
+        coords = [(node.x, node.y) for node in nodes]
+        ele_tags = [ele.tag for ele in elements]
+        ele_nodes = [ele.nodes for ele in elements]
+        mat_tags = [ele.matTag for ele in elements]
+        return cls(node_tags, coords, ele_tags, ele_nodes, mat_tags)
+
+    @property
+    def x(self)->np.ndarray:
+        return self.coords[:, 0]
+
+    @property
+    def y(self)->np.ndarray:
+        return self.coords[:, 1]
+
+    @property
+    def num_nodes(self)->int:
+        return self.node_tags.size
+
+    @property
+    def num_elements(self)->int:
+        return self.ele_tags.size
+
+    def has_nodes(self, tags)->np.ndarray:
+        """
+        bool mask, True where the node tag exists in the mesh
+        """
+        tags = np.asarray(tags, dtype=np.int64)
+        inside = (tags >= 0) & (tags < self._node_index.size)
+        mask = np.zeros(tags.shape, dtype=bool)
+        mask[inside] = self._node_index[tags[inside]] >= 0
+        return mask
+
+    def index_of(self, tags)->np.ndarray:
+        """
+        row index of node tags in node_tags/coords
+        raise KeyError if any tag not found, including tags below 0 or above the largest node tag
+        """
+        tags = np.asarray(tags, dtype=np.int64)
+        found = self.has_nodes(tags)
+        if not found.all():
+            raise KeyError(f'Node tags {np.unique(tags[~found])[:10].tolist()} not found in mesh'
+                           f'(node tags {self.node_tags.min(initial=0)}..{self.node_tags.max(initial=-1)})!')
+        return self._node_index[tags]
+
+    def coords_of(self, tags)->np.ndarray:
+        """
+        coordinates of node tags, shape = tags.shape + (2,)
+        """
+        return self.coords[self.index_of(tags)]
+
+    @property
+    def ele_node_index(self)->np.ndarray:
+        """
+        element connectivity as node row index, shape (E,4)
+        """
+        return self.index_of(self.ele_nodes)
+
+    def nodes_in_box(self, xmin:float = -np.inf, xmax:float = np.inf, ymin:float = -np.inf, ymax:float = np.inf)->np.ndarray:
+        """
+        tags of the nodes inside a rectangular region
+        """
+        x, y = self.x, self.y
+        return self.node_tags[(x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)]
+
+
+NineNodeMesh = namedtuple('NineNodeMesh', ('EleNodes', 'NodeTags', 'Coords', 'EdgeKeys', 'EdgeTags', 'KeyBase'))
+
+
+def _edge_keys(a, b, base:int)->np.ndarray:
+    a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+    return np.minimum(a, b)*base+np.maximum(a, b)
+
+
+def nine_node_connectivity(mesh:SiteMesh, first_tag:int = None)->NineNodeMesh:
+    """
+    9-node connectivity of the quads for 9_4_QuadUP: corners 1-4, mid-side nodes 5-8 of the edges 1-2, 2-3, 3-4, 4-1 and
+    centre node 9
+    The mid-side node of an edge is shared by its elements(deduplicated by the key of the sorted corner pair), new tags
+    start at first_tag(default 10**digits of the max node tag): the edges in key order, then the centres in element order.
+    return: NineNodeMesh
+        EleNodes: np.ndarray(E,9), node tags of every element
+        NodeTags, Coords: np.ndarray(M,), (M,2), the new nodes
+        EdgeKeys, EdgeTags: np.ndarray(K,), sorted edge keys and their mid-side node tags, see midside_tags
+    """
+    base = int(mesh.node_tags.max())+1
+    keys = _edge_keys(mesh.ele_nodes, np.roll(mesh.ele_nodes, -1, axis=1), base)
+    unique, first, inverse = np.unique(keys.ravel(), return_index=True, return_inverse=True)
+    xy = mesh.coords[mesh.ele_node_index]
+    edge_xy = (0.5*(xy+np.roll(xy, -1, axis=1))).reshape(-1, 2)[first]
+    first_tag = 10 ** len(str(base-1)) if first_tag is None else first_tag
+    edge_tags = first_tag+np.arange(unique.size)
+    centre_tags = first_tag+unique.size+np.arange(mesh.num_elements)
+    ele_nodes = np.column_stack([mesh.ele_nodes, edge_tags[inverse.reshape(-1, 4)], centre_tags])
+    return NineNodeMesh(ele_nodes, np.r_[edge_tags, centre_tags], np.vstack([edge_xy, xy.mean(axis=1)]), unique, edge_tags, base)
+
+
+def midside_tags(nine:NineNodeMesh, a, b)->np.ndarray:
+    """
+    mid-side node tags of the corner pairs (a, b), -1 where a-b is not an element edge
+    """
+    keys = _edge_keys(a, b, nine.KeyBase)
+    pos = np.clip(np.searchsorted(nine.EdgeKeys, keys), 0, nine.EdgeKeys.size-1)
+    return np.where(nine.EdgeKeys[pos] == keys, nine.EdgeTags[pos], -1)
+
+
+def pairs_to_namedtuples(pairs:np.ndarray, dofs:list[int])->list[namedtuple]:
+    """
+    convert array of node tag pairs(K,2) to the EqDOFNode namedtuple list used in SlopeAnalysis2D
+    """
+    EqDOFNode = namedtuple('EqDOFNode', ['NodeTags', 'eqDOF'])
+    return [EqDOFNode([int(a), int(b)], list(dofs)) for a, b in np.asarray(pairs).reshape(-1, 2)]
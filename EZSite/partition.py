@@ -0,0 +1,237 @@
+from collections import namedtuple
+import numpy as np
+from loguru import logger
+from EZSite.mesh import SiteMesh
+
+
+PartitionPlan = namedtuple('PartitionPlan', ['NP', 'Boundaries', 'NodeTags', 'EleTags'])
+ConstraintPlan = namedtuple('ConstraintPlan', ['FixOwner', 'EqDOFOwner', 'EqDOFPairs', 'MissingNodes', 'Counts'])
+RankPlan = namedtuple('RankPlan', ['PID', 'NP', 'Boundaries', 'NodeTags', 'EleTags', 'LowestRank',
+                                   'FixOwned', 'EqDOFOwned', 'EqDOFPairs', 'MissingNodes'])
+
+
+def x_split_boundaries(x:np.ndarray, NP:int, weights:np.ndarray = None)->np.ndarray:
+    """
+    split x coordinates into NP parts with (weighted) equal node counts
+    Same rule as SlopeAnalysis2D._get_NP_split_boundary: the split line is the x coordinate whose
+    cumulative fraction is the closest to PID/NP
+    x: np.ndarray, node x coordinates
+    NP: int, number of parts
+    weights: np.ndarray, default=None, cost of each node(1 for every node if None)
+    return: np.ndarray(NP+1), split lines, part PID is [return[PID], return[PID+1]]
+    """
+    x = np.asarray(x, dtype=float)
+    weights = np.ones_like(x) if weights is None else np.asarray(weights, dtype=float)
+    ux, inverse = np.unique(x, return_inverse=True)
+    count = np.bincount(inverse, weights=weights, minlength=ux.size)
+    cumsum = np.cumsum(count/count.sum())
+
+    percentage = np.arange(1, NP)/float(NP)
+    idx = np.minimum(np.searchsorted(cumsum, percentage, side='left'), ux.size-1)
+    prev = np.where(idx > 0, cumsum[np.maximum(idx-1, 0)], 0.0)
+    take_prev = np.abs(cumsum[idx]-percentage) > np.abs(prev-percentage)
+    inner = np.where(take_prev, ux[np.maximum(idx-1, 0)], ux[idx])
+    return np.r_[ux[0], inner, ux[-1]]
+
+
+def _part_masks(mesh:SiteMesh, ele_index:np.ndarray, xmin:float, xmax:float)->tuple[np.ndarray,np.ndarray]:
+    # nodes in [xmin, xmax], elements with at least 2 of them, and the other nodes of these elements
+    in_part = (mesh.x >= xmin) & (mesh.x <= xmax)
+    keep = in_part[ele_index].sum(axis=1) >= 2
+    in_part[ele_index[keep].ravel()] = True
+    return in_part, keep
+
+
+def refine_boundaries(mesh:SiteMesh, boundaries:np.ndarray, weights:np.ndarray, window:int = 4, sweeps:int = 3)->np.ndarray:
+    """
+    move every inner split line to a nearby node x coordinate that lowers the largest part weight
+    The parts include the nodes of the elements crossing the split lines(see split_mesh), which the cumulative
+    split of x_split_boundaries does not see.
+    window: int, default=4, candidate x coordinates on each side of a split line
+    sweeps: int, default=3, passes over all split lines
+    """
+    ux = np.unique(mesh.x)
+    weights = np.asarray(weights, dtype=float)
+    ele_index = mesh.ele_node_index
+    boundaries = np.array(boundaries, dtype=float)
+    part_weight = lambda pid: weights[_part_masks(mesh, ele_index, boundaries[pid], boundaries[pid+1])[0]].sum()
+    for _ in range(sweeps):
+        moved = False
+        for i in range(1, boundaries.size-1):
+            pos = np.searchsorted(ux, boundaries[i])
+            lo = max(np.searchsorted(ux, boundaries[i-1])+1, pos-window)
+            hi = min(np.searchsorted(ux, boundaries[i+1])-1, pos+window)
+            best, best_cost = boundaries[i], max(part_weight(i-1), part_weight(i))
+            for x in ux[lo:hi+1]:
+                boundaries[i] = x
+                cost = max(part_weight(i-1), part_weight(i))
+                if cost < best_cost-1e-12:
+                    best, best_cost, moved = x, cost, True
+            boundaries[i] = best
+        if not moved:
+            break
+    return boundaries
+
+
+def split_mesh(mesh:SiteMesh, NP:int, weights:np.ndarray = None)->PartitionPlan:
+    """
+    split the mesh into NP parts along x with only a line of common nodes, for all ranks at once
+    Same rule as SlopeAnalysis2D.split_nodes_and_elements: an element belongs to a part if at least 2 of its
+    nodes are inside the part's x range, and its other nodes are added to the part
+    mesh: SiteMesh, the whole site
+    NP: int, number of parts
+    weights: np.ndarray, default=None, node weights for x_split_boundaries, the split lines are then refined
+             on the part weights(see refine_boundaries)
+    """
+    boundaries = x_split_boundaries(mesh.x, NP, weights)
+    if weights is not None and NP > 1:
+        boundaries = refine_boundaries(mesh, boundaries, weights)
+    ele_index = mesh.ele_node_index
+    node_tags, ele_tags = [], []
+    for pid in range(NP):
+        in_part, keep = _part_masks(mesh, ele_index, boundaries[pid], boundaries[pid+1])
+        node_tags.append(mesh.node_tags[in_part])
+        ele_tags.append(mesh.ele_tags[keep])
+    return PartitionPlan(NP, boundaries, tuple(node_tags), tuple(ele_tags))
+
+
+def membership(plan:PartitionPlan, mesh:SiteMesh)->np.ndarray:
+    """
+    bool matrix(NP, N), True if node(row index in mesh) is in the part of the rank
+    """
+    member = np.zeros((plan.NP, mesh.num_nodes), dtype=bool)
+    for pid, tags in enumerate(plan.NodeTags):
+        member[pid, mesh.index_of(tags)] = True
+    return member
+
+
+def localize_hub_ties(pairs:np.ndarray, mesh:SiteMesh, member:np.ndarray)->np.ndarray:
+    """
+    rewrite star ties to one hub node(like EqualDOFnodes_Base_Info.dat) so that every tie lies in one rank
+    Every tied node is grouped by the last rank holding it, so the leftmost node of each group is on the
+    split line and also held by the previous rank. It becomes the local hub of its rank and is chained to
+    the previous hub, each tied node is still constrained exactly once.
+    pairs: np.ndarray(K,2), (hub, node) tag pairs with the same hub
+    return: np.ndarray(K,2), rewritten pairs
+    """
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    if pairs.size == 0 or member.shape[0] == 1:
+        return pairs
+    hubs = np.unique(pairs[:, 0])
+    if hubs.size != 1:
+        logger.warning(f'{hubs.size} hub nodes found, ties are not localized!')
+        return pairs
+    tags = np.r_[hubs, pairs[:, 1]]
+    idx = mesh.index_of(tags)
+    # last rank holding the node, nodes are processed from left to right
+    last_rank = member.shape[0]-1-np.argmax(member[::-1][:, idx], axis=0)
+    order = np.lexsort((mesh.x[idx], last_rank))
+    order = np.r_[0, order[order != 0]]   # global hub stays the root
+    tags, last_rank = tags[order], last_rank[order]
+
+    new_pairs = []
+    hub, hub_rank = tags[0], last_rank[0]
+    for tag, rank in zip(tags[1:], last_rank[1:]):
+        new_pairs.append((hub, tag))
+        if rank != hub_rank:
+            # first node of the next rank becomes its local hub, chained to the previous hub
+            hub, hub_rank = tag, rank
+    return np.array(new_pairs, dtype=np.int64)
+
+
+def plan_constraints(plan:PartitionPlan, mesh:SiteMesh, fix_tags:np.ndarray, eqdof_pairs:np.ndarray)->ConstraintPlan:
+    """
+    assign every fix and equalDOF constraint to exactly one owning rank
+    fix: the lowest rank holding the node
+    equalDOF: the lowest rank holding both nodes, otherwise the lowest rank holding one of them(the other node is then
+              reported in MissingNodes of that rank)
+    A constraint defined on one rank only is enforced in the assembled system with the Penalty constraint handler,
+    the Transformation handler can't eliminate a DOF of a node shared with another rank, so do not use the plan with it.
+    fix_tags: np.ndarray(F,), fixed node tags(one entry per fix command)
+    eqdof_pairs: np.ndarray(K,2), equalDOF (retained, constrained) node tags
+    return: ConstraintPlan
+        FixOwner: np.ndarray(F,), owner rank of each fix
+        EqDOFOwner: np.ndarray(K,), owner rank of each equalDOF
+        EqDOFPairs: np.ndarray(K,2), the pairs
+        MissingNodes: tuple of np.ndarray, node tags each rank has to add for its equalDOFs
+        Counts: np.ndarray(NP,3), [fix, equalDOF, cross-rank equalDOF] counts per rank
+    """
+    member = membership(plan, mesh)
+
+    fix_tags = np.asarray(fix_tags, dtype=np.int64).ravel()
+    fix_owner = np.argmax(member[:, mesh.index_of(fix_tags)], axis=0)
+
+    eqdof_pairs = np.asarray(eqdof_pairs, dtype=np.int64).reshape(-1, 2)
+    retained = member[:, mesh.index_of(eqdof_pairs[:, 0])]
+    constrained = member[:, mesh.index_of(eqdof_pairs[:, 1])]
+    both = retained & constrained
+    cross = ~both.any(axis=0)
+    eq_owner = np.where(cross, np.argmax(retained | constrained, axis=0), np.argmax(both, axis=0))
+
+    missing = []
+    for pid in range(plan.NP):
+        need = np.unique(eqdof_pairs[eq_owner == pid])
+        missing.append(need[~member[pid, mesh.index_of(need)]])
+
+    counts = np.column_stack((np.bincount(fix_owner, minlength=plan.NP),
+                              np.bincount(eq_owner, minlength=plan.NP),
+                              np.bincount(eq_owner[cross], minlength=plan.NP)))
+    return ConstraintPlan(fix_owner, eq_owner, eqdof_pairs, tuple(missing), counts)
+
+
+def rank_plans(plan:PartitionPlan, mesh:SiteMesh, constraints:ConstraintPlan = None)->list[RankPlan]:
+    """
+    cut the plans of all ranks into what each rank needs to build its part, so that only rank 0 has to plan
+    return: list of RankPlan, one per rank
+        Boundaries: np.ndarray(NP+1), split lines of all ranks
+        NodeTags, EleTags: np.ndarray, nodes and elements of the rank
+        LowestRank: np.ndarray, lowest rank holding each node of NodeTags(owner of shared split line nodes)
+        FixOwned, EqDOFOwned: np.ndarray(bool), constraints owned by the rank(empty without constraint plan)
+        EqDOFPairs: np.ndarray(K,2), all planned equalDOF pairs(with the localized hub ties)
+        MissingNodes: np.ndarray, nodes the rank has to add for its equalDOFs
+    """
+    member = membership(plan, mesh)
+    lowest = np.argmax(member, axis=0)
+    plans = []
+    for pid in range(plan.NP):
+        if constraints is None:
+            fix_owned = eq_owned = np.zeros(0, dtype=bool)
+            pairs = np.zeros((0, 2), dtype=np.int64)
+            missing = np.zeros(0, dtype=np.int64)
+        else:
+            fix_owned = constraints.FixOwner == pid
+            eq_owned = constraints.EqDOFOwner == pid
+            pairs = constraints.EqDOFPairs
+            missing = constraints.MissingNodes[pid]
+        plans.append(RankPlan(pid, plan.NP, plan.Boundaries, plan.NodeTags[pid], plan.EleTags[pid],
+                              lowest[mesh.index_of(plan.NodeTags[pid])], fix_owned, eq_owned, pairs, missing))
+    return plans
+
+
+def material_costs(counts:np.ndarray, times:np.ndarray, ridge:float = 1.0)->np.ndarray:
+    """
+    cost per element of every material fitted to the measured time of every rank
+    Solves min ||counts@c - times||^2 + ridge*||n/NP*(c - c0)||^2 with the uniform cost c0 = total time / total elements,
+    the ridge term acts like one extra rank with uniform costs, so with fewer ranks than materials the costs stay near uniform
+    counts: np.ndarray(NP, M), elements of each material on each rank
+    times: np.ndarray(NP,), measured time of each rank
+    ridge: float, default=1.0, weight of the uniform prior
+    return: np.ndarray(M,), cost per element(at least 0.1*c0)
+    """
+    counts = np.asarray(counts, dtype=float)
+    times = np.asarray(times, dtype=float)
+    c0 = times.sum()/max(counts.sum(), 1.0)
+    prior = np.sqrt(ridge)*counts.sum(axis=0)/counts.shape[0]
+    A = np.vstack((counts, np.diag(prior)))
+    b = np.r_[times, prior*c0]
+    costs = np.linalg.lstsq(A, b, rcond=None)[0]
+    return np.maximum(costs, 0.1*c0)
+
+
+def node_weights(mesh:SiteMesh, ele_weights:np.ndarray)->np.ndarray:
+    """
+    spread element weights equally to their 4 nodes, node weights for x_split_boundaries/split_mesh
+    """
+    weights = np.zeros(mesh.num_nodes)
+    np.add.at(weights, mesh.ele_node_index, np.asarray(ele_weights, dtype=float)[:, None]/4.0)
+    return weights
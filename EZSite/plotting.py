@@ -0,0 +1,221 @@
+from glob import glob
+from multiprocessing import Pool
+from pathlib import Path
+import shutil
+import subprocess
+import numpy as np
+from loguru import logger
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from EZSite.mesh import SiteMesh
+
+
+def _mesh_rows(mesh_tags:np.ndarray, tags)->tuple[np.ndarray,np.ndarray]:
+    """
+    rows of tags in mesh_tags(node or element tags) and the mask of the tags found, tags missing from the mesh(e.g. the
+    fixed nodes of distributed LK dashpots) are skipped
+    """
+    tags = np.asarray(tags, dtype=np.int64)
+    if len(mesh_tags) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(tags.shape, dtype=bool)
+    order = np.argsort(mesh_tags, kind='stable')
+    rows = order[np.clip(np.searchsorted(mesh_tags, tags, sorter=order), 0, len(mesh_tags)-1)]
+    found = mesh_tags[rows] == tags
+    return rows[found], found
+
+
+class QuadMeshPlotter:
+    """
+    Headless Matplotlib plotter for the 4-node quad site mesh
+    The connectivity(node row index of every element) and the figure are built once, a frame only
+    updates the polygon vertices(deformed shape) and the color array(contour field).
+        mesh: SiteMesh, nodes and elements of the site
+        figsize: tuple, default=(12,4)
+        cmap: str, default='jet'
+        dpi: int, default=150
+    """
+    def __init__(self, mesh:SiteMesh, figsize:tuple = (12, 4), cmap:str = 'jet', dpi:int = 150):
+        self.mesh = mesh
+        self.ele_index = mesh.ele_node_index
+        self.dpi = dpi
+        self.fig = Figure(figsize=figsize)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(111)
+        self.ax.set_aspect('equal')
+        self.ax.set_xlabel('x (m)')
+        self.ax.set_ylabel('y (m)')
+        self.collection = PolyCollection(mesh.coords[self.ele_index], cmap=cmap, edgecolors='k', linewidths=0.1)
+        self.ax.add_collection(self.collection)
+        self.colorbar = None
+        self._set_limits(mesh.coords)
+
+    def _set_limits(self, coords:np.ndarray)->None:
+        pad = 0.02*np.ptp(coords, axis=0)
+        self.ax.set_xlim(coords[:, 0].min()-pad[0], coords[:, 0].max()+pad[0])
+        self.ax.set_ylim(coords[:, 1].min()-pad[1], coords[:, 1].max()+pad[1])
+
+    def to_mesh_order(self, tags:np.ndarray, values:np.ndarray, fill:float = np.nan)->np.ndarray:
+        """
+        reorder nodal values given for tags(e.g. one rank's snapshot) into mesh node order, tags not in the mesh are skipped
+        """
+        values = np.asarray(values, dtype=float)
+        out = np.full((self.mesh.num_nodes,)+values.shape[1:], fill)
+        rows, found = _mesh_rows(self.mesh.node_tags, tags)
+        out[rows] = values[found]
+        return out
+
+    def nodal_to_element(self, nodal:np.ndarray)->np.ndarray:
+        """
+        element value as the mean of its 4 nodal values
+        """
+        return np.asarray(nodal, dtype=float)[self.ele_index].mean(axis=1)
+
+    def update(self, disp:np.ndarray = None, nodal:np.ndarray = None, elemental:np.ndarray = None,
+               scale:float = 1.0, title:str = None, clim:tuple = None, label:str = None)->None:
+        """
+        update the frame
+        disp: np.ndarray(N,2), default=None, nodal displacement in mesh node order
+        nodal: np.ndarray(N,), default=None, nodal field(pore pressure, ru) in mesh node order
+        elemental: np.ndarray(E,), default=None, element field(shear strain), overrides nodal
+        scale: float, default=1.0, displacement scale factor
+        clim: tuple, default=None, color limits(auto if None)
+        """
+        coords = self.mesh.coords if disp is None else self.mesh.coords+scale*np.asarray(disp, dtype=float)
+        self.collection.set_verts(coords[self.ele_index])
+        values = elemental if elemental is not None else (None if nodal is None else self.nodal_to_element(nodal))
+        if values is not None:
+            self.collection.set_array(np.ma.masked_invalid(values))
+            if clim is None:
+                self.collection.autoscale()
+            else:
+                self.collection.set_clim(*clim)
+            if self.colorbar is None:
+                self.colorbar = self.fig.colorbar(self.collection, ax=self.ax)
+            if label is not None:
+                self.colorbar.set_label(label)
+        else:
+            self.collection.set_facecolor('none')
+        if title is not None:
+            self.ax.set_title(title)
+
+    def save(self, file_path, **frame)->Path:
+        """
+        update and render one frame to PNG
+        """
+        if frame:
+            self.update(**frame)
+        self.fig.savefig(file_path, dpi=self.dpi)
+        return Path(file_path)
+
+
+_worker_plotter = None
+
+
+def _init_worker(node_tags, coords, ele_tags, ele_nodes, plotter_kwargs):
+    global _worker_plotter
+    mesh = SiteMesh(node_tags, coords, ele_tags, ele_nodes)
+    _worker_plotter = QuadMeshPlotter(mesh, **plotter_kwargs)
+
+
+def _render_worker(job):
+    file_path, frame = job
+    return str(_worker_plotter.save(file_path, **frame))
+
+
+def render_frames(mesh:SiteMesh, frames, out_dir = 'frames', processes:int = None, **plotter_kwargs)->list[Path]:
+    """
+    render frames to PNG in parallel worker processes, each worker builds its plotter once
+    frames: iterable of dict, keyword arguments of QuadMeshPlotter.update(disp, nodal, elemental, scale, title, clim, label)
+    out_dir: str|Path, default='frames', PNG files frame_00000.png ...
+    processes: int, default=None(os.cpu_count())
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    jobs = ((out_dir/f'frame_{i:05d}.png', frame) for i, frame in enumerate(frames))
+    init_args = (mesh.node_tags, mesh.coords, mesh.ele_tags, mesh.ele_nodes, plotter_kwargs)
+    with Pool(processes, initializer=_init_worker, initargs=init_args) as pool:
+        files = [Path(f) for f in pool.imap(_render_worker, jobs, chunksize=4)]
+    logger.success(f'{len(files)} frames rendered to {out_dir}')
+    return files
+
+
+def frames_to_mp4(frame_dir = 'frames', file_path = 'frames.mp4', fps:int = 10)->Path:
+    """
+    encode frame_*.png to MP4 with ffmpeg, the PNG frames are kept if ffmpeg is not available
+    """
+    if shutil.which('ffmpeg') is None:
+        logger.warning('ffmpeg not found, MP4 not written! PNG frames are kept.')
+        return None
+    subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-framerate', str(fps),
+                    '-i', str(Path(frame_dir)/'frame_%05d.png'),
+                    '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', str(file_path)], check=True)
+    logger.success(f'Animation saved at {file_path}')
+    return Path(file_path)
+
+
+def frames_from_snapshots(plotter_mesh:SiteMesh, pattern:str, field:str = 'pore', scale:float = 1.0,
+                          sigma_v0:np.ndarray = None, pore0:np.ndarray = None)->list[dict]:
+    """
+    frames from the AsyncResponseWriter chunks(<stem>_chunk*.npz) of one or more ranks, tags not in the mesh are skipped
+    field: str, default='pore', 'pore' for pore pressure, 'excess_pore' or 'ru'(needs sigma_v0 in mesh node order)
+    pore0: np.ndarray, default=None, pore pressure before shaking in mesh node order, the snapshot of step 0 if None
+        (the first snapshot if there is no step 0)
+    """
+    files = sorted(glob(pattern))
+    if not files:
+        raise FileNotFoundError(f'No snapshot file matches {pattern}!')
+    chunks = [np.load(f) for f in files]
+    # snapshots of all ranks are merged by step, shared nodes are simply overwritten
+    frames = dict()
+    for chunk in chunks:
+        disp_rows, disp_found = _mesh_rows(plotter_mesh.node_tags, chunk['node_tags'])
+        pore_rows, pore_found = _mesh_rows(plotter_mesh.node_tags, chunk['pore_tags'])
+        for step, time, disp, pore in zip(chunk['step'], chunk['time'], chunk['disp'], chunk['pore']):
+            frame = frames.setdefault(int(step), dict(time=float(time),
+                                                      disp=np.zeros((plotter_mesh.num_nodes, 2)),
+                                                      nodal=np.full(plotter_mesh.num_nodes, np.nan)))
+            frame['disp'][disp_rows] = disp[disp_found]
+            frame['nodal'][pore_rows] = pore[pore_found]
+    if field in ('excess_pore', 'ru') and pore0 is None:
+        first = min(frames)
+        if first != 0:
+            logger.warning(f'No snapshot of step 0, the pore pressure of step {first} is the initial value!')
+        pore0 = frames[first]['nodal']
+    result = []
+    for step in sorted(frames):
+        frame = frames[step]
+        nodal = frame['nodal']
+        if field in ('excess_pore', 'ru'):
+            nodal = nodal-pore0
+            if field == 'ru':
+                nodal = np.divide(nodal, np.abs(sigma_v0), out=np.zeros_like(nodal), where=np.abs(sigma_v0) > 0)
+        result.append(dict(disp=frame['disp'], nodal=nodal, scale=scale, label=field,
+                           title=f'step {step}, t = {frame["time"]:.3f} s'))
+    return result
+
+
+def frames_from_recorders(plotter_mesh:SiteMesh, disp_results, strain_results = None, comp:int = 2, every:int = 1,
+                          scale:float = 1.0)->list[dict]:
+    """
+    frames from memory-mapped recorder files(see EZSite.results.RecorderResults), the recorder node/element tags are
+    mapped to the mesh order of plotter_mesh, tags not in the mesh are skipped
+    disp_results: RecorderResults, displacement.out(ux, uy)
+    strain_results: RecorderResults, default=None, strain*.out, comp=2 is the shear strain gxy
+    every: int, default=1, use every n-th recorded step
+    """
+    node_rows, node_found = _mesh_rows(plotter_mesh.node_tags, disp_results.tags)
+    if strain_results is not None:
+        ele_rows, ele_found = _mesh_rows(plotter_mesh.ele_tags, strain_results.tags)
+    frames = []
+    for step in range(0, disp_results.data.shape[0], every):
+        t = float(disp_results.time[step])
+        disp = np.zeros((plotter_mesh.num_nodes, 2))
+        disp[node_rows] = disp_results.snapshot(t)[node_found, :2]
+        frame = dict(disp=disp, scale=scale, title=f't = {t:.3f} s')
+        if strain_results is not None:
+            strain = np.full(plotter_mesh.num_elements, np.nan)
+            strain[ele_rows] = strain_results.snapshot(t)[ele_found, comp]
+            frame.update(elemental=strain, label='shear strain')
+        frames.append(frame)
+    return frames
@@ -0,0 +1,277 @@
+from collections import namedtuple
+from pathlib import Path
+import queue
+import threading
+import numpy as np
+import openseespy.opensees as ops
+from loguru import logger
+
+
+Snapshot = namedtuple('Snapshot', ['step', 'time', 'disp', 'pore'])
+# queue marker for AsyncResponseWriter.sync
+_FLUSH = object()
+
+
+def nodal_fields(node_tags:np.ndarray, pore_tags:np.ndarray = None, ground_accel = None)->dict[str,np.ndarray]:
+    """
+    nodal displacement(ux,uy), acceleration(ax,ay) and pore pressure of the current step
+    node_tags: np.ndarray, nodes to collect displacement and acceleration
+    pore_tags: np.ndarray, default=None(node_tags), nodes to collect pore pressure
+    ground_accel: float|np.ndarray(2,), default=None, ground acceleration of the step(ax or (ax,ay)), the acceleration
+        is absolute(relative + ground) if given, else relative to the base(UniformExcitation)
+    """
+    pore_tags = node_tags if pore_tags is None else pore_tags
+    disp = np.array([ops.nodeDisp(int(tag))[:2] for tag in node_tags], dtype=float)
+    accel = np.array([ops.nodeAccel(int(tag))[:2] for tag in node_tags], dtype=float)
+    if ground_accel is not None:
+        ground = np.zeros(2)
+        ground[:np.size(ground_accel)] = ground_accel
+        accel += ground
+    pore = np.array([ops.nodeVel(int(tag), 3) for tag in pore_tags], dtype=float)
+    return dict(disp=disp, accel=accel, pore=pore)
+
+
+def element_strain(ele_tags:np.ndarray, gauss_point:int = 1)->np.ndarray:
+    """
+    material strain(exx, eyy, gxy) at one gauss point of quadUP elements, shape(E,3)
+    """
+    return np.array([ops.eleResponse(int(tag), 'material', gauss_point, 'strain')[:3] for tag in ele_tags], dtype=float)
+
+
+def ground_acceleration(velocity:np.ndarray, dt:float, factor:float = 1.0)->np.ndarray:
+    """
+    ground acceleration history of a velocity record(central differences of factor*velocity, one-sided at the ends)
+    velocity: np.ndarray, velocity values at a constant time step dt
+    """
+    velocity = factor*np.asarray(velocity, dtype=float).ravel()
+    if velocity.size < 2:
+        return np.zeros_like(velocity)
+    return np.gradient(velocity, dt)
+
+
+def excess_pore_ratio(excess_pore:np.ndarray, sigma_v0:np.ndarray)->np.ndarray:
+    """
+    excess pore pressure ratio ru = excess pore pressure / initial vertical effective stress(0 where sigma_v0<=0)
+    """
+    sigma_v0 = np.abs(np.asarray(sigma_v0, dtype=float))
+    ru = np.zeros(np.broadcast(excess_pore, sigma_v0).shape)
+    np.divide(excess_pore, sigma_v0, out=ru, where=sigma_v0 > 0)
+    return ru
+
+
+class OnlineReducer:
+    """
+    Running reductions of response fields updated every step, so full histories are not needed for
+    peak values, RMS and permanent(final - initial) values
+        shapes: field name -> array shape, e.g. OnlineReducer(disp=(N,2), pore=(N,))
+    All arrays are preallocated, update() is vectorized and allocation free.
+    """
+    def __init__(self, **shapes):
+        self.shapes = {name: tuple(np.atleast_1d(shape)) for name, shape in shapes.items()}
+        self.initial = {name: np.zeros(shape) for name, shape in self.shapes.items()}
+        self.final = {name: np.zeros(shape) for name, shape in self.shapes.items()}
+        self.max = {name: np.full(shape, -np.inf) for name, shape in self.shapes.items()}
+        self.min = {name: np.full(shape, np.inf) for name, shape in self.shapes.items()}
+        self.sumsq = {name: np.zeros(shape) for name, shape in self.shapes.items()}
+        self._square = {name: np.zeros(shape) for name, shape in self.shapes.items()}
+        self.count = {name: 0 for name in self.shapes}
+        self.time = [None, None]
+
+    def update(self, time:float = None, **values)->None:
+        """
+        reduce one step, values: field name -> array of the field shape
+        """
+        for name, value in values.items():
+            value = np.asarray(value, dtype=float).reshape(self.shapes[name])
+            if self.count[name] == 0:
+                self.initial[name][...] = value
+            np.maximum(self.max[name], value, out=self.max[name])
+            np.minimum(self.min[name], value, out=self.min[name])
+            np.multiply(value, value, out=self._square[name])
+            self.sumsq[name] += self._square[name]
+            self.final[name][...] = value
+            self.count[name] += 1
+        if time is not None:
+            if self.time[0] is None:
+                self.time[0] = time
+            self.time[1] = time
+
+    def rms(self, name:str)->np.ndarray:
+        return np.sqrt(self.sumsq[name]/max(self.count[name], 1))
+
+    def absmax(self, name:str)->np.ndarray:
+        return np.maximum(np.abs(self.max[name]), np.abs(self.min[name]))
+
+    def summary(self)->dict[str,np.ndarray]:
+        """
+        flat dict of all reductions: <field>_max/_min/_absmax/_rms/_initial/_final/_permanent
+        """
+        summary = dict()
+        for name in self.shapes:
+            summary[f'{name}_max'] = self.max[name]
+            summary[f'{name}_min'] = self.min[name]
+            summary[f'{name}_absmax'] = self.absmax(name)
+            summary[f'{name}_rms'] = self.rms(name)
+            summary[f'{name}_initial'] = self.initial[name]
+            summary[f'{name}_final'] = self.final[name]
+            summary[f'{name}_permanent'] = self.final[name]-self.initial[name]
+            summary[f'{name}_count'] = np.array(self.count[name])
+        if self.time[0] is not None:
+            summary['time_range'] = np.array(self.time, dtype=float)
+        return summary
+
+    def state(self, prefix:str = 'reducer')->dict[str,np.ndarray]:
+        """
+        flat dict of the running state for a checkpoint, <prefix>/<kind>/<field>
+        """
+        state = dict()
+        for kind in ('initial', 'final', 'max', 'min', 'sumsq'):
+            for name, value in getattr(self, kind).items():
+                state[f'{prefix}/{kind}/{name}'] = value
+        state[f'{prefix}/count'] = np.array([self.count[name] for name in self.shapes])
+        state[f'{prefix}/time'] = np.array([np.nan if t is None else t for t in self.time], dtype=float)
+        return state
+
+    def load_state(self, state:dict, prefix:str = 'reducer')->None:
+        """
+        continue from a state written by state()
+        """
+        for kind in ('initial', 'final', 'max', 'min', 'sumsq'):
+            for name, value in getattr(self, kind).items():
+                value[...] = state[f'{prefix}/{kind}/{name}']
+        self.count = dict(zip(self.shapes, state[f'{prefix}/count'].tolist()))
+        self.time = [None if np.isnan(t) else float(t) for t in state[f'{prefix}/time']]
+
+    def save(self, file_path, **extra)->Path:
+        """
+        write the summary(and extra arrays like node tags) to a compact .npz file
+        """
+        file_path = Path(file_path).with_suffix('.npz')
+        np.savez(file_path, **self.summary(), **extra)
+        logger.success(f'Response summary of {max(self.count.values(), default=0)} steps written to {file_path}')
+        return file_path
+
+
+class AsyncResponseWriter:
+    """
+    Background writer for response snapshots
+    The solver thread only copies responses into NumPy buffers and puts them into a bounded queue, serialization
+    (compressed .npz chunks) runs in a worker thread. A full queue blocks submit(), so memory stays bounded(backpressure).
+    Peak values and ru are reduced by the OnlineReducer of the caller, which sees every step.
+        file_path: str|Path, output file stem, chunks are written to <stem>_chunk0000.npz ...
+        node_tags: np.ndarray, node tags of the disp rows
+        pore_tags: np.ndarray, default=None(node_tags), node tags of the pore pressure rows
+        maxsize: int, default=8, max snapshots waiting in the queue
+        chunk_size: int, default=50, snapshots per output chunk
+        compress: bool, default=True, use np.savez_compressed
+        timeout: float, default=1.0, seconds between the worker checks of a blocked submit()
+    A failed worker discards the remaining snapshots, the next submit()/sync()/close() raises RuntimeError.
+    """
+    def __init__(self, file_path, node_tags, pore_tags=None, maxsize=8, chunk_size=50, compress=True, timeout=1.0):
+        self.file_path = Path(file_path)
+        self.node_tags = np.asarray(node_tags, dtype=np.int64)
+        self.pore_tags = self.node_tags if pore_tags is None else np.asarray(pore_tags, dtype=np.int64)
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._buffer = []
+        self._chunk = 0
+        self._error = None
+        self.count = 0
+        self._thread = threading.Thread(target=self._run, name='AsyncResponseWriter', daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot:Snapshot)->None:
+        """
+        hand over one snapshot to the worker, blocks if the queue is full
+        """
+        self._put(snapshot)
+
+    def sync(self)->dict:
+        """
+        write all submitted snapshots(also a partial chunk) and wait for the worker, for a checkpoint
+        return: the writer state, see resume
+        """
+        self._put(_FLUSH)
+        self._queue.join()
+        self._check()
+        return dict(chunk=self._chunk, count=self.count)
+
+    def _check(self)->None:
+        if self._error is not None:
+            raise RuntimeError('AsyncResponseWriter worker failed!') from self._error
+        if not self._thread.is_alive():
+            raise RuntimeError('AsyncResponseWriter worker is not running!')
+
+    def _put(self, item)->None:
+        # a failed worker keeps draining the queue, the timeout only guards against a worker that is gone
+        while True:
+            self._check()
+            try:
+                self._queue.put(item, timeout=self.timeout)
+                return
+            except queue.Full:
+                continue
+
+    def resume(self, state:dict)->None:
+        """
+        continue the chunk numbering of a checkpointed run, call before the first submit
+        state: dict, returned by sync
+        """
+        self._chunk = state['chunk']
+        self.count = state['count']
+
+    def _run(self)->None:
+        while True:
+            snapshot = self._queue.get()
+            try:
+                if snapshot is None:
+                    if self._error is None:
+                        self._flush()
+                    return
+                if self._error is not None:
+                    # after a failure the snapshots are discarded, so submit() and sync() never wait on a full queue
+                    continue
+                if snapshot is _FLUSH:
+                    self._flush()
+                    continue
+                self._buffer.append(snapshot)
+                self.count += 1
+                if len(self._buffer) >= self.chunk_size:
+                    self._flush()
+            except Exception as e:
+                logger.exception(f'AsyncResponseWriter failed at step {getattr(snapshot, "step", None)}')
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _flush(self)->None:
+        if not self._buffer:
+            return
+        save = np.savez_compressed if self.compress else np.savez
+        save(self.file_path.with_name(f'{self.file_path.stem}_chunk{self._chunk:04d}.npz'),
+             step=np.array([s.step for s in self._buffer]),
+             time=np.array([s.time for s in self._buffer]),
+             disp=np.stack([s.disp for s in self._buffer]),
+             pore=np.stack([s.pore for s in self._buffer]),
+             node_tags=self.node_tags, pore_tags=self.pore_tags)
+        self._chunk += 1
+        self._buffer = []
+
+    def close(self)->None:
+        """
+        write the remaining snapshots, wait for the worker to finish
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise RuntimeError('AsyncResponseWriter worker failed!') from self._error
+        logger.success(f'{self.count} response snapshots written to {self.file_path.stem}_chunk*.npz in {self._chunk} chunks')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
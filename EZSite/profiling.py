@@ -0,0 +1,211 @@
+from functools import wraps
+from pathlib import Path
+import json
+import time
+import tracemalloc
+import openseespy.opensees as ops
+from loguru import logger
+
+
+class _Frame:
+    # one open stage
+    __slots__ = ('path', 'wall', 'cpu', 'memory', 'peak')
+
+    def __init__(self, path:tuple, memory:int):
+        self.path = path
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.memory = memory
+        self.peak = memory
+
+
+class StageProfiler:
+    """
+    opt-in profiler of the model build stages, per rank: the blocks of StageLog.stage(EZSite.logconfig, the one stage
+    mechanism) and the functions decorated with profile_stage
+    Every stage records calls, wall/CPU time, Python allocations(tracemalloc, net and peak) and the number and time of the
+    OpenSees calls made in it(the functions of openseespy.opensees are wrapped while enabled). Nested stages are kept as
+    paths, so the report is a flame graph in folded-stack format(rank;stage;...;ops.function microseconds).
+    """
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.stats = dict()
+        self._open = []
+        self._original = dict()
+
+    def enable(self, memory:bool = True)->None:
+        """
+        start profiling
+        memory: bool, default=True, trace Python allocations with tracemalloc(slows pure Python code down a few times)
+        """
+        if self.enabled:
+            return None
+        self.enabled = True
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        for name in dir(ops):
+            func = getattr(ops, name)
+            if not name.startswith('_') and callable(func):
+                self._original[name] = func
+                setattr(ops, name, self._wrap(name, func))
+
+    def disable(self)->None:
+        """
+        stop profiling and restore the OpenSees functions, the collected stats are kept
+        """
+        for name, func in self._original.items():
+            setattr(ops, name, func)
+        self._original = dict()
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.enabled = False
+
+    def _wrap(self, name:str, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self._open:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                count = self.stats[self._open[-1].path]['ops'].setdefault(name, [0, 0.0])
+                count[0] += 1
+                count[1] += time.perf_counter()-start
+        return wrapper
+
+    def _traced(self)->tuple[int,int]:
+        return tracemalloc.get_traced_memory() if self.memory and tracemalloc.is_tracing() else (0, 0)
+
+    def start(self, name:str)->None:
+        parent = self._open[-1].path if self._open else ()
+        path = parent+(name,)
+        self.stats.setdefault(path, dict(calls=0, wall=0.0, cpu=0.0, alloc=0, peak=0, ops=dict()))
+        current, peak = self._traced()
+        if self._open:
+            self._open[-1].peak = max(self._open[-1].peak, peak)
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._open.append(_Frame(path, current))
+
+    def stop(self)->None:
+        frame = self._open.pop()
+        current, peak = self._traced()
+        peak = max(frame.peak, peak)
+        entry = self.stats[frame.path]
+        entry['calls'] += 1
+        entry['wall'] += time.perf_counter()-frame.wall
+        entry['cpu'] += time.process_time()-frame.cpu
+        entry['alloc'] += current-frame.memory
+        entry['peak'] = max(entry['peak'], peak-frame.memory)
+        if self._open:
+            self._open[-1].peak = max(self._open[-1].peak, peak)
+
+    def report(self)->dict:
+        """
+        JSON-able stats of this rank: stage path -> calls, wall, cpu, alloc(net bytes), peak(bytes), ops(name -> [calls, seconds])
+        """
+        return {';'.join(path): dict(entry, ops={k: list(v) for k, v in entry['ops'].items()}) for path, entry in self.stats.items()}
+
+    def gather(self)->dict[int,dict]:
+        """
+        reports of all ranks on rank 0(rank -> report, see report), None on the other ranks
+        """
+        report = self.report()
+        pid, NP = ops.getPID(), ops.getNP()
+        if NP == 1:
+            return {0: report}
+        if pid != 0:
+            ops.send('-pid', 0, json.dumps(report))
+            return None
+        reports = {0: report}
+        for rank in range(1, NP):
+            reports[rank] = json.loads(ops.recv('-pid', rank))
+        return reports
+
+    def write(self, prefix = 'logs/profile')->tuple[Path,Path]:
+        """
+        gather the reports of all ranks and write on rank 0:
+            <prefix>.folded: merged flame graph(flamegraph.pl, speedscope, inferno), self wall time in microseconds
+            <prefix>.json: rank -> stage stats
+        return: paths of the two files on rank 0, None on the other ranks
+        """
+        reports = self.gather()
+        if reports is None:
+            return None
+        prefix = Path(prefix)
+        prefix.parent.mkdir(parents=True, exist_ok=True)
+        folded = prefix.with_suffix('.folded')
+        with open(folded, 'w') as f:
+            for rank, report in reports.items():
+                f.writelines(f'{line}\n' for line in folded_stacks(report, f'rank{rank}'))
+        stats = prefix.with_suffix('.json')
+        with open(stats, 'w') as f:
+            json.dump(reports, f, indent=1)
+        log_profile(reports)
+        return folded, stats
+
+
+PROFILER = StageProfiler()
+
+
+def profile_stage(name:str = None):
+    """
+    decorator profiling a function or method as a stage of PROFILER(function name by default),
+    a single attribute check if profiling is not enabled
+    """
+    def decorator(func):
+        stage = func.__name__ if name is None else name
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            PROFILER.start(stage)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PROFILER.stop()
+        return wrapper
+    return decorator
+
+
+def folded_stacks(report:dict, root:str = 'rank0')->list[str]:
+    """
+    folded-stack lines of a report(see StageProfiler.report): self wall time of every stage and the time of its OpenSees calls,
+    in integer microseconds
+    """
+    children = dict()
+    for path, entry in report.items():
+        parent = path.rpartition(';')[0]
+        if parent:
+            children[parent] = children.get(parent, 0.0)+entry['wall']
+    lines = []
+    for path, entry in report.items():
+        ops_time = sum(seconds for _, seconds in entry['ops'].values())
+        own = entry['wall']-children.get(path, 0.0)-ops_time
+        if round(own*1e6) > 0:
+            lines.append(f'{root};{path} {round(own*1e6)}')
+        for name, (_, seconds) in sorted(entry['ops'].items()):
+            if round(seconds*1e6) > 0:
+                lines.append(f'{root};{path};ops.{name} {round(seconds*1e6)}')
+    return lines
+
+
+def log_profile(reports:dict[int,dict])->None:
+    """
+    log wall time over the ranks, allocation and the most frequent OpenSees calls of every stage
+    """
+    paths = list(dict.fromkeys(path for report in reports.values() for path in report))
+    for path in paths:
+        entries = [report[path] for report in reports.values() if path in report]
+        walls = [entry['wall'] for entry in entries]
+        calls = dict()
+        for entry in entries:
+            for name, (count, _) in entry['ops'].items():
+                calls[name] = calls.get(name, 0)+count
+        top = ', '.join(f'{name}:{count}' for name, count in sorted(calls.items(), key=lambda kv: -kv[1])[:3])
+        logger.info(f'Profile {path}: wall max {max(walls):.3f}s min {min(walls):.3f}s over {len(entries)} ranks, '
+                    f'cpu {sum(entry["cpu"] for entry in entries):.3f}s, peak alloc {max(entry["peak"] for entry in entries)/2**20:.2f} MB, '
+                    f'ops calls {top or 0}')
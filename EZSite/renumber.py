@@ -0,0 +1,255 @@
+from collections import namedtuple
+from pathlib import Path
+import json
+import shutil
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import shortest_path
+from loguru import logger
+from EZSite.mesh import SiteMesh
+from EZSite.coarsen import HANGING_NODE_INFO
+
+
+RenumberMap = namedtuple('RenumberMap', ('NodeOld', 'NodeNew', 'EleOld', 'EleNew'))
+RENUMBER_MAP = 'renumber_map.npz'
+
+
+def node_adjacency(mesh:SiteMesh)->sparse.csr_matrix:
+    """
+    symmetric node graph of the element connectivity(nodes sharing an element are connected), shape (N,N)
+    """
+    rows = mesh.ele_node_index
+    k = rows.shape[1]
+    i = np.repeat(rows, k, axis=1).ravel()
+    j = np.tile(rows, (1, k)).ravel()
+    graph = sparse.coo_matrix((np.ones(i.size, dtype=np.int8), (i, j)), shape=(mesh.num_nodes, mesh.num_nodes)).tocsr()
+    graph.data[:] = 1
+    return graph
+
+
+def _level_ends(graph:sparse.csr_matrix, node:int)->tuple[int,np.ndarray]:
+    # eccentricity of node and the nodes of its last breadth-first level
+    dist = shortest_path(graph, unweighted=True, indices=node)
+    far = dist[np.isfinite(dist)].max()
+    return far, np.flatnonzero(dist == far)
+
+
+def pseudo_peripheral_node(graph:sparse.csr_matrix, start:int = 0)->int:
+    """
+    node of (nearly) maximum eccentricity in the component of start(George-Liu): repeat the breadth-first search from
+    the farthest node of minimum degree until the eccentricity stops growing
+    """
+    degree = np.diff(graph.indptr)
+    node, eccentricity = start, -1
+    while True:
+        far, last = _level_ends(graph, node)
+        if far <= eccentricity:
+            return node
+        eccentricity = far
+        node = int(last[np.argmin(degree[last])])
+
+
+def _cuthill_mckee(graph:sparse.csr_matrix, degree:np.ndarray, start:int, visited:np.ndarray)->list[int]:
+    # breadth-first order from start, the unvisited neighbours of every node by increasing degree
+    visited[start] = True
+    order, head = [start], 0
+    while head < len(order):
+        node = order[head]
+        head += 1
+        neighbours = graph.indices[graph.indptr[node]:graph.indptr[node+1]]
+        neighbours = neighbours[~visited[neighbours]]
+        neighbours = neighbours[np.argsort(degree[neighbours], kind='stable')]
+        visited[neighbours] = True
+        order.extend(neighbours.tolist())
+    return order
+
+
+def _profile(graph:sparse.csr_matrix, order:list[int])->int:
+    # profile of one component numbered in order(one DOF per node)
+    order = np.asarray(order, dtype=np.int64)
+    rank = np.zeros(graph.shape[0], dtype=np.int64)
+    rank[order] = np.arange(order.size)
+    rows = graph[order].tocoo()
+    first = np.arange(order.size)
+    np.minimum.at(first, rows.row, rank[rows.col])
+    return int((np.arange(order.size)-first).sum())
+
+
+def rcm_order(mesh:SiteMesh, candidates:int = 8)->np.ndarray:
+    """
+    node rows in reverse Cuthill-McKee order of the element adjacency graph
+    Every connected component starts at the pseudo-peripheral node or at one of the nodes of minimum degree on the far
+    side of it, whichever gives the smallest profile(scipy's reverse_cuthill_mckee always starts at the node of minimum
+    degree, which can give a larger profile than the mesh generator's numbering).
+    candidates: int, default=8, far side start nodes tried
+    """
+    graph = node_adjacency(mesh)
+    degree = np.diff(graph.indptr)
+    visited = np.zeros(mesh.num_nodes, dtype=bool)
+    order = []
+    for seed in np.argsort(degree, kind='stable'):
+        if visited[seed]:
+            continue
+        start = pseudo_peripheral_node(graph, int(seed))
+        far = _level_ends(graph, start)[1]
+        best, best_profile = None, None
+        for node in [start]+far[np.argsort(degree[far], kind='stable')][:candidates].tolist():
+            trial = _cuthill_mckee(graph, degree, node, visited.copy())[::-1]
+            profile = _profile(graph, trial)
+            if best is None or profile < best_profile:
+                best, best_profile = trial, profile
+        visited[best] = True
+        order.extend(best)
+    return np.asarray(order, dtype=np.int64)
+
+
+def hilbert_keys(coords:np.ndarray, bits:int = 16)->np.ndarray:
+    """
+    distance of every point along a Hilbert curve over the bounding box, 2**bits cells per side
+    """
+    coords = np.asarray(coords, dtype=float)
+    lo, span = coords.min(axis=0), np.ptp(coords, axis=0).max()
+    n = 1 << bits
+    cells = np.minimum(((coords-lo)/max(span, 1e-300)*n).astype(np.int64), n-1)
+    x, y = cells[:, 0].copy(), cells[:, 1].copy()
+    keys = np.zeros(x.size, dtype=np.int64)
+    s = n >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        keys += s*s*((3*rx) ^ ry)
+        # rotate the quadrant
+        flip = ~ry & rx
+        x = np.where(flip, s-1-x, x)
+        y = np.where(flip, s-1-y, y)
+        swap = ~ry
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        s >>= 1
+    return keys
+
+
+def hilbert_order(mesh:SiteMesh, bits:int = 16)->np.ndarray:
+    """
+    node rows in the order of a Hilbert space-filling curve through the node coordinates
+    """
+    return np.argsort(hilbert_keys(mesh.coords, bits), kind='stable')
+
+
+def profile_and_bandwidth(mesh:SiteMesh, order:np.ndarray = None, ndf:int = 1)->dict[str,int]:
+    """
+    bandwidth and profile(skyline storage below the diagonal) of the stiffness matrix if the DOFs are numbered node by node
+    order: np.ndarray, default=None(ascending node tags, the order of the OpenSees Plain numberer), node rows in numbering order
+    ndf: int, default=1, DOFs per node, all DOFs of the nodes of an element are coupled
+    """
+    rank = np.empty(mesh.num_nodes, dtype=np.int64)
+    rank[np.argsort(mesh.node_tags, kind='stable') if order is None else order] = np.arange(mesh.num_nodes)
+    graph = node_adjacency(mesh).tocoo()
+    # lowest numbered neighbour of every node
+    first = rank.copy()
+    np.minimum.at(first, graph.row, rank[graph.col])
+    width = (rank-first)[np.bincount(mesh.ele_node_index.ravel(), minlength=mesh.num_nodes) > 0]
+    return dict(bandwidth=int(ndf*width.max()+ndf-1), profile=int(ndf*ndf*width.sum()+width.size*ndf*(ndf-1)//2))
+
+
+def node_order(mesh:SiteMesh, method:str = 'rcm')->np.ndarray:
+    """
+    node rows in the new numbering order
+    method: str, default='rcm', 'rcm'(reverse Cuthill-McKee) or 'hilbert'(space-filling curve)
+    Nodes without elements keep their relative order after the element nodes.
+    """
+    if method == 'rcm':
+        order = rcm_order(mesh)
+    elif method == 'hilbert':
+        order = hilbert_order(mesh)
+    else:
+        raise ValueError(f'Renumbering method {method} not supported!')
+    used = np.zeros(mesh.num_nodes, dtype=bool)
+    used[mesh.ele_node_index.ravel()] = True
+    return np.r_[order[used[order]], np.flatnonzero(~used)]
+
+
+def renumber_map(mesh:SiteMesh, method:str = 'rcm')->RenumberMap:
+    """
+    new node tags 1..N in the node_order, new element tags 1..E ordered by their lowest new node tag
+    """
+    order = node_order(mesh, method)
+    node_new = np.empty(mesh.num_nodes, dtype=np.int64)
+    node_new[order] = np.arange(1, mesh.num_nodes+1)
+    first = node_new[mesh.ele_node_index].min(axis=1)
+    ele_new = np.empty(mesh.num_elements, dtype=np.int64)
+    ele_new[np.lexsort((node_new[mesh.ele_node_index].max(axis=1), first))] = np.arange(1, mesh.num_elements+1)
+    return RenumberMap(mesh.node_tags.copy(), node_new, mesh.ele_tags.copy(), ele_new)
+
+
+def renumber_tags(old:np.ndarray, new:np.ndarray, tags)->np.ndarray:
+    """
+    map tags through old -> new(all tags must be in old), keeps the shape of tags
+    """
+    tags = np.asarray(tags, dtype=np.int64)
+    order = np.argsort(old)
+    pos = np.searchsorted(old, tags, sorter=order)
+    return np.asarray(new)[order[np.clip(pos, 0, old.size-1)]]
+
+
+def load_renumber_map(file_path)->RenumberMap:
+    """
+    the map written by renumber_site_files, e.g. to translate recorder tags back: renumber_tags(m.NodeNew, m.NodeOld, tags)
+    """
+    with np.load(file_path) as data:
+        return RenumberMap(*(data[name] for name in RenumberMap._fields))
+
+
+def _read(file_path:Path)->list[list[str]]:
+    with open(file_path, 'r') as f:
+        return [line.split() for line in f if line.strip()]
+
+
+def renumber_site_files(src_dir, dst_dir, method:str = 'rcm', ndf:int = 3)->dict:
+    """
+    write a renumbered copy of a site data directory(nodeInfo.dat, elementInfo.dat, fixedNodeInfo.dat,
+    EqualDOFnodes_*_Info.dat, massInfo.dat, HangingNodeInfo.dat, other files copied), the map in renumber_map.npz and the report in renumber.json
+    Nodes and elements are written in the new tag order. Fix, equalDOF, mass and hanging node rows keep their order with renamed tags.
+    return: the report, profile and bandwidth of the node-by-node DOF numbering before and after
+    """
+    src_dir, dst_dir = Path(src_dir), Path(dst_dir)
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    nodes = np.array(_read(src_dir/'nodeInfo.dat'), dtype=float)
+    elements = np.array(_read(src_dir/'elementInfo.dat'), dtype=np.int64)
+    mesh = SiteMesh(nodes[:, 0], nodes[:, 1:3], elements[:, 0], elements[:, 1:5], elements[:, 5])
+    tag_map = renumber_map(mesh, method)
+    node_of = lambda tags: renumber_tags(tag_map.NodeOld, tag_map.NodeNew, tags)
+
+    order = np.argsort(tag_map.NodeNew)
+    with open(dst_dir/'nodeInfo.dat', 'w') as f:
+        f.writelines(f'{tag_map.NodeNew[i]:8d} {nodes[i, 1]:11.3f} {nodes[i, 2]:10.3f}\n' for i in order)
+    ele_new = tag_map.EleNew
+    ele_nodes = node_of(elements[:, 1:5])
+    with open(dst_dir/'elementInfo.dat', 'w') as f:
+        f.writelines(f'{ele_new[i]:8d} ' + ' '.join(f'{n:9d}' for n in ele_nodes[i]) + f' {elements[i, 5]:6d} \n'
+                     for i in np.argsort(ele_new))
+    for path in sorted(src_dir.iterdir()):
+        if path.name in ('nodeInfo.dat', 'elementInfo.dat') or not path.is_file():
+            continue
+        if path.name == 'fixedNodeInfo.dat' or path.name == 'massInfo.dat':
+            ntags = 1
+        elif path.name.startswith('EqualDOFnodes_') and path.name.endswith('_Info.dat'):
+            ntags = 2
+        elif path.name == HANGING_NODE_INFO:
+            ntags = 4
+        else:
+            shutil.copyfile(path, dst_dir/path.name)
+            continue
+        rows = _read(path)
+        tags = node_of(np.array([row[:ntags] for row in rows], dtype=np.int64).reshape(len(rows), ntags))
+        with open(dst_dir/path.name, 'w') as f:
+            f.writelines(' '.join(str(t) for t in new) + '  ' + '  '.join(row[ntags:]) + '\n' for new, row in zip(tags, rows))
+
+    np.savez(dst_dir/RENUMBER_MAP, **tag_map._asdict())
+    renumbered = SiteMesh(np.sort(tag_map.NodeNew), nodes[order, 1:3], np.sort(ele_new), ele_nodes[np.argsort(ele_new)])
+    report = dict(method=method, ndf=ndf, before=profile_and_bandwidth(mesh, ndf=ndf),
+                  after=profile_and_bandwidth(renumbered, ndf=ndf))
+    with open(dst_dir/'renumber.json', 'w') as f:
+        json.dump(report, f, indent=1)
+    logger.success(f'Site data renumbered({method}) into {dst_dir}: bandwidth {report["before"]["bandwidth"]} -> '
+                   f'{report["after"]["bandwidth"]}, profile {report["before"]["profile"]} -> {report["after"]["profile"]}')
+    return report
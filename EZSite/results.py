@@ -0,0 +1,129 @@
+from itertools import islice
+from pathlib import Path
+import json
+import numpy as np
+from loguru import logger
+
+
+RECORDER_INDEX = 'recorder_index.json'
+
+
+def write_recorder_index(index:dict, file_path = RECORDER_INDEX)->Path:
+    """
+    write the tag -> column layout of recorder files, e.g.
+    {'displacement.out': {'kind': 'node', 'tags': [...], 'ncomp': 2}, 'stress1.out': {'kind': 'element', 'tags': [...]}}
+    """
+    file_path = Path(file_path)
+    with open(file_path, 'w') as f:
+        json.dump(index, f)
+    return file_path
+
+
+def convert_recorder(out_path, npy_path = None, chunk_rows:int = 2000, force:bool = False)->Path:
+    """
+    convert a text recorder file(time + columns) into a column-major(Fortran order) .npy file
+    The text is streamed in chunks, so RAM does not grow with the history length.
+    out_path: str|Path, recorder text file
+    npy_path: str|Path, default=None(<out_path>.npy)
+    chunk_rows: int, default=2000, rows parsed at a time
+    force: bool, default=False, convert even if the .npy is newer than the text file
+    """
+    out_path = Path(out_path)
+    npy_path = out_path.with_suffix(out_path.suffix+'.npy') if npy_path is None else Path(npy_path)
+    if not force and npy_path.exists() and npy_path.stat().st_mtime >= out_path.stat().st_mtime:
+        return npy_path
+
+    with open(out_path, 'r') as f:
+        first = f.readline().split()
+        nrows = 1 + sum(1 for line in f if line.strip())
+    ncols = len(first)
+    data = np.lib.format.open_memmap(npy_path, mode='w+', dtype=np.float64, shape=(nrows, ncols), fortran_order=True)
+    row = 0
+    with open(out_path, 'r') as f:
+        lines = (line for line in f if line.strip())
+        while row < nrows:
+            chunk = np.loadtxt(islice(lines, chunk_rows), dtype=np.float64, ndmin=2)
+            data[row:row+chunk.shape[0]] = chunk
+            row += chunk.shape[0]
+    data.flush()
+    del data
+    logger.info(f'{out_path} converted to {npy_path}: {nrows} steps x {ncols} columns')
+    return npy_path
+
+
+class RecorderResults:
+    """
+    Memory-mapped query API of one converted recorder file
+    Columns are stored contiguously(Fortran order), so a history only touches the bytes of its column.
+        npy_path: str|Path, converted file(see convert_recorder)
+        tags: list[int], node/element tag of each column group, in recorder order
+        ncomp: int, default=None, columns per tag(inferred from the column count if None)
+    """
+    def __init__(self, npy_path, tags, ncomp:int = None):
+        self.data = np.load(npy_path, mmap_mode='r')
+        self.tags = np.asarray(tags, dtype=np.int64)
+        nvalues = self.data.shape[1]-1
+        if ncomp is None:
+            if self.tags.size == 0 or nvalues % self.tags.size:
+                raise ValueError(f'{nvalues} value columns can not be split into {self.tags.size} tags!')
+            ncomp = nvalues//self.tags.size
+        if ncomp*self.tags.size != nvalues:
+            raise ValueError(f'{nvalues} value columns, expected {self.tags.size} tags x {ncomp} components!')
+        self.ncomp = ncomp
+        # dense tag -> column group index, O(1) lookups
+        self._index = np.full(int(self.tags.max())+1, -1, dtype=np.int64)
+        self._index[self.tags] = np.arange(self.tags.size)
+
+    @classmethod
+    def open(cls, out_path, index_path = RECORDER_INDEX, **kwargs)->'RecorderResults':
+        """
+        convert(if needed) and open a recorder file using the layout in recorder_index.json
+        """
+        out_path = Path(out_path)
+        with open(index_path, 'r') as f:
+            layout = json.load(f)[out_path.name]
+        return cls(convert_recorder(out_path, **kwargs), layout['tags'], layout.get('ncomp'))
+
+    @property
+    def time(self)->np.ndarray:
+        return self.data[:, 0]
+
+    def columns(self, tags, comp = None)->np.ndarray:
+        """
+        column numbers of tags(and components), comp=None for all components
+        """
+        tags = np.atleast_1d(np.asarray(tags, dtype=np.int64))
+        if np.any(tags >= self._index.size) or np.any(self._index[tags] < 0):
+            raise KeyError(f'Tags {tags.tolist()[:10]} not all recorded!')
+        comps = np.arange(self.ncomp) if comp is None else np.atleast_1d(comp)
+        return (1+self._index[tags][:, None]*self.ncomp+comps[None, :]).ravel()
+
+    def history(self, tag:int, comp:int = None)->np.ndarray:
+        """
+        history of one node/element, shape(nstep,) for one component or (nstep, ncomp)
+        """
+        values = self.data[:, self.columns(tag, comp)]
+        return values[:, 0] if comp is not None else values
+
+    def snapshot(self, t:float)->np.ndarray:
+        """
+        all values at the recorded step closest to time t, shape(ntags, ncomp)
+        """
+        step = int(np.clip(np.searchsorted(self.time, t), 0, self.data.shape[0]-1))
+        if step > 0 and abs(self.time[step-1]-t) < abs(self.time[step]-t):
+            step -= 1
+        return np.asarray(self.data[step, 1:]).reshape(self.tags.size, self.ncomp)
+
+    def envelope(self, tags = None, comp:int = None)->tuple[np.ndarray,np.ndarray]:
+        """
+        (min, max) over time of the given tags(default all), shape(ntags, ncomp or 1)
+        """
+        tags = self.tags if tags is None else np.atleast_1d(tags)
+        cols = self.columns(tags, comp)
+        width = self.ncomp if comp is None else np.atleast_1d(comp).size
+        vmin = np.empty(cols.size)
+        vmax = np.empty(cols.size)
+        for i, col in enumerate(cols):
+            column = self.data[:, col]
+            vmin[i], vmax[i] = column.min(), column.max()
+        return vmin.reshape(-1, width), vmax.reshape(-1, width)
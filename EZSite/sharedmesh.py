@@ -0,0 +1,279 @@
+from collections.abc import Mapping, Sequence
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+import json
+import os
+import socket
+import sys
+import zlib
+import numpy as np
+import openseespy.opensees as ops
+from loguru import logger
+
+
+class SharedArrays(Mapping):
+    """
+    Named NumPy arrays in POSIX shared memory(one block per array plus a JSON layout block)
+    The creating process writes the arrays once, other processes on the same machine attach
+    zero-copy, the arrays are read-only views of the mapped blocks.
+        blocks: dict, name -> SharedMemory
+        arrays: dict, name -> np.ndarray view of the block
+        owner: bool, True in the creating process(allowed to unlink the blocks)
+    """
+    def __init__(self, prefix:str, blocks:dict, arrays:dict, owner:bool):
+        self.prefix = prefix
+        self.blocks = blocks
+        self.arrays = arrays
+        self.owner = owner
+
+    @staticmethod
+    def _block_name(prefix:str, name:str)->str:
+        return f'{prefix}_{name}'.replace('.', '_')
+
+    @classmethod
+    def create(cls, prefix:str, **arrays)->'SharedArrays':
+        """
+        copy arrays into new shared memory blocks named <prefix>_<name>
+        """
+        blocks, views, layout = dict(), dict(), dict()
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = SharedMemory(cls._block_name(prefix, name), create=True, size=max(array.nbytes, 1))
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+            view[...] = array
+            view.flags.writeable = False
+            blocks[name], views[name] = block, view
+            layout[name] = dict(shape=array.shape, dtype=array.dtype.str)
+        meta = json.dumps(layout).encode()
+        block = SharedMemory(cls._block_name(prefix, 'layout'), create=True, size=8+len(meta))
+        block.buf[:8] = len(meta).to_bytes(8, 'little')
+        block.buf[8:8+len(meta)] = meta
+        blocks['layout'] = block
+        return cls(prefix, blocks, views, owner=True)
+
+    @classmethod
+    def attach(cls, prefix:str)->'SharedArrays':
+        """
+        attach to the blocks created by SharedArrays.create(prefix, ...)
+        raise FileNotFoundError if the blocks do not exist(e.g. the creator runs on another machine)
+        """
+        blocks, views = dict(), dict()
+        block = cls._open(cls._block_name(prefix, 'layout'))
+        size = int.from_bytes(block.buf[:8], 'little')
+        layout = json.loads(bytes(block.buf[8:8+size]).decode())
+        blocks['layout'] = block
+        for name, meta in layout.items():
+            block = cls._open(cls._block_name(prefix, name))
+            view = np.ndarray(tuple(meta['shape']), dtype=np.dtype(meta['dtype']), buffer=block.buf)
+            view.flags.writeable = False
+            blocks[name], views[name] = block, view
+        return cls(prefix, blocks, views, owner=False)
+
+    @staticmethod
+    def _open(name:str)->SharedMemory:
+        block = SharedMemory(name, create=False)
+        # only the creator cleans up, otherwise the resource tracker of every attaching process unlinks the block at exit
+        resource_tracker.unregister(block._name, 'shared_memory')
+        return block
+
+    def __getitem__(self, name:str)->np.ndarray:
+        return self.arrays[name]
+
+    def __iter__(self):
+        return iter(self.arrays)
+
+    def __len__(self)->int:
+        return len(self.arrays)
+
+    @property
+    def nbytes(self)->int:
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def unlink(self)->None:
+        """
+        remove the block names from the system, mapped views stay valid until every process closes them
+        """
+        if self.owner:
+            for block in self.blocks.values():
+                block.unlink()
+            self.owner = False
+
+
+def read_site_tables(node_path:Path, element_path:Path, **table_paths)->dict[str,np.ndarray]:
+    """
+    read the site model files into compact arrays
+    node_path: Path, nodeInfo.dat(tag x y)
+    element_path: Path, elementInfo.dat(tag n1 n2 n3 n4 matTag)
+    table_paths: name -> Path of other small tables(fixedNodeInfo.dat, massInfo.dat, EqualDOFnodes_*_Info.dat),
+                 stored as float rows, missing files are skipped
+    """
+    nodes = np.loadtxt(node_path, dtype=float, ndmin=2)
+    elements = np.loadtxt(element_path, dtype=np.int64, ndmin=2)
+    arrays = dict(node_tags=nodes[:, 0].astype(np.int64),
+                  node_coords=nodes[:, 1:3],
+                  ele_tags=elements[:, 0],
+                  ele_nodes=elements[:, 1:5],
+                  ele_mat=elements[:, 5])
+    for name, path in table_paths.items():
+        if Path(path).exists():
+            arrays[name] = np.loadtxt(path, dtype=float, ndmin=2)
+    return arrays
+
+
+def _bcast_ints(*values:int)->list[int]:
+    # ops.Bcast returns None in a sequential(non-MPI) interpreter
+    data = ops.Bcast(*values) if ops.getNP() > 1 else None
+    return [int(v) for v in (values if data is None else data)]
+
+
+def share_site_tables(loader, prefix:str = 'ezsite')->SharedArrays:
+    """
+    load the site tables on rank 0 and share them with all ranks on the same machine
+    Rank 0 calls loader() and creates the blocks, the others attach after a barrier, then rank 0 unlinks the
+    block names(the mapped memory lives until the last rank exits, nothing is left in /dev/shm after a crash).
+    A rank on another machine can't attach and calls loader() itself.
+    loader: callable, returns dict name -> np.ndarray(see read_site_tables)
+    prefix: str, default='ezsite', block name prefix, rank 0's process id is appended
+    return: SharedArrays on every rank(owner=False once unlinked)
+    """
+    pid = ops.getPID()
+    parallel = ops.getNP() > 1
+    host = zlib.crc32(socket.gethostname().encode())
+    shared = None
+    if pid == 0:
+        prefix = f'{prefix}{os.getpid()}'
+        shared = SharedArrays.create(prefix, **loader())
+        token, host0 = _bcast_ints(os.getpid(), host)
+    else:
+        token, host0 = _bcast_ints(0, host)
+        prefix = f'{prefix}{token}'
+    if parallel:
+        ops.barrier()
+    if pid != 0:
+        try:
+            if host != host0:
+                raise FileNotFoundError('rank 0 runs on another machine')
+            shared = SharedArrays.attach(prefix)
+        except FileNotFoundError as e:
+            logger.warning(f'Shared site data {prefix} not attached({e}), reading the files on this rank')
+            shared = SharedArrays(prefix, dict(), loader(), owner=False)
+    if parallel:
+        ops.barrier()
+    if pid == 0:
+        shared.unlink()
+    return shared
+
+
+def rss_breakdown()->dict[str,float]:
+    """
+    resident memory of this process in MB from /proc/self/status(Linux only, empty dict elsewhere)
+        RssAnon: private memory(Python objects, NumPy arrays owned by this process)
+        RssShmem: mapped shared memory
+        VmHWM: peak resident memory
+    """
+    result = dict()
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(('VmRSS', 'VmHWM', 'RssAnon', 'RssFile', 'RssShmem')):
+                    key, value = line.split(':')
+                    result[key] = float(value.split()[0])/1024
+    except OSError:
+        pass
+    return result
+
+
+class RecordView(Sequence):
+    """
+    Read-only sequence of namedtuples created on access from column arrays(e.g. the shared site tables),
+    so a rank holds the array memory once instead of one Python object per node/element
+        factory: callable, i -> namedtuple of row i
+        keys: np.ndarray, tag of every row(first field of the namedtuple)
+        extra: tuple, records appended after the rows(e.g. nodes added by add_nodes)
+    Supports `view + (record,)` like a tuple.
+    """
+    def __init__(self, factory, keys:np.ndarray, extra:tuple = ()):
+        self.factory = factory
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.extra = tuple(extra)
+        self._index = None
+
+    def __len__(self)->int:
+        return self.keys.size+len(self.extra)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self[j] for j in range(*i.indices(len(self))))
+        i = i+len(self) if i < 0 else i
+        if i < 0 or i >= len(self):
+            raise IndexError('RecordView index out of range')
+        return self.factory(i) if i < self.keys.size else self.extra[i-self.keys.size]
+
+    def __iter__(self):
+        for i in range(self.keys.size):
+            yield self.factory(i)
+        yield from self.extra
+
+    def __add__(self, other):
+        return RecordView(self.factory, self.keys, self.extra+tuple(other))
+
+    def take(self, rows)->tuple:
+        """
+        records of the given rows(int index array or bool mask over the rows, extra records excluded)
+        """
+        rows = np.asarray(rows)
+        rows = np.flatnonzero(rows) if rows.dtype == bool else rows
+        return tuple(self.factory(int(i)) for i in rows)
+
+    def row_of(self, key:int)->int:
+        """
+        row of a tag, -1 if not found in the rows
+        """
+        if self._index is None:
+            self._index = np.full(int(self.keys.max())+1 if self.keys.size else 0, -1, dtype=np.int64)
+            self._index[self.keys] = np.arange(self.keys.size)
+        return int(self._index[key]) if 0 <= key < self._index.size else -1
+
+    def mapping(self)->'RecordMapping':
+        """
+        tag -> record mapping without building a dict
+        """
+        return RecordMapping(self)
+
+
+class RecordMapping(Mapping):
+    """
+    tag -> record view of a RecordView, same interface as {record.tag: record}
+    """
+    def __init__(self, view:RecordView):
+        self.view = view
+        self.extra = {record[0]: record for record in view.extra}
+
+    def __getitem__(self, key:int):
+        row = self.view.row_of(int(key))
+        if row >= 0:
+            return self.view.factory(row)
+        return self.extra[key]
+
+    def __iter__(self):
+        yield from (int(key) for key in self.view.keys)
+        yield from self.extra
+
+    def __len__(self)->int:
+        return len(self.view)
+
+
+def record_nbytes(records, sample:int = 64)->int:
+    """
+    estimated memory of a sequence of flat namedtuples held as Python objects(sampled, fields and nested tuples included)
+    """
+    def deep(obj):
+        if isinstance(obj, (tuple, list)):
+            return sys.getsizeof(obj)+sum(deep(item) for item in obj)
+        return sys.getsizeof(obj)
+    n = len(records)
+    if n == 0:
+        return 0
+    rows = np.linspace(0, n-1, min(sample, n)).astype(int)
+    return int(np.mean([deep(records[int(i)]) for i in rows])*n)
@@ -0,0 +1,119 @@
+from collections import namedtuple
+import numpy as np
+from scipy.spatial import cKDTree
+from EZSite.mesh import SiteMesh
+
+
+# Kind: 0 equalDOF to a coincident soil node(Retained[:, 0]), 1 ASDEmbeddedNodeElement in the triangle Retained of EleTag,
+#       2 equalDOF to the nearest soil node(outside the site)
+InterfaceTies = namedtuple('InterfaceTies', ['NodeTags', 'Kind', 'Retained', 'EleTags', 'Distance'])
+COINCIDENT, EMBEDDED, NEAREST = 0, 1, 2
+
+
+def _cross(a:np.ndarray, b:np.ndarray, p:np.ndarray)->np.ndarray:
+    # z of (b-a)x(p-a), positive if p is left of a->b
+    return (b[..., 0]-a[..., 0])*(p[..., 1]-a[..., 1])-(b[..., 1]-a[..., 1])*(p[..., 0]-a[..., 0])
+
+
+class SiteLocator:
+    """
+    KD-trees over the site nodes and element centroids, O(log N) queries of the nearest/coincident nodes and the
+    element containing a point(convex quads, either node order)
+        mesh: SiteMesh with elements
+    """
+    def __init__(self, mesh:SiteMesh):
+        self.mesh = mesh
+        self.node_tree = cKDTree(mesh.coords)
+        xy = mesh.coords[mesh.ele_node_index]
+        self.ele_xy = xy
+        self.ele_tree = cKDTree(xy.mean(axis=1))
+        # a point inside an element is within its largest centroid-corner distance of the centroid
+        self.radius = float(np.linalg.norm(xy-xy.mean(axis=1, keepdims=True), axis=2).max()) if len(xy) else 0.0
+
+    def nearest_nodes(self, points, k:int = 1)->tuple[np.ndarray,np.ndarray]:
+        """
+        tags and distances of the k nearest site nodes of every point, shape (P,) for k=1 else (P,k)
+        """
+        dist, rows = self.node_tree.query(np.asarray(points, dtype=float).reshape(-1, 2), k=k)
+        return self.mesh.node_tags[rows], dist
+
+    def coincident_nodes(self, points, tol:float = 1e-6)->np.ndarray:
+        """
+        tag of the site node within tol of every point, -1 where there is none
+        """
+        tags, dist = self.nearest_nodes(points)
+        return np.where(dist <= tol, tags, -1)
+
+    def _inside(self, rows:np.ndarray, points:np.ndarray, tol:float)->np.ndarray:
+        xy = self.ele_xy[rows]
+        cross = _cross(xy, np.roll(xy, -1, axis=1), points[:, None, :])
+        scale = tol*np.linalg.norm(np.roll(xy, -1, axis=1)-xy, axis=2)
+        return (cross >= -scale).all(axis=1) | (cross <= scale).all(axis=1)
+
+    def containing_elements(self, points, k:int = 8, tol:float = 1e-9)->np.ndarray:
+        """
+        row(Mesh order) of the element containing every point, -1 outside the site, the first element by distance of
+        the centroid for points on a shared edge
+        The k nearest centroids are checked first, the points not found in them are checked against all centroids
+        within the largest element radius.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        found = np.full(points.shape[0], -1, dtype=np.int64)
+        if points.shape[0] == 0 or self.mesh.num_elements == 0:
+            return found
+        k = min(k, self.mesh.num_elements)
+        _, candidates = self.ele_tree.query(points, k=k)
+        candidates = candidates.reshape(points.shape[0], k)
+        for j in range(k):
+            todo = np.flatnonzero(found < 0)
+            inside = self._inside(candidates[todo, j], points[todo], tol)
+            found[todo[inside]] = candidates[todo[inside], j]
+        for i in np.flatnonzero(found < 0):
+            rows = np.array(self.ele_tree.query_ball_point(points[i], self.radius*(1+1e-9)), dtype=np.int64)
+            if rows.size:
+                rows = rows[np.argsort(np.linalg.norm(self.ele_tree.data[rows]-points[i], axis=1))]
+                inside = self._inside(rows, np.broadcast_to(points[i], (rows.size, 2)), tol)
+                if inside.any():
+                    found[i] = rows[np.argmax(inside)]
+        return found
+
+    def containing_triangles(self, points, rows:np.ndarray)->np.ndarray:
+        """
+        node tags of the half of element rows(split by the 1-3 diagonal) containing every point, shape (P,3)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        nodes = self.mesh.ele_nodes[rows]
+        xy = self.ele_xy[rows]
+        # the point is on the side of corner 2 of the 1-3 diagonal, or on the side of corner 4
+        side = np.sign(_cross(xy[:, 0], xy[:, 2], points)) == np.sign(_cross(xy[:, 0], xy[:, 2], xy[:, 1]))
+        return np.where(side[:, None], nodes[:, [0, 1, 2]], nodes[:, [0, 2, 3]])
+
+
+def interface_ties(locator:SiteLocator, node_tags, coords, tol:float = 1e-6, outside:str = 'nearest')->InterfaceTies:
+    """
+    ties of structural nodes to the site, for all nodes at once:
+        a site node within tol: equalDOF(COINCIDENT), inside an element: embedded in the element triangle(EMBEDDED),
+        outside the site: equalDOF to the nearest site node(NEAREST) if outside='nearest', raise ValueError if 'raise'
+    node_tags, coords: structural node tags(S,) and coordinates(S,2)
+    return: InterfaceTies, EleTags is the element holding the tie(the element with the retained node for COINCIDENT and
+            NEAREST), the rank holding it defines the tie, Distance to the retained node(0 for EMBEDDED),
+            Retained(S,3) padded with -1
+    """
+    node_tags = np.asarray(node_tags, dtype=np.int64).ravel()
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    mesh = locator.mesh
+    nearest, dist = locator.nearest_nodes(coords)
+    rows = locator.containing_elements(coords)
+    kind = np.where(dist <= tol, COINCIDENT, np.where(rows >= 0, EMBEDDED, NEAREST))
+    if outside == 'raise' and (kind == NEAREST).any():
+        raise ValueError(f'Structural nodes {node_tags[kind == NEAREST][:10].tolist()} outside the site!')
+    if outside not in ('nearest', 'raise'):
+        raise ValueError(f'Outside mode {outside} not supported!')
+    retained = np.full((node_tags.size, 3), -1, dtype=np.int64)
+    retained[kind != EMBEDDED, 0] = nearest[kind != EMBEDDED]
+    embedded = kind == EMBEDDED
+    retained[embedded] = locator.containing_triangles(coords[embedded], rows[embedded])
+    # the tie to a site node belongs to an element with that node
+    rows[~embedded] = locator.containing_elements(mesh.coords_of(retained[~embedded, 0]))
+    ele_tags = np.where(rows >= 0, mesh.ele_tags[np.maximum(rows, 0)], -1)
+    return InterfaceTies(node_tags, kind, retained, ele_tags, np.where(embedded, 0.0, dist))
@@ -0,0 +1,171 @@
+from collections import namedtuple
+import numpy as np
+from EZSite.mesh import SiteMesh
+
+
+ValidationIssue = namedtuple('ValidationIssue', ('check', 'severity', 'tags', 'message'))
+
+
+class MeshValidationError(ValueError):
+    """
+    raised for site data that can't be built, issues: list of ValidationIssue with severity 'error'
+    """
+    def __init__(self, issues:list):
+        self.issues = list(issues)
+        super().__init__('\n'.join(issue.message for issue in self.issues))
+
+
+def _issue(check:str, severity:str, tags, message:str)->ValidationIssue:
+    tags = np.unique(np.asarray(tags, dtype=np.int64).ravel())
+    shown = tags[:10].tolist()
+    more = f' and {tags.size-10} more' if tags.size > 10 else ''
+    return ValidationIssue(check, severity, tags, f'{message}: {tags.size} found, tags {shown}{more}')
+
+
+def _duplicates(tags:np.ndarray)->np.ndarray:
+    unique, counts = np.unique(tags, return_counts=True)
+    return unique[counts > 1]
+
+
+def quad_corner_jacobians(mesh:SiteMesh)->np.ndarray:
+    """
+    Jacobian determinant of every bilinear quad at its 4 corners, shape (E,4)
+    All positive for counterclockwise convex quads, all negative if the node order is clockwise,
+    mixed signs for non-convex or twisted quads. Elements must only reference existing nodes.
+    """
+    xy = mesh.coords[mesh.ele_node_index]
+    forward = np.roll(xy, -1, axis=1)-xy
+    backward = np.roll(xy, 1, axis=1)-xy
+    return 0.25*(forward[..., 0]*backward[..., 1]-forward[..., 1]*backward[..., 0])
+
+
+def quad_aspect_ratios(mesh:SiteMesh)->np.ndarray:
+    """
+    longest / shortest edge of every quad, shape (E,), inf for zero-length edges
+    """
+    xy = mesh.coords[mesh.ele_node_index]
+    edges = np.linalg.norm(np.roll(xy, -1, axis=1)-xy, axis=2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(edges.min(axis=1) > 0, edges.max(axis=1)/edges.min(axis=1), np.inf)
+
+
+def validate_site(mesh:SiteMesh, mat_tags = None, mass:np.ndarray = None, fixed = None, eqdof = None,
+                  max_aspect:float = 10.0, jacobian_tol:float = 1e-12)->list[ValidationIssue]:
+    """
+    check the site data in one vectorized pass before the model is built
+    mesh: SiteMesh, nodes and elements of the whole site
+    mat_tags: iterable of int, default=None(not checked), defined material tags
+    mass: np.ndarray(M,1+ndf), default=None, massInfo.dat rows(node tag, nodal mass per DOF)
+    fixed: np.ndarray(F,), default=None, fixed node tags
+    eqdof: np.ndarray(K,2), default=None, equalDOF node tag pairs
+    max_aspect: float, default=10.0, longest/shortest edge above which a quad is reported
+    jacobian_tol: float, default=1e-12, corner Jacobians with |J| below tol*(mean element area) are degenerate
+    return: list of ValidationIssue, severity 'error'(the model can't be built or the analysis fails) or 'warning'
+    """
+    issues = []
+    node_tags, ele_tags, ele_nodes = mesh.node_tags, mesh.ele_tags, mesh.ele_nodes
+
+    # tags and coordinates
+    for name, tags in (('node', node_tags), ('element', ele_tags)):
+        duplicated = _duplicates(tags)
+        if duplicated.size:
+            issues.append(_issue(f'duplicate {name} tags', 'error', duplicated, f'Duplicate {name} tags'))
+    # negative node tags are rejected by SiteMesh
+    negative = ele_tags[ele_tags < 0]
+    if negative.size:
+        issues.append(_issue('negative element tags', 'error', negative, 'Negative element tags'))
+    bad_coords = ~np.isfinite(mesh.coords).all(axis=1)
+    if bad_coords.any():
+        issues.append(_issue('node coordinates', 'error', node_tags[bad_coords], 'Nodes with non-finite coordinates'))
+
+    # connectivity
+    found = mesh.has_nodes(ele_nodes)
+    broken = ~found.all(axis=1)
+    if broken.any():
+        issues.append(_issue('missing element nodes', 'error', ele_tags[broken], 'Elements referencing missing nodes'))
+    repeated = np.sort(ele_nodes, axis=1)
+    repeated = (repeated[:, 1:] == repeated[:, :-1]).any(axis=1)
+    if repeated.any():
+        issues.append(_issue('repeated element nodes', 'error', ele_tags[repeated], 'Elements with a node used twice'))
+    used = np.zeros(node_tags.size, dtype=bool)
+    used[mesh.index_of(ele_nodes[found])] = True
+    if (~used).any():
+        issues.append(_issue('orphan nodes', 'warning', node_tags[~used], 'Nodes not used by any element'))
+
+    # geometry of the elements with all nodes defined
+    valid = ~broken & ~repeated
+    valid[valid] = ~bad_coords[mesh.index_of(ele_nodes[valid])].any(axis=1)
+    if valid.any():
+        geometry = SiteMesh(node_tags, mesh.coords, ele_tags[valid], ele_nodes[valid])
+        jac = quad_corner_jacobians(geometry)
+        tol = jacobian_tol*np.abs(jac).sum(axis=1).mean()
+        tags = geometry.ele_tags
+        degenerate = (np.abs(jac) <= tol).any(axis=1)
+        clockwise = (jac < -tol).all(axis=1)
+        distorted = ~degenerate & ~clockwise & (jac < -tol).any(axis=1)
+        if degenerate.any():
+            issues.append(_issue('degenerate quads', 'error', tags[degenerate], 'Quads with a zero corner Jacobian(collapsed edge or corner)'))
+        if clockwise.any():
+            issues.append(_issue('inverted quads', 'error', tags[clockwise], 'Quads with clockwise node order(negative Jacobian)'))
+        if distorted.any():
+            issues.append(_issue('distorted quads', 'error', tags[distorted], 'Non-convex or twisted quads(Jacobian changes sign)'))
+        aspect = quad_aspect_ratios(geometry)
+        slender = np.isfinite(aspect) & (aspect > max_aspect)
+        if slender.any():
+            issues.append(_issue('aspect ratio', 'warning', tags[slender],
+                                 f'Quads with aspect ratio above {max_aspect}(max {aspect[slender].max():.1f})'))
+
+    # materials
+    if mat_tags is not None:
+        defined = np.asarray(list(mat_tags), dtype=np.int64)
+        undefined = ~np.isin(mesh.mat_tags, defined)
+        if undefined.any():
+            issues.append(_issue('material coverage', 'error', ele_tags[undefined],
+                                 f'Elements with undefined material tags {np.unique(mesh.mat_tags[undefined]).tolist()}'))
+        unused = defined[~np.isin(defined, mesh.mat_tags)]
+        if unused.size:
+            issues.append(_issue('unused materials', 'warning', unused, 'Materials not used by any element'))
+
+    # nodal mass
+    if mass is not None and len(mass):
+        mass = np.asarray(mass, dtype=float).reshape(len(mass), -1)
+        tags = mass[:, 0].astype(np.int64)
+        negative = (mass[:, 1:] < 0).any(axis=1) | ~np.isfinite(mass[:, 1:]).all(axis=1)
+        if negative.any():
+            issues.append(_issue('negative mass', 'error', tags[negative], 'Negative or non-finite nodal mass'))
+        missing = ~mesh.has_nodes(tags)
+        if missing.any():
+            issues.append(_issue('mass nodes', 'error', tags[missing], 'Nodal mass at missing nodes'))
+        duplicated = _duplicates(tags)
+        if duplicated.size:
+            issues.append(_issue('duplicate mass', 'warning', duplicated, 'Nodal mass defined more than once(the last one is used)'))
+
+    # constraints
+    if fixed is not None and len(fixed):
+        fixed = np.asarray(fixed, dtype=np.int64).ravel()
+        missing = ~mesh.has_nodes(fixed)
+        if missing.any():
+            issues.append(_issue('fixed nodes', 'error', fixed[missing], 'Fixes at missing nodes'))
+    if eqdof is not None and len(eqdof):
+        pairs = np.asarray(eqdof, dtype=np.int64).reshape(-1, 2)
+        orphan = ~mesh.has_nodes(pairs).all(axis=1)
+        if orphan.any():
+            issues.append(_issue('orphan equalDOF', 'error', pairs[orphan][~mesh.has_nodes(pairs[orphan])],
+                                 'EqualDOF pairs with missing nodes, missing nodes'))
+        self_tied = pairs[:, 0] == pairs[:, 1]
+        if self_tied.any():
+            issues.append(_issue('self-tied equalDOF', 'error', pairs[self_tied, 0], 'EqualDOF pairs tying a node to itself'))
+        ordered = np.sort(pairs, axis=1)
+        unique, counts = np.unique(ordered, axis=0, return_counts=True)
+        if (counts > 1).any():
+            issues.append(_issue('duplicate equalDOF', 'warning', unique[counts > 1], 'EqualDOF node pairs defined more than once, nodes'))
+    return issues
+
+
+def raise_for_errors(issues:list)->None:
+    """
+    raise MeshValidationError if any issue has severity 'error'
+    """
+    errors = [issue for issue in issues if issue.severity == 'error']
+    if errors:
+        raise MeshValidationError(errors)
@@ -1,23 +1,32 @@
 import openseespy.opensees as ops
-from collections import namedtuple, Counter
-from alive_progress import alive_bar, alive_it
+from collections import namedtuple
+from alive_progress import alive_bar
 from loguru import logger
 import opstool as opst
-import time,sys
+import time,gc,json,os
+import numpy as np
 from EZSite.opsmaterial import EZOpsMaterial
+from EZSite.mesh import SiteMesh, pairs_to_namedtuples, nine_node_connectivity, midside_tags
+from EZSite.partition import x_split_boundaries, split_mesh, membership, localize_hub_ties, plan_constraints, rank_plans, RankPlan, material_costs, node_weights
+from EZSite.comm import send_arrays, recv_arrays, bcast_arrays, allgather_array
+from EZSite.costmodel import load_material_costs, element_costs
+from EZSite.validation import validate_site, raise_for_errors
+from EZSite.geostatic import geostatic_state, poisson_ratio, rows_of, pressure_dependent_modulus
+from EZSite.logconfig import STAGES, configure_logging, ensure_logging, hot_logging
+from EZSite.profiling import PROFILER, profile_stage
+from EZSite.postprocess import AsyncResponseWriter, OnlineReducer, Snapshot, nodal_fields, element_strain, \
+    ground_acceleration, excess_pore_ratio
+from EZSite.results import write_recorder_index
+from EZSite.checkpoint import Checkpointer, CheckpointPolicy
+from EZSite.dofindex import DofIndex
+from EZSite.spatial import SiteLocator, interface_ties, EMBEDDED
+from EZSite.renumber import renumber_site_files, load_renumber_map, renumber_tags, RENUMBER_MAP
+from EZSite.coarsen import coarsen_site_files, read_site_mesh, max_frequency, max_element_size, HANGING_NODE_INFO
+from EZSite.plotting import render_frames, frames_to_mp4, frames_from_snapshots
+from EZSite.sharedmesh import share_site_tables, read_site_tables, rss_breakdown, record_nbytes, RecordView
+from EZSite.boundary import tributary_areas, LK_dashpot_coefficients, owned_by_rank, periodic_boundary_pairs, local_constraint_pairs
 from pathlib import Path
 
-# logger configuration
-if ops.getNP()>1:
-    logger = logger.bind(PID=ops.getPID(), NP=ops.getNP())
-    logger.configure(handlers=[
-        {
-            "sink": sys.stderr,
-            "format": "{time:YY-MM-DD HH:mm:ss} |<lvl>{level:8}</>| PID:<cyan>{extra[PID]}</> NP:<green>{extra[NP]}</> | <cyan>{module} : {function}:{line:4}</> - <lvl>{message}</>",
-            "colorize": True
-        },
-    ])
-
 def define_file_path(DATA_PATH:Path, pathname:str)->Path:
         if not DATA_PATH.exists():
             logger.error(f'File at Path {DATA_PATH} does not exist!')
@@ -43,19 +52,131 @@ class SlopeAnalysis2D(EZOpsMaterial):
         EQDOF_02_INFO_PATH = define_file_path(DATA_PATH, 'EqualDOFnodes_02_Info.dat')
         EQDOF_BASE_INFO_PATH = define_file_path(DATA_PATH, 'EqualDOFnodes_Base_Info.dat')
         MASS_INFO_PATH = define_file_path(DATA_PATH, 'massInfo.dat')
+        HANGING_INFO_PATH = DATA_PATH/HANGING_NODE_INFO
     else:
         logger.error(f'There is no directory named "{data_path}" in current path: {ABS_PATH}!')
     
+    # Elastic half-space below the site for Lysmer-Kulhemyer boundary
+    # rho(ton/m^3), vs(m/s), poisson ratio(only used for normal dashpots)
+    LK_RHO = 2.00
+    LK_VS = 875.0
+    LK_NU = 0.25
+    
+    def use_data_path(self, data_path:Path)->None:
+        """
+        read the site files of this model from data_path(e.g. a renumbered or coarsened copy, see renumber_site_data and
+        coarsen_site_data), the class paths stay the default of every new model
+        """
+        self.DATA_PATH = Path(data_path)
+        self.NODEINFO_PATH = define_file_path(self.DATA_PATH, 'nodeInfo.dat')
+        self.ELEMENTINFO_PATH = define_file_path(self.DATA_PATH, 'elementInfo.dat')
+        self.FIXNODESINFO_PATH = define_file_path(self.DATA_PATH, 'fixedNodeInfo.dat')
+        self.EQDOF_01_INFO_PATH = define_file_path(self.DATA_PATH, 'EqualDOFnodes_01_Info.dat')
+        self.EQDOF_02_INFO_PATH = define_file_path(self.DATA_PATH, 'EqualDOFnodes_02_Info.dat')
+        self.EQDOF_BASE_INFO_PATH = define_file_path(self.DATA_PATH, 'EqualDOFnodes_Base_Info.dat')
+        self.MASS_INFO_PATH = define_file_path(self.DATA_PATH, 'massInfo.dat')
+        self.HANGING_INFO_PATH = self.DATA_PATH/HANGING_NODE_INFO
+        logger.info(f'Using Data in path {self.DATA_PATH}')
+    
+    def renumber_site_data(self, method:str = 'rcm')->dict:
+        """
+        renumber the nodes and elements of the site files before the model is built, for a small stiffness matrix profile
+        (see EZSite.renumber.renumber_site_files), applied to nodes, elements, fixes, equalDOFs and nodal mass
+        Rank 0 writes the renumbered copy to <work_dir>/<data name>_<method>/, which is then used by all ranks of this model
+        (other models keep their own data path). In serial, the Plain numberer keeps this order(RCM would renumber it again). All model, recorder and result tags are the new tags,
+        RenumberMap maps them to the original tags(also in renumber_map.npz of the copy and the recorder index).
+        method: str, default='rcm', 'rcm'(reverse Cuthill-McKee) or 'hilbert'(space-filling curve)
+        return: the profile/bandwidth report
+        """
+        src = self.DATA_PATH
+        if (src/RENUMBER_MAP).exists():
+            # the data path is a renumbered copy already
+            dst = src
+        else:
+            dst = self.WorkDir/f'{src.name}_{method}'
+            if ops.getPID() == 0:
+                renumber_site_files(src, dst, method)
+            if ops.getNP() > 1:
+                ops.barrier()
+            self.use_data_path(dst)
+        with open(dst/'renumber.json') as f:
+            report = json.load(f)
+        self.RenumberMap = load_renumber_map(dst/RENUMBER_MAP)
+        self.Numberer = 'Plain'
+        return report
+    
+    def coarsen_site_data(self, fmax = 'auto', materials:tuple[str] = ('dense sand2', 'sandy gravel'),
+                          points_per_wavelength:float = 10, record:str = 'velocityHistory.txt', record_dt:float = 0.005,
+                          energy:float = 0.95, max_passes:int = 3)->dict:
+        """
+        merge stacked element pairs of the deep stiff layers before the model is built(see EZSite.coarsen.coarsen_site_files)
+        while the merged height resolves the shortest shear wave: height <= vs/(points_per_wavelength*fmax), vs of every
+        element from its small strain shear modulus at the geostatic mean effective stress(see _get_geostatic_state)
+        Rank 0 writes the coarsened copy to <work_dir>/<data name>_coarse/ on every build(generated, not kept in the
+        repository), which is then used by all ranks of this model, hanging nodes are tied by tie_hanging_nodes.
+        fmax: float|str, default='auto', maximum frequency(Hz) of the motion, 'auto' from the record(see EZSite.coarsen.max_frequency)
+        materials: tuple[str], default=('dense sand2', 'sandy gravel'), names of the layers that may be coarsened
+        points_per_wavelength: float, default=10, elements per shortest wavelength
+        record: str, default='velocityHistory.txt', velocity record in the data path, record_dt its time step
+        energy: float, default=0.95, Fourier power fraction of the acceleration below fmax
+        return: the report of coarsen.json
+        """
+        src = self.DATA_PATH
+        if (src/'coarsen.json').exists():
+            # the data path is a coarsened copy already
+            dst = src
+        else:
+            dst = self.WorkDir/f'{src.name}_coarse'
+            if ops.getPID() == 0:
+                if fmax == 'auto':
+                    fmax = max_frequency(np.loadtxt(src/record), record_dt, energy)
+                mesh = read_site_mesh(src)
+                props = self.SOIL_MAT_PROP.values()
+                rho_by_mat = {prop.matTag: prop.rho for prop in props}
+                nu_by_mat = {prop.matTag: float(poisson_ratio(prop.ShearModul, prop.BulkModul)) for prop in props}
+                drained = [int(row[0]) for row in self._info_rows(src/'fixedNodeInfo.dat') if row and int(row[3]) == 1]
+                state = geostatic_state(mesh, rho_by_mat, nu_by_mat, self.WaterLevel, drained)
+                mat = [self.SOIL_MAT_PROP[self.MAT_TAG_NAME_MAP[int(tag)]] for tag in mesh.mat_tags]
+                G = pressure_dependent_modulus([prop.ShearModul for prop in mat], -state.EleStress[:, :3].mean(axis=1),
+                                               [prop.refPress for prop in mat], [prop.pressDependCoef for prop in mat])
+                vs = np.sqrt(G/np.array([prop.rho for prop in mat]))
+                eligible = np.isin(mesh.mat_tags, [self.MAT_NAME_TAG_MAP[name] for name in materials])
+                info = dict(fmax=fmax, points_per_wavelength=points_per_wavelength, materials=list(materials),
+                            hmax={name: round(float(max_element_size(vs[mesh.mat_tags == self.MAT_NAME_TAG_MAP[name]],
+                                                                     fmax, points_per_wavelength).min(initial=np.inf)), 3)
+                                  for name in materials})
+                coarsen_site_files(src, dst, max_element_size(vs, fmax, points_per_wavelength), eligible, max_passes, info)
+            if ops.getNP() > 1:
+                ops.barrier()
+            self.use_data_path(dst)
+        with open(dst/'coarsen.json') as f:
+            report = json.load(f)
+        logger.info(f'Coarsened site: fmax {report["fmax"]:.2f} Hz, smallest allowed height {report["hmax"]}, '
+                    f'{report["elements"][0]} -> {report["elements"][1]} elements')
+        return report
+    
     @property
     def NodesDict_ALL(self)->dict[namedtuple]:
+        if isinstance(self.Nodes_ALL, RecordView):
+            return self.Nodes_ALL.mapping()
         keys = [node.tag for node in self.Nodes_ALL]
         return dict(zip(keys, self.Nodes_ALL))
     
     @property
     def NodesDict(self)->dict[namedtuple]:
+        if isinstance(self.Nodes, RecordView):
+            return self.Nodes.mapping()
         keys = [node.tag for node in self.Nodes]
         return dict(zip(keys, self.Nodes))
     
+    @property
+    def Mesh_ALL(self)->SiteMesh:
+        if isinstance(self.Nodes_ALL, RecordView) and not self.Nodes_ALL.extra:
+            # zero-copy views of the site arrays(shared site tables or lean mode, see release_build_data)
+            data = self.SiteArrays
+            return SiteMesh(data['node_tags'], data['node_coords'], data['ele_tags'], data['ele_nodes'], data['ele_mat'])
+        return SiteMesh.from_namedtuples(self.Nodes_ALL, self.Elements_ALL)
+    
     def __init_properties(self, WaterLevel)->None:
         self.WaterLevel = WaterLevel
         self._SOIL_MAT_PROP()
@@ -274,6 +395,7 @@ class SlopeAnalysis2D(EZOpsMaterial):
         else:
             logger.warning('Soil Element Properties already defined!')
     
+    @profile_stage()
     def define_soil_materials(self)->None:
         """
         define soil materials from SOIL_MATERIAL dict
@@ -291,13 +413,100 @@ class SlopeAnalysis2D(EZOpsMaterial):
                 raise ValueError('SoilType not defined!')
         logger.success('Finished creating all soil materials...')
     
+    def _info_rows(self, file_path:Path):
+        """
+        split rows of a site info file, taken from the shared site tables if loaded(see _get_shared_site_data)
+        """
+        shared = getattr(self, 'SharedData', None)
+        if shared is not None and file_path.name in shared:
+            return shared[file_path.name].tolist()
+        def rows():
+            with open(file_path, 'r') as f:
+                for line in f:
+                    yield line.split()
+        return rows()
+    
+    def _get_shared_site_data(self)->None:
+        """
+        load the site files once on rank 0, the other ranks get the arrays without reading the files
+            shared_memory=True: the ranks on the machine attach to rank 0's shared memory zero-copy(see EZSite.sharedmesh)
+            otherwise: rank 0 broadcasts the arrays with ops.Bcast(see EZSite.comm)
+        Nodes_ALL and Elements_ALL become RecordView of the arrays, a namedtuple is only created when a node/element
+        is accessed, the ranks keep Python objects only for their own partition
+        """
+        rss = rss_breakdown()
+        tables = {path.name: path for path in (self.FIXNODESINFO_PATH, self.MASS_INFO_PATH,
+                                                self.EQDOF_01_INFO_PATH, self.EQDOF_02_INFO_PATH,
+                                                self.EQDOF_BASE_INFO_PATH)}
+        loader = lambda: read_site_tables(self.NODEINFO_PATH, self.ELEMENTINFO_PATH, **tables)
+        if self.UseSharedMemory:
+            self.SharedData = share_site_tables(loader)
+        else:
+            self.SharedData = bcast_arrays(loader() if self.PID == 0 else None)
+        data = self.SharedData
+        self.SiteArrays = {key: data[key] for key in ('node_tags', 'node_coords', 'ele_tags', 'ele_nodes', 'ele_mat')}
+        Node = self.NODE2
+        QuadUPele = namedtuple('QuadUPele', ('tag','nodes', 'matTag', 'vpermParamtag', 'hpermParamtag'))
+        node_tags, coords = data['node_tags'], data['node_coords']
+        ele_tags, ele_nodes, ele_mat = data['ele_tags'], data['ele_nodes'], data['ele_mat']
+        self.Nodes_ALL = RecordView(lambda i: Node(int(node_tags[i]), float(coords[i, 0]), float(coords[i, 1])), node_tags)
+        self.Elements_ALL = RecordView(lambda i: QuadUPele(int(ele_tags[i]), tuple(int(n) for n in ele_nodes[i]),
+                                                           int(ele_mat[i]), None, None), ele_tags)
+        
+        as_objects = record_nbytes(self.Nodes_ALL) + record_nbytes(self.Elements_ALL)
+        private = rss_breakdown().get('RssAnon', 0.0) - rss.get('RssAnon', 0.0)
+        nbytes = sum(array.nbytes for array in data.values())
+        where = 'mapped once per machine' if self.UseSharedMemory else 'received from rank 0'
+        logger.info(f'Site data: {nbytes/2**20:.3f} MB {where}, '
+                    f'{as_objects/2**20:.3f} MB of node/element namedtuples not held by this rank, private memory +{private:.2f} MB')
+
+    def validate_site_data(self, max_aspect:float = 10.0)->list:
+        """
+        check nodes, elements, materials, nodal mass, fixes and equalDOF pairs of the whole site before building
+        (see EZSite.validation.validate_site), warnings are logged, errors raise MeshValidationError
+        max_aspect: float, default=10.0, quads with a longer/shorter edge ratio are reported
+        return: list of ValidationIssue
+        """
+        if not hasattr(self, 'Nodes_ALL'):
+            self._get_site_nodes()
+        if not hasattr(self,'Elements_ALL'):
+            self._get_site_elements()
+        start = time.perf_counter()
+        def columns(file_path, ncol = None):
+            try:
+                rows = [[float(v) for v in line[:ncol]] for line in self._info_rows(file_path)]
+            except FileNotFoundError:
+                return None
+            return np.array(rows, dtype=float).reshape(len(rows), -1)
+        fixed = columns(self.FIXNODESINFO_PATH, 1)
+        eqdof = None
+        if self.eqDOF_source == 'file':
+            # pairs derived from geometry always reference existing nodes
+            pairs = [columns(path, 2) for path in (self.EQDOF_01_INFO_PATH, self.EQDOF_02_INFO_PATH,
+                                                   self.EQDOF_BASE_INFO_PATH)]
+            eqdof = np.vstack([p for p in pairs if p is not None] or [np.empty((0, 2))])
+        mass = columns(self.MASS_INFO_PATH)
+        issues = validate_site(self.Mesh_ALL, mat_tags=self.MAT_TAG_NAME_MAP.keys(), mass=mass,
+                               fixed=fixed, eqdof=eqdof, max_aspect=max_aspect)
+        if mass is not None and len(mass) and self.PID == 0:
+            # see _get_nodal_mass
+            logger.debug(f'Nodal mass of {self.MASS_INFO_PATH} is not applied: {len(mass)} nodes, values up to {mass[:, 1:].max():.3g}')
+        elapsed = time.perf_counter()-start
+        if self.PID == 0:
+            for issue in issues:
+                (logger.error if issue.severity == 'error' else logger.warning)(f'Site data check {issue.check}: {issue.message}')
+        raise_for_errors(issues)
+        logger.success(f'Site data checked in {elapsed*1000:.1f} ms: {len(self.Nodes_ALL)} nodes, {len(self.Elements_ALL)} elements, '
+                       f'{len(issues)} warnings')
+        return issues
+
     def _get_site_nodes(self)->None:
         """
         read node information from nodeInfo.dat
         """
         nodelist = []
         try:
-            with open(SlopeAnalysis2D.NODEINFO_PATH, 'r') as f:
+            with open(self.NODEINFO_PATH, 'r') as f:
                 for line in f:
                     line = line.split()
                     nodeTag = int(line[0])
@@ -308,6 +517,7 @@ class SlopeAnalysis2D(EZOpsMaterial):
         except FileNotFoundError as e:
             logger.error(f'FileNotFoundError: {e}\nPlease check the file path!')
              
+    @profile_stage()
     def define_site_nodes(self)->None:
         """read node information from nodeInfo.dat and define soil nodes"""
         if not hasattr(self, 'Nodes'):
@@ -328,7 +538,7 @@ class SlopeAnalysis2D(EZOpsMaterial):
         elelist = []
         QuadUPele = namedtuple('QuadUPele', ('tag','nodes', 'matTag', 'vpermParamtag', 'hpermParamtag'))
         try:
-            with open(SlopeAnalysis2D.ELEMENTINFO_PATH, 'r') as f:
+            with open(self.ELEMENTINFO_PATH, 'r') as f:
                 for line in f:
                     line = line.split()
                     eleTag,n1,n2,n3,n4,matTag = [int(point) for point in line]
@@ -337,11 +547,13 @@ class SlopeAnalysis2D(EZOpsMaterial):
         except FileNotFoundError as e:
             logger.error(f'FileNotFoundError: {e}\nPlease check the file path!')
     
+    @profile_stage()
     def define_site_elements(self,
                              thicker_boundary = True,
                              high_perm = True,
                              basic_thick_coef = 100,
-                             thicker_coef = 100
+                             thicker_coef = 100,
+                             element = 'quadUP'
                              )->None:
         """
         read element information from elementInfo.dat and define soil elements
@@ -350,7 +562,14 @@ class SlopeAnalysis2D(EZOpsMaterial):
                         will be thicker
         high_perm: bool, default=True, if True, all elements permibility will be set to 1.0
                     NEED TO update material properties later!
+        element: str, default='quadUP', '9_4_QuadUP' adds the mid-side and centre displacement nodes of every element
+                 (see define_midside_nodes), the pore pressure stays bilinear on the corner nodes
         """
+        if element not in ('quadUP', '9_4_QuadUP'):
+            raise ValueError(f'Element type {element} not supported!')
+        if element == '9_4_QuadUP' and getattr(self, 'HangingNodes_ALL', ()):
+            raise ValueError('9_4_QuadUP needs a conforming mesh, hanging nodes of a coarsened site are not supported!')
+        self.ElementType = element
         if not hasattr(self, 'Elements'):
             self.split_nodes_and_elements()
         exist_elements = self.opsElements
@@ -361,10 +580,15 @@ class SlopeAnalysis2D(EZOpsMaterial):
             self.basic_thick_coef = basic_thick_coef
             self.thicker_coef = thicker_coef
             # only consider the first nodepair in eqDOF_nodes_01_list, consider as soil colomns
+            if not hasattr(self, 'eqDOF_nodes_01_list_ALL'):
+                self._read_eqDOF_nodes_ALL(self.eqDOF_source)
             left_boundary = max(self.NodesDict_ALL[node].x for node in self.eqDOF_nodes_01_list_ALL[0].NodeTags)
             right_boundary = min(self.NodesDict_ALL[node].x for node in self.eqDOF_nodes_02_list_ALL[0].NodeTags)
             self._site_boundary = (left_boundary, right_boundary)
         
+        if element == '9_4_QuadUP':
+            ele_nodes = self.define_midside_nodes([ele.tag for ele in self.Elements])
+        
         elements = list(self.Elements)
         for num, ele in enumerate(self.Elements):
             if ele.tag not in exist_elements:
@@ -393,7 +617,10 @@ class SlopeAnalysis2D(EZOpsMaterial):
                     hperm = self.SOIL_ELE_PROP[mat_name].hperm
                 
                 # create element
-                ops.element('quadUP', ele.tag, *ele.nodes, ele_thick, ele.matTag, bulk, fmass, vperm, hperm, unitWX, unitWY)
+                if element == '9_4_QuadUP':
+                    ops.element('9_4_QuadUP', ele.tag, *ele_nodes[ele.tag], ele_thick, ele.matTag, bulk, fmass, vperm, hperm, unitWX, unitWY)
+                else:
+                    ops.element('quadUP', ele.tag, *ele.nodes, ele_thick, ele.matTag, bulk, fmass, vperm, hperm, unitWX, unitWY)
                 
                 # add parameters for vperm and hperm
                 vPermtag = New_Param_tag+2*ele.tag
@@ -404,39 +631,127 @@ class SlopeAnalysis2D(EZOpsMaterial):
             else:
                 logger.warning(f'{ele} already exists! Not created!')
         self.Elements = tuple(elements)
+        if element == '9_4_QuadUP':
+            self.constrain_midside_nodes()
         logger.success('Finished creating Site elements...')
-        
-    def _get_fix_nodes(self)->None:
+    
+    def define_midside_nodes(self, ele_tags)->dict[int,list[int]]:
+        """
+        define the mid-side and centre nodes(ndf 2, displacement only) of the 9_4_QuadUP elements ele_tags
+        The 9-node connectivity of the whole site is built at once(see EZSite.mesh.nine_node_connectivity), so a
+        mid-side node shared by elements of different ranks has the same tag on every rank.
+        return: the 9 node tags of every element, {ele tag: [corners 1-4, mid-sides of 1-2, 2-3, 3-4, 4-1, centre]}
+        """
+        mesh = self.Mesh_ALL
+        if not hasattr(self, 'NineNodes'):
+            self.NineNodes = nine_node_connectivity(mesh)
+        nine = self.NineNodes
+        self._nine_ele_tags = np.asarray(ele_tags, dtype=np.int64)
+        ele_nodes = nine.EleNodes[rows_of(mesh.ele_tags, ele_tags)]
+        new = np.setdiff1d(ele_nodes[:, 4:], list(self.opsNodes))
+        coords = nine.Coords[rows_of(nine.NodeTags, new)]
+        for tag, xy in zip(new.tolist(), coords.tolist()):
+            ops.node(tag, *xy, '-ndf', 2)
+        logger.success(f'Finished creating {new.size} mid-side/centre nodes...')
+        return dict(zip(np.asarray(ele_tags, dtype=int).tolist(), ele_nodes.tolist()))
+    
+    def constrain_midside_nodes(self)->None:
         """
-        read fixed node information from fixedNodeInfo.dat
+        carry the fixes and equalDOFs of the element corners over to the mid-side nodes between them(DOF 1 and 2):
+            fix: both corners fixed in a DOF
+            equalDOF: both corners tied in a DOF, to the mid-side node of the partner edge, or to the partner node if
+                      both corners are tied to the same node(the base ties)
+        Without them the edges between constrained corners bulge(e.g. the rigid base). The constraints are derived from
+        the whole-site fixes and equalDOFs, each is defined once, by the lowest rank holding an element of the edge
+        (collective, the ranks exchange which elements they hold), which adds the partner node if it is missing.
+        """
+        nine = self.NineNodes
+        mesh = self.Mesh_ALL
+        u, v = mesh.ele_nodes.ravel(), np.roll(mesh.ele_nodes, -1, axis=1).ravel()
+        # owner of every edge: the lowest rank holding one of its elements(NP if no rank holds one)
+        held = allgather_array(np.isin(mesh.ele_tags, self._nine_ele_tags))
+        ele_owner = np.where(held.any(axis=0), np.argmax(held, axis=0), self.NP)
+        mid, first, inverse = np.unique(midside_tags(nine, u, v), return_index=True, return_inverse=True)
+        owner = np.full(mid.size, self.NP)
+        np.minimum.at(owner, inverse.ravel(), np.repeat(ele_owner, 4))
+        u, v = u[first], v[first]
+        own = owner == self.PID
+        constraints = []
+        for dof in (1, 2):
+            fixed = [node.tag for node in self.FixedNodes_ALL if node.FixedDOF[dof-1] == 1]
+            constraints += [(tag, -1, (dof,)) for tag in mid[own & np.isin(u, fixed) & np.isin(v, fixed)].tolist()]
+        for pairs in (self.eqDOF_nodes_01_list_ALL, self.eqDOF_nodes_02_list_ALL, self.eqDOF_nodes_Base_list_ALL):
+            for dofs in {tuple(dof for dof in pair.eqDOF if dof in (1, 2)) for pair in pairs} - {()}:
+                group = np.array([pair.NodeTags for pair in pairs if tuple(dof for dof in pair.eqDOF if dof in (1, 2)) == dofs],
+                                 dtype=np.int64)
+                # constrained node -> retained node, edges with both corners constrained
+                retained = dict(zip(group[:, 1].tolist(), group[:, 0].tolist()))
+                both = own & np.isin(u, group[:, 1]) & np.isin(v, group[:, 1])
+                ru = np.array([retained[tag] for tag in u[both].tolist()], dtype=np.int64)
+                rv = np.array([retained[tag] for tag in v[both].tolist()], dtype=np.int64)
+                partner = np.where(ru == rv, ru, midside_tags(nine, ru, rv))
+                constraints += [(tag, other, dofs) for tag, other in zip(mid[both].tolist(), partner.tolist()) if other >= 0]
+        # partner nodes held by other ranks only
+        exist_nodes = set(self.opsNodes)
+        missing = {other for _, other, _ in constraints if other >= 0} - exist_nodes
+        new = np.array(sorted(missing & set(nine.NodeTags.tolist())), dtype=np.int64)
+        for tag, xy in zip(new.tolist(), nine.Coords[rows_of(nine.NodeTags, new)].tolist()):
+            ops.node(tag, *xy, '-ndf', 2)
+        self.add_nodes([self.NodesDict_ALL[tag] for tag in sorted(missing - set(new.tolist()))])
+        for tag, other, dofs in constraints:
+            if other < 0:
+                if dofs[0] not in ops.getFixedDOFs(tag):
+                    ops.fix(tag, *[int(i == dofs[0]) for i in (1, 2)])
+            else:
+                ops.equalDOF(other, tag, *dofs)
+        logger.success(f'Finished creating {len(constraints)} mid-side node constraints...')
+    
+    def _read_fix_nodes_ALL(self)->None:
+        """
+        read fixed node information of the whole site from fixedNodeInfo.dat
         """
         fix_Bottom_node_list = []
         fix_Surface_node_list = []
         FixedNode = namedtuple('FixedNode', ('tag', 'FixedDOF'))
         # get undrained surface nodes
-        undrained_node_list = [FixedNode(node.tag, [0,0,1]) for node in self.Nodes if node.y >= self.WaterLevel]
-        self.UndrainedNodes = tuple(undrained_node_list)
+        undrained_node_list = [FixedNode(node.tag, [0,0,1]) for node in self.Nodes_ALL if node.y >= self.WaterLevel]
+        self.UndrainedNodes_ALL = tuple(undrained_node_list)
+        nodes_dict = self.NodesDict_ALL
         try:
-            with open(SlopeAnalysis2D.FIXNODESINFO_PATH, 'r') as f:
-                for line in f:
-                    line = line.split()
-                    nodetag = int(line[0])
-                    fixedDOF = [int(dof) for dof in line[1:]]
-                    if fixedDOF == [0,1,0]:
-                        fix_Bottom_node_list.append(FixedNode(nodetag, fixedDOF))
-                    elif fixedDOF == [0,0,1]:
-                        # Only Contain the surface nodes below water level here
-                        if self.NodesDict_ALL[nodetag].y < self.WaterLevel:
-                            fix_Surface_node_list.append(FixedNode(nodetag, fixedDOF))
-                    else:
-                        raise ValueError(f'FixedDOF {fixedDOF} not supported!')
+            for line in self._info_rows(self.FIXNODESINFO_PATH):
+                nodetag = int(line[0])
+                fixedDOF = [int(dof) for dof in line[1:]]
+                if fixedDOF == [0,1,0]:
+                    fix_Bottom_node_list.append(FixedNode(nodetag, fixedDOF))
+                elif fixedDOF == [0,0,1]:
+                    # Only Contain the surface nodes below water level here
+                    if nodes_dict[nodetag].y < self.WaterLevel:
+                        fix_Surface_node_list.append(FixedNode(nodetag, fixedDOF))
+                else:
+                    raise ValueError(f'FixedDOF {fixedDOF} not supported!')
             self.FixedNodes_ALL = tuple(fix_Bottom_node_list + fix_Surface_node_list)
             self.FixedBottomNodes_ALL = tuple(fix_Bottom_node_list)
             self.FixedSurfaceNodes_ALL = tuple(fix_Surface_node_list)
         except FileNotFoundError as e:
             logger.error(f'FileNotFoundError: {e}\nPlease check the file path!')
-        self.FixedBottomNodes = tuple([fixnode for fixnode in self.FixedBottomNodes_ALL if fixnode.tag in self.NodesDict.keys()])
-        self.FixedSurfaceNodes = tuple([fixnode for fixnode in self.FixedSurfaceNodes_ALL if fixnode.tag in self.NodesDict.keys()])
+    
+    def _get_fix_nodes(self)->None:
+        """
+        read fixed node information from fixedNodeInfo.dat and keep the fixes of this rank
+        """
+        if not hasattr(self, 'FixedNodes_ALL'):
+            self._read_fix_nodes_ALL()
+        if self.PlanConstraints:
+            # only keep the fixes owned by this rank
+            owned = iter(self._owned_constraints()[0])
+            self.FixedBottomNodes = tuple([fixnode for fixnode, own in zip(self.FixedBottomNodes_ALL, owned) if own])
+            self.FixedSurfaceNodes = tuple([fixnode for fixnode, own in zip(self.FixedSurfaceNodes_ALL, owned) if own])
+            self.UndrainedNodes = tuple([fixnode for fixnode, own in zip(self.UndrainedNodes_ALL, owned) if own])
+        else:
+            local_tags = set(self.NodesDict.keys())
+            self.FixedBottomNodes = tuple([fixnode for fixnode in self.FixedBottomNodes_ALL if fixnode.tag in local_tags])
+            self.FixedSurfaceNodes = tuple([fixnode for fixnode in self.FixedSurfaceNodes_ALL if fixnode.tag in local_tags])
+            self.UndrainedNodes = tuple([fixnode for fixnode in self.UndrainedNodes_ALL if fixnode.tag in local_tags])
         self.FixedNodes = tuple(list(self.FixedBottomNodes) + list(self.FixedSurfaceNodes))
                 
     def fix_bottom_nodes(self)->None:
@@ -470,82 +785,147 @@ class SlopeAnalysis2D(EZOpsMaterial):
         Nodes = self.Nodes
         exist_nodes = self.opsNodes
         All_nodes = self.Nodes_ALL
+        verbose = hot_logging()
         for node in nodes:
             if node not in All_nodes:
                 logger.warning(f'{node} not defined in {self.NODEINFO_PATH}! MAKE SURE you Know what you are doing! Adding it...')
                 ops.node(node.tag, node.x, node.y)
                 self.Nodes_ALL += (node,)
                 self.Nodes += (node,)
-                logger.info(f'User defined {node} is created!')
+                if verbose:
+                    logger.info(f'User defined {node} is created!')
                 continue
                 
             if node.tag not in Nodes and node.tag not in exist_nodes:
                 ops.node(node.tag, node.x, node.y)
                 self.Nodes += (node,)
-                logger.info(f'{node} is created!')
+                if verbose:
+                    logger.info(f'{node} is created!')
             elif node.tag in Nodes and node.tag not in exist_nodes:
                 ops.node(node.tag, node.x, node.y)
-                logger.info(f'{node} already built but not found in opensees, created!')
+                if verbose:
+                    logger.info(f'{node} already built but not found in opensees, created!')
             elif node.tag not in Nodes and node.tag in exist_nodes:
                 logger.warning(f'{node} not built but found in opensees, Please Check!')
                 raise ValueError(f'{node} not built but found in opensees, Please Check!')
             else:
                 logger.warning(f'{node} already exists! Not created!')
     
-    def _get_eqDOF_nodes(self)->None:
+    def _get_eqDOF_nodes(self, source:str = None)->None:
         """
         read equalDOF node information from EqualDOFnodes_Info.dat
+        source: str, default=None(self.eqDOF_source), 'file' or 'geometry'
+            file: read from EqualDOFnodes_01/02/Base_Info.dat
+            geometry: derive the periodic boundary node pairs from node coordinates(see EZSite.boundary.periodic_boundary_pairs)
         """
-        EqDOFNode = namedtuple('EqDOFNode', ['NodeTags', 'eqDOF'])
-        
-        def _read_eqDOF_nodes(file_path):
-            eqDOF_nodes_list = []
-            try:
-                with open(file_path, 'r') as f:
-                    for line in f:
-                        line = line.split()
-                        NodeTags = [int(line[0]), int(line[1])]
-                        eqDOF = [int(dof) for dof in line[2:]]
-                        eqDOF_nodes_list.append(EqDOFNode(NodeTags, eqDOF))
-            except FileNotFoundError as e:
-                logger.error(f'FileNotFoundError: {e}\nPlease check the file path!')
-            return eqDOF_nodes_list
-
         def recheck_and_define_missing_nodes(eqDOF_nodes_list):
-            qualified_nodes_list = [node for node in eqDOF_nodes_list if any(tag in self.NodesDict.keys() for tag in node.NodeTags)]
-            undefined_nodes_list = list(set([nodetag for nodepair in qualified_nodes_list for nodetag in nodepair.NodeTags if nodetag not in self.NodesDict.keys()]))
-            nodes_undefined = [self.NodesDict_ALL[nodetag] for nodetag in undefined_nodes_list]
-            if len(nodes_undefined)==0:
+            if len(eqDOF_nodes_list)==0:
+                return []
+            local_mesh = SiteMesh.from_namedtuples(self.Nodes)
+            pairs = np.array([node.NodeTags for node in eqDOF_nodes_list], dtype=np.int64)
+            qualified = local_mesh.has_nodes(pairs).any(axis=1)
+            qualified_nodes_list = [node for node, keep in zip(eqDOF_nodes_list, qualified) if keep]
+            _, undefined_nodes = local_constraint_pairs(pairs, local_mesh)
+            if undefined_nodes.size==0:
                 # no need to add nodes and check constraints
                 return qualified_nodes_list
             
             # add undefined nodes
+            nodes_undefined = [self.NodesDict_ALL[int(nodetag)] for nodetag in undefined_nodes]
             logger.warning(f'{nodes_undefined} not defined in this part of the model but Used in EqDOF! Adding it...')
             self.add_nodes(nodes_undefined)
             
             # check constraints
-            nodes_to_fix = [fixed_node for fixed_node in self.FixedNodes_ALL if fixed_node.tag in undefined_nodes_list]
+            undefined_nodes = set(undefined_nodes.tolist())
+            nodes_to_fix = [fixed_node for fixed_node in self.FixedNodes_ALL if fixed_node.tag in undefined_nodes]
             for node in nodes_to_fix:
                 ops.fix(node.tag, *node.FixedDOF)
-                logger.info(f'{self.NodesDict[node.tag]} missing constraints at DOF:{node.FixedDOF}! Adding it ...')
+                logger.info(f'Node {node.tag} missing constraints at DOF:{node.FixedDOF}! Adding it ...')
                 
             return qualified_nodes_list
         
-        self.eqDOF_nodes_01_list_ALL   = _read_eqDOF_nodes(SlopeAnalysis2D.EQDOF_01_INFO_PATH)
-        self.eqDOF_nodes_02_list_ALL   = _read_eqDOF_nodes(SlopeAnalysis2D.EQDOF_02_INFO_PATH)
-        self.eqDOF_nodes_Base_list_ALL = _read_eqDOF_nodes(SlopeAnalysis2D.EQDOF_BASE_INFO_PATH)
+        source = self.eqDOF_source if source is None else source
+        if not hasattr(self, 'eqDOF_nodes_01_list_ALL'):
+            self._read_eqDOF_nodes_ALL(source)
         
+        if self.PlanConstraints:
+            self._get_planned_eqDOF_nodes()
+            return None
         self.eqDOF_nodes_01_list   = recheck_and_define_missing_nodes(self.eqDOF_nodes_01_list_ALL)
         self.eqDOF_nodes_02_list   = recheck_and_define_missing_nodes(self.eqDOF_nodes_02_list_ALL)
         self.eqDOF_nodes_Base_list = recheck_and_define_missing_nodes(self.eqDOF_nodes_Base_list_ALL)
+    
+    def _read_eqDOF_nodes_ALL(self, source:str = 'file')->None:
+        """
+        read equalDOF node pairs of the whole site
+        source: str, default='file', or 'geometry', see _get_eqDOF_nodes
+        """
+        EqDOFNode = namedtuple('EqDOFNode', ['NodeTags', 'eqDOF'])
+        
+        def _read_eqDOF_nodes(file_path):
+            eqDOF_nodes_list = []
+            try:
+                for line in self._info_rows(file_path):
+                    NodeTags = [int(line[0]), int(line[1])]
+                    eqDOF = [int(dof) for dof in line[2:]]
+                    eqDOF_nodes_list.append(EqDOFNode(NodeTags, eqDOF))
+            except FileNotFoundError as e:
+                logger.error(f'FileNotFoundError: {e}\nPlease check the file path!')
+            return eqDOF_nodes_list
+        
+        if source == 'file':
+            self.eqDOF_nodes_01_list_ALL   = _read_eqDOF_nodes(self.EQDOF_01_INFO_PATH)
+            self.eqDOF_nodes_02_list_ALL   = _read_eqDOF_nodes(self.EQDOF_02_INFO_PATH)
+            self.eqDOF_nodes_Base_list_ALL = _read_eqDOF_nodes(self.EQDOF_BASE_INFO_PATH)
+        elif source == 'geometry':
+            periodic = periodic_boundary_pairs(self.Mesh_ALL)
+            self.eqDOF_nodes_01_list_ALL   = pairs_to_namedtuples(periodic.Left, periodic.LeftDOF)
+            self.eqDOF_nodes_02_list_ALL   = pairs_to_namedtuples(periodic.Right, periodic.RightDOF)
+            self.eqDOF_nodes_Base_list_ALL = pairs_to_namedtuples(periodic.Base, periodic.BaseDOF)
+            logger.info(f'Periodic boundary from geometry: {len(periodic.Left)} left, {len(periodic.Right)} right, {len(periodic.Base)} base node pairs')
+        else:
+            raise ValueError(f'EqualDOF source {source} not supported!')
+    
+    def _get_planned_eqDOF_nodes(self)->None:
+        """
+        keep the equalDOF constraints owned by this rank(see _get_constraint_plan) and add the nodes they need
+        """
+        if hasattr(self, 'RankPlan') and len(self.eqDOF_nodes_Base_list_ALL) > 0:
+            # base ties localized by rank 0(see _get_constraint_plan)
+            n_side = len(self.eqDOF_nodes_01_list_ALL) + len(self.eqDOF_nodes_02_list_ALL)
+            self.eqDOF_nodes_Base_list_ALL = pairs_to_namedtuples(self.RankPlan.EqDOFPairs[n_side:],
+                                                                  self.eqDOF_nodes_Base_list_ALL[0].eqDOF)
+        _, owned, missing_nodes = self._owned_constraints()
+        owned = iter(owned)
+        self.eqDOF_nodes_01_list   = [node for node, own in zip(self.eqDOF_nodes_01_list_ALL, owned) if own]
+        self.eqDOF_nodes_02_list   = [node for node, own in zip(self.eqDOF_nodes_02_list_ALL, owned) if own]
+        self.eqDOF_nodes_Base_list = [node for node, own in zip(self.eqDOF_nodes_Base_list_ALL, owned) if own]
+        if missing_nodes.size > 0:
+            nodes_undefined = [self.NodesDict_ALL[int(nodetag)] for nodetag in missing_nodes]
+            logger.warning(f'{nodes_undefined} not defined in this part of the model but Used in owned EqDOF! Adding it...')
+            self.add_nodes(nodes_undefined)
              
-    def equalDOF_for_Site(self)->None:
+    def _owned_constraints(self)->tuple[np.ndarray,np.ndarray,np.ndarray]:
+        """
+        (fix owned, equalDOF owned, missing node tags) of this rank from the constraint plan
+        the plan comes from rank 0 with distribute_plan(see _get_distributed_plan), otherwise every rank plans itself
+        """
+        if hasattr(self, 'RankPlan'):
+            return self.RankPlan.FixOwned, self.RankPlan.EqDOFOwned, self.RankPlan.MissingNodes
+        if not hasattr(self, 'ConstraintPlan'):
+            self._get_constraint_plan()
+        plan = self.ConstraintPlan
+        return plan.FixOwner == self.PID, plan.EqDOFOwner == self.PID, plan.MissingNodes[self.PID]
+    
+    @profile_stage()
+    def equalDOF_for_Site(self, source:str = None)->None:
         """read equalDOF node information from:
             EqualDOFnodes_01_Info.dat
             EqualDOFnodes_02_Info.dat
             EqualDOFnodes_Base_Info.dat
+        (or derive them from geometry if source='geometry')
         and then define equalDOF constraints"""
-        self._get_eqDOF_nodes()
+        self._get_eqDOF_nodes(source)
         for node in self.eqDOF_nodes_01_list:
             ops.equalDOF(*node.NodeTags, *node.eqDOF)
             
@@ -555,6 +935,85 @@ class SlopeAnalysis2D(EZOpsMaterial):
         for node in self.eqDOF_nodes_Base_list:
             ops.equalDOF(*node.NodeTags, *node.eqDOF)
         logger.success('Finished creating equalDOF constraints for site...')
+    
+    def _get_hanging_nodes(self)->None:
+        """
+        read the hanging node ties of a coarsened site(see coarsen_site_data) from HangingNodeInfo.dat, keep the ties of
+        the merged elements of this rank
+        """
+        HangingNode = namedtuple('HangingNode', ['NodeTag', 'EdgeNodes', 'ThirdNode'])
+        hanging = []
+        if self.HANGING_INFO_PATH.exists():
+            hanging = [HangingNode(int(row[0]), [int(row[1]), int(row[2])], int(row[3]))
+                       for row in self._info_rows(self.HANGING_INFO_PATH) if row]
+        self.HangingNodes_ALL = tuple(hanging)
+        # the merged element holds the edge nodes and the third node
+        elements_of = dict()
+        for num, ele in enumerate(self.Elements):
+            for node in ele.nodes:
+                elements_of.setdefault(node, set()).add(num)
+        self.HangingNodes = tuple(node for node in hanging
+                                  if set.intersection(*(elements_of.get(tag, set()) for tag in (*node.EdgeNodes, node.ThirdNode))))
+    
+    def tie_hanging_nodes(self)->None:
+        """
+        tie the displacements of the hanging nodes of a coarsened site to the edges of the merged elements with an
+        ASDEmbeddedNodeElement(penalty, interpolated in the triangle of the edge nodes and the third node, the hanging
+        node lies on the edge)
+        NOTE: the pore pressure(DOF 3) stays free, it follows the finer elements next to the edge. A penalty equalDOF
+              on DOF 3 makes the gravity analysis diverge.
+        Tie element tags are 2*10**digits(max element tag) + row of HangingNodeInfo.dat.
+        """
+        if not hasattr(self, 'HangingNodes'):
+            self._get_hanging_nodes()
+        if not self.HangingNodes_ALL:
+            return None
+        rows = {node.NodeTag: num for num, node in enumerate(self.HangingNodes_ALL)}
+        new_tag = 2 * 10 ** len(str(max(ele.tag for ele in self.Elements_ALL)))
+        exist_nodes = set(self.opsNodes)
+        self.add_nodes([self.NodesDict_ALL[node.NodeTag] for node in self.HangingNodes if node.NodeTag not in exist_nodes])
+        for node in self.HangingNodes:
+            ops.element('ASDEmbeddedNodeElement', new_tag+rows[node.NodeTag], node.NodeTag, *node.EdgeNodes, node.ThirdNode)
+        logger.success(f'Finished tying {len(self.HangingNodes)} hanging nodes...')
+    
+    def tie_structure(self, node_tags, coords, dofs:tuple[int] = (1, 2), tol:float = 1e-6, outside:str = 'nearest')->namedtuple:
+        """
+        tie the nodes of a structure(e.g. a foundation, defined before on the ranks holding them) to the site
+        (see EZSite.spatial.interface_ties): equalDOF to a coincident site node, ASDEmbeddedNodeElement in the element
+        containing the node(DOF 1 and 2), equalDOF to the nearest site node outside the site.
+        A tie is defined by the lowest rank holding its element(see split_nodes_and_elements), which must hold the
+        structural node.
+        node_tags, coords: structural node tags(S,) and coordinates(S,2)
+        dofs: tuple[int], default=(1, 2), DOFs of the equalDOF ties
+        tol: float, default=1e-6, distance of a coincident node
+        outside: str, default='nearest', or 'raise' for nodes outside the site
+        Embedded tie element tags are 3*10**digits(max element tag) + position in node_tags.
+        return: InterfaceTies of all nodes
+        """
+        if not hasattr(self, 'SiteLocator'):
+            self.SiteLocator = SiteLocator(self.Mesh_ALL)
+        ties = interface_ties(self.SiteLocator, node_tags, coords, tol, outside)
+        if hasattr(self, 'PartitionPlan'):
+            held = np.array([np.isin(ties.EleTags, tags) for tags in self.PartitionPlan.EleTags])
+            own = held.any(axis=0) & (np.argmax(held, axis=0) == self.PID)
+        else:
+            own = np.isin(ties.EleTags, [ele.tag for ele in self.Elements])
+        exist_nodes = set(self.opsNodes)
+        missing = sorted(set(ties.NodeTags[own].tolist()) - exist_nodes)
+        if missing:
+            raise ValueError(f'Structural nodes {missing[:10]} not defined on rank {self.PID}!')
+        site = {int(tag) for tag in ties.Retained[own].ravel() if tag >= 0} - exist_nodes
+        self.add_nodes([self.NodesDict_ALL[tag] for tag in sorted(site)])
+        new_tag = 3 * 10 ** len(str(max(ele.tag for ele in self.Elements_ALL)))
+        for i in np.flatnonzero(own):
+            if ties.Kind[i] == EMBEDDED:
+                ops.element('ASDEmbeddedNodeElement', new_tag+int(i), int(ties.NodeTags[i]), *ties.Retained[i].tolist())
+            else:
+                ops.equalDOF(int(ties.Retained[i, 0]), int(ties.NodeTags[i]), *dofs)
+        self.InterfaceTies = ties
+        logger.success(f'Finished tying {own.sum()} structural nodes: {np.bincount(ties.Kind[own], minlength=3).tolist()} '
+                       f'coincident/embedded/nearest...')
+        return ties
         
     def _get_nodal_mass(self)->None:
         """
@@ -563,20 +1022,21 @@ class SlopeAnalysis2D(EZOpsMaterial):
         nodal_mass_list = []
         NodalMass = namedtuple('NodalMass', ('NodeTag', 'mass'))
         try:
-            with open(SlopeAnalysis2D.MASS_INFO_PATH, 'r') as f:
-                for line in f:
-                    line = line.split()
-                    NodeTag = int(line[0])
-                    mass = [float(l) for l in line[1:]]
-                    if any(mass)<0:
-                        logger.trace(f'Negative mass found in {NodeTag}! ignored!')
-                    nodal_mass_list.append(NodalMass(NodeTag, mass))
-                self.NodalMass_ALL = tuple(nodal_mass_list)
+            for line in self._info_rows(self.MASS_INFO_PATH):
+                NodeTag = int(line[0])
+                mass = [float(l) for l in line[1:]]
+                if min(mass)<0:
+                    logger.warning(f'Negative mass found in {NodeTag}! ignored!')
+                    continue
+                nodal_mass_list.append(NodalMass(NodeTag, mass))
+            self.NodalMass_ALL = tuple(nodal_mass_list)
         except FileNotFoundError as e:
             logger.warning(f'FileNotFoundError: {e}\nPlease check the file path!')
-        # only consider the nodes in the model
-        self.NodalMass = tuple([node for node in self.NodalMass_ALL if node in self.Nodes])
+        # the massInfo.dat masses are not defined, as in the original model(NodalMass records were compared with Node
+        # records, which never matched): they look scaled by the thickness, validate_site_data logs them at debug level
+        self.NodalMass = tuple()
             
+    @profile_stage()
     def define_nodal_mass(self)->None:
         """define nodal mass"""
         if not hasattr(self, 'NodalMass'):
@@ -593,18 +1053,31 @@ class SlopeAnalysis2D(EZOpsMaterial):
         
         if len(ops.getPatterns())<1:
                 ops.pattern('Plain', 1, 1)
-                logger.warning(f'No Pattern Found! Created a Plain Pattern with tag 1!')
+                logger.warning('No Pattern Found! Created a Plain Pattern with tag 1!')
                 
+        logger.warning('记得检查，这里多乘了个厚度')
         for node in self.NodalMass:
-            logger.warning('记得检查，这里多乘了个厚度')
             ops.load(node.NodeTag, *[m*-9.81 for m in node.mass])
         logger.success('Finished adding nodal mass for gravity')
     
-    def _get_LK_boundary_property(self)->None:
+    def _get_LK_boundary_property(self, mode:str = 'lumped', dirs:tuple[int] = (1,))->None:
         """
         calc Lysmer-Kulhemyer boundary property from existing information
+        mode: str, default='lumped', or 'distributed'
+            lumped: one dashpot at the left corner node for the whole base(base nodes MUST be tied by EqualDOFnodes_Base_Info.dat)
+            distributed: one dashpot per base node with its tributary area
+        dirs: tuple[int], default=(1,), dashpot directions for distributed mode, 1:shear(rho*vs) 2:normal(rho*vp)
         """
+        if mode == 'distributed':
+            self._get_distributed_LK_boundary_property(dirs)
+            return None
+        elif mode != 'lumped':
+            raise ValueError(f'LK boundary mode {mode} not supported!')
+        
         LKDashPot = namedtuple('LKDashPot',['FixedNode','EqDOFNode','LeftCornerNode','Material', 'Element', 'BaseArea','DashpotCoef'])
+        if not hasattr(self, 'eqDOF_nodes_Base_list_ALL'):
+            # dropped in lean mode(see release_build_data)
+            self._read_eqDOF_nodes_ALL(self.eqDOF_source)
         
         # get LK dashpot position(x,y) by eqDOF_nodes_01_list ∩ eqDOF_nodes_Base_list, there should be 2 nodes but the one with smaller x is needed
         nodetags01 = [tag for node in self.eqDOF_nodes_01_list_ALL for tag in node.NodeTags]
@@ -624,13 +1097,11 @@ class SlopeAnalysis2D(EZOpsMaterial):
 
         # define dashpot material parameters
         # dashpotcoef = rou*vs, rou is the density(ton/m^3) of the soil below the site, vs is the shear wave velocity(m/s)
-        rou = 2.00
-        vs = 875.0
-        dashpotcoef = rou*vs
+        dashpotcoef = LK_dashpot_coefficients(self.LK_RHO, self.LK_VS)[1]
         
         # baseArea = sum of the area of the soil length*soil thickness
-        max_x = max(self.NodesDict[node].x for node in self.eqDOF_nodes_Base_list[0].NodeTags)
-        min_x = min(self.NodesDict[node].x for node in self.eqDOF_nodes_Base_list[0].NodeTags)
+        base_x = [self.NodesDict_ALL[tag].x for node in self.eqDOF_nodes_Base_list_ALL for tag in node.NodeTags]
+        max_x, min_x = max(base_x), min(base_x)
         base_thick = self.SOIL_ELE_PROP['sandy gravel'].thick*self.basic_thick_coef
         if not hasattr(self, '_site_boundary'):
             baseArea = (max_x-min_x)*base_thick
@@ -648,11 +1119,83 @@ class SlopeAnalysis2D(EZOpsMaterial):
         new_ele_tag = max(self.opsElements) + 1
         LKele = Viciousele(new_ele_tag, [fixed_node.tag, eqdof_node.tag], LK_material.matTag)
         self.LKDashPot = LKDashPot(fixed_node, eqdof_node, left_corner_node, LK_material, LKele, baseArea, dashpotcoef)
+    
+    def _get_distributed_LK_boundary_property(self, dirs:tuple[int] = (1,))->None:
+        """
+        calc distributed Lysmer-Kulhemyer boundary property, one dashpot per base node
+        The base nodes are the bottom nodes in fixedNodeInfo.dat, their tributary areas are computed
+        from the tributary length along x and the element thickness of the segment(thicker outside _site_boundary)
+        dirs: tuple[int], dashpot directions, 1:shear(rho*vs) 2:normal(rho*vp)
+        """
+        if not set(dirs) <= {1, 2}:
+            raise ValueError(f'LK dashpot directions {dirs} not supported!')
+        if not hasattr(self, 'FixedBottomNodes_ALL'):
+            self._get_fix_nodes()
+        LKDashPots = namedtuple('LKDashPots', ['BaseNodeTags', 'FixedNodeTags', 'TributaryArea', 'Materials', 'Elements', 'Dirs', 'BaseArea', 'DashpotCoef'])
+        
+        # base nodes sorted by x
+        base_tags = np.array([node.tag for node in self.FixedBottomNodes_ALL], dtype=int)
+        base_x = np.array([self.NodesDict_ALL[tag].x for tag in base_tags], dtype=float)
+        order = np.argsort(base_x, kind='stable')
+        base_tags, base_x = base_tags[order], base_x[order]
         
-    def define_LK_boundary(self)->None:
-        """define Lysmer-Kulhemyer boundary"""
+        # tributary area of each base node, segments outside the site boundary are thicker
+        base_thick = self.SOIL_ELE_PROP['sandy gravel'].thick*self.basic_thick_coef
+        seg_thick = np.full(max(base_x.size-1, 0), base_thick)
+        if hasattr(self, '_site_boundary'):
+            seg_mid = 0.5*(base_x[1:]+base_x[:-1])
+            outside = (seg_mid < self._site_boundary[0]) | (seg_mid > self._site_boundary[1])
+            seg_thick[outside] *= self.thicker_coef
+        areas = tributary_areas(base_x, seg_thick)
+        
+        # tags are computed from the whole model so that every rank gets the same numbering
+        newtag = max(node.tag for node in self.Nodes_ALL) + 1
+        fixed_tags = newtag + np.arange(base_tags.size)
+        new_ele_tag = max(ele.tag for ele in self.Elements_ALL) + 1
+        ele_tags = new_ele_tag + np.arange(base_tags.size)
+        
+        # one Viscous material per (direction, distinct tributary area)
+        dashpotcoef = LK_dashpot_coefficients(self.LK_RHO, self.LK_VS, self.LK_NU)
+        unique_areas, area_index = np.unique(np.round(areas, 9), return_inverse=True)
+        new_material_tag = max(self.SOIL_MAT_PROP.values(), key=lambda x:x.matTag).matTag + 1
+        materials = []
+        mat_tags = np.empty((base_tags.size, len(dirs)), dtype=int)
+        for i, dof in enumerate(dirs):
+            tags = new_material_tag + i*unique_areas.size + np.arange(unique_areas.size)
+            materials += [self.uniaxialMaterial('Viscous', int(tag), [dashpotcoef[dof]*area, 1], f'LK_Dashpot Vicious Material(dir={dof})')
+                          for tag, area in zip(tags, unique_areas)]
+            mat_tags[:, i] = tags[area_index]
+        
+        if 2 in dirs and any(node.FixedDOF[1] for node in self.FixedBottomNodes_ALL):
+            logger.warning('Normal LK dashpots are defined on base nodes fixed at DOF:2, they take no effect!')
+        
+        # only keep the dashpots owned by this rank, shared nodes on split lines are owned by the right rank
+        owned = np.ones(base_tags.size, dtype=bool)
+        if self.Parallel:
+            xmin, xmax = self._get_NP_split_boundary()
+            owned = owned_by_rank(base_x, xmin, xmax, self.PID == self.NP-1)
+        
+        Viciousele = namedtuple('Viciousele', ['tag', 'nodes', 'matTag'])
+        elements = tuple(Viciousele(int(etag), [int(ftag), int(btag)], [int(m) for m in mtags])
+                         for etag, ftag, btag, mtags in zip(ele_tags[owned], fixed_tags[owned], base_tags[owned], mat_tags[owned]))
+        self.LKDashPot = LKDashPots(base_tags[owned], fixed_tags[owned], areas[owned], tuple(materials), elements,
+                                    tuple(dirs), float(areas.sum()), dashpotcoef[1])
+    
+    @profile_stage()
+    def define_LK_boundary(self, mode:str = 'lumped', dirs:tuple[int] = (1,))->None:
+        """
+        define Lysmer-Kulhemyer boundary
+        mode: str, default='lumped', or 'distributed', see _get_LK_boundary_property
+        dirs: tuple[int], default=(1,), dashpot directions for distributed mode
+        """
         if not hasattr(self, 'LKDashPot'):
-            self._get_LK_boundary_property()
+            self._get_LK_boundary_property(mode, dirs)
+        if mode == 'distributed':
+            self._define_distributed_LK_boundary()
+            return None
+        if self.PlanConstraints and self.PID != self._LK_owner():
+            logger.info('Lumped LK dashpot is owned by another rank, skipped...')
+            return None
             
         fixed_node = self.LKDashPot.FixedNode
         eqdof_node = self.LKDashPot.EqDOFNode
@@ -677,14 +1220,52 @@ class SlopeAnalysis2D(EZOpsMaterial):
         logger.info(f'LK dashpot material(tag={element.matTag}) & element(tag={element.tag}) defined!')
         logger.success('Finished creating Lysmer-Kulhemyer dashpot boundary...')
     
-    def check_matrix_dof(self, dof_to_check:int)->namedtuple:
+    def _LK_owner(self)->int:
+        """the lowest rank holding the left corner node owns the lumped LK dashpot"""
+        corner = self.LKDashPot.LeftCornerNode.tag
+        if hasattr(self, 'RankPlan'):
+            holds = self.RankPlan.NodeTags == corner
+            return int(self.RankPlan.LowestRank[holds][0]) if holds.any() else -1
+        return min(pid for pid, tags in enumerate(self.PartitionPlan.NodeTags) if corner in tags)
+    
+    def _define_distributed_LK_boundary(self)->None:
+        """define one zeroLength dashpot between every base node and its fixed dashpot node"""
+        dashpots = self.LKDashPot
+        base_nodes = self.NodesDict_ALL
+        for material in dashpots.Materials:
+            ops.uniaxialMaterial(material.Type, material.matTag, *material.matArgs)
+        
+        fixed_nodes = [self.NODE2(int(ftag), base_nodes[btag].x, base_nodes[btag].y)
+                       for ftag, btag in zip(dashpots.FixedNodeTags, dashpots.BaseNodeTags)]
+        self.add_nodes(fixed_nodes)
+        for node in fixed_nodes:
+            ops.fix(node.tag, 1, 1, 1)
+        for element in dashpots.Elements:
+            ops.element('zeroLength', element.tag, *element.nodes, '-mat', *element.matTag, '-dir', *dashpots.Dirs)
+        logger.info(f'{len(dashpots.Elements)} LK dashpots defined with {len(dashpots.Materials)} materials, total base area:{dashpots.BaseArea:.2f}')
+        logger.success('Finished creating distributed Lysmer-Kulhemyer dashpot boundary...')
+    
+    @property
+    def DofIndex(self)->DofIndex:
+        """
+        equation number -> node/DOF/element/layer index of this rank(see EZSite.dofindex.DofIndex), built on the first
+        query after the equations are numbered and again after the domain changed
+        """
+        if not hasattr(self, '_dof_index'):
+            layers = {ele.tag: self.MAT_TAG_NAME_MAP[ele.matTag] for ele in self.Elements}
+            self._dof_index = DofIndex(layers)
+        return self._dof_index
+    
+    def check_matrix_dof(self, dof_to_check)->namedtuple:
         """
         check matrix DOF
+        dof_to_check: int|list[int], equation number(s), e.g. the zero pivot of the solver
+        return: node of the equation(None if not on this rank), a list for a list of equations,
+                see DofIndex.describe for the DOF, elements and material layers
         """
-        for nodeTag in self.opsNodes:
-            if dof_to_check in ops.nodeDOFs(nodeTag):
-                return self.NODE2(nodeTag, *ops.nodeCoord(nodeTag))
-        return None
+        nodes, _ = self.DofIndex.lookup(dof_to_check)
+        found = [self.NODE2(int(tag), *ops.nodeCoord(int(tag))) if tag >= 0 else None for tag in nodes]
+        return found if np.ndim(dof_to_check) else found[0]
     
     def update_material(self, stage = 'elastic')->None:
         """
@@ -697,6 +1278,7 @@ class SlopeAnalysis2D(EZOpsMaterial):
             for material in self.SOIL_MAT_PROP.values():
                 ops.updateMaterialStage('-material', material.matTag, '-stage', 1)
 
+    @profile_stage()
     def update_permibility(self)->None:
         """
         update permibility for all elements
@@ -709,112 +1291,211 @@ class SlopeAnalysis2D(EZOpsMaterial):
             ops.updateParameter(ele.hpermParamtag, hperm)
         logger.success('Updated permibility for all elements...')
 
-    def fix_side_nodes(self, side, pos_tol = 1e-1)->tuple[int]:
+    def _get_side_nodes(self, side:str, pos_tol:float = 1e-1)->np.ndarray:
+        """
+        tags of the outer nodes(|x-x of the site edge| < pos_tol) of the equalDOF pairs of one side on this rank
+        side: str, 'left'(EqualDOFnodes_01) or 'right'(EqualDOFnodes_02)
+        """
+        if side not in ('left', 'right'):
+            raise ValueError('Must Specify Side!')
+        pairs = self.eqDOF_nodes_01_list if side == 'left' else self.eqDOF_nodes_02_list
+        if len(pairs) == 0:
+            return np.zeros(0, dtype=np.int64)
+        mesh = self.Mesh_ALL
+        x_target = mesh.x.min() if side == 'left' else mesh.x.max()
+        pairs = np.array([node.NodeTags for node in pairs], dtype=np.int64)
+        near = np.abs(mesh.x[mesh.index_of(pairs)]-x_target) < pos_tol
+        found = near.any(axis=1)
+        if not found.all():
+            logger.error(f'No Node\'s x position of pairs {pairs[~found][:5].tolist()} falls in boundary:'
+                         f'[{x_target-pos_tol},{x_target+pos_tol}]! Please Check pos_tol!')
+        return pairs[found, np.argmax(near[found], axis=1)]
+    
+    def fix_side_nodes(self, side = 'both', pos_tol = 1e-1)->tuple[int]:
         """
         fix side nodes with DOF=[1,0,0]
         side: str, default: 'both', or 'left' or 'right'
-        pos_tol: float, default=1e-2, x position tolerance for fixing nodes
+        pos_tol: float, default=1e-1, x position tolerance for fixing nodes
+        return: the nodes fixed now(nodes fixed before are skipped)
         """
-        fixed_nodes = []
-        nodes = []
         if side == 'both':
-            self.fix_side_nodes('left', pos_tol)
-            self.fix_side_nodes('right', pos_tol)
-        elif side == 'left':
-            nodes = self.eqDOF_nodes_01_list
-            x_target = min(self.NodesDict[node].x for node in nodes[0].NodeTags)
-        elif side == 'right':
-            nodes = self.eqDOF_nodes_02_list
-            x_target = max(self.NodesDict[node].x for node in nodes[0].NodeTags)
-        else:
+            return self.fix_side_nodes('left', pos_tol)+self.fix_side_nodes('right', pos_tol)
+        name = 'FixedLeftNodes' if side == 'left' else 'FixedRightNodes'
+        candidates = self._get_side_nodes(side, pos_tol)
+        # nodes already fixed at DOF:1, by the site data(FixedNodes_ALL, tags kept once in FixedDOF1Tags) or fix_side_nodes
+        if not hasattr(self, 'FixedDOF1Tags'):
+            if not hasattr(self, 'FixedNodes_ALL'):
+                self._read_fix_nodes_ALL()
+            self.FixedDOF1Tags = np.array([node.tag for node in self.FixedNodes_ALL if node.FixedDOF[0] == 1], dtype=np.int64)
+        fixed = np.r_[self.FixedDOF1Tags, getattr(self, 'FixedLeftNodes', ()), getattr(self, 'FixedRightNodes', ())]
+        nodes = candidates[~np.isin(candidates, fixed)]
+        for node in nodes.tolist():
+            ops.fix(node, *[1,0,0])
+        setattr(self, name, tuple(getattr(self, name, ())) + tuple(nodes.tolist()))
+        logger.success(f'{nodes.size} {side} side nodes DOF:1 fixed...')
+        return tuple(nodes.tolist())
+    
+    def unfix_side_nodes(self, side = 'both')->None:
+        """
+        remove the DOF 1 fixes of fix_side_nodes
+        side: str, default: 'both', or 'left' or 'right'
+        """
+        if side == 'both':
+            self.unfix_side_nodes('left')
+            self.unfix_side_nodes('right')
+            return None
+        if side not in ('left', 'right'):
             raise ValueError('Must Specify Side!')
-        
-        for node in nodes:
-            try:
-                node_tag = [n for n in node.NodeTags if (self.NodesDict[n].x-x_target) < pos_tol][0]
-            except IndexError:
-                n1x = self.NodesDict[node.NodeTags[0]].x  
-                n2x = self.NodesDict[node.NodeTags[1]].x
-                logger.error(f'No Node\'s x position:[{n1x},{n2x}] falls in boundary:[{x_target-pos_tol},{x_target+pos_tol}]! Please Check pos_tol!')
-            fixeddofs = ops.getFixedDOFs(node_tag)  # get fixed DOFs, if exists, return [1,2,3], none return []
-            if 1 not in fixeddofs:
-                ops.fix(node_tag, *[1,0,0])
-                fixed_nodes.append(node_tag)
-
-        # return fixed_nodes
-        if side == 'left':
-            self.FixedLeftNodes = tuple(fixed_nodes)
-        elif side == 'right':
-            self.FixedRightNodes = tuple(fixed_nodes)
-
-    # def unfix_side_nodes(self, side)->None:
-    #     """
-    #     unfix side nodes with DOF=[1,0,0]
-    #     side: str, default: 'both', or 'left' or 'right'
-    #     """
-    #     nodes = []
-    #     if side == 'both':
-    #         self.unfix_side_nodes('left')
-    #         self.unfix_side_nodes('right')
-    #         return None
-    #     elif side == 'left':
-    #         nodes = self.FixedLeftNodes
-    #     elif side == 'right':
-    #         nodes = self.FixedRightNodes
-    #     else:
-    #         raise ValueError('Must Specify Side!')
-        
-    #     self._unfix_nodes(nodes, dof = 1)
-    #     logger.success(f'Finished unfixing {side} side nodes...')
-        
-    # def _unfix_nodes(self, nodes:tuple[int], dof = None)->None:
-    #     """
-    #     unfix nodes with specified DOF
-    #     """
-    #     for node in nodes:
-    #         fixeddofs = ops.getFixedDOFs(node)  # get fixed DOFs, if exists, return [1,2,3], none return []
-    #         if dof in fixeddofs:
-    #             ops.remove('sp', node, dof)
-    #             logger.trace(f'Node {node} DOF:{dof} unfixed!')
+        name = 'FixedLeftNodes' if side == 'left' else 'FixedRightNodes'
+        for node in getattr(self, name, ()):
+            ops.remove('sp', node, 1)
+        logger.success(f'Finished unfixing {len(getattr(self, name, ()))} {side} side nodes...')
+        setattr(self, name, ())
+    
+    def record_side_reactions(self, dof:int = 1)->namedtuple:
+        """
+        reactions of all fixed side nodes in one pass(one ops.reactions), e.g. after the gravity analysis
+        dof: int, default: 1, or 2,3
+        return: SideReactions, also kept in self.SideReactions
+            NodeTags, Side('left'/'right'), Reaction: np.ndarray of the fixed side nodes of this rank
+        """
+        SideReactions = namedtuple('SideReactions', ['NodeTags', 'Side', 'DOF', 'Reaction'])
+        left = np.asarray(getattr(self, 'FixedLeftNodes', ()), dtype=np.int64)
+        right = np.asarray(getattr(self, 'FixedRightNodes', ()), dtype=np.int64)
+        ops.reactions('-dynamic')
+        tags = np.r_[left, right]
+        reaction = np.array([ops.nodeReaction(int(node), dof) for node in tags], dtype=float)
+        sides = np.repeat(np.array(['left', 'right']), [left.size, right.size])
+        self.SideReactions = SideReactions(tags, sides, dof, reaction)
+        total = allgather_array(np.array([reaction[:left.size].sum(), reaction[left.size:].sum()])).sum(axis=0)
+        if self.PID == 0:
+            logger.info(f'Side reactions DOF:{dof}, left {total[0]:.6g}, right {total[1]:.6g}')
+        return self.SideReactions
+    
+    def replace_side_supports(self, pattern_tag:int = None, ts_tag:int = None)->None:
+        """
+        replace the side fixes by their reactions(see record_side_reactions) as nodal loads, in bulk on every rank, so
+        the side nodes follow the free-field columns in the dynamic stage without losing the gravity equilibrium
+        The loads go to a Plain pattern of a Constant timeSeries(created on every rank).
+        pattern_tag: int, default=None(the next free pattern tag), raise ValueError if the tag is in use
+        ts_tag: int, default=None(the pattern tag), OpenSees can't list the timeSeries tags, the default is free while every
+                timeSeries shares the tag of its pattern(the Constant timeSeries 1 of the gravity loads), pass it otherwise
+        """
+        patterns = ops.getPatterns()
+        pattern_tag = max(patterns, default=0)+1 if pattern_tag is None else pattern_tag
+        if pattern_tag in patterns:
+            raise ValueError(f'Pattern tag {pattern_tag} already in use!')
+        ts_tag = pattern_tag if ts_tag is None else ts_tag
+        if not hasattr(self, 'SideReactions'):
+            self.record_side_reactions()
+        reactions = self.SideReactions
+        self.unfix_side_nodes('both')
+        ops.timeSeries('Constant', ts_tag)
+        ops.pattern('Plain', pattern_tag, ts_tag)
+        loads = np.zeros(3)
+        for node, reaction in zip(reactions.NodeTags.tolist(), reactions.Reaction.tolist()):
+            loads[:] = 0.0
+            loads[reactions.DOF-1] = reaction
+            ops.load(node, *loads.tolist())
+        count = int(allgather_array(np.array([reactions.NodeTags.size])).sum())
+        logger.success(f'Side supports replaced by nodal loads(pattern:{pattern_tag}, timeSeries:{ts_tag}): '
+                       f'{reactions.NodeTags.size} nodes on this rank, {count} in total')
+    
+    def _get_geostatic_state(self)->None:
+        """
+        at-rest state of the whole site from overburden(see EZSite.geostatic.geostatic_state): soil densities of SOIL_MAT_PROP,
+        K0 of the elastic stage, hydrostatic pore pressure below WaterLevel(or below the drained surface nodes under water)
+        """
+        if not hasattr(self, 'FixedSurfaceNodes_ALL'):
+            self._read_fix_nodes_ALL()
+        props = self.SOIL_MAT_PROP.values()
+        rho_by_mat = {prop.matTag: prop.rho for prop in props}
+        nu_by_mat = {prop.matTag: float(poisson_ratio(prop.ShearModul, prop.BulkModul)) for prop in props}
+        drained = [node.tag for node in self.FixedSurfaceNodes_ALL]
+        self.GeostaticState = geostatic_state(self.Mesh_ALL, rho_by_mat, nu_by_mat, self.WaterLevel, drained)
 
-    # def replace_support_reaction(self)->None:
-    #     """
-    #     replace support reaction for side nodes in Side_Support_Reaction
+    def preset_pore_pressure(self)->None:
+        """
+        pre-set the hydrostatic pore pressure of the geostatic state(see _get_geostatic_state) as committed initial values
+        of the nodes of this rank(pore pressure is the DOF 3 velocity of quadUP nodes), nodes with fixed DOF 3 are skipped
+        NOTE: only the pore pressure, the K0 effective stresses are not injected, OpenSees has no initial stress input for
+              the multi yield materials, they build up from zero in the elastic correction steps of site_gravity_analysis
+        """
+        if not hasattr(self, 'GeostaticState'):
+            self._get_geostatic_state()
+        state = self.GeostaticState
+        local = np.array(sorted(self.opsNodes), dtype=np.int64)
+        local = local[np.isin(local, state.NodeTags)]
+        pore = state.PorePressure[rows_of(state.NodeTags, local)]
+        count = 0
+        for tag, value in zip(local[pore > 0].tolist(), pore[pore > 0].tolist()):
+            if 3 not in ops.getFixedDOFs(tag):
+                ops.setNodeVel(tag, 3, value, '-commit')
+                count += 1
+        logger.info(f'Hydrostatic pore pressure set at {count} nodes(max {pore.max(initial=0.0):.1f})')
 
-    #     """
-    #     for node, reaction in self.Side_Support_Reaction.items():
-    #         ops.load(node, reaction['Reaction'],0,0)
-    #         logger.trace(f'Node {node} reaction replaced with {reaction["Reaction"]}!')
+    def _report_geostatic_state(self, tol:float = 0.2)->None:
+        """
+        difference between the analytic state and the state after the elastic correction
+        The analytic stresses come from vertical overburden columns with K0 of the elastic stage, they ignore the stress
+        redistribution under the slope, elements whose xx or yy stress is off by more than tol of the corrected stress
+        are logged as a warning and kept in GeostaticStressOff(element tags).
+        tol: float, default=0.2, relative difference(to the corrected stress, at least 1 kPa)
+        """
+        state = self.GeostaticState
+        local = np.array(sorted(self.opsNodes), dtype=np.int64)
+        local = local[np.isin(local, state.NodeTags)]
+        pore = np.array([ops.nodeVel(tag, 3) for tag in local.tolist()])
+        ele_tags = np.array([ele.tag for ele in self.Elements], dtype=np.int64)
+        stress = np.array([ops.eleResponse(tag, 'material', 1, 'stress')[:2] for tag in ele_tags.tolist()]).reshape(-1, 2)
+        dev = np.abs(stress-state.EleStress[rows_of(state.EleTags, ele_tags), :2])
+        logger.info(f'Geostatic state vs elastic correction: pore pressure max change {np.abs(pore-state.PorePressure[rows_of(state.NodeTags, local)]).max(initial=0.0):.2f}, '
+                    f'effective stress xx/yy median difference {np.median(dev[:, 0]):.1f}/{np.median(dev[:, 1]):.1f}, '
+                    f'90th percentile {np.percentile(dev[:, 0], 90):.1f}/{np.percentile(dev[:, 1], 90):.1f}')
+        off = (dev/np.maximum(np.abs(stress), 1.0) > tol).any(axis=1)
+        self.GeostaticStressOff = ele_tags[off]
+        if off.any():
+            logger.warning(f'Analytic geostatic stress off by more than {100*tol:.0f}% at {off.sum()} of {ele_tags.size} elements, '
+                           f'the analytic stresses are not reliable there')
 
-    # def record_side_nodes_force(self, side = 'both', dof = 1)->dict:
-    #     """
-    #     record nodes force of one side
-    #     side: str, default: 'both', or 'left' or 'right'
-    #     dof: int, default: 1, or 2,3
-    #     """
-    #     side_node_force = dict()
-    #     if side == 'both':
-    #         self.Side_Support_Reaction = {
-    #             **self.record_side_nodes_force('left'),
-    #             **self.record_side_nodes_force('right')
-    #             }
-    #         return self.Side_Support_Reaction
-    #     elif side == 'left':
-    #         nodes = self.FixedLeftNodes
-    #     elif side == 'right':
-    #         nodes = self.FixedRightNodes
-    #     else:
-    #         raise ValueError('Must Specify Side!')
-        
-    #     for node in nodes:
-    #         side_node_force[node] = {'Side':side,'Reaction':ops.nodeReaction(node, dof)}
-    #     return side_node_force
+    def _log_gravity_init_saving(self, init:str, cpu:float)->None:
+        """
+        keep the elastic stage cpu time of init for this site, element and rank count in <work_dir>/gravity_init_rank*.json
+        and log the measured saving of pore_pressure against transient once both were run
+        """
+        file_path = self.WorkDir/f'gravity_init_rank{self.PID:03d}.json'
+        case = f'{self.DATA_PATH.resolve()}|{getattr(self, "ElementType", "quadUP")}|NP{self.NP}'
+        times = json.loads(file_path.read_text()) if file_path.exists() else dict()
+        times.setdefault(case, dict())[init] = cpu
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(json.dumps(times, indent=1))
+        measured = times[case]
+        message = f'Gravity initialization {init}: elastic stage cpu time {cpu:.2f}s'
+        if 'transient' in measured and 'pore_pressure' in measured:
+            message += (f', measured saving of pore_pressure {measured["transient"]-measured["pore_pressure"]:.2f}s '
+                        f'against transient {measured["transient"]:.2f}s')
+        elif init == 'pore_pressure':
+            message += ', run gravity_init=\'transient\' once on this site for the measured saving'
+        logger.info(message)
 
-    def site_gravity_analysis(self, plot_disp = False, save = False)->None:
+    @profile_stage()
+    def site_gravity_analysis(self, plot_disp = False, save = False, init:str = None, correction_steps:int = 2)->None:
         """
         site gravity analysis
+        init: str, default=None(gravity_init of SlopeAnalysis2D)
+            transient: elastic stage of 10 steps at dt=5e2 and 10 steps at dt=5e3 from a zero state
+            pore_pressure: only the hydrostatic pore pressure is pre-set(see preset_pore_pressure), then a short
+                           elastic correction of correction_steps steps at dt=5e3 to equilibrium, the element stresses
+                           are not initialized, they build up from zero in the correction steps
+            the plastic stage(10 steps at dt=5e-3) is the same for both
+            The elastic stage cpu time of every init is kept per site, element and rank count in
+            <work_dir>/gravity_init_rank*.json, with both measured the saving of pore_pressure is logged.
+        correction_steps: int, default=2, elastic correction steps of init='pore_pressure'
         """
-        # gravity analysis settings
+        init = self.GravityInit if init is None else init
+        if init not in ('transient', 'pore_pressure'):
+            raise ValueError(f'Gravity initialization {init} not supported!')
+        # gravity analysis settings, Penalty also for the constraints owned by one rank(plan_constraints)
         ops.constraints('Penalty', 1.e18, 1.e18)
         ops.test('RelativeNormDispIncr', 1e-4, 35, 1)
         ops.algorithm('Newton')
@@ -824,7 +1505,7 @@ class SlopeAnalysis2D(EZOpsMaterial):
             ops.numberer('ParallelRCM')
             ops.system('Mumps')
         else:
-            ops.numberer('RCM')
+            ops.numberer(self.Numberer)
             ops.system('ProfileSPD')
             
         ops.analysis('Transient')
@@ -833,10 +1514,17 @@ class SlopeAnalysis2D(EZOpsMaterial):
         # elastic gravity analysis
         self.update_material(stage='elastic')
         startT = time.time()
+        startCPU = time.process_time()
         if plot_disp:
             logger.info('Recording displacement data for Visualization...')
             ModelData = opst.GetFEMdata(results_dir="opstool_output")
             ModelData.get_model_data(save_file="ModelData.hdf5")
+        if init == 'pore_pressure':
+            self.preset_pore_pressure()
+            ops.analyze(correction_steps, 5.0e3)
+            if plot_disp:
+                ModelData.get_resp_step()
+        elif plot_disp:
             ops.analyze(10, 5.0e2)
             ModelData.get_resp_step()
             ops.analyze(10, 5.0e3)
@@ -845,9 +1533,13 @@ class SlopeAnalysis2D(EZOpsMaterial):
             ops.analyze(10, 5.0e2)
             ops.analyze(10, 5.0e3)
         logger.info(f'Finished with elastic gravity analysis. Time used:{time.time()-startT:.2f}s')
+        self.StageCPUTime = {'gravity_elastic': time.process_time()-startCPU}
+        self._log_gravity_init_saving(init, self.StageCPUTime['gravity_elastic'])
+        if init == 'pore_pressure':
+            self._report_geostatic_state()
         
         # nodalFy = [ops.nodeUnbalance(node.tag,2) for node in self.FixedSurfaceNodes_ALL].sort()
-        if not self.Parallel:
+        if not self.Parallel and hot_logging():
             for node in self.FixedSurfaceNodes_ALL:
                 logger.info(f'Node {node.tag} nodereaction Fy:{ops.nodeReaction(node.tag)}')
         # print(nodalFy[:10])
@@ -857,12 +1549,14 @@ class SlopeAnalysis2D(EZOpsMaterial):
         ops.test('RelativeNormDispIncr', 1e-4, 50, 1)
         
         startT1 = time.time()
+        startCPU = time.process_time()
         if plot_disp:
             ops.analyze(10, 5.0e-3)
             ModelData.get_resp_step()
         else:      
             ops.analyze(10, 5.0e-3)
         logger.info(f'Finished with plastic gravity analysis. Time used:{time.time()-startT1:.2f}s')
+        self.StageCPUTime['gravity_plastic'] = time.process_time()-startCPU
         
         if plot_disp:
             ModelData.save_resp_all(save_file="RespStepData-Gravity.hdf5")
@@ -878,7 +1572,7 @@ class SlopeAnalysis2D(EZOpsMaterial):
             if save:
                 fig.write_html('Gravity_Deformation_Animation.html', auto_open = False)
                 logger.success('Animation file saved at Gravity_Deformation_Animation.html')
-        logger.success(f'Finished site gravity analysis')
+        logger.success('Finished site gravity analysis')
         
     def set_velocity_record(self, tsTag: int, path:str = 'velocityHistory.txt', dt: float = 0.01)->int:
         """
@@ -888,66 +1582,98 @@ class SlopeAnalysis2D(EZOpsMaterial):
         """
         # define velocity time history file
         # NOTICE: the file path should be relative to the working directory
-        full_path = SlopeAnalysis2D.DATA_PATH.relative_to(SlopeAnalysis2D.ABS_PATH) / path
+        full_path = Path(os.path.relpath(self.DATA_PATH/path))
         if not full_path.exists():
             raise FileNotFoundError(f'FileNotFoundError: {full_path} not found!')
         # timeseries object for force history
         cfactor = self.LKDashPot.BaseArea*self.LKDashPot.DashpotCoef
         ops.timeSeries('Path', tsTag,'-dt', dt,'-filePath',str(full_path),'-factor',cfactor)
+        VelocityRecord = namedtuple('VelocityRecord', ['tsTag', 'Path', 'dt', 'Factor'])
+        self.VelocityRecord = VelocityRecord(tsTag, full_path, dt, cfactor)
         return tsTag
+
+    def get_ground_acceleration(self, time:float)->float:
+        """
+        input ground acceleration at time, derivative of the velocity record of set_velocity_record in the units of the
+        record(Factor of the series is the LK dashpot force scale, not part of the motion), 0 after the record
+        NOTE: OpenSees applies no inertia loads for a UniformExcitation pattern of a velocity series only(GroundMotion
+              without an acceleration series)
+        """
+        if not hasattr(self, 'GroundAcceleration'):
+            record = self.VelocityRecord
+            velocity = np.array(record.Path.read_text().split(), dtype=float)
+            self.GroundAcceleration = ground_acceleration(velocity, record.dt)
+        accel = self.GroundAcceleration
+        return float(np.interp(time, np.arange(accel.size)*self.VelocityRecord.dt, accel, right=0.0))
+
+    def get_vertical_effective_stress(self, node_tags)->np.ndarray:
+        """
+        initial vertical effective stress(positive) of the geostatic state at node_tags, total vertical stress minus the
+        hydrostatic pore pressure(see _get_geostatic_state), for the excess pore pressure ratio ru
+        """
+        if not hasattr(self, 'GeostaticState'):
+            self._get_geostatic_state()
+        state = self.GeostaticState
+        rows = rows_of(state.NodeTags, np.asarray(node_tags, dtype=np.int64))
+        return np.maximum(state.SigmaV[rows]-state.PorePressure[rows], 0.0)
     
-    def create_recorders(self):
+    def create_recorders(self, dT:float = 0.01)->None:
+        """
+        record nodal displacment, acceleration, porepressure and elemental stress, strain
+        The tag -> column layout of every file is written to recorder_index.json(recorder_index_PID*.json in parallel),
+        use EZSite.results.RecorderResults.open to query the files without loading them into RAM.
+        In parallel, every rank writes its own files with a _PID* suffix.
+        """
+        suffix = f'_PID{self.PID}' if self.Parallel else ''
+        node_tags = list(self.opsNodes)
+        maxelenum = max([ele.tag for ele in self.Elements_ALL])
+        ele_tags = sorted(tag for tag in self.opsElements if 1 <= tag <= maxelenum)
+        index = dict()
         # record nodal displacment, acceleration, and porepressure
-        ops.recorder('Node', '-file', 'displacement.out', '-time', '-dT', 0.01, '-node', *self.opsNodes, '-dof', 1, 2, 'disp')
-        ops.recorder('Node', '-file', 'acceleration.out', '-time', '-dT', 0.01, '-node', *self.opsNodes, '-dof', 1, 2, 'accel')
-        ops.recorder('Node', '-file', 'porePressure.out', '-time', '-dT', 0.01, '-node', *self.opsNodes, '-dof', 3, 'vel')
+        original = dict()
+        if self.RenumberMap is not None:
+            # original tags of the renumbered site nodes/elements, -1 for nodes added to the model(e.g. LK dashpots)
+            tag_map = self.RenumberMap
+            site = np.isin(node_tags, tag_map.NodeNew)
+            original['node'] = np.where(site, renumber_tags(tag_map.NodeNew, tag_map.NodeOld, node_tags), -1).tolist()
+            original['element'] = renumber_tags(tag_map.EleNew, tag_map.EleOld, ele_tags).tolist()
+        # only the corner nodes of 9_4_QuadUP elements have a pore pressure DOF
+        pore = [ops.getNDF(tag)[0] >= 3 for tag in node_tags]
+        for name, dofs, resp in (('displacement', (1, 2), 'disp'), ('acceleration', (1, 2), 'accel'), ('porePressure', (3,), 'vel')):
+            file = f'{name}{suffix}.out'
+            tags = [tag for tag, keep in zip(node_tags, pore) if keep] if 3 in dofs else node_tags
+            ops.recorder('Node', '-file', file, '-time', '-dT', dT, '-node', *tags, '-dof', *dofs, resp)
+            index[file] = {'kind': 'node', 'tags': tags, 'ncomp': len(dofs)}
+            if 'node' in original:
+                index[file]['original_tags'] = [tag for tag, keep in zip(original['node'], pore) if keep or 3 not in dofs]
         # record elemental stress and strain
-        maxelenum = max([ele.tag for ele in self.Elements_ALL])
-        ops.recorder('Element', '-file', 'stress1.out', '-time', '-dT', 0.01, '-eleRange', 1, maxelenum, 'material', 1, 'stress')
-        ops.recorder('Element', '-file', 'stress2.out', '-time', '-dT', 0.01, '-eleRange', 1, maxelenum, 'material', 2, 'stress')
-        ops.recorder('Element', '-file', 'stress3.out', '-time', '-dT', 0.01, '-eleRange', 1, maxelenum, 'material', 3, 'stress')
-        ops.recorder('Element', '-file', 'stress4.out', '-time', '-dT', 0.01, '-eleRange', 1, maxelenum, 'material', 4, 'stress')
-        ops.recorder('Element', '-file', 'strain1.out', '-time', '-dT', 0.01, '-eleRange', 1, maxelenum, 'material', 1, 'strain')
-        ops.recorder('Element', '-file', 'strain2.out', '-time', '-dT', 0.01, '-eleRange', 1, maxelenum, 'material', 2, 'strain')
-        ops.recorder('Element', '-file', 'strain3.out', '-time', '-dT', 0.01, '-eleRange', 1, maxelenum, 'material', 3, 'strain')
-        ops.recorder('Element', '-file', 'strain4.out', '-time', '-dT', 0.01, '-eleRange', 1, maxelenum, 'material', 4, 'strain')
+        for resp in ('stress', 'strain'):
+            for gp in (1, 2, 3, 4):
+                file = f'{resp}{gp}{suffix}.out'
+                ops.recorder('Element', '-file', file, '-time', '-dT', dT, '-eleRange', 1, maxelenum, 'material', gp, resp)
+                index[file] = {'kind': 'element', 'tags': ele_tags, 'ncomp': None}
+        for layout in index.values():
+            if layout['kind'] == 'element' and 'element' in original:
+                layout['original_tags'] = original['element']
+        write_recorder_index(index, f'recorder_index{suffix}.json')
+        self.RecorderFiles = list(index)
         logger.success('Finished creating all recorders...')
     
-    def _get_NP_split_boundary(self)->tuple[float,float]:
+    def _get_NP_split_boundary(self, pid:int = None)->tuple[float,float]:
         """
         get min and max x coordinates for spliting nodes into ops.NP parts
+        the split line is the x coordinate whose cumulative node fraction is the closest to PID/NP
+        pid: int, default=None(self.PID)
         return: left and right boundary for the ops.PID part
         """
-        def x_at_percentage(x_coord_count:dict, percentage:float)->float:
-            if percentage == 0.0:
-                return min(x_coord_count.keys())
-            if percentage == 1.0:
-                return max(x_coord_count.keys())
-
-            total = sum(x_coord_count.values())
-            cumsum = 0.
-            x0 = min(x_coord_count.keys())
-            for x, count in x_coord_count.items():
-                cumsumnew = cumsum + count/total
-                if cumsumnew >= percentage:
-                    if abs(cumsumnew - percentage) <= abs(cumsum - percentage):
-                        return x
-                    else:
-                        return x0
-                cumsum = cumsumnew
-                x0 = x
-        
-        left_percentage = float(self.PID)/float(self.NP)
-        right_percentage = float(self.PID+1)/float(self.NP)
-        x_coord_count = Counter([node.x for node in self.Nodes_ALL]).items()
-        x_coord_count = dict(sorted(x_coord_count))
-        left_boundary = x_at_percentage(x_coord_count, left_percentage)
-        right_boundary = x_at_percentage(x_coord_count, right_percentage)
-        return left_boundary, right_boundary
+        pid = self.PID if pid is None else pid
+        boundaries = x_split_boundaries(self.Mesh_ALL.x, self.NP, self._get_partition_weights())
+        return float(boundaries[pid]), float(boundaries[pid+1])
         
     def split_nodes_and_elements(self)->list[float,float]:
         """
         split nodes into ops.NP parts with only a line of common nodes(in x direction)
+        The parts of all ranks are computed at once in self.PartitionPlan(see EZSite.partition.split_mesh)
         return: boundary x coordinates:list[float,float]
                 self.Nodes defines all nodes satisfying the boundary condition
         """
@@ -956,41 +1682,194 @@ class SlopeAnalysis2D(EZOpsMaterial):
         if not hasattr(self,'Elements_ALL'):
             self._get_site_elements()
         # split x coordinates into ops.NP parts and get boundary for this split
-        xmin,xmax = self._get_NP_split_boundary()
+        if hasattr(self, 'RankPlan'):
+            plan = self.RankPlan
+        else:
+            self.PartitionPlan = split_mesh(self.Mesh_ALL, self.NP, self._get_partition_weights())
+            plan = RankPlan(self.PID, self.NP, self.PartitionPlan.Boundaries, self.PartitionPlan.NodeTags[self.PID],
+                            self.PartitionPlan.EleTags[self.PID], None, None, None, None, None)
+        xmin, xmax = float(plan.Boundaries[self.PID]), float(plan.Boundaries[self.PID+1])
         # return if not parallel
         if not self.Parallel:
             self.Nodes = self.Nodes_ALL
             self.Elements = self.Elements_ALL
             return xmin, xmax
         
-        # get nodes in the boundary
-        nodes = [node for node in self.Nodes_ALL if xmin<=node.x<=xmax]
-        nodetags = [node.tag for node in nodes]
-        # add nodes not in the boundary but in the common elements
-        elements = []
-        for ele in self.Elements_ALL:
-            is_quadup = type(ele).__name__ == 'QuadUPele'
-            node_in_boundary:list[int] = [node for node in ele.nodes if node in nodetags]
-            if len(node_in_boundary)<=1:
-                # element not in the boundary, do nothing
-                continue
-            elif len(node_in_boundary) == 4 and is_quadup:
-                # element in the boundary, no node to add
-                elements.append(ele)
-            elif len(node_in_boundary) in [2,3] and is_quadup:
-                # element in the boundary, add one node
-                missing_nodes = [self.NodesDict_ALL[nodetag] for nodetag in ele.nodes if nodetag not in node_in_boundary]
-                for node in missing_nodes:
-                    nodes.append(node)
-                elements.append(ele)
-            else:
-                logger.warning(f'Element:{ele} has {len(node_in_boundary)} nodes in the boundary, not supported!')
-                raise ValueError('Element type not supported!')
-        # add qualified nodes/elements to self and remove suplicate nodes/elements
-        self.Nodes = tuple(set(nodes))
-        self.Elements = tuple(set(elements))
+        unsupported = [ele for ele in self.Elements_ALL if type(ele).__name__ != 'QuadUPele']
+        if unsupported:
+            logger.warning(f'Element:{unsupported[0]} can not be split, not supported!')
+            raise ValueError('Element type not supported!')
+        # nodes in the boundary and nodes of the elements with at least 2 nodes in the boundary
+        if isinstance(self.Nodes_ALL, RecordView):
+            # only the records of this partition are created from the shared site tables
+            self.Nodes = self.Nodes_ALL.take(np.isin(self.Nodes_ALL.keys, plan.NodeTags))
+            self.Elements = self.Elements_ALL.take(np.isin(self.Elements_ALL.keys, plan.EleTags))
+            return xmin, xmax
+        node_tags = set(plan.NodeTags.tolist())
+        ele_tags = set(plan.EleTags.tolist())
+        self.Nodes = tuple(node for node in self.Nodes_ALL if node.tag in node_tags)
+        self.Elements = tuple(ele for ele in self.Elements_ALL if ele.tag in ele_tags)
         return xmin, xmax
-          
+    
+    def _get_constraint_plan(self)->None:
+        """
+        assign every fix and equalDOF constraint of the whole site to exactly one owning rank
+        The base ties to one hub node are rewritten into rank-local hubs chained through the split lines,
+        see EZSite.partition.localize_hub_ties and EZSite.partition.plan_constraints
+        NOTE: a constraint defined on one rank only needs the Penalty constraint handler(as in site_gravity_analysis
+        and __main__), it is wrong with Transformation
+        """
+        if not hasattr(self, 'PartitionPlan'):
+            self.split_nodes_and_elements()
+        if not hasattr(self, 'eqDOF_nodes_01_list_ALL'):
+            self._read_eqDOF_nodes_ALL(self.eqDOF_source)
+        mesh = self.Mesh_ALL
+        member = membership(self.PartitionPlan, mesh)
+        
+        base_list = self.eqDOF_nodes_Base_list_ALL
+        if len(base_list) > 0:
+            base_pairs = localize_hub_ties([node.NodeTags for node in base_list], mesh, member)
+            self.eqDOF_nodes_Base_list_ALL = pairs_to_namedtuples(base_pairs, base_list[0].eqDOF)
+        eqdof_lists = self.eqDOF_nodes_01_list_ALL + self.eqDOF_nodes_02_list_ALL + self.eqDOF_nodes_Base_list_ALL
+        fix_lists = self.FixedBottomNodes_ALL + self.FixedSurfaceNodes_ALL + self.UndrainedNodes_ALL
+        self.ConstraintPlan = plan_constraints(self.PartitionPlan, mesh,
+                                               [node.tag for node in fix_lists],
+                                               [node.NodeTags for node in eqdof_lists])
+        if self.PID == 0:
+            for pid, (nfix, neq, ncross) in enumerate(self.ConstraintPlan.Counts):
+                logger.info(f'Constraint plan PID:{pid} fix:{nfix} equalDOF:{neq} cross-rank equalDOF:{ncross}')
+    
+    def _get_distributed_plan(self)->None:
+        """
+        rank 0 plans the partition(and the constraint ownership with plan_constraints) of all ranks and sends every rank
+        only its own index arrays with ops.send/recv(see EZSite.partition.rank_plans), the other ranks skip splitting and planning
+        The partition weights are computed on all ranks first, 'material' broadcasts the costs(collective).
+        """
+        weights = self._get_partition_weights()
+        if self.PID == 0:
+            mesh = self.Mesh_ALL
+            self.PartitionPlan = split_mesh(mesh, self.NP, weights)
+            constraints = None
+            if self.PlanConstraints:
+                self._read_fix_nodes_ALL()
+                self._get_constraint_plan()
+                constraints = self.ConstraintPlan
+            plans = rank_plans(self.PartitionPlan, mesh, constraints)
+            for pid in range(1, self.NP):
+                send_arrays(pid, plans[pid]._asdict())
+            self.RankPlan = plans[0]
+        else:
+            self.RankPlan = RankPlan(**recv_arrays(0))
+        logger.info(f'Partition plan of this rank: {self.RankPlan.NodeTags.size} nodes, {self.RankPlan.EleTags.size} elements, '
+                    f'{int(np.count_nonzero(self.RankPlan.FixOwned))} fix and {int(np.count_nonzero(self.RankPlan.EqDOFOwned))} equalDOF owned')
+    
+    def _get_partition_weights(self)->np.ndarray:
+        """
+        node weights of the x split from partition_weights
+            None: equal node counts
+            'material': element cost of the material benchmark(see EZSite.costmodel), cached per machine in
+                        <work_dir>/material_costs.json, rank 0 benchmarks and broadcasts the costs
+            np.ndarray: node weights in Mesh_ALL order
+        """
+        if self.PartitionWeights is None:
+            return None
+        if not isinstance(self.PartitionWeights, str):
+            # nodes added after the split(e.g. LK dashpot nodes) carry no weight
+            weights = np.asarray(self.PartitionWeights, dtype=float)
+            return np.r_[weights, np.zeros(max(len(self.Nodes_ALL)-weights.size, 0))]
+        if self.PartitionWeights != 'material':
+            raise ValueError(f'Partition weights {self.PartitionWeights} not supported!')
+        names = list(self.SOIL_MAT_PROP)
+        costs = None
+        if self.PID == 0:
+            by_name = load_material_costs(self.SOIL_MAT_PROP, cache_path=self.WorkDir/'material_costs.json')
+            costs = dict(costs=np.array([by_name[name] for name in names]))
+        costs = bcast_arrays(costs)['costs']
+        costs_by_tag = {self.SOIL_MAT_PROP[name].matTag: cost for name, cost in zip(names, costs)}
+        mesh = self.Mesh_ALL
+        self.PartitionWeights = node_weights(mesh, element_costs(mesh, costs_by_tag))
+        return self.PartitionWeights
+    
+    def rebalance_weights(self, cpu_time:float = None, ridge:float = 1.0)->np.ndarray:
+        """
+        cost-weighted node weights for a new partition(partition_weights of SlopeAnalysis2D) from the measured time of every rank
+        The per-element cost of every material is fitted to the CPU time and the material element counts of all ranks
+        (see EZSite.partition.material_costs), so liquefiable PDMY02 layers get heavier than the PIMY layers.
+        cpu_time: float, default=None(plastic gravity stage of this rank), e.g. the CPU time of a pilot window of dynamic steps
+        ridge: float, default=1.0, weight of the uniform cost prior
+        NOTE: time.process_time also counts the MPI busy waiting of the lighter ranks, let the MPI library yield when idle
+              (e.g. OMPI_MCA_mpi_yield_when_idle=1) for a sharper measurement
+        return: np.ndarray, weight of every node in Mesh_ALL order
+        """
+        cpu_time = self.StageCPUTime['gravity_plastic'] if cpu_time is None else cpu_time
+        mesh = self.Mesh_ALL
+        mats = np.unique(mesh.mat_tags)
+        local_mats = np.array([ele.matTag for ele in self.Elements], dtype=np.int64)
+        local_counts = np.bincount(np.searchsorted(mats, local_mats), minlength=mats.size)
+        gathered = allgather_array(np.r_[cpu_time, local_counts].astype(float))
+        times, counts = gathered[:, 0], gathered[:, 1:]
+        costs = material_costs(counts, times, ridge)
+        ele_weights = costs[np.searchsorted(mats, mesh.mat_tags)]
+        weights = node_weights(mesh, ele_weights)
+        
+        if self.PID == 0:
+            plan = split_mesh(mesh, self.NP, weights)
+            ele_index = {tag: i for i, tag in enumerate(mesh.ele_tags.tolist())}
+            predicted = np.array([ele_weights[[ele_index[tag] for tag in tags]].sum() for tags in plan.EleTags])
+            for mat, cost in zip(mats, costs):
+                logger.info(f'Material {self.MAT_TAG_NAME_MAP.get(int(mat), mat)}: relative cost per element {cost/costs.min():.2f}')
+            logger.info(f'Measured rank time(s): {np.round(times, 3).tolist()}, imbalance max/mean {times.max()/times.mean():.2f}')
+            logger.info(f'Predicted imbalance of the rebalanced partition: {predicted.max()/predicted.mean():.2f}')
+        return weights
+    
+    def release_build_data(self)->None:
+        """
+        lean mode: once OpenSees owns the model, keep nodes and elements as compact arrays and drop the parse-time structures
+            Nodes_ALL, Elements_ALL, Nodes, Elements: RecordView of NumPy arrays, a namedtuple is only created on access
+            dropped: whole-site and local fix tuples, whole-site equalDOF lists, nodal mass, constraint plan
+                     (read again from the site files if a method needs them later)
+            kept: equalDOF lists of this rank(used by fix_side_nodes), LKDashPot, partition plan
+        """
+        rss = rss_breakdown().get('RssAnon', 0.0)
+        dropped = ('FixedNodes_ALL', 'FixedBottomNodes_ALL', 'FixedSurfaceNodes_ALL', 'UndrainedNodes_ALL',
+                   'FixedNodes', 'FixedBottomNodes', 'FixedSurfaceNodes', 'UndrainedNodes',
+                   'eqDOF_nodes_01_list_ALL', 'eqDOF_nodes_02_list_ALL', 'eqDOF_nodes_Base_list_ALL',
+                   'NodalMass_ALL', 'NodalMass', 'ConstraintPlan')
+        as_objects = sum(record_nbytes(self.__dict__[name]) for name in dropped if name in self.__dict__)
+        as_objects += sum(record_nbytes(records) for records in (self.Nodes_ALL, self.Elements_ALL, self.Nodes, self.Elements)
+                          if not isinstance(records, RecordView))
+
+        # whole site
+        mesh = self.Mesh_ALL
+        self.SiteArrays = dict(node_tags=mesh.node_tags, node_coords=mesh.coords, ele_tags=mesh.ele_tags,
+                               ele_nodes=mesh.ele_nodes, ele_mat=mesh.mat_tags)
+        Node = self.NODE2
+        QuadUPele = type(self.Elements[0]) if len(self.Elements) else namedtuple('QuadUPele', ('tag','nodes', 'matTag', 'vpermParamtag', 'hpermParamtag'))
+        node_tags, coords = mesh.node_tags, mesh.coords
+        ele_tags, ele_nodes, ele_mat = mesh.ele_tags, mesh.ele_nodes, mesh.mat_tags
+        self.Nodes_ALL = RecordView(lambda i: Node(int(node_tags[i]), float(coords[i, 0]), float(coords[i, 1])), node_tags)
+        self.Elements_ALL = RecordView(lambda i: QuadUPele(int(ele_tags[i]), tuple(int(n) for n in ele_nodes[i]),
+                                                           int(ele_mat[i]), None, None), ele_tags)
+
+        # this rank, rows of the whole site arrays and the parameter tags of the elements
+        local_nodes = mesh.index_of([node.tag for node in self.Nodes])
+        local = np.array([(ele.tag, *ele.nodes, ele.matTag,
+                           -1 if ele.vpermParamtag is None else ele.vpermParamtag,
+                           -1 if ele.hpermParamtag is None else ele.hpermParamtag) for ele in self.Elements], dtype=np.int64).reshape(-1, 8)
+        param = lambda tag: None if tag < 0 else int(tag)
+        self.Nodes = RecordView(lambda i: Node(int(node_tags[local_nodes[i]]), float(coords[local_nodes[i], 0]),
+                                               float(coords[local_nodes[i], 1])), node_tags[local_nodes])
+        self.Elements = RecordView(lambda i: QuadUPele(int(local[i, 0]), tuple(int(n) for n in local[i, 1:5]), int(local[i, 5]),
+                                                       param(local[i, 6]), param(local[i, 7])), local[:, 0])
+        for name in dropped:
+            self.__dict__.pop(name, None)
+        gc.collect()
+
+        nbytes = sum(array.nbytes for array in self.SiteArrays.values()) + local_nodes.nbytes + local.nbytes
+        private = rss_breakdown().get('RssAnon', 0.0) - rss
+        logger.info(f'Lean mode: {as_objects/2**20:.3f} MB of parse-time Python objects released, kept {nbytes/2**20:.3f} MB of arrays, '
+                    f'private memory {private:+.2f} MB')
+
     def __init_parallel_parameters(self):
         """
         init parallel parameters
@@ -1002,47 +1881,124 @@ class SlopeAnalysis2D(EZOpsMaterial):
         else:
             self.Parallel = False
         
+        if self.UseSharedMemory or self.DistributePlan:
+            self._get_shared_site_data()
+        if self.Validate:
+            # fail fast on broken site data, before partitioning and building
+            with STAGES.stage('validation'):
+                self.validate_site_data()
+        if self.DistributePlan:
+            self._get_distributed_plan()
+        
         if self.NP>1:
             self.split_nodes_and_elements()
     
-    def __init__(self, WaterLevel=0.0):
+    def __init__(self, WaterLevel=0.0, LK_mode='lumped', eqDOF_source='file', plan_constraints=False, shared_memory=False,
+                 distribute_plan=False, partition_weights=None, validate=True, profile=False, lean=False,
+                 gravity_init='transient', renumber=None, coarsen=None, element='quadUP', side_support=False,
+                 work_dir='work', configure_log=True):
         """
         Build the model for SlopeAnalysis2D Example at https://opensees.berkeley.edu/wiki/index.php?title=Dynamic_2D_Effective_Stress_Analysis_of_Slope
+        WaterLevel: float, default=0.0, nodes above water level are undrained
+        LK_mode: str, default='lumped', Lysmer-Kulhemyer boundary mode, 'lumped' or 'distributed'(one dashpot per base node)
+        eqDOF_source: str, default='file', periodic boundary node pairs from EqualDOFnodes_*_Info.dat('file') or node coordinates('geometry')
+        plan_constraints: bool, default=False, if True, every fix/equalDOF is defined on exactly one owning rank(see _get_constraint_plan),
+                          needs the Penalty constraint handler
+        shared_memory: bool, default=False, if True, rank 0 reads the site files into shared memory and the ranks on the same machine
+                       attach zero-copy instead of each holding the whole mesh(see _get_shared_site_data)
+        distribute_plan: bool, default=False, if True, only rank 0 reads the site files and plans the partition, every rank receives
+                         its own part with the OpenSees MPI primitives(see _get_distributed_plan)
+        partition_weights: np.ndarray|str, default=None, node weights(Mesh_ALL order) of the x split, equal node counts if None,
+                           'material' for the benchmarked material costs(see _get_partition_weights and rebalance_weights)
+        validate: bool, default=True, check the site data before building and raise MeshValidationError on errors(see validate_site_data)
+        profile: bool, default=False, if True, profile the build stages(time, allocations, OpenSees calls) of every rank,
+                 see EZSite.profiling, write the merged report with PROFILER.write()
+        lean: bool, default=False, if True, keep nodes and elements as compact arrays and drop the parse-time structures
+              after the build(see release_build_data), RSS per stage is in the stage summary
+        gravity_init: str, default='transient', 'pore_pressure' pre-sets the hydrostatic pore pressure of the analytic
+                      overburden state and runs a short elastic correction, the K0 stresses are not injected(see
+                      site_gravity_analysis)
+        renumber: str, default=None, 'rcm' or 'hilbert' renumbers the site nodes/elements before the build for a small
+                  stiffness matrix profile, with the Plain numberer in serial(see renumber_site_data)
+        coarsen: float|str, default=None, merge element rows of the deep stiff layers before the build while they resolve
+                 this maximum frequency(Hz), 'auto' for the frequency of the velocity record(see coarsen_site_data)
+        element: str, default='quadUP', '9_4_QuadUP' for quadratic displacement elements on the same mesh(mid-side/centre
+                 nodes with 2 DOFs, see define_midside_nodes), about 3 times the equations and 5 times the cpu time of quadUP
+                 on the same mesh; with fewer equations it is more accurate only on the linear elastic soil column of
+                 benchmarks/element_column.py(4 m elements, 78 equations: 0.4% max spectral error against 0.25 m quadUP,
+                 1 m quadUP with 126 equations: 1.0%, at 1.8 times its cpu time), the nonlinear site is not measured
+        side_support: bool, default=False, if True, the outer side nodes are fixed in x during the gravity analysis and
+                      their reactions replace the fixes as nodal loads before the dynamic stage(see replace_side_supports)
+        work_dir: str|Path, default='work', directory(relative to the working directory) of the renumbered and coarsened site
+                  copies of renumber and coarsen and of the material cost cache of partition_weights='material', the site
+                  data itself is never written
+        configure_log: bool, default=True, configure loguru with configure_logging(EZSITE_LOG_MODE) unless it is already
+                       configured, False keeps the handlers of the caller(stage records are then not counted)
         I've Changed the model element from nine_four_node_quadUP to four_node_quadUP
         Tested in Openseespy(version:3.6.0.3) for Windows and Linux(Parallel part only works in Linux, I used WSL2)
         Test Computer: Windows 11, 32GB RAM, Intel(R) Core(TM) i5-13600K CPU @ 3.40GHz
         Speed:1 Core: 509.120s, 2 Cores: 207.437s, 3 Cores: 170.449s, 4 Cores: 157.543s, 5 Cores or more: Unconverged
         """
+        if configure_log:
+            ensure_logging()
+        self.eqDOF_source = eqDOF_source
+        self.PlanConstraints = plan_constraints
+        self.UseSharedMemory = shared_memory
+        self.DistributePlan = distribute_plan
+        self.PartitionWeights = partition_weights
+        self.Validate = validate
+        self.GravityInit = gravity_init
+        self.Numberer = 'RCM'
+        self.RenumberMap = None
+        self.WorkDir = Path(work_dir)
+        if profile:
+            PROFILER.enable()
         self.__init_properties(WaterLevel)
-        self.__init_parallel_parameters()
+        if coarsen is not None:
+            with STAGES.stage('coarsen'):
+                self.coarsen_site_data(fmax=coarsen)
+        if renumber is not None:
+            with STAGES.stage('renumber'):
+                self.renumber_site_data(renumber)
+        with STAGES.stage('partition'):
+            self.__init_parallel_parameters()
         
         ops.wipe()
         ops.model('BasicBuilder', '-ndm', 2, '-ndf', 3)
         
-        self.define_site_nodes()
+        with STAGES.stage('nodes'):
+            self.define_site_nodes()
 
-        self.fix_bottom_nodes()
-        self.fix_surface_nodes()
-        self.undrain_nodes_above_water()
+        with STAGES.stage('constraints'):
+            self.fix_bottom_nodes()
+            self.fix_surface_nodes()
+            self.undrain_nodes_above_water()
 
-        self.equalDOF_for_Site()
-        
-        self.define_soil_materials()
+            self.equalDOF_for_Site(source=eqDOF_source)
+            self.tie_hanging_nodes()
+            if side_support:
+                self.fix_side_nodes('both')
         
-        self.define_site_elements(
-            thicker_boundary = True,
-            high_perm = True,
-            basic_thick_coef = 1,
-            thicker_coef = 10000
-            )
-        
-        self.define_nodal_mass()
+        with STAGES.stage('elements'):
+            self.define_soil_materials()
+            
+            self.define_site_elements(
+                thicker_boundary = True,
+                high_perm = True,
+                basic_thick_coef = 1,
+                thicker_coef = 10000,
+                element = element
+                )
         
-        ops.timeSeries('Constant', 1)
-        ops.pattern('Plain', 1, 1)
-        self.add_nodal_mass_gravity()
+        with STAGES.stage('mass'):
+            self.define_nodal_mass()
+            
+            ops.timeSeries('Constant', 1)
+            ops.pattern('Plain', 1, 1)
+            self.add_nodal_mass_gravity()
         
-        self.define_LK_boundary()
+        with STAGES.stage('LK boundary'):
+            self.define_LK_boundary(mode=LK_mode)
         
         # Auto Partition, not recommended
         # if self.Parallel:
@@ -1051,20 +2007,50 @@ class SlopeAnalysis2D(EZOpsMaterial):
         # gravity analysis
         logger.info('Start Gravity Analysis...')
 
-        self.site_gravity_analysis(plot_disp=False, save=False)
+        with STAGES.stage('gravity'):
+            self.site_gravity_analysis(plot_disp=False, save=False)
+            self.DofIndex.log_summary()
+        
+        if side_support:
+            with STAGES.stage('side supports'):
+                self.record_side_reactions()
+                self.replace_side_supports()
         
         self.update_permibility()
         
         ops.setTime(0.0)
         ops.loadConst('-time',0)
         ops.remove('recorders')
+        if lean:
+            with STAGES.stage('release'):
+                self.release_build_data()
         logger.success('Finished building the model for SlopeAnalysis2D!')
         
         
         
     
 if __name__ == "__main__":
-    Slope2D = SlopeAnalysis2D(WaterLevel = -6.0)
+    # logger configuration, set EZSITE_LOG_MODE=production for per-rank JSON lines files and rate-limited messages
+    configure_logging()
+    # profile the build stages and the dynamic run, report in logs/profile.folded(flame graph) and logs/profile.json
+    profile = False
+    # drop the parse-time node/element/constraint objects after the build, RSS per stage in logs/stages_rank*.json
+    lean = False
+    # 'pore_pressure': pre-set the hydrostatic pore pressure only, with a short elastic correction(stresses from zero)
+    gravity_init = 'transient'
+    # 'rcm' or 'hilbert': renumber the site nodes/elements before the build, profile/bandwidth in <work_dir>/<data>_<method>/renumber.json
+    renumber = None
+    # maximum frequency(Hz) or 'auto'(from the record): coarsen the deep stiff layers while they resolve it
+    coarsen = None
+    # '9_4_QuadUP': quadratic displacement, bilinear pore pressure elements(mid-side/centre nodes added to the site mesh)
+    element = 'quadUP'
+    # fix the outer side nodes in x for the gravity analysis, their reactions replace the fixes before the dynamic stage
+    side_support = False
+    # renumbered/coarsened site copies are written here, never next to the site data
+    work_dir = 'work'
+    Slope2D = SlopeAnalysis2D(WaterLevel = -6.0, profile = profile, lean = lean, gravity_init = gravity_init,
+                              renumber = renumber, coarsen = coarsen, element = element,
+                              side_support = side_support, work_dir = work_dir)
     
     # print some information if you like
     # print(Slope2D.Nodes[:5])
@@ -1092,75 +2078,199 @@ if __name__ == "__main__":
     #                 save_html="ModelVis.html")
     #     fig.show()
     
-    logger.info('Start Dynamic Analysis...')
-    velSeriesTag = Slope2D.set_velocity_record(tsTag = 100, path='velocityHistory.txt', dt = 0.005)
-    logger.success(f'Velocity Time History (tag:{velSeriesTag}) Loaded!')
-    
-    dir=1
-    patternTag = 400
-    ops.pattern('UniformExcitation', patternTag, dir, '-vel', velSeriesTag)
-    logger.success(f'UniformExcitation Pattern (tag:{patternTag}) Loaded!')
-    
-    # set damping
-    damp = 0.2
-    w1 = 2*3.1415926535*0.2
-    w2 = 2*3.1415926535*20
-    a0 = 2*damp*w1*w2/(w1+w2)
-    a1 = 2*damp/(w1+w2)
-    ops.rayleigh(a0,a1,0,0)
-    
     nstep = 5000
     dt = 0.005
     tFinal = nstep*dt
-
-    if Slope2D.Parallel:
+    # rebalance the partition with the measured cost of every rank before the earthquake run(parallel only)
+    # rebalance_pilot: dynamic pilot steps to measure, 0 to use the plastic gravity stage
+    rebalance = False
+    rebalance_pilot = 0
+    
+    def set_dynamic_analysis(model:SlopeAnalysis2D):
+        logger.info('Start Dynamic Analysis...')
+        velSeriesTag = model.set_velocity_record(tsTag = 100, path='velocityHistory.txt', dt = 0.005)
+        logger.success(f'Velocity Time History (tag:{velSeriesTag}) Loaded!')
+        
+        dir=1
+        patternTag = 400
+        ops.pattern('UniformExcitation', patternTag, dir, '-vel', velSeriesTag)
+        logger.success(f'UniformExcitation Pattern (tag:{patternTag}) Loaded!')
+        
+        # set damping
+        damp = 0.2
+        w1 = 2*3.1415926535*0.2
+        w2 = 2*3.1415926535*20
+        a0 = 2*damp*w1*w2/(w1+w2)
+        a1 = 2*damp/(w1+w2)
+        ops.rayleigh(a0,a1,0,0)
+        
+        # algorithm settings 10:Newton 20:NewtonLineSearch 30:ModifiedNewton 40:KrylovNewton 70:Broyden
+        analysis = opst.SmartAnalyze(analysis_type="Transient",
+                                     testType = 'RelativeNormDispIncr',
+                                     algoTypes=[10,20,30,40,70],
+                                     printPer = 100 if model.PID==0 else nstep,
+                                     tryLooseTestTol = True,
+                                     looseTestTolTo = 1e-4,
+                                     tryAlterAlgoTypes = True,
+                                     )
+        # Penalty also for the constraints owned by one rank(plan_constraints)
+        ops.constraints('Penalty', 1.e20, 1.e20)
+        ops.test('RelativeNormDispIncr', 1e-4, 35, 0)
+        ops.algorithm('Newton')
+        
+        if model.Parallel:
+            ops.numberer('ParallelRCM')
+            ops.system('Mumps')
+        else:
+            ops.numberer(model.Numberer)
+            ops.system('ProfileSPD')
+        
+        ops.integrator('Newmark', 0.5, 0.25)
+        ops.analysis('Transient')
+        return analysis
+    
+    analysis = set_dynamic_analysis(Slope2D)
+    if rebalance and Slope2D.Parallel:
+        cpu_time = None
+        if rebalance_pilot > 0:
+            startCPU = time.process_time()
+            ops.analyze(rebalance_pilot, dt)
+            cpu_time = time.process_time()-startCPU
+        weights = Slope2D.rebalance_weights(cpu_time)
+        # the gravity state is rebuilt on the new partition, the pilot steps are discarded
+        Slope2D = SlopeAnalysis2D(WaterLevel = -6.0, partition_weights = weights, lean = lean,
+                                  gravity_init = gravity_init, renumber = renumber,
+                                  coarsen = coarsen, element = element, side_support = side_support, work_dir = work_dir)
+        analysis = set_dynamic_analysis(Slope2D)
+    
+    # full response histories(recorders and the snapshots of the background writer every 100 steps), the per-step
+    # summary is always written
+    full_history = True
+    # opt-in: opstool HDF5 + Plotly animation(DeformVis.html) of the baseline, every 100 steps inside the loop and blocking
+    # after the solve, serial only(opstool can't run in parallel)
+    plot_disp = False
+    # Matplotlib frames(PNG/MP4) of deformation and pore pressure, rendered from the writer chunks after the solve
+    plot_frames = False
+    # checkpoint the transient loop to checkpoints/rank*/, the interval adapts so the overhead stays under max_overhead
+    # resume: continue from the last checkpoint of all ranks(same nstep, dt and number of cores)
+    # WARNING: only the nodal state is restored, the material/element state(yield surfaces, stresses) is the one after
+    #          gravity, so a resumed run is an approximation of the uninterrupted run, not the same analysis
+    checkpoint = False
+    resume = False
+    # must be set to resume: accept the approximate(nodal state only) resume
+    allow_inexact_resume = False
+    max_overhead = 0.02
+    # the summary reduces every reduce_every steps(and the last step) on reduce_nodes/reduce_elements(None: all site
+    # nodes/elements of the rank, or tags of e.g. the surface and a profile column), collecting all of them costs about
+    # 2 ms per step(1027 nodes, 959 elements) against about 290 ms for the step itself, peaks between reductions are missed
+    reduce_every = 1
+    reduce_nodes = None
+    reduce_elements = None
+    
+    site_node_tags = np.array([node.tag for node in Slope2D.Nodes], dtype=np.int64)
+    # the mid-side/centre nodes of 9_4_QuadUP elements are part of the kinematic state
+    state_node_tags = site_node_tags
+    if element == '9_4_QuadUP':
+        state_node_tags = np.union1d(site_node_tags, np.intersect1d(Slope2D.NineNodes.NodeTags, Slope2D.opsNodes))
+    checkpointer, meta, saved = None, None, None
+    if checkpoint or resume:
+        checkpointer = Checkpointer('checkpoints', state_node_tags, CheckpointPolicy(max_overhead=max_overhead))
+    if resume:
+        meta, saved = checkpointer.restore(allow_inexact=allow_inexact_resume)
+    
+    if Slope2D.Parallel and full_history:
+        if meta is not None:
+            checkpointer.keep_recorder_output(meta)
         Slope2D.create_recorders()
-    else:
-        # opstool can't run in parallel
+        if checkpointer is not None:
+            checkpointer.recorder_files = Slope2D.RecorderFiles
+    elif plot_disp and not Slope2D.Parallel:
         ModelData = opst.GetFEMdata(results_dir="opstool_output")
         ModelData.get_model_data(save_file="ModelData.hdf5")
     
-    # algorithm settings 10:Newton 20:NewtonLineSearch 30:ModifiedNewton 40:KrylovNewton 70:Broyden
-    analysis = opst.SmartAnalyze(analysis_type="Transient",
-                                 testType = 'RelativeNormDispIncr',
-                                 algoTypes=[10,20,30,40,70],
-                                 printPer = 100 if Slope2D.PID==0 else nstep,
-                                 tryLooseTestTol = True,
-                                 looseTestTolTo = 1e-4,
-                                 tryAlterAlgoTypes = True,
-                                 )
-    segs = analysis.transient_split(nstep)
-    ops.constraints('Penalty', 1.e20, 1.e20)
-    ops.test('RelativeNormDispIncr', 1e-4, 35, 0)
-    ops.algorithm('Newton')
+    sigma_v0 = Slope2D.get_vertical_effective_stress(site_node_tags)
+    # response snapshots are serialized in a background thread, each rank writes its own nodes
+    if full_history:
+        writer = AsyncResponseWriter(f'RespStep-Dynamic-PID{Slope2D.PID}', site_node_tags)
+    # running peak/RMS/permanent values, the state before shaking is the initial value
+    # accel is absolute(relative + ground acceleration of the input record), strain at gauss point 1 of the site elements
+    site_ele_tags = np.array([ele.tag for ele in Slope2D.Elements], dtype=np.int64)
+    reduce_node_tags = site_node_tags if reduce_nodes is None else np.intersect1d(site_node_tags, reduce_nodes)
+    reduce_ele_tags = site_ele_tags if reduce_elements is None else np.intersect1d(site_ele_tags, reduce_elements)
+    reduce_rows = rows_of(site_node_tags, reduce_node_tags)
+    reducer = OnlineReducer(disp=(reduce_node_tags.size, 2), accel=(reduce_node_tags.size, 2), pore=(reduce_node_tags.size,),
+                            strain=(reduce_ele_tags.size, 3))
     
-    if Slope2D.Parallel:
-        ops.numberer('ParallelRCM')
-        ops.system('Mumps')
+    def collect_step(step:int)->None:
+        # the nodal values are collected once for the reducer and the writer snapshot(every 100 steps, all site nodes)
+        write = full_history and step%100 == 0
+        reduce = step%reduce_every == 0 or step == nstep
+        if not (write or reduce):
+            return
+        time_now = ops.getTime()
+        fields = nodal_fields(site_node_tags if write else reduce_node_tags,
+                              ground_accel=Slope2D.get_ground_acceleration(time_now))
+        if reduce:
+            values = {name: value[reduce_rows] for name, value in fields.items()} if write else fields
+            reducer.update(time_now, **values, strain=element_strain(reduce_ele_tags))
+        if write:
+            writer.submit(Snapshot(step, time_now, fields['disp'], fields['pore']))
+    
+    if meta is None:
+        # the state before shaking is the first snapshot and the initial value of the reducer(excess pore pressure, ru)
+        collect_step(0)
     else:
-        ops.numberer('RCM')
-        ops.system('ProfileSPD')
+        reducer.load_state(saved)
+        if full_history:
+            writer.resume(meta['state']['writer'])
+    
+    def checkpoint_state()->dict:
+        return dict(writer=writer.sync()) if full_history else dict()
     
-    ops.integrator('Newmark', 0.5, 0.25)
-    ops.analysis('Transient')
+    segs = analysis.transient_split(nstep)
+    start = 0 if meta is None else meta['step']
+    analysis.current_args['progress'] = start
     
     # Dynamic Analysis
-    if Slope2D.PID==0:
-        with alive_bar(nstep,title="NLTHA:",length=30,bar='notes') as bar:
-            for seg in segs:
-                ok = analysis.TransientAnalyze(dt)
-                # save response data per 100 steps
-                if seg%100==0 and not Slope2D.Parallel:
-                    ModelData.get_resp_step()
-                bar()
-    else:
-        for seg in segs:
+    with STAGES.stage('dynamic'), alive_bar(nstep,title="NLTHA:",length=30,bar='notes', disable=Slope2D.PID!=0) as bar:
+        bar(start)
+        for seg in segs[start:]:
             ok = analysis.TransientAnalyze(dt)
-            if seg%100==0:
-                    ModelData.get_resp_step()
+            collect_step(seg)
+            # only converged steps are checkpointed, the last good checkpoint is kept for resume
+            if checkpointer is not None and ok >= 0:
+                checkpointer.maybe_save(seg, dt, reducer.state, checkpoint_state)
+            # save response data per 100 steps
+            if seg%100==0 and plot_disp and not Slope2D.Parallel:
+                ModelData.get_resp_step()
+            bar()
+    if checkpointer is not None and checkpointer.policy.checkpoint_cost is not None:
+        policy = checkpointer.policy
+        logger.info(f'Checkpoint overhead {100*policy.overhead:.2f}%(step {policy.step_cost*1e3:.1f} ms, '
+                    f'checkpoint {policy.checkpoint_cost*1e3:.1f} ms, interval {policy.interval} steps)')
+    if full_history:
+        writer.close()
+    excess_pore_max = reducer.max['pore']-reducer.initial['pore']
+    reducer.save(f'Summary-Dynamic-PID{Slope2D.PID}', node_tags=reduce_node_tags, ele_tags=reduce_ele_tags,
+                 sigma_v0=sigma_v0[reduce_rows], excess_pore_max=excess_pore_max,
+                 ru_max=excess_pore_ratio(excess_pore_max, sigma_v0[reduce_rows]))
+    STAGES.log_summary()
+    STAGES.write(f'logs/stages_rank{Slope2D.PID:03d}.json')
+    if profile:
+        PROFILER.write('logs/profile')
+        PROFILER.disable()
+    
+    if plot_frames and Slope2D.Parallel:
+        # all chunks are written before rank 0 reads them
+        ops.barrier()
+    if plot_frames and full_history and Slope2D.PID==0:
+        site_mesh = Slope2D.Mesh_ALL
+        frames = frames_from_snapshots(site_mesh, 'RespStep-Dynamic-PID*_chunk*.npz', field='excess_pore', scale=50.0)
+        render_frames(site_mesh, frames, out_dir='DeformFrames')
+        frames_to_mp4('DeformFrames', 'DeformVis.mp4', fps=10)
     
     # save response data and plot if you like
-    if not Slope2D.Parallel:     
+    if plot_disp and not Slope2D.Parallel:
         ModelData.save_resp_all(save_file="RespStepData-Dynamic.hdf5")
     
         opsvis = opst.OpsVisPlotly(point_size=2, line_width=3, colors_dict=None, theme="plotly",
@@ -1173,13 +2283,3 @@ if __name__ == "__main__":
                                 model_update=False,
                                 save_html="DeformVis.html")
         fig.show()
-        # fig = opsvis.react_vis(input_file="RespStepData-Dynamic.hdf5",
-        #                         slider=True,
-        #                         direction="Fy",
-        #                         show_values = True,
-        #                         show_outline = False,
-        #                         save_html = "ReactVis.html")
-        # fig.show()
-
-    
-    
\ No newline at end of file
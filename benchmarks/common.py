@@ -0,0 +1,115 @@
+"""
+helpers of the benchmark scripts, run the scripts from the repository root(python benchmarks/<script>.py)
+every case builds the model in its own process(one OpenSees domain per process) and writes its results as JSON to
+work/benchmarks/, the script prints the comparison; times are cpu times(time.process_time) of the building process
+"""
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import openseespy.opensees as ops
+
+ROOT = Path(__file__).resolve().parents[1]
+OUT = ROOT/'work'/'benchmarks'
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def run_cases(script:str, cases:dict, *args)->dict:
+    """
+    run script once per case in a subprocess(python script --case <name> <kwargs as JSON> *args) and load the JSON
+    results the case wrote to OUT/<script stem>_<name>.json
+    cases: dict, case name -> keyword arguments of the case
+    """
+    OUT.mkdir(parents=True, exist_ok=True)
+    results = {}
+    for name, kwargs in cases.items():
+        out = OUT/f'{Path(script).stem}_{name}.json'
+        subprocess.run([sys.executable, script, '--case', name, json.dumps(kwargs), *map(str, args)], cwd=ROOT, check=True)
+        results[name] = json.loads(out.read_text())
+    return results
+
+
+def write_case(script:str, name:str, result:dict)->None:
+    """write the result of one case for run_cases"""
+    (OUT/f'{Path(script).stem}_{name}.json').write_text(json.dumps(result))
+
+
+def build(**kwargs):
+    """
+    build SlopeAnalysis2D(WaterLevel=-6.0 as in __main__, gravity analysis included) with kwargs
+    return: model, cpu time of the build(s)
+    """
+    from SlopeAnalysis2D import SlopeAnalysis2D
+    start = time.process_time()
+    model = SlopeAnalysis2D(WaterLevel=-6.0, **kwargs)
+    return model, time.process_time()-start
+
+
+def nodal_state(node_tags)->dict:
+    """x/y displacement and pore pressure of the nodes(pore pressure is the 3rd velocity DOF of quadUP nodes)"""
+    disp = np.array([ops.nodeDisp(tag)[:2] for tag in node_tags])
+    pore = np.array([ops.nodeVel(tag, 3) for tag in node_tags])
+    return dict(ux=disp[:, 0].tolist(), uy=disp[:, 1].tolist(), pore=pore.tolist())
+
+
+def shake(model, nstep:int, dt:float=0.005, node_tags=None, every:int=5)->dict:
+    """
+    dynamic stage of __main__(Rayleigh damping of 20% at 0.2 and 20 Hz, Newmark, Penalty constraints) under the velocity
+    record applied as the force of the lumped LK dashpot at the left corner base node(compliant base of the OpenSees
+    example: force = velocity*BaseArea*DashpotCoef), the UniformExcitation of a velocity series in __main__ loads nothing
+    nstep: int, analysis steps of dt
+    node_tags: list, nodes whose x displacement, x acceleration and pore pressure are kept every `every` steps
+    return: dict of the cpu time, failed steps, number of equations and the histories(step x node)
+    """
+    ts_tag = model.set_velocity_record(tsTag=100, path='velocityHistory.txt', dt=dt)
+    ops.pattern('Plain', 400, ts_tag)
+    ops.load(model.LKDashPot.LeftCornerNode.tag, 1.0, 0.0, 0.0)
+    damp, w1, w2 = 0.2, 2*np.pi*0.2, 2*np.pi*20
+    ops.rayleigh(2*damp*w1*w2/(w1+w2), 2*damp/(w1+w2), 0, 0)
+    ops.constraints('Penalty', 1.e20, 1.e20)
+    ops.test('RelativeNormDispIncr', 1e-4, 35, 0)
+    ops.algorithm('Newton')
+    ops.numberer(model.Numberer)
+    ops.system('ProfileSPD')
+    ops.integrator('Newmark', 0.5, 0.25)
+    ops.analysis('Transient')
+
+    node_tags = [] if node_tags is None else list(node_tags)
+    ux, ax, pore = [], [], []
+    failed = 0
+    start = time.process_time()
+    for step in range(1, nstep+1):
+        ok = ops.analyze(1, dt)
+        # same fallback order as the SmartAnalyze of __main__, then the loose tolerance
+        for algorithm in ('NewtonLineSearch', 'ModifiedNewton', 'KrylovNewton'):
+            if ok == 0:
+                break
+            ops.algorithm(algorithm)
+            ok = ops.analyze(1, dt)
+        if ok != 0:
+            ops.test('RelativeNormDispIncr', 1e-3, 50, 0)
+            ok = ops.analyze(1, dt)
+            ops.test('RelativeNormDispIncr', 1e-4, 35, 0)
+            failed += ok != 0
+        ops.algorithm('Newton')
+        if step % every == 0:
+            ux.append([ops.nodeDisp(tag, 1) for tag in node_tags])
+            ax.append([ops.nodeAccel(tag, 1) for tag in node_tags])
+            pore.append([ops.nodeVel(tag, 3) for tag in node_tags])
+    return dict(cpu=time.process_time()-start, failed=int(failed), equations=ops.systemSize(), time=ops.getTime(),
+                node_tags=node_tags, ux=ux, ax=ax, pore=pore)
+
+
+def common_rows(tags_a, tags_b):
+    """rows of the tags common to tags_a and tags_b in both lists"""
+    common, rows_a, rows_b = np.intersect1d(tags_a, tags_b, return_indices=True)
+    return common, rows_a, rows_b
+
+
+def relative_rms(ref:np.ndarray, other:np.ndarray)->float:
+    """rms of other-ref relative to the rms of ref"""
+    norm = np.linalg.norm(ref)
+    return float(np.linalg.norm(other-ref)/norm) if norm > 0 else float(np.linalg.norm(other))
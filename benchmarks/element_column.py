@@ -0,0 +1,139 @@
+"""
+accuracy of quadUP and 9_4_QuadUP against the number of equations, on a 1D saturated soil column(openseespy only,
+no SlopeAnalysis2D)
+python benchmarks/element_column.py [nstep=2500]
+a 20 m linear elastic column(vs=200 m/s, fundamental frequency 2.5 Hz) of one element width, the nodes of both sides
+tied at every height(periodic column), rigid base shaken by the acceleration of the example velocity record
+(UniformExcitation), drained surface. The surface response is compared against quadUP with 0.25 m elements:
+peak acceleration, 5% damped response spectrum(0.05-2 s) and the acceleration history.
+"""
+import json
+import sys
+import time
+import numpy as np
+from common import ROOT, run_cases, write_case, relative_rms
+
+HEIGHT = 20.0
+RHO, VS, NU = 2.0, 200.0, 0.3
+BULK, FMASS, PERM = 2.2e6, 1.0, 1.0e-4
+CASES = {
+    'quadUP_h0.25': dict(element='quadUP', rows=80),
+    'quadUP_h1': dict(element='quadUP', rows=20),
+    'quadUP_h2.5': dict(element='quadUP', rows=8),
+    '9_4_QuadUP_h2.5': dict(element='9_4_QuadUP', rows=8),
+    '9_4_QuadUP_h4': dict(element='9_4_QuadUP', rows=5),
+}
+REFERENCE = 'quadUP_h0.25'
+PERIODS = np.geomspace(0.05, 2.0, 60)
+
+
+def ground_motion(dt:float=0.005)->np.ndarray:
+    """acceleration of the example velocity record(m/s2)"""
+    from EZSite.postprocess import ground_acceleration
+    return ground_acceleration(np.loadtxt(ROOT/'SlopeAnalysis2Dexample'/'velocityHistory.txt'), dt)
+
+
+def column(rows:int):
+    """SiteMesh of the column, nodes (x=0, x=1) of every height from the base up"""
+    from EZSite.mesh import SiteMesh
+    y = np.linspace(0.0, HEIGHT, rows+1)
+    coords = np.column_stack([np.tile([0.0, 1.0], rows+1), np.repeat(y, 2)])
+    tags = np.arange(1, 2*rows+3)
+    lower = 2*np.arange(rows)+1
+    ele_nodes = np.column_stack([lower, lower+1, lower+3, lower+2])
+    return SiteMesh(tags, coords, np.arange(1, rows+1), ele_nodes, np.ones(rows, dtype=int))
+
+
+def run_case(name:str, kwargs:dict, nstep:int)->None:
+    import openseespy.opensees as ops
+    from EZSite.mesh import nine_node_connectivity
+    element, rows = kwargs['element'], kwargs['rows']
+    mesh = column(rows)
+    ops.wipe()
+    ops.model('basic', '-ndm', 2, '-ndf', 3)
+    for tag, (x, y) in zip(mesh.node_tags.tolist(), mesh.coords.tolist()):
+        ops.node(tag, x, y)
+    ops.nDMaterial('ElasticIsotropic', 1, 2*RHO*VS**2*(1+NU), NU, RHO)
+    ele_nodes = mesh.ele_nodes.tolist()
+    tied = [(int(a), int(b)) for a, b in mesh.node_tags.reshape(-1, 2)[1:]]
+    base = mesh.node_tags[:2].tolist()
+    if element == '9_4_QuadUP':
+        nine = nine_node_connectivity(mesh)
+        for tag, (x, y) in zip(nine.NodeTags.tolist(), nine.Coords.tolist()):
+            ops.node(tag, x, y, '-ndf', 2)
+        ele_nodes = nine.EleNodes.tolist()
+        # mid-side nodes of the left(edge 4-1) and right(edge 2-3) sides, the bottom edge(1-2) of the first element
+        tied += list(zip(nine.EleNodes[:, 7].tolist(), nine.EleNodes[:, 5].tolist()))
+        ops.fix(int(nine.EleNodes[0, 4]), 1, 1)
+    for tag, nodes in zip(mesh.ele_tags.tolist(), ele_nodes):
+        ops.element(element, tag, *nodes, 1.0, 1, BULK, FMASS, PERM, PERM, 0.0, 0.0)
+    for tag in base:
+        ops.fix(tag, 1, 1, 0)
+    for tag in mesh.node_tags[-2:].tolist():
+        ops.fix(tag, 0, 0, 1)
+    for retained, constrained in tied:
+        ops.equalDOF(retained, constrained, 1, 2)
+
+    dt = 0.005
+    accel = ground_motion(dt)[:nstep]
+    ops.timeSeries('Path', 1, '-dt', dt, '-values', *accel.tolist())
+    ops.pattern('UniformExcitation', 1, 1, '-accel', 1)
+    damp, w1, w2 = 0.05, 2*np.pi*1.0, 2*np.pi*10.0
+    ops.rayleigh(2*damp*w1*w2/(w1+w2), 2*damp/(w1+w2), 0, 0)
+    # Transformation is unstable with the equalDOFs of the ndf 2 mid-side nodes
+    ops.constraints('Penalty', 1.e14, 1.e14)
+    ops.numberer('RCM')
+    ops.system('BandGeneral')
+    ops.test('NormDispIncr', 1e-10, 10)
+    ops.algorithm('Linear')
+    ops.integrator('Newmark', 0.5, 0.25)
+    ops.analysis('Transient')
+    surface = int(mesh.node_tags[-2])
+    ax, ux = [], []
+    start = time.process_time()
+    for step in range(nstep):
+        if ops.analyze(1, dt) != 0:
+            raise RuntimeError(f'{name} failed at step {step}!')
+        ax.append(ops.nodeAccel(surface, 1)+accel[step+1 if step+1 < accel.size else step])
+        ux.append(ops.nodeDisp(surface, 1))
+    write_case(__file__, name, dict(cpu=time.process_time()-start, equations=ops.systemSize(), dt=dt, ax=ax, ux=ux))
+    ops.wipe()
+
+
+def spectrum(accel:np.ndarray, dt:float, damp:float=0.05)->np.ndarray:
+    """pseudo spectral acceleration of accel at PERIODS(Newmark average acceleration of the SDOFs)"""
+    w = 2*np.pi/PERIODS
+    k = w**2+2*damp*w*2/dt+4/dt**2
+    u, v, a = np.zeros_like(w), np.zeros_like(w), -accel[0]*np.ones_like(w)
+    peak = np.zeros_like(w)
+    for ag in accel[1:]:
+        u1 = (-ag+(4/dt**2)*u+(4/dt)*v+a+2*damp*w*(2/dt*u+v))/k
+        v1 = 2/dt*(u1-u)-v
+        a, u, v = 4/dt**2*(u1-u)-4/dt*v-a, u1, v1
+        peak = np.maximum(peak, np.abs(u))
+    return w**2*peak
+
+
+def compare(results:dict)->None:
+    ref = results[REFERENCE]
+    ref_sa = spectrum(np.asarray(ref['ax']), ref['dt'])
+    print(f'{"case":17s}{"equations":>10s}{"cpu(s)":>8s}{"PGA":>8s}{"dPGA":>7s}{"Sa rms":>8s}{"Sa max":>8s}'
+          f'{"ax rms":>8s}{"ux rms":>8s}')
+    for name, res in results.items():
+        ax = np.asarray(res['ax'])
+        sa = spectrum(ax, res['dt'])
+        pga, ref_pga = np.abs(ax).max(), np.abs(ref['ax']).max()
+        err = np.abs(sa/ref_sa-1)
+        print(f'{name:17s}{res["equations"]:10d}{res["cpu"]:8.2f}{pga:8.3f}{pga/ref_pga-1:7.1%}'
+              f'{np.sqrt((err**2).mean()):8.1%}{err.max():8.1%}{relative_rms(np.asarray(ref["ax"]), ax):8.3f}'
+              f'{relative_rms(np.asarray(ref["ux"]), np.asarray(res["ux"])):8.3f}')
+    print(f'reference {REFERENCE}: PGA {np.abs(ref["ax"]).max():.3f} m/s2, max Sa {ref_sa.max():.3f} m/s2 '
+          f'at {PERIODS[ref_sa.argmax()]:.2f} s, Sa rms/max: relative spectral error over {PERIODS.size} periods')
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--case']:
+        run_case(sys.argv[2], json.loads(sys.argv[3]), int(sys.argv[4]))
+    else:
+        nstep = int(sys.argv[1]) if len(sys.argv) > 1 else 2500
+        compare(run_cases(__file__, CASES, nstep))
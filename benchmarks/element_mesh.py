@@ -0,0 +1,52 @@
+"""
+equations, cpu time and dynamic response of quadUP and 9_4_QuadUP on the full and the coarsened(coarsen=2.0) site
+python benchmarks/element_mesh.py [nstep=300]
+the response under shaking(see common.shake) is compared at the site nodes common to all cases, against 9_4_QuadUP on
+the full mesh
+"""
+import json
+import sys
+import numpy as np
+from common import build, shake, run_cases, write_case, common_rows, relative_rms
+
+CASES = {
+    'quadUP': dict(element='quadUP'),
+    'quadUP_coarsen2': dict(element='quadUP', coarsen=2.0),
+    '9_4_QuadUP_coarsen2': dict(element='9_4_QuadUP', coarsen=2.0),
+    '9_4_QuadUP': dict(element='9_4_QuadUP'),
+}
+REFERENCE = '9_4_QuadUP'
+
+
+def run_case(name:str, kwargs:dict, nstep:int)->None:
+    import openseespy.opensees as ops
+    model, build_cpu = build(**kwargs)
+    node_tags = [node.tag for node in model.Nodes]
+    result = shake(model, nstep, node_tags=node_tags)
+    result.update(elements=len(ops.getEleTags()), build_cpu=build_cpu, gravity_cpu=sum(model.StageCPUTime.values()))
+    write_case(__file__, name, result)
+
+
+def compare(results:dict)->None:
+    ref = results[REFERENCE]
+    print(f'{"case":22s}{"elements":>9s}{"equations":>10s}{"gravity(s)":>11s}{"dynamic(s)":>11s}{"failed":>7s}'
+          f'{"ux rms":>8s}{"ax rms":>8s}{"pore rms":>9s}{"max|dux|":>9s}{"max|dp|":>8s}')
+    for name, res in results.items():
+        _, rows, rows_ref = common_rows(res['node_tags'], ref['node_tags'])
+        diff = []
+        for field in ('ux', 'ax', 'pore'):
+            diff.append(relative_rms(np.asarray(ref[field])[:, rows_ref], np.asarray(res[field])[:, rows]))
+        dux = np.abs(np.asarray(ref['ux'])[:, rows_ref]-np.asarray(res['ux'])[:, rows]).max()
+        dp = np.abs(np.asarray(ref['pore'])[:, rows_ref]-np.asarray(res['pore'])[:, rows]).max()
+        print(f'{name:22s}{res["elements"]:9d}{res["equations"]:10d}{res["gravity_cpu"]:11.1f}{res["cpu"]:11.1f}'
+              f'{res["failed"]:7d}{diff[0]:8.3f}{diff[1]:8.3f}{diff[2]:9.3f}{dux:9.4f}{dp:8.2f}')
+    print(f'reference {REFERENCE}: max|ux| {np.abs(ref["ux"]).max():.4f} m, max|ax| {np.abs(ref["ax"]).max():.3f} m/s2, '
+          f'max|pore| {np.abs(ref["pore"]).max():.1f} kPa, {len(ref["node_tags"])} nodes, {ref["time"]:.2f} s')
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--case']:
+        run_case(sys.argv[2], json.loads(sys.argv[3]), int(sys.argv[4]))
+    else:
+        nstep = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+        compare(run_cases(__file__, CASES, nstep))
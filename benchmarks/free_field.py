@@ -0,0 +1,164 @@
+"""
+thick quadUP free-field columns vs condensed 1D shear columns on the site sides(openseespy only, no SlopeAnalysis2D)
+python benchmarks/free_field.py [nstep=2000]
+the condensed columns were tried as a free-field mode of SlopeAnalysis2D and dropped: on the example site they did
+not improve the condition number(1.9e13 against 6.4e12 of the thick columns) for 5% fewer equations. This script
+keeps the comparison reproducible on a small layered site built here, where it gives the same result(condition number
+7.4e9 against 3.3e9, 5% fewer equations, 7% rms difference of the site displacements).
+    thick: one element wide quadUP column on each side, thickness thicker_coef(100) times the site, the outer node
+           line tied to the inner one(EqualDOFnodes_01/02, DOF 1 2), as define_site_elements builds them
+    condensed: no outer nodes, a chain of twoNodeLink springs(shear G*A/h, axial (K+4G/3)*A/h) on 2 DOF spring nodes
+               tied to the inner node line, the column mass lumped to the spring nodes, Rayleigh damping on the links
+a 10 x 10 m site of 1 m elements, the lower half twice as stiff, linear elastic, rigid base shaken by the acceleration
+of the example velocity record(UniformExcitation), drained surface; condition number of the effective stiffness matrix
+(dense, Transformation constraints so the penalty numbers stay out) and the response at the site nodes
+"""
+import json
+import sys
+import time
+import numpy as np
+from common import ROOT, run_cases, write_case, relative_rms
+
+COLUMNS, ROWS, SIZE = 10, 10, 1.0
+SITE_THICK, THICKER_COEF = 100.0, 100.0
+# (density, shear wave velocity, poisson's ratio) of the upper and lower half
+LAYERS = {1: (1.9, 150.0, 0.3), 2: (2.0, 300.0, 0.3)}
+BULK, FMASS, PERM = 2.2e6, 1.0, 1.0e-4
+CASES = {
+    'thick': dict(free_field='thick'),
+    'condensed': dict(free_field='condensed'),
+}
+SPRING_NODE = 100000
+
+
+def node_tag(i:int, j:int)->int:
+    """node of column line i(0 is the outer line of the left free-field column) and row line j(0 is the base)"""
+    return 100*j+i+1
+
+
+def layer(j:int)->int:
+    """material of element row j"""
+    return 2 if j < ROWS//2 else 1
+
+
+def moduli(mat:int)->tuple[float,float]:
+    """shear and constrained modulus of a layer"""
+    rho, vs, nu = LAYERS[mat]
+    G = rho*vs**2
+    return G, 2*G*(1-nu)/(1-2*nu)
+
+
+def build(free_field:str)->list[int]:
+    """build the site, return the site node tags(without the outer free-field lines)"""
+    import openseespy.opensees as ops
+    ops.wipe()
+    ops.model('basic', '-ndm', 2, '-ndf', 3)
+    lines = range(0, COLUMNS+3) if free_field == 'thick' else range(1, COLUMNS+2)
+    for j in range(ROWS+1):
+        for i in lines:
+            ops.node(node_tag(i, j), (i-1)*SIZE, j*SIZE)
+            ops.fix(node_tag(i, j), int(j == 0), int(j == 0), int(j == ROWS))
+    for mat, (rho, vs, nu) in LAYERS.items():
+        ops.nDMaterial('ElasticIsotropic', mat, 2*rho*vs**2*(1+nu), nu, rho)
+    for j in range(ROWS):
+        for i in lines[:-1]:
+            thick = SITE_THICK*(THICKER_COEF if i in (0, COLUMNS+1) else 1.0)
+            nodes = node_tag(i, j), node_tag(i+1, j), node_tag(i+1, j+1), node_tag(i, j+1)
+            ops.element('quadUP', 100*j+i+1, *nodes, thick, layer(j), BULK, FMASS, PERM, PERM, 0.0, 0.0)
+    if free_field == 'thick':
+        for j in range(1, ROWS+1):
+            ops.equalDOF(node_tag(1, j), node_tag(0, j), 1, 2)
+            ops.equalDOF(node_tag(COLUMNS+1, j), node_tag(COLUMNS+2, j), 1, 2)
+    else:
+        area = SIZE*SITE_THICK*THICKER_COEF
+        for j in range(ROWS):
+            G, M = moduli(layer(j))
+            ops.uniaxialMaterial('Elastic', 10+2*j, G*area/SIZE)
+            ops.uniaxialMaterial('Elastic', 11+2*j, M*area/SIZE)
+        for i in (1, COLUMNS+1):
+            springs = [SPRING_NODE+node_tag(i, j) for j in range(ROWS+1)]
+            mass = np.zeros(ROWS+1)
+            for j in range(ROWS):
+                mass[j:j+2] += 0.5*LAYERS[layer(j)][0]*area*SIZE
+            for j, tag in enumerate(springs):
+                ops.node(tag, (i-1)*SIZE, j*SIZE, '-ndf', 2, '-mass', mass[j], mass[j])
+                if j == 0:
+                    ops.fix(tag, 1, 1)
+                else:
+                    ops.equalDOF(node_tag(i, j), tag, 1, 2)
+            # the local x of the link is vertical: axial in DOF 1, shear in DOF 2
+            for j in range(ROWS):
+                ops.element('twoNodeLink', SPRING_NODE+100*j+i, springs[j], springs[j+1], '-mat', 11+2*j, 10+2*j,
+                            '-dir', 1, 2, '-doRayleigh')
+    return [node_tag(i, j) for j in range(ROWS+1) for i in range(1, COLUMNS+2)]
+
+
+def condition_number(dt:float = 0.005)->float:
+    """2-norm condition number of the Newmark effective stiffness matrix of one unloaded step of dt"""
+    import openseespy.opensees as ops
+    ops.wipeAnalysis()
+    ops.constraints('Transformation')
+    ops.numberer('RCM')
+    ops.system('FullGeneral')
+    ops.test('NormDispIncr', 1e-10, 5)
+    ops.algorithm('Linear')
+    ops.integrator('Newmark', 0.5, 0.25)
+    ops.analysis('Transient')
+    ops.analyze(1, dt)
+    A = np.array(ops.printA('-ret'))
+    n = int(round(np.sqrt(A.size)))
+    ops.wipeAnalysis()
+    ops.setTime(0.0)
+    return float(np.linalg.cond(A.reshape(n, n)))
+
+
+def run_case(name:str, kwargs:dict, nstep:int)->None:
+    import openseespy.opensees as ops
+    from EZSite.postprocess import ground_acceleration
+    node_tags = build(**kwargs)
+    cond = condition_number()
+    dt, every = 0.005, 5
+    accel = ground_acceleration(np.loadtxt(ROOT/'SlopeAnalysis2Dexample'/'velocityHistory.txt'), dt)[:nstep]
+    ops.timeSeries('Path', 1, '-dt', dt, '-values', *accel.tolist())
+    ops.pattern('UniformExcitation', 1, 1, '-accel', 1)
+    damp, w1, w2 = 0.05, 2*np.pi*1.0, 2*np.pi*10.0
+    ops.rayleigh(2*damp*w1*w2/(w1+w2), 2*damp/(w1+w2), 0, 0)
+    ops.constraints('Penalty', 1.e14, 1.e14)
+    ops.numberer('RCM')
+    ops.system('BandGeneral')
+    ops.test('NormDispIncr', 1e-10, 10)
+    ops.algorithm('Linear')
+    ops.integrator('Newmark', 0.5, 0.25)
+    ops.analysis('Transient')
+    ux, ax = [], []
+    start = time.process_time()
+    for step in range(1, nstep+1):
+        if ops.analyze(1, dt) != 0:
+            raise RuntimeError(f'{name} failed at step {step}!')
+        if step % every == 0:
+            ux.append([ops.nodeDisp(tag, 1) for tag in node_tags])
+            ax.append([ops.nodeAccel(tag, 1) for tag in node_tags])
+    write_case(__file__, name, dict(cpu=time.process_time()-start, equations=ops.systemSize(), cond=cond,
+                                    node_tags=node_tags, ux=ux, ax=ax))
+    ops.wipe()
+
+
+def compare(results:dict)->None:
+    thick = results['thick']
+    for name, res in results.items():
+        print(f'{name:10s} equations {res["equations"]:4d}, condition number {res["cond"]:.3g}, dynamic {res["cpu"]:.2f}s')
+    res = results['condensed']
+    side = np.isin(thick['node_tags'], [node_tag(i, j) for i in (1, COLUMNS+1) for j in range(ROWS+1)])
+    for field in ('ux', 'ax'):
+        ref, other = np.asarray(thick[field]), np.asarray(res[field])
+        print(f'{field}: rms difference {relative_rms(ref, other):.4f} of the thick rms(side lines '
+              f'{relative_rms(ref[:, side], other[:, side]):.4f}), max |thick-condensed| {np.abs(ref-other).max():.4g}, '
+              f'max |thick| {np.abs(ref).max():.4g}')
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--case']:
+        run_case(sys.argv[2], json.loads(sys.argv[3]), int(sys.argv[4]))
+    else:
+        nstep = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+        compare(run_cases(__file__, CASES, nstep))
@@ -0,0 +1,55 @@
+"""
+gravity_init='transient'(20 elastic steps from a zero state) vs 'pore_pressure'(only the hydrostatic pore pressure pre-set and 2
+elastic correction steps)
+python benchmarks/gravity_init.py [nstep=300]
+measured cpu time of the elastic and plastic gravity stages, the difference of the gravity state(displacement, pore
+pressure, effective stress of the first integration point) and of the response under shaking(see common.shake)
+"""
+import json
+import sys
+import numpy as np
+import openseespy.opensees as ops
+from common import build, shake, nodal_state, run_cases, write_case, relative_rms
+
+CASES = {
+    'transient': dict(gravity_init='transient'),
+    'pore_pressure': dict(gravity_init='pore_pressure'),
+}
+
+
+def run_case(name:str, kwargs:dict, nstep:int)->None:
+    model, build_cpu = build(**kwargs)
+    node_tags = [node.tag for node in model.Nodes]
+    ele_tags = [ele.tag for ele in model.Elements]
+    gravity = nodal_state(node_tags)
+    gravity['stress'] = [ops.eleResponse(tag, 'material', 1, 'stress')[:4] for tag in ele_tags]
+    result = shake(model, nstep, node_tags=node_tags)
+    result.update(build_cpu=build_cpu, stage_cpu=model.StageCPUTime, gravity=gravity, ele_tags=ele_tags)
+    write_case(__file__, name, result)
+
+
+def compare(results:dict)->None:
+    transient, pore_pressure = results['transient'], results['pore_pressure']
+    for name, res in results.items():
+        stage = res['stage_cpu']
+        print(f'{name:13s} elastic stage {stage["gravity_elastic"]:.2f}s, plastic stage {stage["gravity_plastic"]:.2f}s, '
+              f'build {res["build_cpu"]:.1f}s')
+    saving = transient['stage_cpu']['gravity_elastic']-pore_pressure['stage_cpu']['gravity_elastic']
+    print(f'measured saving of the elastic stage {saving:.2f}s, of the whole build '
+          f'{transient["build_cpu"]-pore_pressure["build_cpu"]:.2f}s')
+    for field in ('ux', 'uy', 'pore', 'stress'):
+        ref, other = np.asarray(transient['gravity'][field]), np.asarray(pore_pressure['gravity'][field])
+        print(f'gravity {field:6s}: rms difference {relative_rms(ref, other):.2e} of the transient rms, '
+              f'max |difference| {np.abs(ref-other).max():.3g}, max |transient| {np.abs(ref).max():.4g}')
+    for field in ('ux', 'ax', 'pore'):
+        ref, other = np.asarray(transient[field]), np.asarray(pore_pressure[field])
+        print(f'shaking {field:6s}: rms difference {relative_rms(ref, other):.2e} of the transient rms, '
+              f'max |difference| {np.abs(ref-other).max():.3g}')
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--case']:
+        run_case(sys.argv[2], json.loads(sys.argv[3]), int(sys.argv[4]))
+    else:
+        nstep = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+        compare(run_cases(__file__, CASES, nstep))
@@ -1,154 +1,176 @@
-import openseespy.opensees as ops
-from loguru import logger
-import sys
-
-# Logger配置用于并行执行,其他情况默认
-if ops.getNP() > 1:
-    logger = logger.bind(PID=ops.getPID(), NP=ops.getNP())
-    logger.configure(handlers=[
-        {
-            "sink": sys.stderr,
-            "format": "{time:YY-MM-DD HH:mm:ss} |<lvl>{level:8}</>| PID:<cyan>{extra[PID]}</> NP:<green>{extra[NP]}</> | <cyan>{module} : {function}:{line:4}</> - <lvl>{message}</>",
-            "colorize": True
-        },
-    ])
-
-class ParallelStructure:
-    def __init__(self, WaterLevel=0.0):
-        self.__init_parallel_parameters()
-        
-        # 建立模型
-        ops.model('basic', '-ndm', 2, '-ndf', 2)
-        # 1.正常定义材料
-        self.define_materials()
-        
-        if self.Parallel:
-            # 2.定义节点和单元（建议手动分别建立不同的单元）
-            self.add_nodes_and_elements_for_pid()
-            # 3.边界条件
-            self.add_boundary_conditions_for_pid()
-            # 4. 定义荷载
-            self.set_load_for_pid()
-        else:
-            # 2.定义节点和单元
-            self.add_nodes_and_elements_at_once()
-            # 3.边界条件
-            self.add_boundary_conditions_at_once()
-            # 4. 定义荷载
-            self.set_load_at_once() 
-        
-        # 5.进行分析（本例外部调用）
-        # self.run_analysis()
-        
-        logger.success('完成ParallelStructure模型构建！')
-
-    def __init_parallel_parameters(self):
-        """初始化并行计算参数"""
-        self.PID = ops.getPID()
-        self.NP = ops.getNP()
-        self.Parallel = self.NP > 1
-
-    def define_materials(self):
-        """定义材料"""
-        ops.uniaxialMaterial('Elastic', 1, 3000.0)
-
-    def add_nodes_and_elements_at_once(self):
-        """一次性添加所有节点和单元"""
-        ops.node(1, 0.0, 0.0)
-        ops.node(2, 144.0, 0.0)
-        ops.node(3, 168.0, 0.0)
-        ops.node(4, 72.0, 96.0)
-
-        ops.element('Truss', 1, 1, 4, 10.0, 1)
-        ops.element('Truss', 2, 2, 4, 5.0, 1)
-        ops.element('Truss', 3, 3, 4, 5.0, 1)
-        
-    def add_nodes_and_elements_for_pid(self):
-        """为并行计算分别节点和单元"""
-        if self.PID == 0:
-            ops.node(1, 0.0, 0.0)
-            ops.node(4, 72.0, 96.0)
-            
-            ops.element('Truss', 1, 1, 4, 10.0, 1)
-        elif self.PID == 1:
-            ops.node(2, 144.0, 0.0)
-            ops.node(3, 168.0, 0.0)
-            ops.node(4, 72.0, 96.0)
-            
-            ops.element('Truss', 2, 2, 4, 5.0, 1)
-            ops.element('Truss', 3, 3, 4, 5.0, 1)
-        else:
-            raise ValueError(f'PID {self.PID} 超出范围！本例仅为2线程计算演示，请修改代码以适应更多线程！')
-    
-    def add_boundary_conditions_at_once(self):
-        """一次性添加所有边界条件"""
-        ops.fix(1, 1, 1)
-        ops.fix(2, 1, 1)
-        ops.fix(3, 1, 1)
-    
-    def add_boundary_conditions_for_pid(self):
-        """为并行计算分别添加边界条件"""
-        if self.PID == 0:
-            ops.fix(1, 1, 1)
-        elif self.PID == 1:
-            ops.fix(2, 1, 1)
-            ops.fix(3, 1, 1)
-        else:
-            raise ValueError(f'PID {self.PID} 超出范围！本例仅为2线程计算演示，请修改代码以适应更多线程！')
-    
-    def set_load_for_pid(self):
-        """为并行计算分别添加荷载"""
-        if self.PID == 0:
-            ops.timeSeries('Linear', 1)
-            ops.pattern('Plain', 1, 1)
-            ops.load(4, 100.0, -50.0)
-        
-    def set_load_at_once(self):
-        """一次性添加所有荷载"""
-        ops.timeSeries('Linear', 1)
-        ops.pattern('Plain', 1, 1)
-        ops.load(4, 100.0, -50.0)
-    
-    def run_analysis(self):
-        """运行结构分析"""
-        # 设置分析参数
-        # 注：以下运行参数仅为Truss静力计算的示例，不具有一般性，请根据需要修改
-        ops.constraints('Transformation')
-        ops.test('NormDispIncr', 1e-6, 6)
-        ops.algorithm('Newton')
-    
-        if self.Parallel:
-            # 并行计算编号方式可选'ParallelPlain'或'ParallelRCM'
-            ops.numberer('ParallelPlain')
-            # 并行计算只能选'Mumps'，单核计算不可选
-            ops.system('Mumps')
-        else:
-            ops.numberer('Plain')
-            ops.system('ProfileSPD')
-        
-        ops.integrator('LoadControl', 0.1)
-        ops.analysis('Static')
-
-        ops.analyze(10)
-
-        if self.PID == 0:
-            logger.info(f'Node 4(Step 1): [{ops.nodeCoord(4)}, {ops.nodeDisp(4)}]')
-
-        ops.loadConst('-time', 0.0)
-
-        if self.PID == 0:
-            ops.pattern('Plain', 2, 1)
-            ops.load(4, 1.0, 0.0)
-
-        ops.domainChange()
-        ops.integrator('ParallelDisplacementControl', 4, 1, 0.1)
-        ops.analyze(10)
-
-        if self.PID == 0:
-            logger.info(f'Node 4(Step 2): [{ops.nodeCoord(4)}, {ops.nodeDisp(4)}]')
-
-        logger.success('分析成功完成！')
-
-if __name__ == "__main__":
-    parallel_demo = ParallelStructure()
-    parallel_demo.run_analysis()
\ No newline at end of file
+import openseespy.opensees as ops
+from loguru import logger
+from pathlib import Path
+import json
+import subprocess
+import sys
+import time
+import numpy as np
+from EZSite.logconfig import configure_logging
+from EZSite.builder import ParallelModelBuilder, model_arrays
+
+class ParallelStructure:
+    def __init__(self, WaterLevel=0.0):
+        self.__init_parallel_parameters()
+        
+        # 建立模型
+        ops.model('basic', '-ndm', 2, '-ndf', 2)
+        # 1.正常定义材料
+        self.define_materials()
+        
+        # 2.~4. 给出整体模型的节点、单元、边界条件和荷载，自动分配到各进程（任意进程数，单核时全部建立）
+        # 单元按坐标分块，交界面节点在相关进程中重复建立，每个边界条件和荷载只由一个进程定义
+        self.builder = ParallelModelBuilder(self.model_arrays())
+        self.builder.build(ts_tag=1, pattern_tag=1)
+        
+        # 5.进行分析（本例外部调用）
+        # self.run_analysis()
+        
+        logger.success('完成ParallelStructure模型构建！')
+
+    def __init_parallel_parameters(self):
+        """初始化并行计算参数"""
+        self.PID = ops.getPID()
+        self.NP = ops.getNP()
+        self.Parallel = self.NP > 1
+
+    def define_materials(self):
+        """定义材料"""
+        ops.uniaxialMaterial('Elastic', 1, 3000.0)
+
+    def model_arrays(self):
+        """整体模型：节点、单元、边界条件和荷载数组"""
+        return model_arrays(node_tags=[1, 2, 3, 4],
+                            coords=[[0.0, 0.0], [144.0, 0.0], [168.0, 0.0], [72.0, 96.0]],
+                            ele_tags=[1, 2, 3],
+                            ele_nodes=[[1, 4], [2, 4], [3, 4]],
+                            ele_commands=[('Truss', (10.0, 1)), ('Truss', (5.0, 1)), ('Truss', (5.0, 1))],
+                            fixes=[[1, 1, 1], [2, 1, 1], [3, 1, 1]],
+                            loads=[[4, 100.0, -50.0]])
+    
+    def run_analysis(self):
+        """运行结构分析"""
+        # 设置分析参数
+        # 注：以下运行参数仅为Truss静力计算的示例，不具有一般性，请根据需要修改
+        ops.constraints('Transformation')
+        ops.test('NormDispIncr', 1e-6, 6)
+        ops.algorithm('Newton')
+    
+        # 并行计算：'ParallelPlain'+'Mumps'(并行计算只能选'Mumps')，单核计算：'Plain'+'ProfileSPD'
+        self.builder.set_solver('Plain', 'ProfileSPD')
+        
+        ops.integrator('LoadControl', 0.1)
+        ops.analysis('Static')
+
+        ops.analyze(10)
+
+        # 节点4的结果由持有该节点的最小编号进程输出
+        report = self.PID == self.builder.owner_of(4)
+        if report:
+            logger.info(f'Node 4(Step 1): [{ops.nodeCoord(4)}, {ops.nodeDisp(4)}]')
+
+        ops.loadConst('-time', 0.0)
+
+        self.builder.define_loads(2, 1, loads=[[4, 1.0, 0.0]])
+
+        ops.domainChange()
+        ops.integrator('ParallelDisplacementControl', 4, 1, 0.1)
+        ops.analyze(10)
+
+        if report:
+            logger.info(f'Node 4(Step 2): [{ops.nodeCoord(4)}, {ops.nodeDisp(4)}]')
+
+        logger.success('分析成功完成！')
+
+def grid_model(nx:int, ny:int, width:float = 100.0, height:float = 50.0):
+    """
+    扩展性基准模型：nx*ny个四节点平面应力单元的矩形网格，底部固定，顶部节点施加水平和竖向荷载
+    """
+    x, y = np.meshgrid(np.linspace(0.0, width, nx+1), np.linspace(0.0, height, ny+1))
+    node_tags = np.arange(1, (nx+1)*(ny+1)+1).reshape(ny+1, nx+1)
+    ele_nodes = np.stack([node_tags[:-1, :-1], node_tags[:-1, 1:], node_tags[1:, 1:], node_tags[1:, :-1]], axis=2).reshape(-1, 4)
+    bottom, top = node_tags[0], node_tags[-1]
+    return model_arrays(node_tags.ravel(), np.column_stack([x.ravel(), y.ravel()]),
+                        np.arange(1, nx*ny+1), ele_nodes, ('quad', (1.0, 'PlaneStress', 1)),
+                        fixes=np.column_stack([bottom, np.ones((bottom.size, 2), dtype=np.int64)]),
+                        loads=np.column_stack([top, np.full(top.size, 10.0), np.full(top.size, -5.0)]))
+
+def run_benchmark(nx:int, ny:int, out_dir = 'bench'):
+    """
+    运行一次基准（由mpiexec -n NP调用），进程0将全部节点位移和建模/求解耗时写入out_dir/np<NP>.npz
+    """
+    ops.wipe()
+    ops.model('basic', '-ndm', 2, '-ndf', 2)
+    ops.nDMaterial('ElasticIsotropic', 1, 2.0e7, 0.3)
+    ops.barrier()
+    start = time.perf_counter()
+    builder = ParallelModelBuilder(grid_model(nx, ny))
+    builder.build()
+    ops.constraints('Plain')
+    ops.test('NormDispIncr', 1e-8, 6)
+    ops.algorithm('Linear')
+    builder.set_solver('RCM', 'UmfPack')
+    ops.integrator('LoadControl', 1.0)
+    ops.analysis('Static')
+    ops.barrier()
+    built = time.perf_counter()
+    ok = ops.analyze(1)
+    ops.barrier()
+    solved = time.perf_counter()
+    tags, disp = builder.gather_nodal('disp')
+    if builder.PID == 0:
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+        np.savez(Path(out_dir)/f'np{builder.NP}.npz', tags=tags, disp=disp, ok=ok,
+                 build=built-start, solve=solved-built, elements=builder.plan.EleOwner.size,
+                 ele_counts=np.bincount(builder.plan.EleOwner, minlength=builder.NP))
+        logger.success(f'基准 NP={builder.NP}：建模 {built-start:.3f}s，求解 {solved-built:.3f}s')
+
+def scaling_report(out_dir = 'bench', max_np:int = 8):
+    """
+    比较各进程数的结果与单核结果（最大位移差/最大位移），计算加速比，写入out_dir/scaling.json
+    """
+    files = {NP: Path(out_dir)/f'np{NP}.npz' for NP in range(1, max_np+1)}
+    results = {NP: dict(np.load(file)) for NP, file in files.items() if file.exists()}
+    if 1 not in results:
+        raise FileNotFoundError(f'单核基准结果{files[1]}不存在！')
+    serial = results[1]
+    scale = max(np.abs(serial['disp']).max(), 1e-300)
+    report = dict()
+    for NP, result in results.items():
+        total = float(result['build']+result['solve'])
+        report[NP] = dict(build=float(result['build']), solve=float(result['solve']), total=total,
+                          speedup=float(serial['build']+serial['solve'])/total,
+                          solve_speedup=float(serial['solve'])/float(result['solve']),
+                          max_rel_diff=float(np.abs(result['disp']-serial['disp']).max()/scale),
+                          consistent=bool(np.array_equal(result['tags'], serial['tags'])),
+                          ele_counts=result['ele_counts'].tolist())
+        logger.info(f'NP={NP}: 总耗时 {total:.3f}s，加速比 {report[NP]["speedup"]:.2f}(求解 {report[NP]["solve_speedup"]:.2f})，'
+                    f'相对位移差 {report[NP]["max_rel_diff"]:.2e}，单元数 {report[NP]["ele_counts"]}')
+    with open(Path(out_dir)/'scaling.json', 'w') as f:
+        json.dump(report, f, indent=1)
+    return report
+
+def run_scaling(max_np:int = 8, nx:int = 200, ny:int = 100, out_dir = 'bench', launcher = ('mpiexec', '-n')):
+    """
+    串行-并行一致性与加速比基准：依次用launcher运行NP=1..max_np，然后生成scaling_report
+    launcher: 启动命令，后接进程数，例如('mpiexec', '--oversubscribe', '-n')
+    """
+    for NP in range(1, max_np+1):
+        logger.info(f'运行基准 NP={NP}...')
+        subprocess.run([*launcher, str(NP), sys.executable, str(Path(__file__).resolve()), 'bench', str(nx), str(ny), str(out_dir)],
+                       check=True)
+    return scaling_report(out_dir, max_np)
+
+if __name__ == "__main__":
+    # Logger配置(EZSITE_LOG_MODE=production时每个进程写JSON lines日志文件)
+    configure_logging()
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        # 由run_scaling调用：运行一次基准
+        run_benchmark(int(sys.argv[2]), int(sys.argv[3]), sys.argv[4])
+    else:
+        parallel_demo = ParallelStructure()
+        parallel_demo.run_analysis()
+        # 串行-并行一致性与加速比基准（串行运行本文件），结果在bench/scaling.json
+        scaling = False
+        if scaling and ops.getNP() == 1:
+            run_scaling(max_np=8, nx=200, ny=100)
\ No newline at end of file
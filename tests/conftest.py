@@ -0,0 +1,36 @@
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+# the EZSite package sits next to SlopeAnalysis2D.py at the repository root
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+# scripts run on several ranks by the mpi_run fixture
+MPI_SCRIPTS = Path(__file__).resolve().parent/'mpi'
+
+
+@pytest.fixture(scope='session')
+def mpi_run():
+    """
+    run a script of tests/mpi with mpiexec -n NP(default 2) and its arguments, the test fails if a rank exits with an error
+    Skipped without mpiexec or with an openseespy that is not an OpenSeesMP build(getNP() is 1 on every rank).
+    """
+    mpiexec = shutil.which('mpiexec')
+    if mpiexec is None:
+        pytest.skip('mpiexec not found')
+    # Open MPI refuses to run as root or on fewer cores than ranks without these
+    env = dict(os.environ, OMPI_ALLOW_RUN_AS_ROOT='1', OMPI_ALLOW_RUN_AS_ROOT_CONFIRM='1', OMPI_MCA_rmaps_base_oversubscribe='1')
+
+    def run(script:str, NP:int = 2)->str:
+        result = subprocess.run([mpiexec, '-n', str(NP), sys.executable, *script], cwd=ROOT, env=env,
+                                capture_output=True, text=True, timeout=600)
+        assert result.returncode == 0, result.stdout+result.stderr
+        return result.stdout
+
+    probe = run(['-c', 'import openseespy.opensees as ops; print(f"NP={ops.getNP()}")'])
+    if probe.count('NP=2') != 2:
+        pytest.skip('openseespy does not run in parallel here(getNP() != 2 under mpiexec -n 2)')
+    return lambda script, *args, NP=2: run([str(MPI_SCRIPTS/script), *map(str, args)], NP)
@@ -0,0 +1,29 @@
+"""
+ParallelModelBuilder on 2 ranks(see tests/test_mpi.py): the benchmark of ops_parallel_demo builds and solves a grid
+model, every element, fix and load is defined on exactly one rank, rank 0 writes the gathered displacements to
+OUT_DIR/np2.npz for the comparison with the serial run
+usage: builder_ranks.py OUT_DIR
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+import numpy as np
+import openseespy.opensees as ops
+from EZSite.builder import ParallelModelBuilder
+from EZSite.comm import allgather_array
+from ops_parallel_demo import grid_model, run_benchmark
+
+NX, NY = 8, 4
+pid, NP = ops.getPID(), ops.getNP()
+assert NP == 2, NP
+run_benchmark(NX, NY, sys.argv[1])
+
+model = grid_model(NX, NY)
+builder = ParallelModelBuilder(model)
+assert builder.plan.Member[pid, np.isin(model.NodeTags, ops.getNodeTags())].all()
+defined = lambda all_tags, local_tags: allgather_array(np.isin(all_tags, local_tags).astype(int)).sum(axis=0)
+assert defined(model.EleTags, ops.getEleTags()).tolist() == [1]*model.EleTags.size
+assert defined(model.NodeTags, ops.getNodeTags()).tolist() == builder.plan.Member.sum(axis=0).tolist()
+assert allgather_array((builder.plan.FixOwner == pid).astype(int)).sum(axis=0).tolist() == [1]*len(model.Fixes)
+ops.barrier()
+print(f'rank {pid} ok')
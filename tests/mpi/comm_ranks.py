@@ -0,0 +1,31 @@
+"""
+EZSite.comm on 2 ranks(see tests/test_mpi.py): send/recv, Bcast and allgather of named arrays, including one value
+messages(ops.recv/ops.Bcast return a float) and empty arrays
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+import numpy as np
+import openseespy.opensees as ops
+from EZSite.comm import send_arrays, recv_arrays, bcast_arrays, allgather_array
+
+pid, NP = ops.getPID(), ops.getNP()
+assert NP == 2, NP
+sent = dict(tags=np.array([[3, 7], [11, 2**40]], dtype=np.int64), one=np.array([0.5]), empty=np.zeros((0, 2)))
+if pid == 0:
+    send_arrays(1, sent)
+    send_arrays(1, dict(empty=np.zeros(0, dtype=np.int64)))
+else:
+    received = recv_arrays(0)
+    for name, array in sent.items():
+        assert received[name].dtype == array.dtype and np.array_equal(received[name], array), name
+    assert recv_arrays(0)['empty'].shape == (0,)
+
+arrays = bcast_arrays(dict(x=np.arange(5.0), tag=np.array([42])) if pid == 0 else None)
+assert arrays['x'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0] and arrays['tag'].tolist() == [42]
+assert bcast_arrays(dict(one=np.array([1.5])) if pid == 0 else None)['one'].tolist() == [1.5]
+
+assert allgather_array(np.array([pid, 10*pid])).tolist() == [[0, 0], [1, 10]]
+assert allgather_array(np.array([pid+0.5])).tolist() == [[0.5], [1.5]]
+ops.barrier()
+print(f'rank {pid} ok')
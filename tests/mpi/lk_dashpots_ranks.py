@@ -0,0 +1,40 @@
+"""
+distributed LK dashpots on 2 ranks(see tests/test_mpi.py): every rank keeps the base nodes of its split with the rule
+of SlopeAnalysis2D._get_distributed_LK_boundary_property, defines their zeroLength dashpots and every dashpot, including
+the one on the split line, must be created on exactly one rank
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+import numpy as np
+import openseespy.opensees as ops
+from EZSite.boundary import owned_by_rank
+from EZSite.comm import allgather_array
+from EZSite.partition import x_split_boundaries
+
+pid, NP = ops.getPID(), ops.getNP()
+assert NP == 2, NP
+# 9 x 3 grid, tags row by row from the bottom left, the base row is y=0
+x, y = (a.ravel() for a in np.meshgrid(np.arange(9.0), np.arange(3.0)))
+tags = np.arange(1, x.size+1)
+base_tags, base_x = tags[y == 0], x[y == 0]
+fixed_tags, ele_tags = tags.max()+base_tags, 100+base_tags
+
+boundaries = x_split_boundaries(x, NP)
+assert boundaries[1] in base_x, boundaries
+owned = owned_by_rank(base_x, boundaries[pid], boundaries[pid+1], pid == NP-1)
+
+ops.wipe()
+ops.model('basic', '-ndm', 2, '-ndf', 2)
+ops.uniaxialMaterial('Viscous', 1, 1.0, 1.0)
+for etag, ftag, btag, bx in zip(ele_tags[owned], fixed_tags[owned], base_tags[owned], base_x[owned]):
+    ops.node(int(btag), float(bx), 0.0)
+    ops.node(int(ftag), float(bx), 0.0)
+    ops.fix(int(ftag), 1, 1)
+    ops.element('zeroLength', int(etag), int(ftag), int(btag), '-mat', 1, '-dir', 1)
+
+created = np.isin(ele_tags, ops.getEleTags()).astype(int)
+counts = allgather_array(created).sum(axis=0)
+assert counts.tolist() == [1]*ele_tags.size, counts
+ops.barrier()
+print(f'rank {pid} ok')
@@ -0,0 +1,53 @@
+"""
+distributed partition plan on 2 ranks(see tests/test_mpi.py): rank 0 plans the partition and the constraints and sends
+every rank its RankPlan like SlopeAnalysis2D._get_distributed_plan, every rank builds its part, every element and node
+is defined and every fix/equalDOF is owned by exactly one rank
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+import numpy as np
+import openseespy.opensees as ops
+from EZSite.mesh import SiteMesh
+from EZSite.comm import send_arrays, recv_arrays, allgather_array
+from EZSite.partition import split_mesh, membership, localize_hub_ties, plan_constraints, rank_plans, RankPlan
+
+pid, NP = ops.getPID(), ops.getNP()
+assert NP == 2, NP
+# 8 x 2 unit quads, node tags row by row from the bottom left, base nodes 2-9 tied to the corner node 1
+x, y = np.meshgrid(np.arange(9.0), np.arange(3.0))
+tags = np.arange(1, x.size+1).reshape(x.shape)
+ele_nodes = np.column_stack((tags[:-1, :-1].ravel(), tags[:-1, 1:].ravel(), tags[1:, 1:].ravel(), tags[1:, :-1].ravel()))
+mesh = SiteMesh(tags.ravel(), np.column_stack((x.ravel(), y.ravel())), np.arange(1, 17), ele_nodes, np.ones(16))
+base = tags[0]
+
+if pid == 0:
+    plan = split_mesh(mesh, NP, np.where(mesh.x > 6.0, 3.0, 1.0))
+    pairs = localize_hub_ties(np.column_stack((np.full(8, base[0]), base[1:])), mesh, membership(plan, mesh))
+    plans = rank_plans(plan, mesh, plan_constraints(plan, mesh, base, pairs))
+    for rank in range(1, NP):
+        send_arrays(rank, plans[rank]._asdict())
+    rank_plan = plans[0]
+else:
+    rank_plan = RankPlan(**recv_arrays(0))
+assert int(rank_plan.PID) == pid and int(rank_plan.NP) == NP
+
+ops.wipe()
+ops.model('basic', '-ndm', 2, '-ndf', 2)
+ops.nDMaterial('ElasticIsotropic', 1, 1.0e4, 0.3)
+for tag in np.r_[rank_plan.NodeTags, rank_plan.MissingNodes]:
+    ops.node(int(tag), *mesh.coords_of([tag])[0].tolist())
+for tag in rank_plan.EleTags:
+    ops.element('quad', int(tag), *mesh.ele_nodes[tag-1].tolist(), 1.0, 'PlaneStrain', 1)
+for tag in base[rank_plan.FixOwned]:
+    ops.fix(int(tag), 0, 1)
+for retained, constrained in rank_plan.EqDOFPairs[rank_plan.EqDOFOwned]:
+    ops.equalDOF(int(retained), int(constrained), 1)
+
+defined = lambda all_tags, local_tags: allgather_array(np.isin(all_tags, local_tags).astype(int)).sum(axis=0)
+assert (defined(mesh.node_tags, ops.getNodeTags()) >= 1).all()
+assert (defined(mesh.ele_tags, ops.getEleTags()) >= 1).all()
+assert allgather_array(rank_plan.FixOwned.astype(int)).sum(axis=0).tolist() == [1]*base.size
+assert allgather_array(rank_plan.EqDOFOwned.astype(int)).sum(axis=0).tolist() == [1]*len(rank_plan.EqDOFPairs)
+ops.barrier()
+print(f'rank {pid} ok')
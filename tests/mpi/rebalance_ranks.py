@@ -0,0 +1,48 @@
+"""
+rebalanced partition on 2 ranks(see tests/test_mpi.py): every rank measures the time of its part, the material costs
+are fitted to the gathered times like SlopeAnalysis2D.rebalance_weights and every rank splits the mesh again with the
+cost-weighted node weights, the new parts are the same on all ranks and cover every element, only the elements along
+the split line are held by both ranks
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+import numpy as np
+import openseespy.opensees as ops
+from EZSite.mesh import SiteMesh
+from EZSite.comm import allgather_array
+from EZSite.partition import split_mesh, material_costs, node_weights
+
+pid, NP = ops.getPID(), ops.getNP()
+assert NP == 2, NP
+# 8 x 2 unit quads, the elements right of x=6 are 3 times as expensive(material 2)
+x, y = np.meshgrid(np.arange(9.0), np.arange(3.0))
+tags = np.arange(1, x.size+1).reshape(x.shape)
+ele_nodes = np.column_stack((tags[:-1, :-1].ravel(), tags[:-1, 1:].ravel(), tags[1:, 1:].ravel(), tags[1:, :-1].ravel()))
+mat_tags = np.where(np.tile(np.arange(8), 2) >= 6, 2, 1)
+mesh = SiteMesh(tags.ravel(), np.column_stack((x.ravel(), y.ravel())), np.arange(1, 17), ele_nodes, mat_tags)
+true_costs = {1: 1.0, 2: 3.0}
+
+# measured time of the equal node count split
+local = split_mesh(mesh, NP).EleTags[pid]
+local_mats = mesh.mat_tags[local-1]
+cpu_time = sum(true_costs[int(mat)] for mat in local_mats)
+mats = np.unique(mesh.mat_tags)
+local_counts = np.bincount(np.searchsorted(mats, local_mats), minlength=mats.size)
+gathered = allgather_array(np.r_[cpu_time, local_counts].astype(float))
+times, counts = gathered[:, 0], gathered[:, 1:]
+costs = material_costs(counts, times)
+assert costs[1] > costs[0], costs
+weights = node_weights(mesh, costs[np.searchsorted(mats, mesh.mat_tags)])
+
+# the new plan of every rank
+assert np.array_equal(allgather_array(weights)[0], allgather_array(weights)[1])
+plan = split_mesh(mesh, NP, weights)
+held = allgather_array(np.isin(mesh.ele_tags, plan.EleTags[pid]).astype(int)).sum(axis=0)
+assert (held >= 1).all(), held
+on_line = (mesh.x[mesh.ele_node_index] == plan.Boundaries[1]).sum(axis=1) == 2
+assert np.array_equal(held == 2, on_line), (held, plan.Boundaries)
+# the split line moved towards the expensive elements
+assert plan.Boundaries[1] > split_mesh(mesh, NP).Boundaries[1], plan.Boundaries
+ops.barrier()
+print(f'rank {pid} ok')
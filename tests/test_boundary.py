@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from EZSite.mesh import SiteMesh
+from EZSite.boundary import periodic_boundary_pairs, owned_by_rank
+from EZSite.partition import x_split_boundaries
+
+
+def _grid(xs, ys)->SiteMesh:
+    # node tags row by row from the bottom left, 1-based
+    x, y = np.meshgrid(xs, ys)
+    return SiteMesh(np.arange(1, x.size+1), np.column_stack((x.ravel(), y.ravel())))
+
+
+def _tag(mesh:SiteMesh, x:float, y:float)->int:
+    return int(mesh.nodes_in_box(x, x, y, y)[0])
+
+
+def test_periodic_boundary_pairs():
+    mesh = _grid([0.0, 1.0, 3.0, 5.0, 6.0], [0.0, 1.0, 2.0])
+    periodic = periodic_boundary_pairs(mesh)
+    # (outer, inner) pairs from the bottom up
+    assert periodic.Left.tolist() == [[_tag(mesh, 0, y), _tag(mesh, 1, y)] for y in (0, 1, 2)]
+    assert periodic.Right.tolist() == [[_tag(mesh, 6, y), _tag(mesh, 5, y)] for y in (0, 1, 2)]
+    # base nodes tied to the left bottom corner, except the inner column nodes tied by the column pairs
+    corner = _tag(mesh, 0, 0)
+    assert periodic.Base.tolist() == [[corner, _tag(mesh, 3, 0)], [corner, _tag(mesh, 6, 0)]]
+    assert (periodic.LeftDOF, periodic.RightDOF, periodic.BaseDOF) == ([1, 2], [1, 2], [1])
+
+
+def test_periodic_boundary_column_width():
+    mesh = _grid([0.0, 1.0, 2.0, 4.0, 5.0, 6.0], [0.0, 1.0])
+    periodic = periodic_boundary_pairs(mesh, column_width=(2.0, 2.0))
+    assert periodic.Left[:, 1].tolist() == [_tag(mesh, 2, 0), _tag(mesh, 2, 1)]
+    assert periodic.Right[:, 1].tolist() == [_tag(mesh, 4, 0), _tag(mesh, 4, 1)]
+
+
+def test_periodic_boundary_unmatched_and_too_narrow():
+    # the inner line has no node at y=2, the outer node there is left without a pair
+    mesh = _grid([0.0, 1.0, 3.0, 6.0], [0.0, 1.0, 2.0])
+    mesh = SiteMesh(*(np.delete(a, _tag(mesh, 1, 2)-1, axis=0) for a in (mesh.node_tags, mesh.coords)))
+    assert periodic_boundary_pairs(mesh).Left.shape == (2, 2)
+    with pytest.raises(ValueError):
+        periodic_boundary_pairs(_grid([0.0, 1.0, 2.0], [0.0, 1.0]))
+
+
+@pytest.mark.parametrize('NP', [1, 2, 3, 4])
+def test_owned_by_rank_once(NP):
+    # base nodes on the split lines are shared by two ranks, their LK dashpot must be defined on one of them
+    mesh = _grid(np.arange(13.0), [0.0, 1.0])
+    base_x = mesh.x[mesh.y == 0]
+    boundaries = x_split_boundaries(mesh.x, NP)
+    owned = np.array([owned_by_rank(base_x, boundaries[pid], boundaries[pid+1], pid == NP-1) for pid in range(NP)])
+    assert np.isin(boundaries, base_x).all()
+    assert owned.sum(axis=0).tolist() == [1]*base_x.size
+    # the node on a split line goes to the right rank
+    assert all(owned[pid+1, base_x == boundaries[pid+1]].all() for pid in range(NP-1))
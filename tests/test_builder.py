@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+import openseespy.opensees as ops
+from EZSite.builder import model_arrays, element_centroids, assign_elements, plan_model, ParallelModelBuilder
+
+
+def _grid(nx:int, ny:int):
+    # unit quads, node tags row by row from the bottom left, fixed bottom row and loaded top right node
+    x, y = np.meshgrid(np.arange(nx+1.0), np.arange(ny+1.0))
+    tags = np.arange(1, x.size+1).reshape(x.shape)
+    ele_nodes = np.column_stack((tags[:-1, :-1].ravel(), tags[:-1, 1:].ravel(), tags[1:, 1:].ravel(), tags[1:, :-1].ravel()))
+    return model_arrays(tags.ravel(), np.column_stack((x.ravel(), y.ravel())), np.arange(1, nx*ny+1), ele_nodes,
+                        ('quad', (1.0, 'PlaneStress', 1)), fixes=[[tag, 1, 1] for tag in tags[0]],
+                        loads=[[tags[-1, -1], 10.0, -5.0]])
+
+
+def test_model_arrays():
+    model = model_arrays([1, 2, 3], [[0, 0], [1, 0], [0, 1]], [7, 8], [[1, 2], [1, 3]], ('Truss', (1.0, 1)))
+    assert model.EleCommands == [('Truss', (1.0, 1))]*2
+    assert model.Coords.shape == (3, 2) and model.EleNodes.tolist() == [[1, 2], [1, 3]]
+    assert model.Fixes.shape == (0, 1) and model.Loads.shape == (0, 1)
+    with pytest.raises(ValueError):
+        model_arrays([1, 2], [[0, 0], [1, 0]], [1, 2], [[1, 2], [2, 1]], [('Truss', (1.0, 1))])
+
+
+def test_element_centroids_padded():
+    # a truss padded with -1 next to a triangle
+    model = model_arrays([1, 2, 3], [[0, 0], [3, 0], [0, 3]], [1, 2], [[1, 2, -1], [1, 2, 3]],
+                         [('Truss', (1.0, 1)), ('tri31', (1.0, 'PlaneStress', 1))])
+    assert np.allclose(element_centroids(model), [[1.5, 0.0], [1.0, 1.0]])
+
+
+def test_assign_elements():
+    centroids = element_centroids(_grid(8, 2))
+    owner = assign_elements(centroids, 4)
+    # strips along the long x axis with 4 elements each
+    assert np.bincount(owner).tolist() == [4, 4, 4, 4]
+    assert all(np.ptp(centroids[owner == pid, 0]) == 1.0 for pid in range(4))
+    weights = np.where(centroids[:, 0] < 4.0, 3.0, 1.0)
+    assert np.bincount(assign_elements(centroids, 2, weights)).tolist() == [5, 11]
+    assert not assign_elements(centroids, 1).any()
+
+
+@pytest.mark.parametrize('NP', [1, 2, 3, 4])
+def test_plan_model_ownership(NP):
+    model = _grid(8, 2)
+    plan = plan_model(model, NP)
+    index = {tag: i for i, tag in enumerate(model.NodeTags.tolist())}
+    # every rank holds exactly the nodes of its elements, interface nodes are replicated
+    for pid in range(NP):
+        nodes = np.unique(model.EleNodes[plan.EleOwner == pid])
+        assert sorted(model.NodeTags[plan.Member[pid]].tolist()) == nodes.tolist()
+    assert plan.Member.any(axis=0).all()
+    # every fix and load is owned once by a rank holding the node, loads by the lowest one
+    fix_rows = [index[tag] for tag in model.Fixes[:, 0]]
+    assert plan.Member[plan.FixOwner, fix_rows].all()
+    load_rows = [index[int(tag)] for tag in model.Loads[:, 0]]
+    assert plan.LoadOwner.tolist() == np.argmax(plan.Member[:, load_rows], axis=0).tolist()
+    # the fixes of interface nodes go to the least loaded rank
+    assert np.ptp(np.bincount(plan.FixOwner, minlength=NP)) <= 1
+
+
+def test_plan_model_orphan_nodes():
+    model = model_arrays([1, 2, 3, 4], [[0, 0], [1, 0], [2, 0], [5, 5]], [1, 2], [[1, 2], [2, 3]], ('Truss', (1.0, 1)),
+                         fixes=[[4, 1, 1]])
+    plan = plan_model(model, 2)
+    assert plan.Member[:, 3].tolist() == [True, False] and plan.FixOwner.tolist() == [0]
+
+
+def test_builder_serial():
+    model = _grid(4, 2)
+    ops.wipe()
+    ops.model('basic', '-ndm', 2, '-ndf', 2)
+    ops.nDMaterial('ElasticIsotropic', 1, 2.0e7, 0.3)
+    builder = ParallelModelBuilder(model)
+    builder.build()
+    assert sorted(ops.getNodeTags()) == model.NodeTags.tolist() and sorted(ops.getEleTags()) == model.EleTags.tolist()
+    assert builder.owner_of(15) == 0
+    ops.constraints('Plain')
+    ops.algorithm('Linear')
+    builder.set_solver('RCM', 'UmfPack')
+    ops.integrator('LoadControl', 1.0)
+    ops.analysis('Static')
+    assert ops.analyze(1) == 0
+    tags, disp = builder.gather_nodal('disp')
+    assert tags.tolist() == model.NodeTags.tolist() and disp.shape == (15, 2)
+    assert np.allclose(disp[:5], 0.0) and disp[-1, 0] > 0.0
+    ops.wipe()
@@ -0,0 +1,90 @@
+import json
+import numpy as np
+import openseespy.opensees as ops
+import pytest
+import EZSite.checkpoint as checkpoint
+from EZSite.checkpoint import Checkpointer, CheckpointPolicy
+
+
+def _column(nstep:int = 60, dt:float = 0.01)->np.ndarray:
+    # elastic quadUP column of 4 elements under a base acceleration pulse, the nodal state is its whole state
+    ops.wipe()
+    ops.model('basic', '-ndm', 2, '-ndf', 3)
+    for j in range(5):
+        for i in range(2):
+            ops.node(2*j+i+1, float(i), float(j))
+            ops.fix(2*j+i+1, int(j == 0), int(j == 0), int(j == 4))
+        if j > 0:
+            ops.equalDOF(2*j+1, 2*j+2, 1, 2)
+    ops.nDMaterial('ElasticIsotropic', 1, 2.0e5, 0.3, 2.0)
+    for j in range(4):
+        ops.element('quadUP', j+1, 2*j+1, 2*j+2, 2*j+4, 2*j+3, 1.0, 1, 2.2e6, 1.0, 1e-4, 1e-4, 0.0, 0.0)
+    accel = np.sin(np.linspace(0.0, 6*np.pi, nstep+1))*np.hanning(nstep+1)
+    ops.timeSeries('Path', 1, '-dt', dt, '-values', *accel.tolist())
+    ops.pattern('UniformExcitation', 1, 1, '-accel', 1)
+    ops.rayleigh(0.1, 0.001, 0.0, 0.0)
+    ops.constraints('Transformation')
+    ops.numberer('RCM')
+    ops.system('BandGeneral')
+    ops.test('NormDispIncr', 1e-10, 10)
+    ops.algorithm('Linear')
+    ops.integrator('Newmark', 0.5, 0.25)
+    ops.analysis('Transient')
+    return np.array(ops.getNodeTags(), dtype=np.int64)
+
+
+def test_policy_interval(monkeypatch):
+    # the interval is checkpoint cost/(max_overhead*step cost), within the bounds
+    clock = iter([0.0, 10.0, 10.0, 20.0, 20.0])
+    monkeypatch.setattr(checkpoint.time, 'perf_counter', lambda: next(clock))
+    policy = CheckpointPolicy(max_overhead=0.01, first=50, min_interval=10, max_interval=1000)
+    assert not policy.due(49) and policy.due(50)
+    # 50 steps in 10 s of which 0.5 s checkpoint: 0.19 s per step
+    policy.update(50, 0.5)
+    assert policy.interval == int(np.ceil(0.5/(0.01*9.5/50)))
+    assert np.isclose(policy.overhead, 0.5/9.5)
+    policy.update(50+policy.interval, 0.0)
+    assert policy.min_interval <= policy.interval < 1000
+
+
+def test_resume_is_exact_for_elastic_materials(tmp_path):
+    dt = 0.01
+    node_tags = _column(dt=dt)
+    for _ in range(60):
+        assert ops.analyze(1, dt) == 0
+    expected = checkpoint.nodal_state(node_tags)
+
+    node_tags = _column(dt=dt)
+    checkpointer = Checkpointer(tmp_path, node_tags, CheckpointPolicy(first=20, min_interval=10, max_interval=10))
+    for step in range(1, 46):
+        assert ops.analyze(1, dt) == 0
+        checkpointer.maybe_save(step, dt, state=lambda: dict(segment=step))
+    # the last two complete checkpoints are kept, a checkpoint without its JSON is not complete
+    assert checkpointer.steps() == [30, 40]
+    np.savez(checkpointer.directory/'step_000045.npz', node_tags=node_tags)
+    assert checkpointer.latest() == 40
+
+    node_tags = _column(dt=dt)
+    checkpointer = Checkpointer(tmp_path, node_tags)
+    with pytest.raises(RuntimeError):
+        checkpointer.restore()
+    meta, _ = checkpointer.restore(allow_inexact=True)
+    assert meta['step'] == 40 and meta['state'] == dict(segment=40) and np.isclose(ops.getTime(), 40*dt)
+    for _ in range(meta['step'], 60):
+        assert ops.analyze(1, dt) == 0
+    resumed = checkpoint.nodal_state(node_tags)
+    ops.wipe()
+    for name, value in expected.items():
+        assert np.allclose(resumed[name], value, rtol=1e-10, atol=1e-14), name
+
+
+def test_keep_recorder_output(tmp_path):
+    # the recorder file is cut to its last complete line at the checkpoint and kept next to the new one
+    file = tmp_path/'disp.out'
+    file.write_text('0.1 1\n0.2 2\n0.3 3\n')
+    offset = len('0.1 1\n0.2 2\n0.3')
+    ops.wipe()
+    checkpointer = Checkpointer(tmp_path/'checkpoints', [])
+    kept = checkpointer.keep_recorder_output(json.loads(json.dumps(dict(step=2, recorders={str(file): offset}))))
+    assert kept == [tmp_path/'disp_upto000002.out'] and not file.exists()
+    assert kept[0].read_text() == '0.1 1\n0.2 2\n'
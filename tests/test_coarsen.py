@@ -0,0 +1,114 @@
+import json
+import numpy as np
+from EZSite.mesh import SiteMesh
+from EZSite.coarsen import (coarsen_mesh, coarsen_site_files, max_element_size, max_frequency, read_site_mesh,
+                            HANGING_NODE_INFO)
+
+
+def _grid(nx:int, ny:int, dx:float = 1.0, dy:float = 1.0)->SiteMesh:
+    # node 1+i+j*(nx+1) at (i*dx, j*dy), element 1+i+j*nx counterclockwise, material 1 in the lower half
+    tags = np.arange((nx+1)*(ny+1))+1
+    i, j = np.meshgrid(np.arange(nx+1), np.arange(ny+1))
+    coords = np.c_[i.ravel()*dx, j.ravel()*dy]
+    ei, ej = np.meshgrid(np.arange(nx), np.arange(ny))
+    ei, ej = ei.ravel(), ej.ravel()
+    n1 = 1+ei+ej*(nx+1)
+    ele_nodes = np.c_[n1, n1+1, n1+nx+2, n1+nx+1]
+    return SiteMesh(tags, coords, np.arange(nx*ny)+1, ele_nodes, np.where(ej < ny//2, 1, 2))
+
+
+def _areas(mesh:SiteMesh)->np.ndarray:
+    xy = mesh.coords[mesh.ele_node_index]
+    x, y = xy[..., 0], xy[..., 1]
+    return 0.5*((x*np.roll(y, -1, axis=1)).sum(axis=1)-(y*np.roll(x, -1, axis=1)).sum(axis=1))
+
+
+def _check(mesh:SiteMesh, coarse, hmax:np.ndarray, protected = ())->None:
+    new = coarse.Mesh
+    # merged quads keep the lower tag and respect hmax, area and orientation are kept
+    height = np.ptp(new.coords[new.ele_node_index][..., 1], axis=1)
+    assert np.all(height <= hmax[np.searchsorted(mesh.ele_tags, new.ele_tags)]+1e-12)
+    assert np.all(_areas(new) > 0) and np.isclose(_areas(new).sum(), _areas(mesh).sum())
+    assert new.num_elements == mesh.num_elements-coarse.Merged
+    assert not np.isin(coarse.Removed, new.ele_nodes).any() and not np.isin(coarse.Removed, new.node_tags).any()
+    # every hanging node is still used, gets exactly one tie and lies inside the edge i-j of one merged quad
+    hanging = coarse.Hanging
+    assert np.unique(hanging[:, 0]).size == hanging.shape[0]
+    assert np.isin(hanging[:, 0], new.ele_nodes).all() and not np.isin(hanging[:, 0], list(protected)).any()
+    for node, i, j, k in hanging:
+        p, a, b = new.coords_of([node, i, j])
+        t = np.dot(p-a, b-a)/np.dot(b-a, b-a)
+        assert 0 < t < 1 and np.allclose(a+t*(b-a), p)
+        hosts = [nodes for nodes in new.ele_nodes.tolist() if {i, j, k} <= set(nodes)]
+        assert len(hosts) == 1 and node not in hosts[0]
+
+
+def test_coarsen_mesh():
+    mesh = _grid(3, 8)
+    hmax = np.full(mesh.num_elements, 4.0)
+    # every pass halves the rows of each material(4 rows) until hmax
+    coarse = coarsen_mesh(mesh, hmax, np.ones(mesh.num_elements, dtype=bool))
+    _check(mesh, coarse, hmax)
+    assert coarse.Merged == 12+6 and coarse.Mesh.num_elements == 6 and coarse.Hanging.shape[0] == 0
+    assert coarse.Removed.size == 6*4
+    # stacks stop at the material boundary
+    assert np.isin(mesh.node_tags[mesh.y == 4.0], coarse.Mesh.ele_nodes).all()
+    assert coarsen_mesh(mesh, np.full(mesh.num_elements, 1.5), np.ones(mesh.num_elements, dtype=bool)).Merged == 0
+
+    # the right column stays fine, the middle nodes on its left edge hang, the elements holding a tie are not
+    # merged again
+    eligible = mesh.ele_nodes[:, 1] % 4 != 0
+    coarse = coarsen_mesh(mesh, hmax, eligible)
+    _check(mesh, coarse, hmax)
+    assert coarse.Merged == 8 and coarse.Hanging[:, 0].tolist() == [7, 15, 23, 31]
+    assert coarse.Removed.tolist() == [5, 6, 13, 14, 21, 22, 29, 30]
+
+
+def test_coarsen_mesh_protected():
+    mesh = _grid(3, 8)
+    hmax = np.full(mesh.num_elements, 2.0)
+    eligible = mesh.ele_nodes[:, 1] % 4 != 0
+    protected = [15]
+    coarse = coarsen_mesh(mesh, hmax, eligible, protected)
+    _check(mesh, coarse, hmax, protected)
+    assert 15 not in coarse.Hanging[:, 0] and coarse.Merged == 7
+
+
+def test_max_element_size_and_frequency():
+    assert max_element_size([100.0, 400.0], 5.0).tolist() == [2.0, 8.0]
+    assert max_element_size([100.0], 5.0, points_per_wavelength=5).tolist() == [4.0]
+    dt = 0.01
+    t = np.arange(0, 20, dt)
+    velocity = np.sin(2*np.pi*2.0*t)+0.01*np.sin(2*np.pi*12.0*t)
+    assert abs(max_frequency(velocity, dt)-2.0) <= 0.1
+    assert abs(max_frequency(velocity, dt, energy=0.9999)-12.0) <= 0.1
+
+
+def _write_site(path, mesh:SiteMesh, nx:int)->None:
+    path.mkdir()
+    np.savetxt(path/'nodeInfo.dat', np.c_[mesh.node_tags, mesh.coords], fmt=['%d', '%.6f', '%.6f'])
+    np.savetxt(path/'elementInfo.dat', np.c_[mesh.ele_tags, mesh.ele_nodes, mesh.mat_tags], fmt='%d')
+    bottom = mesh.node_tags[mesh.y == 0]
+    np.savetxt(path/'fixedNodeInfo.dat', bottom, fmt='%d')
+    left = mesh.node_tags[(mesh.x == 0) & (mesh.y > 0)]
+    np.savetxt(path/'EqualDOFnodes_01_Info.dat', np.c_[left, left+nx], fmt='%d')
+    (path/'readme.txt').write_text('copied')
+
+
+def test_coarsen_site_files(tmp_path):
+    nx = 3
+    mesh = _grid(nx, 8)
+    _write_site(tmp_path/'site', mesh, nx)
+    hmax = np.full(mesh.num_elements, 2.0)
+    eligible = np.ones(mesh.num_elements, dtype=bool)
+    report = coarsen_site_files(tmp_path/'site', tmp_path/'coarse', hmax, eligible, info=dict(fmax=5.0))
+    new = read_site_mesh(tmp_path/'coarse')
+    # whole rows are merged without hanging nodes, the equalDOF pairs of the removed side nodes are dropped
+    assert report['fmax'] == 5.0 and report['merged'] == 12 and report['hanging'] == 0
+    assert report['elements'] == [24, 12] and report['nodes'] == [36, 36-4*(nx+1)] and report['removed'] == 4*(nx+1)
+    assert report['dropped_rows'] == {'EqualDOFnodes_01_Info.dat': 4, 'fixedNodeInfo.dat': 0}
+    assert np.loadtxt(tmp_path/'coarse'/'EqualDOFnodes_01_Info.dat', dtype=int)[:, 0].tolist() == [9, 17, 25, 33]
+    assert np.isclose(_areas(new).sum(), _areas(mesh).sum()) and np.all(_areas(new) > 0)
+    assert (tmp_path/'coarse'/HANGING_NODE_INFO).read_text() == ''
+    assert (tmp_path/'coarse'/'readme.txt').read_text() == 'copied'
+    assert json.loads((tmp_path/'coarse'/'coarsen.json').read_text()) == report
@@ -0,0 +1,22 @@
+import numpy as np
+from EZSite.comm import _layout, _pack, _unpack
+
+
+def test_pack_round_trip():
+    arrays = dict(tags=np.array([[3, 7], [11, 2**40]], dtype=np.int64), values=np.array([0.5, -1.25]))
+    out = _unpack(_layout(arrays), _pack(arrays))
+    assert out['tags'].dtype == np.int64 and np.array_equal(out['tags'], arrays['tags'])
+    assert np.array_equal(out['values'], arrays['values'])
+
+
+def test_unpack_single_value():
+    # ops.recv/ops.Bcast return a float for a one value message, e.g. allgather_array of a 1-element array
+    arrays = dict(array=np.array([4.0]))
+    assert np.array_equal(_unpack(_layout(arrays), 4.0)['array'], [4.0])
+    stacked = dict(array=np.zeros((1, 1)))
+    assert _unpack(_layout(stacked), 2.5)['array'].shape == (1, 1)
+
+
+def test_unpack_empty():
+    arrays = dict(array=np.zeros((0, 2), dtype=np.int64))
+    assert _unpack(_layout(arrays), None)['array'].shape == (0, 2)
@@ -0,0 +1,81 @@
+import json
+from collections import namedtuple
+import numpy as np
+import pytest
+from EZSite.mesh import SiteMesh
+from EZSite.partition import material_costs
+from EZSite.costmodel import material_cost_key, load_material_costs, benchmark_materials, element_costs, _time_element
+
+
+PIMY = namedtuple('PIMY', ['SoilType', 'matTag', 'nd', 'rho', 'ShearModul', 'BulkModul', 'cohesion', 'peakShearStrain',
+                           'frictionAng', 'refPress', 'pressDependCoef', 'noYieldSurf', 'note'],
+                  defaults=['PressureIndependMultiYield', 0, 2, 1.9, 75000.0, 200000.0, 37.0, 0.1, 0.0, 100.0, 0.0, 20, None])
+PDMY02 = namedtuple('PDMY02', ['SoilType', 'matTag', 'nd', 'rho', 'ShearModul', 'BulkModul', 'frictionAng',
+                               'peakShearStrain', 'refPress', 'pressDependCoef', 'PTAng', 'contrac1', 'contrac3', 'dilat1',
+                               'dilat3', 'noYieldSurf', 'contrac2', 'dilat2', 'Liq1', 'Liq2', 'e', 'cs1', 'cs2', 'cs3', 'pa', 'note'],
+                    defaults=['PressureDependMultiYield02', 0, 2, 1.9, 75000.0, 200000.0, 33, 0.1, 80.0, 0.5, 27.0, 0.045,
+                              0.15, 0.06, 0.15, 20, 5.0, 3.0, 1.0, 0.0, 0.6, 0.9, 0.02, 0.7, 101.0, None])
+
+
+def test_material_costs_fit():
+    rng = np.random.default_rng(0)
+    truth = np.array([1.0, 3.0, 0.5])
+    counts = rng.integers(50, 200, size=(8, 3)).astype(float)
+    times = counts@truth
+    # more ranks than materials: a weak prior recovers the costs
+    assert np.allclose(material_costs(counts, times, ridge=1e-8), truth, rtol=1e-4)
+    # the default prior pulls towards the uniform cost but keeps the order
+    fitted = material_costs(counts, times)
+    assert np.argsort(fitted).tolist() == [2, 0, 1]
+    c0 = times.sum()/counts.sum()
+    assert np.abs(fitted-truth).max() < np.abs(c0-truth).max()
+
+
+def test_material_costs_prior():
+    counts = np.array([[100.0, 0.0, 50.0], [0.0, 100.0, 50.0]])
+    times = np.array([4.0, 2.0])
+    c0 = times.sum()/counts.sum()
+    # fewer ranks than materials: near uniform, the heavier rank's material costs more
+    costs = material_costs(counts, times)
+    assert costs[0] > c0 > costs[1] and abs(costs[2]-c0) < abs(costs[0]-c0)
+    assert np.allclose(material_costs(counts, times, ridge=1e8), c0, rtol=1e-3)
+    # costs are floored at 0.1*c0
+    assert material_costs(np.array([[100.0, 0.0], [100.0, 100.0]]), np.array([10.0, 1.0]), ridge=1e-8).min() == pytest.approx(0.1*11.0/300.0)
+
+
+def test_element_costs():
+    coords = [(0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1)]
+    mesh = SiteMesh([1, 2, 3, 4, 5, 6], coords, [1, 2, 3], [[1, 2, 5, 4], [2, 3, 6, 5], [1, 2, 5, 4]], [7, 2, 7])
+    assert element_costs(mesh, {7: 3.0, 2: 1.5}).tolist() == [3.0, 1.5, 3.0]
+    assert element_costs(mesh, {7: 3.0}, default=0.5).tolist() == [3.0, 0.5, 3.0]
+
+
+def test_material_cost_key():
+    prop = PIMY(matTag=1, note='silt')
+    # the tag and the note don't change the benchmark
+    assert material_cost_key(prop) == material_cost_key(prop._replace(matTag=5, note=None))
+    assert material_cost_key(prop) != material_cost_key(prop._replace(cohesion=20.0))
+
+
+def test_load_material_costs_cache(tmp_path):
+    props = dict(silt=PIMY(matTag=1), clay=PIMY(matTag=2, cohesion=60.0))
+    cache_path = tmp_path/'work'/'material_costs.json'
+    cache_path.parent.mkdir()
+    cache_path.write_text(json.dumps({material_cost_key(prop): cost for prop, cost in zip(props.values(), (2.0, 4.0))}))
+    # every material is cached: nothing is benchmarked
+    assert load_material_costs(props, cache_path=cache_path) == dict(silt=2.0, clay=4.0)
+
+
+def test_time_element():
+    elastic = _time_element(None, nstep=12)
+    plastic = _time_element(PDMY02(matTag=1), nstep=12)
+    assert plastic > elastic > 0.0
+
+
+def test_benchmark_materials(tmp_path):
+    props = dict(sand=PDMY02(matTag=1))
+    cache_path = tmp_path/'material_costs.json'
+    costs = load_material_costs(props, cache_path=cache_path, nstep=12, repeat=1)
+    assert list(costs) == ['sand'] and costs['sand'] > 1.0
+    assert json.loads(cache_path.read_text()) == {material_cost_key(props['sand']): costs['sand']}
+    assert benchmark_materials(props, nstep=12, repeat=1).keys() == {'sand'}
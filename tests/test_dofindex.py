@@ -0,0 +1,90 @@
+from collections import namedtuple
+from types import SimpleNamespace
+import numpy as np
+import pytest
+import openseespy.opensees as ops
+from EZSite.dofindex import DofIndex
+
+
+@pytest.fixture
+def two_quads():
+    # 4---5---6
+    # | 1 | 2 |
+    # 1---2---3   node 1 fixed, nodes 2-3 on rollers, solved once with RCM
+    ops.wipe()
+    ops.model('basic', '-ndm', 2, '-ndf', 2)
+    for tag, xy in enumerate([(0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1)], 1):
+        ops.node(tag, *map(float, xy))
+    ops.nDMaterial('ElasticIsotropic', 1, 1.0e4, 0.3)
+    ops.element('quad', 1, 1, 2, 5, 4, 1.0, 'PlaneStrain', 1)
+    ops.element('quad', 2, 2, 3, 6, 5, 1.0, 'PlaneStrain', 1)
+    ops.fix(1, 1, 1)
+    ops.fix(2, 0, 1)
+    ops.fix(3, 0, 1)
+    ops.timeSeries('Linear', 1)
+    ops.pattern('Plain', 1, 1)
+    ops.load(6, 1.0, 0.0)
+    ops.constraints('Plain')
+    ops.numberer('RCM')
+    ops.system('BandGeneral')
+    ops.algorithm('Linear')
+    ops.integrator('LoadControl', 1.0)
+    ops.analysis('Static')
+    yield
+    ops.wipe()
+
+
+def _brute_force(equation:int)->tuple[int,int]:
+    # the scan over all nodes of the original check_matrix_dof, constrained DOFs are numbered -1
+    if equation < 0:
+        return -1, -1
+    for tag in ops.getNodeTags():
+        dofs = ops.nodeDOFs(tag)
+        if equation in dofs:
+            return tag, dofs.index(equation)+1
+    return -1, -1
+
+
+def test_dof_index_lookup(two_quads):
+    index = DofIndex({1: 'clay', 2: 'sand'})
+    with pytest.raises(RuntimeError):
+        index.lookup(0)
+    assert ops.analyze(1) == 0
+    equations = np.arange(-1, ops.systemSize()+1)
+    nodes, dofs = index.lookup(equations)
+    assert list(zip(nodes.tolist(), dofs.tolist())) == [_brute_force(eq) for eq in equations.tolist()]
+    # every free DOF has one equation, 4 DOFs are fixed
+    assert sorted(zip(nodes[1:-1].tolist(), dofs[1:-1].tolist())) == [(2, 1), (3, 1)]+[(tag, dof) for tag in (4, 5, 6) for dof in (1, 2)]
+    assert index.summary()['constrained_dofs'] == 4 and index.summary()['equations'] == 8
+
+    entry, missing = index.describe([ops.nodeDOFs(5)[1], 99])
+    assert missing is None
+    assert (entry.NodeTag, entry.DOF, entry.Coords, entry.EleTags, entry.Layers) == (5, 2, [1.0, 1.0], [1, 2], ['clay', 'sand'])
+
+
+def test_dof_index_domain_change(two_quads):
+    index = DofIndex()
+    ops.analyze(1)
+    assert index.stale and index.lookup(0)[0][0] > 0 and not index.stale
+    # node 3 moves from a roller to a vertical slider, same equation count, the index is built again after domain_change
+    ops.remove('sp', 3, 2)
+    ops.fix(3, 1, 0)
+    index.domain_change()
+    assert index.stale
+    ops.analyze(1)
+    equations = np.arange(ops.systemSize())
+    assert index.lookup(equations)[0].tolist() == [_brute_force(eq)[0] for eq in equations.tolist()]
+    assert (3, 2) in zip(*(a.tolist() for a in index.lookup(equations))) and index.summary()['equations'] == 8
+
+
+def test_check_matrix_dof(two_quads):
+    try:
+        from SlopeAnalysis2D import SlopeAnalysis2D
+    except (ImportError, OSError) as error:
+        # opstool needs the X11/VTK libraries of its plotting backends
+        pytest.skip(f'SlopeAnalysis2D can not be imported: {error}')
+    site = SimpleNamespace(DofIndex=DofIndex(), NODE2=namedtuple('Node', ['tag', 'x', 'y']))
+    ops.analyze(1)
+    eq = ops.nodeDOFs(6)[0]
+    assert SlopeAnalysis2D.check_matrix_dof(site, eq) == (6, 2.0, 1.0)
+    assert SlopeAnalysis2D.check_matrix_dof(site, [eq, -1]) == [(6, 2.0, 1.0), None]
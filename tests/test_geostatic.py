@@ -0,0 +1,84 @@
+import json
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from loguru import logger
+from EZSite.mesh import SiteMesh
+from EZSite.geostatic import (poisson_ratio, rows_of, vertical_stress, hydrostatic_pore_pressure, geostatic_state,
+                              pressure_dependent_modulus)
+
+G = 9.81
+
+
+def _column()->SiteMesh:
+    # 5---6  y=0
+    # | 1 |     material 1
+    # 3---4  y=-1
+    # | 2 |     material 2
+    # 1---2  y=-3
+    # node 7 is not used by any element
+    coords = [(0, -3), (1, -3), (0, -1), (1, -1), (0, 0), (1, 0), (5, -2)]
+    return SiteMesh(np.arange(1, 8), coords, [1, 2], [[3, 4, 6, 5], [1, 2, 4, 3]], [1, 2])
+
+
+def test_poisson_ratio_and_rows_of():
+    assert np.allclose(poisson_ratio(3.0, 5.0), 0.25)
+    assert rows_of(np.array([30, 10, 20]), [20, 30, 10, 20]).tolist() == [2, 0, 1, 2]
+
+
+def test_vertical_stress():
+    sigma = vertical_stress(_column(), {1: 2.0, 2: 1.5}, g=G)
+    top, bottom = 2.0*G, 2.0*G+1.5*G*2
+    assert np.allclose(sigma, [bottom, bottom, top, top, 0.0, 0.0, 0.0])
+
+
+def test_hydrostatic_pore_pressure():
+    mesh = _column()
+    assert np.allclose(hydrostatic_pore_pressure(mesh, -0.5, gamma_w=G), G*np.array([2.5, 2.5, 0.5, 0.5, 0, 0, 1.5]))
+    # submerged surface: the drained surface nodes set the water table of their column
+    pore = hydrostatic_pore_pressure(mesh, 2.0, drained_tags=[5, 6], gamma_w=G)
+    assert np.allclose(pore[:6], G*np.array([3, 3, 1, 1, 0, 0])) and np.isclose(pore[6], 4.0*G)
+    # drained nodes above the water level are ignored
+    assert np.allclose(hydrostatic_pore_pressure(mesh, -0.5, drained_tags=[5], gamma_w=G)[:2], 2.5*G)
+
+
+def test_geostatic_state():
+    state = geostatic_state(_column(), {1: 2.0, 2: 1.5}, {1: 0.25, 2: 0.4}, -0.5, gamma_w=G, g=G)
+    assert state.NodeTags.tolist() == list(range(1, 8)) and state.EleTags.tolist() == [1, 2]
+    # the node without elements gets no pore pressure
+    assert state.PorePressure[6] == 0.0
+    sigma_v = np.array([0.5*(2.0*G), 0.5*(2.0*G+2.0*G+1.5*G*2)])
+    pore = np.array([0.25*G, 1.5*G])
+    effective = sigma_v-pore
+    k0 = np.array([0.25/0.75, 0.4/0.6])
+    assert np.allclose(state.EleStress, np.column_stack((-k0*effective, -effective, -k0*effective, np.zeros(2))))
+
+
+def test_pressure_dependent_modulus():
+    assert np.allclose(pressure_dependent_modulus(100.0, [25.0, 100.0, 400.0], 100.0, 0.5), [50.0, 100.0, 200.0])
+    # the mean stress is at least min_ratio*ref_press
+    assert np.allclose(pressure_dependent_modulus([100.0, 80.0], [0.0, -5.0], 100.0, [0.5, 1.0]), [10.0, 0.8])
+
+
+def test_gravity_init_saving(tmp_path):
+    try:
+        from SlopeAnalysis2D import SlopeAnalysis2D
+    except (ImportError, OSError) as error:
+        # opstool needs the X11/VTK libraries of its plotting backends
+        pytest.skip(f'SlopeAnalysis2D can not be imported: {error}')
+    site = SimpleNamespace(WorkDir=tmp_path/'work', PID=0, NP=1, DATA_PATH=tmp_path/'site', ElementType='quadUP')
+    messages = []
+    handler = logger.add(messages.append, format='{message}')
+    try:
+        SlopeAnalysis2D._log_gravity_init_saving(site, 'pore_pressure', 1.5)
+        SlopeAnalysis2D._log_gravity_init_saving(site, 'transient', 9.0)
+        site.NP = 2
+        SlopeAnalysis2D._log_gravity_init_saving(site, 'pore_pressure', 1.0)
+    finally:
+        logger.remove(handler)
+    assert 'run gravity_init=\'transient\' once' in messages[0]
+    assert 'measured saving of pore_pressure 7.50s against transient 9.00s' in messages[1]
+    # another rank count is another case
+    assert 'measured saving' not in messages[2]
+    times = json.loads((tmp_path/'work'/'gravity_init_rank000.json').read_text())
+    assert sorted(times.values(), key=len) == [dict(pore_pressure=1.0), dict(pore_pressure=1.5, transient=9.0)]
@@ -0,0 +1,85 @@
+import os
+import numpy as np
+import pytest
+import openseespy.opensees as ops
+from EZSite.sharedmesh import RecordView
+from EZSite.results import RecorderResults
+from EZSite.postprocess import nodal_fields
+
+DROPPED = ('FixedNodes_ALL', 'FixedBottomNodes_ALL', 'FixedSurfaceNodes_ALL', 'UndrainedNodes_ALL',
+           'FixedNodes', 'FixedBottomNodes', 'FixedSurfaceNodes', 'UndrainedNodes',
+           'eqDOF_nodes_01_list_ALL', 'eqDOF_nodes_02_list_ALL', 'eqDOF_nodes_Base_list_ALL',
+           'NodalMass_ALL', 'NodalMass', 'ConstraintPlan')
+
+
+@pytest.fixture(scope='module')
+def lean_model(tmp_path_factory):
+    try:
+        from SlopeAnalysis2D import SlopeAnalysis2D
+    except (ImportError, OSError) as error:
+        # opstool needs the X11/VTK libraries of its plotting backends
+        pytest.skip(f'SlopeAnalysis2D can not be imported: {error}')
+    cwd = os.getcwd()
+    # recorders and work_dir are relative to the working directory
+    os.chdir(tmp_path_factory.mktemp('lean'))
+    try:
+        yield SlopeAnalysis2D(WaterLevel=-6.0, LK_mode='distributed', side_support=True, lean=True, configure_log=False)
+    finally:
+        ops.wipe()
+        os.chdir(cwd)
+
+
+def test_parse_time_structures_dropped(lean_model):
+    model = lean_model
+    assert not [name for name in DROPPED if name in model.__dict__]
+    for records in (model.Nodes_ALL, model.Elements_ALL, model.Nodes, model.Elements):
+        assert isinstance(records, RecordView)
+    # the compact records still describe the OpenSees model(site nodes and the LK dashpot nodes)
+    assert sorted(model.Nodes_ALL.keys.tolist()) == sorted(ops.getNodeTags())
+    node = model.NodesDict_ALL[int(model.LKDashPot.BaseNodeTags[0])]
+    assert ops.nodeCoord(node.tag) == pytest.approx([node.x, node.y])
+    ele = model.Elements[len(model.Elements)//2]
+    assert list(ops.eleNodes(ele.tag)) == list(ele.nodes)
+
+
+def test_lk_dashpots_after_release(lean_model):
+    model = lean_model
+    distributed = model.LKDashPot
+    # the dropped fix and equalDOF records are read again from the site files
+    model._get_LK_boundary_property('distributed')
+    assert np.array_equal(model.LKDashPot.BaseNodeTags, distributed.BaseNodeTags)
+    assert np.allclose(model.LKDashPot.TributaryArea, distributed.TributaryArea)
+    model._get_LK_boundary_property('lumped')
+    assert model.LKDashPot.LeftCornerNode.tag in model.Nodes_ALL.keys
+    model.LKDashPot = distributed
+
+
+def test_side_supports_after_release(lean_model):
+    model = lean_model
+    # replaced before the release, fixed and unfixed again from the kept equalDOF lists
+    assert model.SideReactions.NodeTags.size > 0 and len(ops.getPatterns()) >= 2
+    fixed = model.fix_side_nodes('both')
+    assert fixed and all(1 in ops.getFixedDOFs(node) for node in fixed)
+    model.unfix_side_nodes('both')
+    assert all(1 not in ops.getFixedDOFs(node) for node in fixed)
+
+
+def test_recorders_after_release(lean_model):
+    model = lean_model
+    site_node_tags = np.array([node.tag for node in model.Nodes], dtype=np.int64)
+    assert np.all(model.get_vertical_effective_stress(site_node_tags) >= 0.0)
+    model.create_recorders(dT=0.01)
+    ops.pattern('UniformExcitation', 400, 1, '-vel', model.set_velocity_record(tsTag=100, dt=0.005))
+    ops.constraints('Penalty', 1.e20, 1.e20)
+    ops.test('RelativeNormDispIncr', 1e-4, 35, 0)
+    ops.algorithm('Newton')
+    ops.numberer(model.Numberer)
+    ops.system('ProfileSPD')
+    ops.integrator('Newmark', 0.5, 0.25)
+    ops.analysis('Transient')
+    assert ops.analyze(6, 0.005) == 0
+    assert nodal_fields(site_node_tags)['disp'].shape == (site_node_tags.size, 2)
+    # the recorder files are closed and complete once removed
+    ops.remove('recorders')
+    disp = RecorderResults.open('displacement.out', 'recorder_index.json')
+    assert disp.data.shape[0] >= 2 and set(site_node_tags.tolist()) <= set(disp.tags.tolist())
@@ -0,0 +1,84 @@
+import json
+import sys
+from datetime import datetime, timezone
+import pytest
+from loguru import logger
+from EZSite import logconfig
+from EZSite.logconfig import RateLimiter, StageLog, configure_logging, ensure_logging, hot_logging, STAGES
+
+
+@pytest.fixture
+def restore_logger():
+    configured = logconfig._CONFIGURED
+    yield
+    logger.configure(handlers=[dict(sink=sys.stderr)], extra=dict())
+    logconfig._CONFIGURED = configured
+    logconfig._HOT_LOOP_LOGGING = True
+    STAGES.limiter = None
+
+
+def _record(line:int, seconds:float)->dict:
+    return dict(name='site', function='build', line=line, time=datetime.fromtimestamp(seconds, tz=timezone.utc))
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(burst=2, period=10.0)
+    assert [limiter(_record(1, t)) for t in (0.0, 1.0, 2.0, 3.0)] == [True, True, False, False]
+    # another call site has its own window
+    assert limiter(_record(2, 3.0))
+    # a new window after the period
+    assert limiter(_record(1, 11.0)) and limiter(_record(1, 12.0)) and not limiter(_record(1, 13.0))
+    assert limiter.suppressed == {('site', 'build', 1): 3}
+
+
+def test_stage_log(tmp_path):
+    stages = StageLog()
+    handler = logger.add(stages.sink, level='INFO', format='{message}')
+    try:
+        with stages.stage('build'):
+            logger.info('one')
+            with stages.stage('gravity'):
+                logger.warning('two')
+                logger.debug('below the level')
+            logger.info('three')
+        with stages.stage('build'):
+            pass
+        logger.info('outside')
+    finally:
+        logger.remove(handler)
+    summary = stages.summary()
+    assert summary['build']['calls'] == 2 and summary['gravity']['calls'] == 1
+    assert summary['build']['records'] == {'INFO': 2} and summary['gravity']['records'] == {'WARNING': 1}
+    assert summary['other']['records'] == {'INFO': 1}
+    assert summary['build']['wall'] >= summary['gravity']['wall'] >= 0.0
+    assert json.loads(stages.write(tmp_path/'logs'/'stages.json').read_text())['gravity']['records'] == {'WARNING': 1}
+
+
+def test_production_json_lines(tmp_path, restore_logger):
+    configure_logging('production', log_dir=tmp_path, burst=2)
+    assert not hot_logging() and STAGES.limiter is not None
+    with STAGES.stage('json lines test'):
+        for i in range(5):
+            logger.info(f'repeated {i}')
+        logger.warning('once')
+    logger.remove()
+    records = [json.loads(line) for line in (tmp_path/'rank000.jsonl').read_text().splitlines()]
+    # the repeated call site is rate-limited in the file, every record is counted in the stage
+    assert [r['record']['message'] for r in records] == ['repeated 0', 'repeated 1', 'once']
+    assert all(r['record']['extra'] == dict(PID=0, NP=1) for r in records)
+    assert records[-1]['record']['level']['name'] == 'WARNING'
+    assert STAGES.summary()['json lines test']['records'] == {'INFO': 5, 'WARNING': 1}
+    assert sum(STAGES.limiter.suppressed.values()) == 3
+    with pytest.raises(ValueError):
+        configure_logging('verbose')
+
+
+def test_ensure_logging_keeps_handlers(restore_logger):
+    configure_logging('dev')
+    handler = logger.add(lambda message: None)
+    ensure_logging()
+    # a configured logger is left alone, the handler added by the caller survives
+    logger.remove(handler)
+    logconfig._CONFIGURED = False
+    logger.configure(handlers=[dict(sink=sys.stderr)])
+    assert ensure_logging() is STAGES and logconfig._CONFIGURED
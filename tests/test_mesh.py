@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from EZSite.mesh import SiteMesh, nine_node_connectivity, midside_tags
+
+
+def _two_quads()->SiteMesh:
+    # 4---5---6
+    # | 1 | 2 |
+    # 1---2---3
+    coords = [(0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1)]
+    return SiteMesh([1, 2, 3, 4, 5, 6], coords, [1, 2], [[1, 2, 5, 4], [2, 3, 6, 5]], [1, 1])
+
+
+def test_tag_lookup_range():
+    mesh = _two_quads()
+    assert mesh.index_of([6, 1]).tolist() == [5, 0]
+    # below 0, a gap inside the range and above the largest tag
+    assert mesh.has_nodes([-1, 0, 3, 7, 2**40]).tolist() == [False, False, True, False, False]
+    for tags in ([-1], [0], [7], [3, 2**40]):
+        with pytest.raises(KeyError):
+            mesh.index_of(tags)
+    with pytest.raises(KeyError):
+        mesh.coords_of([-6])
+    # a negative tag would wrap around the dense index
+    with pytest.raises(ValueError):
+        SiteMesh([1, 2, -1], [(0, 0), (1, 0), (2, 0)])
+
+
+def test_nine_node_connectivity():
+    mesh = _two_quads()
+    nine = nine_node_connectivity(mesh)
+    # 7 distinct edges and 2 centres, tags start at 10**digits of the max node tag
+    assert nine.EleNodes.shape == (2, 9)
+    assert nine.NodeTags.tolist() == list(range(10, 19))
+    assert np.array_equal(nine.EleNodes[:, :4], mesh.ele_nodes)
+    # the shared edge 2-5 has one mid-side node: edge 2-3(column 5) of element 1 and edge 4-1(column 7) of element 2
+    assert nine.EleNodes[0, 5] == nine.EleNodes[1, 7]
+    assert np.unique(nine.EleNodes[:, 4:8]).size == 7
+    coords = dict(zip(nine.NodeTags.tolist(), map(tuple, nine.Coords)))
+    assert coords[nine.EleNodes[0, 4]] == (0.5, 0.0)
+    assert coords[nine.EleNodes[0, 5]] == (1.0, 0.5)
+    assert coords[nine.EleNodes[1, 6]] == (1.5, 1.0)
+    assert coords[nine.EleNodes[0, 8]] == (0.5, 0.5) and coords[nine.EleNodes[1, 8]] == (1.5, 0.5)
+
+
+def test_nine_node_first_tag():
+    nine = nine_node_connectivity(_two_quads(), first_tag=100)
+    assert nine.NodeTags.min() == 100 and nine.EleNodes[:, 4:].min() == 100
+
+
+def test_midside_tags():
+    nine = nine_node_connectivity(_two_quads())
+    # either corner order, -1 for a diagonal or a pair of unconnected nodes
+    tags = midside_tags(nine, [2, 5, 1, 1, 3], [5, 2, 5, 3, 6])
+    assert tags[0] == tags[1] == nine.EleNodes[0, 5]
+    assert tags[2] == -1 and tags[3] == -1
+    assert tags[4] == nine.EleNodes[1, 5]
+
+
+def test_nine_node_patch():
+    # 9_4_QuadUP elements built from nine_node_connectivity(corners ndf 3, mid-side/centre nodes ndf 2, as in
+    # define_midside_nodes) reproduce a linear displacement field: a wrong node order gives wrong interior displacements
+    ops = pytest.importorskip('openseespy.opensees')
+    mesh = _two_quads()
+    nine = nine_node_connectivity(mesh)
+    ops.wipe()
+    ops.model('basic', '-ndm', 2, '-ndf', 3)
+    for tag, (x, y) in zip(mesh.node_tags.tolist(), mesh.coords.tolist()):
+        ops.node(tag, x, y)
+        ops.fix(tag, 0, 0, 1)
+    for tag, (x, y) in zip(nine.NodeTags.tolist(), nine.Coords.tolist()):
+        ops.node(tag, x, y, '-ndf', 2)
+    ops.nDMaterial('ElasticIsotropic', 1, 1.0e4, 0.3)
+    for tag, nodes in zip(mesh.ele_tags.tolist(), nine.EleNodes.tolist()):
+        ops.element('9_4_QuadUP', tag, *nodes, 1.0, 1, 2.2e6, 1.0, 1.0, 1.0, 0.0, 0.0)
+        assert ops.eleNodes(tag) == nodes
+    # the shared mid-side node of edge 2-5 and the centres are inside the patch, all other nodes are prescribed
+    inner = [int(nine.EleNodes[0, 5]), *nine.EleNodes[:, 8].tolist()]
+    field = lambda x, y: (1e-3*x+2e-3*y, -1e-3*x+3e-3*y)
+    ops.timeSeries('Linear', 1)
+    ops.pattern('Plain', 1, 1)
+    for tag in ops.getNodeTags():
+        if tag not in inner:
+            for dof, value in enumerate(field(*ops.nodeCoord(tag)), start=1):
+                ops.sp(tag, dof, value)
+    ops.constraints('Transformation')
+    ops.numberer('Plain')
+    ops.system('FullGeneral')
+    ops.test('NormDispIncr', 1e-12, 10)
+    ops.algorithm('Linear')
+    ops.integrator('LoadControl', 1.0)
+    ops.analysis('Static')
+    assert ops.analyze(1) == 0
+    for tag in inner:
+        assert np.allclose(ops.nodeDisp(tag)[:2], field(*ops.nodeCoord(tag)), atol=1e-12)
+    ops.wipe()
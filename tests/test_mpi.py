@@ -0,0 +1,27 @@
+# the scripts of tests/mpi run on 2 ranks(see the mpi_run fixture), every rank checks its part and prints ok
+
+
+def test_comm_ranks(mpi_run):
+    assert mpi_run('comm_ranks.py').count(' ok') == 2
+
+
+def test_lk_dashpots_ranks(mpi_run):
+    assert mpi_run('lk_dashpots_ranks.py').count(' ok') == 2
+
+
+def test_partition_ranks(mpi_run):
+    assert mpi_run('partition_ranks.py').count(' ok') == 2
+
+
+def test_builder_ranks(mpi_run, tmp_path):
+    from ops_parallel_demo import run_benchmark, scaling_report
+    assert mpi_run('builder_ranks.py', tmp_path).count(' ok') == 2
+    # the same benchmark in serial
+    run_benchmark(8, 4, tmp_path)
+    report = scaling_report(tmp_path, max_np=2)
+    assert report[2]['consistent'] and report[2]['max_rel_diff'] < 1e-8
+    assert sum(report[2]['ele_counts']) == 32 and min(report[2]['ele_counts']) > 0
+
+
+def test_rebalance_ranks(mpi_run):
+    assert mpi_run('rebalance_ranks.py').count(' ok') == 2
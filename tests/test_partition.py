@@ -0,0 +1,150 @@
+import numpy as np
+from EZSite.mesh import SiteMesh
+from EZSite.partition import (PartitionPlan, x_split_boundaries, refine_boundaries, split_mesh, membership,
+                              localize_hub_ties, plan_constraints, rank_plans, material_costs, node_weights, _part_masks)
+
+
+def _line_plan()->tuple[SiteMesh,PartitionPlan]:
+    # nodes 1-6 on a line, rank 0 holds 1-3 and rank 1 holds 3-6(node 3 on the split line)
+    mesh = SiteMesh(np.arange(1, 7), np.column_stack((np.arange(6.0), np.zeros(6))))
+    plan = PartitionPlan(2, np.array([0.0, 2.0, 5.0]), (np.array([1, 2, 3]), np.array([3, 4, 5, 6])), (np.zeros(0), np.zeros(0)))
+    return mesh, plan
+
+
+def _grid(nx:int, ny:int)->SiteMesh:
+    # unit quads, node tags row by row from the bottom left, element tags the same way
+    x, y = np.meshgrid(np.arange(nx+1.0), np.arange(ny+1.0))
+    tags = np.arange(1, x.size+1).reshape(x.shape)
+    ele_nodes = np.column_stack((tags[:-1, :-1].ravel(), tags[:-1, 1:].ravel(), tags[1:, 1:].ravel(), tags[1:, :-1].ravel()))
+    return SiteMesh(tags.ravel(), np.column_stack((x.ravel(), y.ravel())), np.arange(1, nx*ny+1), ele_nodes, np.ones(nx*ny))
+
+
+def _part_weights(mesh:SiteMesh, boundaries, weights)->list[float]:
+    return [weights[_part_masks(mesh, mesh.ele_node_index, boundaries[pid], boundaries[pid+1])[0]].sum()
+            for pid in range(len(boundaries)-1)]
+
+
+def test_plan_constraints():
+    mesh, plan = _line_plan()
+    constraints = plan_constraints(plan, mesh, [1, 3, 5], [[1, 2], [3, 4], [2, 5]])
+    # the lowest rank holding the node(s), node 3 on the split line goes to rank 0
+    assert constraints.FixOwner.tolist() == [0, 0, 1]
+    # 3-4 is only held together by rank 1, 2-5 by no rank: rank 0 owns it and has to add node 5
+    assert constraints.EqDOFOwner.tolist() == [0, 1, 0]
+    assert constraints.MissingNodes[0].tolist() == [5] and constraints.MissingNodes[1].size == 0
+    assert constraints.Counts.tolist() == [[2, 2, 1], [1, 1, 0]]
+
+
+def test_plan_constraints_empty():
+    mesh, plan = _line_plan()
+    constraints = plan_constraints(plan, mesh, [], np.zeros((0, 2)))
+    assert constraints.FixOwner.size == 0 and constraints.EqDOFOwner.size == 0
+    assert constraints.Counts.tolist() == [[0, 0, 0], [0, 0, 0]]
+
+
+def test_split_mesh_membership():
+    mesh = _grid(8, 2)
+    plan = split_mesh(mesh, 3)
+    assert plan.Boundaries.tolist() == x_split_boundaries(mesh.x, 3).tolist()
+    member = membership(plan, mesh)
+    for pid in range(3):
+        assert mesh.node_tags[member[pid]].tolist() == sorted(plan.NodeTags[pid].tolist())
+        # same rule as SlopeAnalysis2D: at least 2 nodes in the x range, the other nodes of the element are added
+        xmin, xmax = plan.Boundaries[pid], plan.Boundaries[pid+1]
+        inside = ((mesh.x >= xmin) & (mesh.x <= xmax))[mesh.ele_node_index].sum(axis=1) >= 2
+        assert plan.EleTags[pid].tolist() == mesh.ele_tags[inside].tolist()
+        assert member[pid, mesh.ele_node_index[inside]].all()
+    # every node and element is in a part, the elements on both sides of a split line are shared
+    assert member.any(axis=0).all()
+    assert np.unique(np.concatenate(plan.EleTags)).size == mesh.num_elements
+    assert np.unique(mesh.x[member.sum(axis=0) > 1]).tolist() == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+
+
+def test_rebalanced_split_coverage():
+    # serial version of tests/mpi/rebalance_ranks.py, the elements right of x=6 are 3 times as expensive
+    mesh = _grid(8, 2)
+    mesh.mat_tags[:] = np.where(mesh.x[mesh.ele_node_index].min(axis=1) >= 6.0, 2, 1)
+    mats = np.unique(mesh.mat_tags)
+    before = split_mesh(mesh, 2)
+    counts = np.array([np.bincount(np.searchsorted(mats, mesh.mat_tags[tags-1]), minlength=mats.size)
+                       for tags in before.EleTags], dtype=float)
+    costs = material_costs(counts, counts@[1.0, 3.0])
+    plan = split_mesh(mesh, 2, node_weights(mesh, costs[np.searchsorted(mats, mesh.mat_tags)]))
+    assert plan.Boundaries[1] > before.Boundaries[1]
+    # every element is held, only the elements along the split line by both ranks
+    held = np.isin(mesh.ele_tags, plan.EleTags[0]).astype(int)+np.isin(mesh.ele_tags, plan.EleTags[1])
+    assert (held >= 1).all()
+    assert np.array_equal(held == 2, (mesh.x[mesh.ele_node_index] == plan.Boundaries[1]).sum(axis=1) == 2)
+
+
+def test_refine_boundaries():
+    # the heavy right column is added to rank 0 with the elements crossing the cumulative split line x=5
+    mesh = _grid(6, 1)
+    weights = np.where(mesh.x == 6.0, 8.0, 1.0)
+    boundaries = x_split_boundaries(mesh.x, 2, weights)
+    assert boundaries.tolist() == [0.0, 5.0, 6.0]
+    refined = refine_boundaries(mesh, boundaries, weights)
+    assert refined.tolist() == [0.0, 4.0, 6.0]
+    assert _part_weights(mesh, boundaries, weights) == [28.0, 20.0]
+    assert _part_weights(mesh, refined, weights) == [12.0, 22.0]
+    assert split_mesh(mesh, 2, weights).Boundaries.tolist() == refined.tolist()
+
+
+def test_refine_boundaries_keeps_order():
+    mesh = _grid(12, 2)
+    weights = np.random.default_rng(0).uniform(0.5, 4.0, mesh.num_nodes)
+    for NP in (2, 3, 4):
+        boundaries = x_split_boundaries(mesh.x, NP, weights)
+        refined = refine_boundaries(mesh, boundaries, weights)
+        assert refined[0] == boundaries[0] and refined[-1] == boundaries[-1]
+        assert (np.diff(refined) > 0).all() and np.isin(refined, mesh.x).all()
+        assert max(_part_weights(mesh, refined, weights)) <= max(_part_weights(mesh, boundaries, weights))
+
+
+def test_localize_hub_ties():
+    # base nodes 2-10 tied to the left corner node 1, split into 3 parts
+    mesh = _grid(9, 1)
+    member = membership(split_mesh(mesh, 3), mesh)
+    pairs = np.column_stack((np.ones(9, dtype=int), np.arange(2, 11)))
+    local = localize_hub_ties(pairs, mesh, member)
+    # every base node is still constrained once, the global hub is never constrained
+    assert sorted(local[:, 1].tolist()) == list(range(2, 11))
+    # every tie lies in one rank
+    held = member[:, mesh.index_of(local[:, 0])] & member[:, mesh.index_of(local[:, 1])]
+    assert held.any(axis=0).all()
+    # the local hubs are chained back to the global hub
+    retained = dict(zip(local[:, 1].tolist(), local[:, 0].tolist()))
+    for tag in range(2, 11):
+        while tag != 1:
+            tag = retained[tag]
+    assert np.unique(local[:, 0]).size == 3
+
+
+def test_localize_hub_ties_unchanged():
+    mesh = _grid(9, 1)
+    pairs = np.column_stack((np.ones(9, dtype=int), np.arange(2, 11)))
+    assert np.array_equal(localize_hub_ties(pairs, mesh, membership(split_mesh(mesh, 1), mesh)), pairs)
+    # more than one hub
+    pairs[0, 0] = 11
+    assert np.array_equal(localize_hub_ties(pairs, mesh, membership(split_mesh(mesh, 3), mesh)), pairs)
+
+
+def test_rank_plans():
+    mesh = _grid(9, 2)
+    plan = split_mesh(mesh, 3)
+    member = membership(plan, mesh)
+    base = np.arange(1, 11)
+    pairs = localize_hub_ties(np.column_stack((np.ones(9, dtype=int), base[1:])), mesh, member)
+    constraints = plan_constraints(plan, mesh, base, pairs)
+    plans = rank_plans(plan, mesh, constraints)
+    assert [p.PID for p in plans] == [0, 1, 2]
+    for p in plans:
+        assert np.array_equal(p.NodeTags, plan.NodeTags[p.PID]) and np.array_equal(p.EleTags, plan.EleTags[p.PID])
+        assert np.array_equal(p.LowestRank, np.argmax(member[:, mesh.index_of(p.NodeTags)], axis=0))
+        assert (p.LowestRank <= p.PID).all()
+    # every constraint is owned by one rank
+    assert np.sum([p.FixOwned for p in plans], axis=0).tolist() == [1]*base.size
+    assert np.sum([p.EqDOFOwned for p in plans], axis=0).tolist() == [1]*len(pairs)
+    assert all(p.MissingNodes.size == 0 for p in plans)
+    # without a constraint plan
+    assert all(p.FixOwned.size == 0 and p.EqDOFPairs.shape == (0, 2) for p in rank_plans(plan, mesh))
@@ -0,0 +1,84 @@
+import numpy as np
+from EZSite.mesh import SiteMesh
+from EZSite.postprocess import AsyncResponseWriter, Snapshot
+from EZSite.results import RecorderResults, convert_recorder
+from EZSite.plotting import QuadMeshPlotter, render_frames, frames_from_recorders, frames_from_snapshots
+
+
+def _mesh()->SiteMesh:
+    # 2x2 quads, node tags not in row order
+    # 17--18--19
+    # |13 |14 |
+    # 4---5---6
+    # |11 |12 |
+    # 1---2---3
+    node_tags = [19, 1, 2, 3, 4, 5, 6, 17, 18]
+    coords = [(2, 2), (0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1), (0, 2), (1, 2)]
+    ele_nodes = [[1, 2, 5, 4], [2, 3, 6, 5], [4, 5, 18, 17], [5, 6, 19, 18]]
+    return SiteMesh(node_tags, coords, [11, 12, 13, 14], ele_nodes, [1, 1, 2, 2])
+
+
+def _row(mesh:SiteMesh, tag:int)->int:
+    return int(np.flatnonzero(mesh.node_tags == tag)[0])
+
+
+def test_plotter(tmp_path):
+    mesh = _mesh()
+    plotter = QuadMeshPlotter(mesh, figsize=(4, 3), dpi=50)
+    nodal = plotter.to_mesh_order([3, 19, 99], [3.0, 19.0, 99.0])
+    # tags not in the mesh are skipped, the others land on their mesh rows
+    assert nodal[_row(mesh, 3)] == 3.0 and nodal[_row(mesh, 19)] == 19.0 and np.isnan(nodal).sum() == 7
+    assert plotter.nodal_to_element(mesh.node_tags.astype(float)).tolist() == [3.0, 4.0, 11.0, 12.0]
+    disp = np.zeros((mesh.num_nodes, 2))
+    disp[_row(mesh, 19)] = (0.5, 0.0)
+    file_path = plotter.save(tmp_path/'frame.png', disp=disp, nodal=mesh.node_tags.astype(float), title='t')
+    assert file_path.read_bytes()[:8] == b'\x89PNG\r\n\x1a\n'
+    # the deformed vertices follow the element connectivity
+    assert plotter.collection.get_paths()[3].vertices[2].tolist() == [2.5, 2.0]
+    assert plotter.collection.get_array().tolist() == [3.0, 4.0, 11.0, 12.0]
+
+
+def test_render_frames(tmp_path):
+    mesh = _mesh()
+    frames = [dict(nodal=np.full(mesh.num_nodes, float(i)), title=f'{i}') for i in range(3)]
+    files = render_frames(mesh, frames, tmp_path/'frames', processes=2, figsize=(4, 3), dpi=40)
+    assert [f.name for f in files] == ['frame_00000.png', 'frame_00001.png', 'frame_00002.png']
+    assert all(f.stat().st_size > 0 for f in files)
+
+
+def test_frames_from_recorders(tmp_path):
+    mesh = _mesh()
+    # recorder order differs from the mesh order, tag 7 is a dashpot node outside the mesh
+    tags = [2, 19, 7]
+    steps = np.arange(4)
+    out_path = tmp_path/'displacement.out'
+    np.savetxt(out_path, np.column_stack([0.1*steps, *[10*t+c+steps for t in tags for c in range(2)]]))
+    disp = RecorderResults(convert_recorder(out_path), tags)
+    strain_path = tmp_path/'strain.out'
+    np.savetxt(strain_path, np.column_stack([0.1*steps, *[100*t+c+steps for t in (14, 11) for c in range(3)]]))
+    strain = RecorderResults(convert_recorder(strain_path), [14, 11])
+    frames = frames_from_recorders(mesh, disp, strain, every=2)
+    assert len(frames) == 2 and [frame['title'] for frame in frames] == ['t = 0.000 s', 't = 0.200 s']
+    assert frames[1]['disp'][_row(mesh, 19)].tolist() == [192.0, 193.0]
+    assert frames[1]['disp'][_row(mesh, 2)].tolist() == [22.0, 23.0]
+    assert np.count_nonzero(frames[1]['disp']) == 4
+    elemental = frames[1]['elemental']
+    assert elemental[3] == 1404.0 and elemental[0] == 1104.0 and np.isnan(elemental[1:3]).all()
+
+
+def test_frames_from_snapshots(tmp_path):
+    mesh = _mesh()
+    # two ranks share node 5
+    for rank, tags in enumerate(([1, 2, 5], [5, 6, 19])):
+        writer = AsyncResponseWriter(tmp_path/f'resp-PID{rank}', tags, chunk_size=2, compress=False)
+        for step in range(3):
+            pore = np.array(tags, dtype=float)+step
+            writer.submit(Snapshot(step, 0.01*step, np.full((3, 2), float(rank)), pore))
+        writer.close()
+    frames = frames_from_snapshots(mesh, str(tmp_path/'resp-PID*_chunk*.npz'), field='excess_pore', scale=2.0)
+    assert len(frames) == 3 and frames[2]['title'] == 'step 2, t = 0.020 s'
+    nodal = frames[2]['nodal']
+    assert nodal[_row(mesh, 19)] == 2.0 and nodal[_row(mesh, 1)] == 2.0 and np.isnan(nodal[_row(mesh, 17)])
+    assert frames[0]['disp'][_row(mesh, 6)].tolist() == [1.0, 1.0] and frames[0]['scale'] == 2.0
+    pore = frames_from_snapshots(mesh, str(tmp_path/'resp-PID*_chunk*.npz'))
+    assert pore[1]['nodal'][_row(mesh, 5)] == 6.0
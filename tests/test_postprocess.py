@@ -0,0 +1,96 @@
+import threading
+import numpy as np
+import pytest
+from EZSite.postprocess import AsyncResponseWriter, OnlineReducer, Snapshot
+
+
+def _snapshot(step:int, n:int = 3)->Snapshot:
+    return Snapshot(step, 0.01*step, np.full((n, 2), float(step)), np.full(n, float(step)))
+
+
+def test_writer_chunks(tmp_path):
+    with AsyncResponseWriter(tmp_path/'resp', np.arange(1, 4), chunk_size=2) as writer:
+        for step in range(5):
+            writer.submit(_snapshot(step))
+    chunks = sorted(tmp_path.glob('resp_chunk*.npz'))
+    assert len(chunks) == 3 and writer.count == 5
+    assert np.load(chunks[0])['step'].tolist() == [0, 1]
+    last = np.load(chunks[-1])
+    assert last['disp'].shape == (1, 3, 2) and np.allclose(last['pore'], 4.0)
+    # peak values are reduced by the caller, the writer writes no summary
+    assert not list(tmp_path.glob('resp_summary*'))
+
+
+def test_failed_writer_does_not_block(tmp_path):
+    writer = AsyncResponseWriter(tmp_path/'resp', np.arange(1, 4), maxsize=1, chunk_size=1, timeout=0.05)
+    release = threading.Event()
+
+    def failing_flush():
+        release.wait(5)
+        raise OSError('disk full')
+
+    writer._flush = failing_flush
+    writer.submit(_snapshot(0))
+    release.set()
+    # the queue holds one snapshot, a dead worker would block the second submit or sync for ever
+    with pytest.raises(RuntimeError):
+        for step in range(1, 20):
+            writer.submit(_snapshot(step))
+        writer.sync()
+    with pytest.raises(RuntimeError):
+        writer.close()
+
+
+def test_online_reducer():
+    history = np.array([[[0.0, 1.0], [2.0, -1.0]], [[-3.0, 1.0], [1.0, 4.0]], [[1.0, 2.0], [2.0, 0.0]]])
+    reducer = OnlineReducer(disp=(2, 2), pore=2)
+    for step, disp in enumerate(history):
+        reducer.update(0.1*step, disp=disp, pore=disp[:, 0].tolist())
+    summary = reducer.summary()
+    assert np.array_equal(summary['disp_max'], history.max(axis=0))
+    assert np.array_equal(summary['disp_min'], history.min(axis=0))
+    assert np.array_equal(summary['disp_absmax'], np.abs(history).max(axis=0))
+    assert np.allclose(summary['disp_rms'], np.sqrt((history**2).mean(axis=0)))
+    assert np.array_equal(summary['disp_permanent'], history[-1]-history[0])
+    assert np.array_equal(summary['pore_final'], history[-1, :, 0])
+    assert summary['disp_count'] == 3 and np.allclose(summary['time_range'], [0.0, 0.2])
+
+
+def test_online_reducer_save(tmp_path):
+    values = np.arange(12.0).reshape(4, 3)*[1, -1, 1]
+    reducer = OnlineReducer(u=3)
+    for step, value in enumerate(values):
+        reducer.update(step, u=value)
+    saved = np.load(reducer.save(tmp_path/'summary', tags=np.arange(3)))
+    assert np.array_equal(saved['u_initial'], values[0]) and np.array_equal(saved['u_permanent'], values[-1]-values[0])
+    assert saved['tags'].tolist() == [0, 1, 2] and saved['u_count'] == 4
+
+
+def test_online_reducer_state():
+    # a reducer continued from the state of the first steps ends where one reducer over all steps ends
+    values = np.arange(12.0).reshape(4, 3)*[1, -1, 1]
+    whole, first = OnlineReducer(u=3), OnlineReducer(u=3)
+    for step, value in enumerate(values):
+        whole.update(step, u=value)
+        if step < 2:
+            first.update(step, u=value)
+    second = OnlineReducer(u=3)
+    second.load_state(first.state())
+    for step, value in enumerate(values[2:], start=2):
+        second.update(step, u=value)
+    for name, value in whole.summary().items():
+        assert np.array_equal(second.summary()[name], value), name
+
+
+def test_writer_sync_resume(tmp_path):
+    # sync writes the partial chunk, a resumed writer continues the chunk numbering
+    with AsyncResponseWriter(tmp_path/'resp', np.arange(1, 4), chunk_size=2) as writer:
+        for step in range(3):
+            writer.submit(_snapshot(step))
+        state = writer.sync()
+    assert state == dict(chunk=2, count=3)
+    with AsyncResponseWriter(tmp_path/'resp', np.arange(1, 4), chunk_size=2) as writer:
+        writer.resume(state)
+        writer.submit(_snapshot(3))
+    chunks = sorted(tmp_path.glob('resp_chunk*.npz'))
+    assert [np.load(chunk)['step'].tolist() for chunk in chunks] == [[0, 1], [2], [3]] and writer.count == 4
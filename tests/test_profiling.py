@@ -0,0 +1,75 @@
+import json
+import re
+import openseespy.opensees as ops
+from EZSite.profiling import StageProfiler, PROFILER, profile_stage, folded_stacks
+
+
+@profile_stage()
+def _build(n:int)->None:
+    ops.wipe()
+    ops.model('basic', '-ndm', 2, '-ndf', 2)
+    for tag in range(1, n+1):
+        ops.node(tag, float(tag), 0.0)
+    _fix(n)
+
+
+@profile_stage('fixes')
+def _fix(n:int)->None:
+    for tag in range(1, n+1):
+        ops.fix(tag, 1, 1)
+
+
+def test_disable_restores_opensees():
+    original = {name: getattr(ops, name) for name in dir(ops) if not name.startswith('_')}
+    profiler = StageProfiler()
+    profiler.enable(memory=False)
+    try:
+        assert ops.node is not original['node'] and ops.node.__wrapped__ is original['node']
+        # enabling twice doesn't wrap the wrappers
+        profiler.enable(memory=False)
+        assert ops.node.__wrapped__ is original['node']
+    finally:
+        profiler.disable()
+    assert not profiler.enabled
+    assert all(getattr(ops, name) is func for name, func in original.items())
+
+
+def test_stage_stats_and_folded_stacks():
+    PROFILER.enable(memory=True)
+    try:
+        _build(20)
+        _build(10)
+    finally:
+        PROFILER.disable()
+        stats, PROFILER.stats = PROFILER.stats, dict()
+        ops.wipe()
+    assert set(stats) == {('_build',), ('_build', 'fixes')}
+    assert stats[('_build',)]['calls'] == 2 and stats[('_build',)]['ops']['node'][0] == 30
+    assert stats[('_build', 'fixes')]['ops'] == {'fix': [30, stats[('_build', 'fixes')]['ops']['fix'][1]]}
+    assert stats[('_build',)]['wall'] >= stats[('_build', 'fixes')]['wall']
+
+    report = json.loads(json.dumps({';'.join(path): dict(entry, ops={k: list(v) for k, v in entry['ops'].items()})
+                                    for path, entry in stats.items()}))
+    lines = folded_stacks(report, 'rank3')
+    assert lines and all(re.fullmatch(r'rank3(;[\w.]+)+ [1-9]\d*', line) for line in lines)
+    assert any(line.startswith('rank3;_build;fixes;ops.fix ') for line in lines)
+    # self times: the stacks add up to the wall time of the outer stage
+    total = sum(int(line.rpartition(' ')[2]) for line in lines)
+    assert abs(total-stats[('_build',)]['wall']*1e6) <= 10
+
+
+def test_write(tmp_path):
+    profiler = StageProfiler()
+    profiler.enable(memory=False)
+    try:
+        profiler.start('outer')
+        ops.wipe()
+        ops.model('basic', '-ndm', 2, '-ndf', 2)
+        ops.node(1, 0.0, 0.0)
+        profiler.stop()
+    finally:
+        profiler.disable()
+        ops.wipe()
+    folded, stats = profiler.write(tmp_path/'logs'/'profile')
+    assert json.loads(stats.read_text())['0']['outer']['ops']['node'][0] == 1
+    assert all(line.startswith('rank0;outer') for line in folded.read_text().splitlines())
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from EZSite.mesh import SiteMesh
+from EZSite.renumber import (rcm_order, node_order, renumber_map, renumber_tags, profile_and_bandwidth,
+                             renumber_site_files, load_renumber_map, RENUMBER_MAP)
+
+
+def _shuffled_grid(nx:int = 6, ny:int = 3, seed:int = 0)->SiteMesh:
+    # unit quad grid with scattered node tags, a second separate grid and a node without elements
+    rng = np.random.default_rng(seed)
+    x, y = np.meshgrid(np.arange(nx+1.0), np.arange(ny+1.0))
+    rows = np.arange(x.size).reshape(x.shape)
+    quads = np.column_stack((rows[:-1, :-1].ravel(), rows[:-1, 1:].ravel(), rows[1:, 1:].ravel(), rows[1:, :-1].ravel()))
+    coords = np.r_[np.column_stack((x.ravel(), y.ravel())), np.column_stack((x.ravel()+20.0, y.ravel())), [[50.0, 50.0]]]
+    quads = np.r_[quads, quads+x.size]
+    tags = 3*rng.permutation(coords.shape[0])+7
+    return SiteMesh(tags, coords, 5*rng.permutation(len(quads))+2, tags[quads], np.ones(len(quads)))
+
+
+def _edges(ele_nodes:np.ndarray)->set:
+    return {tuple(sorted((a, b))) for row in ele_nodes.tolist() for a in row for b in row if a != b}
+
+
+@pytest.mark.parametrize('method', ['rcm', 'hilbert'])
+def test_renumber_map_bijection(method):
+    mesh = _shuffled_grid()
+    order = node_order(mesh, method)
+    assert sorted(order.tolist()) == list(range(mesh.num_nodes))
+    tag_map = renumber_map(mesh, method)
+    assert sorted(tag_map.NodeNew.tolist()) == list(range(1, mesh.num_nodes+1))
+    assert sorted(tag_map.EleNew.tolist()) == list(range(1, mesh.num_elements+1))
+    # the node without elements is numbered last
+    assert tag_map.NodeNew[np.argmax(mesh.y)] == mesh.num_nodes
+    # same connectivity and coordinates under the new tags, and back again
+    new_nodes = renumber_tags(tag_map.NodeOld, tag_map.NodeNew, mesh.ele_nodes)
+    assert np.array_equal(renumber_tags(tag_map.NodeNew, tag_map.NodeOld, new_nodes), mesh.ele_nodes)
+    renumbered = SiteMesh(tag_map.NodeNew, mesh.coords, tag_map.EleNew, new_nodes)
+    assert np.array_equal(renumbered.coords_of(renumber_tags(tag_map.NodeOld, tag_map.NodeNew, mesh.node_tags)), mesh.coords)
+    old_of = dict(zip(tag_map.NodeNew.tolist(), tag_map.NodeOld.tolist()))
+    assert {tuple(sorted((old_of[a], old_of[b]))) for a, b in _edges(new_nodes)} == _edges(mesh.ele_nodes)
+
+
+def test_rcm_profile():
+    mesh = _shuffled_grid(12, 4)
+    order = rcm_order(mesh)
+    assert sorted(order.tolist()) == list(range(mesh.num_nodes))
+    before, after = profile_and_bandwidth(mesh), profile_and_bandwidth(mesh, node_order(mesh, 'rcm'))
+    assert after['bandwidth'] < before['bandwidth'] and after['profile'] < before['profile']
+
+
+def test_renumber_site_files(tmp_path):
+    mesh = _shuffled_grid()
+    src = tmp_path/'site'
+    src.mkdir()
+    with open(src/'nodeInfo.dat', 'w') as f:
+        f.writelines(f'{tag} {x:.3f} {y:.3f}\n' for tag, (x, y) in zip(mesh.node_tags, mesh.coords))
+    with open(src/'elementInfo.dat', 'w') as f:
+        f.writelines(f'{tag} ' + ' '.join(map(str, nodes)) + ' 1\n' for tag, nodes in zip(mesh.ele_tags, mesh.ele_nodes))
+    base = mesh.node_tags[mesh.y == 0.0]
+    with open(src/'fixedNodeInfo.dat', 'w') as f:
+        f.writelines(f'{tag}  1 1 0\n' for tag in base)
+    with open(src/'EqualDOFnodes_Base_Info.dat', 'w') as f:
+        f.writelines(f'{base[0]} {tag}  1\n' for tag in base[1:])
+    (src/'notes.txt').write_text('copied')
+
+    report = renumber_site_files(src, tmp_path/'rcm')
+    assert report['after']['profile'] < report['before']['profile']
+    tag_map = load_renumber_map(tmp_path/'rcm'/RENUMBER_MAP)
+    nodes = np.loadtxt(tmp_path/'rcm'/'nodeInfo.dat')
+    assert nodes[:, 0].tolist() == list(range(1, mesh.num_nodes+1))
+    old = renumber_tags(tag_map.NodeNew, tag_map.NodeOld, nodes[:, 0])
+    assert np.allclose(nodes[:, 1:], mesh.coords_of(old))
+    elements = np.loadtxt(tmp_path/'rcm'/'elementInfo.dat', dtype=np.int64)
+    old_ele = renumber_tags(tag_map.EleNew, tag_map.EleOld, elements[:, 0])
+    ele_nodes = dict(zip(mesh.ele_tags.tolist(), mesh.ele_nodes.tolist()))
+    assert renumber_tags(tag_map.NodeNew, tag_map.NodeOld, elements[:, 1:5]).tolist() == [ele_nodes[tag] for tag in old_ele.tolist()]
+    fixed = np.loadtxt(tmp_path/'rcm'/'fixedNodeInfo.dat', dtype=np.int64)
+    assert np.array_equal(renumber_tags(tag_map.NodeNew, tag_map.NodeOld, fixed[:, 0]), base) and (fixed[:, 1:] == [1, 1, 0]).all()
+    pairs = np.loadtxt(tmp_path/'rcm'/'EqualDOFnodes_Base_Info.dat', dtype=np.int64)
+    assert np.array_equal(renumber_tags(tag_map.NodeNew, tag_map.NodeOld, pairs[:, :2]),
+                          np.column_stack((np.full(base.size-1, base[0]), base[1:])))
+    assert (tmp_path/'rcm'/'notes.txt').read_text() == 'copied'
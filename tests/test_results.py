@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from EZSite.results import RecorderResults, convert_recorder, write_recorder_index
+
+
+def _recorder(tmp_path, tags=(5, 2, 9), ncomp:int = 2, nstep:int = 4):
+    # value of tag t, component c at step s: 100*t+10*c+s, the time column is 0.1*s
+    steps = np.arange(nstep)
+    values = [100*t+10*c+steps for t in tags for c in range(ncomp)]
+    out_path = tmp_path/'displacement.out'
+    np.savetxt(out_path, np.column_stack([0.1*steps, *values]))
+    write_recorder_index({out_path.name: {'kind': 'node', 'tags': list(tags), 'ncomp': ncomp}}, tmp_path/'index.json')
+    return out_path
+
+
+def test_column_layout(tmp_path):
+    results = RecorderResults.open(_recorder(tmp_path), tmp_path/'index.json', chunk_rows=3)
+    assert results.data.flags.f_contiguous and results.data.shape == (4, 7)
+    # column groups follow the recorder tag order, not the tag values
+    assert results.columns(2).tolist() == [3, 4]
+    assert results.columns([9, 5], comp=1).tolist() == [6, 2]
+    assert np.allclose(results.time, [0.0, 0.1, 0.2, 0.3])
+    assert np.array_equal(results.history(9, comp=0), 900+np.arange(4))
+    assert results.history(2).shape == (4, 2)
+
+
+def test_snapshot_and_envelope(tmp_path):
+    results = RecorderResults(convert_recorder(_recorder(tmp_path)), [5, 2, 9])
+    # ncomp inferred from the column count, the closest recorded step to t
+    assert results.ncomp == 2
+    assert np.array_equal(results.snapshot(0.19), [[502, 512], [202, 212], [902, 912]])
+    vmin, vmax = results.envelope([2], comp=1)
+    assert vmin.tolist() == [[210]] and vmax.tolist() == [[213]]
+
+
+def test_layout_errors(tmp_path):
+    npy_path = convert_recorder(_recorder(tmp_path))
+    with pytest.raises(ValueError):
+        RecorderResults(npy_path, [5, 2, 9, 4])
+    with pytest.raises(ValueError):
+        RecorderResults(npy_path, [5, 2, 9], ncomp=3)
+    with pytest.raises(KeyError):
+        RecorderResults(npy_path, [5, 2, 9]).columns([3])
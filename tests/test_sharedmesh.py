@@ -0,0 +1,90 @@
+import os
+import sys
+from collections import namedtuple
+from multiprocessing import resource_tracker
+import numpy as np
+import pytest
+from EZSite.sharedmesh import SharedArrays, RecordView, RecordMapping, record_nbytes, share_site_tables
+
+
+Node = namedtuple('Node', ('tag', 'x', 'y'))
+
+
+def _tables()->dict:
+    return dict(node_tags=np.array([3, 7, 5], dtype=np.int64),
+                node_coords=np.array([[0.0, 0.0], [1.0, 0.5], [2.0, 1.0]]),
+                empty=np.empty((0, 2)))
+
+
+def test_create_attach_unlink():
+    prefix = f'eztest{os.getpid()}'
+    tables = _tables()
+    shared = SharedArrays.create(prefix, **tables)
+    try:
+        attached = SharedArrays.attach(prefix)
+        # attaching in the creating process unregisters the creator's blocks from the resource tracker,
+        # register them again so that unlink doesn't leave a KeyError in the tracker
+        for block in attached.blocks.values():
+            resource_tracker.register(block._name, 'shared_memory')
+        assert not attached.owner and list(attached) == ['node_tags', 'node_coords', 'empty']
+        for name, array in tables.items():
+            assert attached[name].dtype == array.dtype and np.array_equal(attached[name], array)
+            assert not attached[name].flags.writeable
+        assert attached.nbytes == shared.nbytes == sum(array.nbytes for array in tables.values())
+        with pytest.raises(ValueError):
+            attached['node_tags'][0] = 1
+    finally:
+        shared.unlink()
+    assert not shared.owner
+    # the names are gone, the mapped views stay valid
+    with pytest.raises(FileNotFoundError):
+        SharedArrays.attach(prefix)
+    assert attached['node_tags'].tolist() == [3, 7, 5]
+    shared.unlink()
+
+
+def test_share_site_tables_serial():
+    shared = share_site_tables(_tables, prefix='eztest')
+    assert not shared.owner and np.array_equal(shared['node_coords'], _tables()['node_coords'])
+    with pytest.raises(FileNotFoundError):
+        SharedArrays.attach(shared.prefix)
+
+
+def _view()->RecordView:
+    tables = _tables()
+    tags, coords = tables['node_tags'], tables['node_coords']
+    return RecordView(lambda i: Node(int(tags[i]), *coords[i].tolist()), tags)
+
+
+def test_record_view():
+    view = _view()
+    assert len(view) == 3 and view[1] == Node(7, 1.0, 0.5) and view[-1] == Node(5, 2.0, 1.0)
+    assert view[0:2] == (Node(3, 0.0, 0.0), Node(7, 1.0, 0.5))
+    assert view.take([2, 0]) == (view[2], view[0]) and view.take(np.array([False, True, False])) == (view[1],)
+    assert view.row_of(5) == 2 and view.row_of(4) == -1 and view.row_of(100) == -1 and view.row_of(-1) == -1
+    with pytest.raises(IndexError):
+        view[3]
+    extended = view+(Node(9, 3.0, 0.0),)
+    assert len(view) == 3 and len(extended) == 4
+    assert list(extended) == list(view)+[Node(9, 3.0, 0.0)] and extended[-1].tag == 9
+
+
+def test_record_mapping():
+    view = _view()+(Node(9, 3.0, 0.0),)
+    mapping = view.mapping()
+    assert isinstance(mapping, RecordMapping)
+    assert dict(mapping) == {node.tag: node for node in view}
+    assert list(mapping) == [3, 7, 5, 9] and len(mapping) == 4
+    assert 7 in mapping and 4 not in mapping and mapping.get(4) is None
+    with pytest.raises(KeyError):
+        mapping[4]
+
+
+def test_record_nbytes():
+    records = tuple(_view())
+    exact = sum(sys.getsizeof(record)+sum(sys.getsizeof(field) for field in record) for record in records)
+    assert record_nbytes(records) == pytest.approx(exact, rel=0.05)
+    assert record_nbytes(()) == 0
+    # sampled on long sequences
+    many = tuple(Node(i, 0.0, 1.0) for i in range(10000))
+    assert record_nbytes(many, sample=16) == pytest.approx(record_nbytes(many, sample=10000), rel=0.05)
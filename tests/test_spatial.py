@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from EZSite.mesh import SiteMesh
+from EZSite.spatial import SiteLocator, interface_ties, COINCIDENT, EMBEDDED, NEAREST
+
+
+def _distorted_grid(nx:int = 8, ny:int = 5, seed:int = 0)->SiteMesh:
+    # convex quads from a grid with moved interior nodes, scattered tags, every other element numbered clockwise
+    rng = np.random.default_rng(seed)
+    x, y = np.meshgrid(np.arange(nx+1.0), np.arange(ny+1.0))
+    inner = (x > 0) & (x < nx) & (y > 0) & (y < ny)
+    x[inner] += rng.uniform(-0.2, 0.2, inner.sum())
+    y[inner] += rng.uniform(-0.2, 0.2, inner.sum())
+    rows = np.arange(x.size).reshape(x.shape)
+    quads = np.column_stack((rows[:-1, :-1].ravel(), rows[:-1, 1:].ravel(), rows[1:, 1:].ravel(), rows[1:, :-1].ravel()))
+    quads[::2] = quads[::2, ::-1]
+    tags = 2*rng.permutation(x.size)+11
+    return SiteMesh(tags, np.column_stack((x.ravel(), y.ravel())), 3*np.arange(len(quads))+5, tags[quads], np.ones(len(quads)))
+
+
+def _in_triangle(a, b, c, p, tol:float = 1e-9)->bool:
+    # barycentric coordinates of p
+    l1, l2 = np.linalg.solve(np.column_stack((b-a, c-a)), p-a)
+    return l1 >= -tol and l2 >= -tol and l1+l2 <= 1+tol
+
+
+def _brute_force_elements(mesh:SiteMesh, point:np.ndarray)->set:
+    # rows of all elements containing the point, a convex quad is the union of the triangles of one diagonal
+    xy = mesh.coords[mesh.ele_node_index]
+    return {row for row, (a, b, c, d) in enumerate(xy) if _in_triangle(a, b, c, point) or _in_triangle(a, c, d, point)}
+
+
+def _points(mesh:SiteMesh, n:int = 200, seed:int = 1)->np.ndarray:
+    # inside and around the site, including node positions and edge midpoints
+    rng = np.random.default_rng(seed)
+    xy = mesh.coords[mesh.ele_node_index]
+    lo, hi = mesh.coords.min(axis=0)-1.0, mesh.coords.max(axis=0)+1.0
+    return np.r_[rng.uniform(lo, hi, (n, 2)), mesh.coords[:10], 0.5*(xy[:10, 0]+xy[:10, 1])]
+
+
+def test_nearest_nodes():
+    mesh = _distorted_grid()
+    locator = SiteLocator(mesh)
+    points = _points(mesh)
+    dist = np.linalg.norm(points[:, None, :]-mesh.coords[None, :, :], axis=2)
+    tags, found = locator.nearest_nodes(points)
+    assert np.allclose(found, dist.min(axis=1))
+    assert np.allclose(np.linalg.norm(mesh.coords_of(tags)-points, axis=1), dist.min(axis=1))
+    tags, found = locator.nearest_nodes(points, k=3)
+    assert tags.shape == (points.shape[0], 3) and np.allclose(found, np.sort(dist, axis=1)[:, :3])
+    coincident = locator.coincident_nodes(np.r_[mesh.coords[:5], mesh.coords[:5]+1e-3])
+    assert coincident.tolist() == mesh.node_tags[:5].tolist()+[-1]*5
+
+
+def test_containing_elements():
+    mesh = _distorted_grid()
+    locator = SiteLocator(mesh)
+    points = _points(mesh)
+    rows = locator.containing_elements(points)
+    for point, row in zip(points, rows.tolist()):
+        expected = _brute_force_elements(mesh, point)
+        assert (row in expected) if expected else row == -1
+    # the fallback over all centroids within the element radius finds the same elements
+    assert np.array_equal(locator.containing_elements(points, k=1), rows)
+
+
+def test_containing_triangles():
+    mesh = _distorted_grid()
+    locator = SiteLocator(mesh)
+    points = _points(mesh)
+    rows = locator.containing_elements(points)
+    inside = rows >= 0
+    triangles = locator.containing_triangles(points[inside], rows[inside])
+    for point, row, tags in zip(points[inside], rows[inside], triangles):
+        assert set(tags.tolist()) <= set(mesh.ele_nodes[row].tolist())
+        assert _in_triangle(*mesh.coords_of(tags), point)
+
+
+def test_interface_ties():
+    mesh = _distorted_grid()
+    locator = SiteLocator(mesh)
+    coords = np.array([mesh.coords[7], [3.5, 2.5], [-2.0, 0.3]])
+    ties = interface_ties(locator, [101, 102, 103], coords)
+    assert ties.Kind.tolist() == [COINCIDENT, EMBEDDED, NEAREST]
+    nearest = locator.nearest_nodes(coords[2])[0][0]
+    assert ties.Retained[0].tolist() == [mesh.node_tags[7], -1, -1] and ties.Retained[2].tolist() == [nearest, -1, -1]
+    assert _in_triangle(*mesh.coords_of(ties.Retained[1]), coords[1])
+    assert np.allclose(ties.Distance, [0.0, 0.0, np.linalg.norm(mesh.coords_of([nearest])[0]-coords[2])])
+    # the element of a tie holds its retained nodes
+    for row, retained in zip(np.searchsorted(mesh.ele_tags, ties.EleTags), ties.Retained):
+        assert set(retained[retained >= 0].tolist()) <= set(mesh.ele_nodes[row].tolist())
+    with pytest.raises(ValueError):
+        interface_ties(locator, [103], coords[2:], outside='raise')
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from EZSite.mesh import SiteMesh
+from EZSite.validation import (validate_site, raise_for_errors, MeshValidationError, quad_corner_jacobians,
+                               quad_aspect_ratios)
+
+
+def _mesh(ele_nodes = ((1, 2, 5, 4), (2, 3, 6, 5)), ele_tags = (1, 2), node_tags = (1, 2, 3, 4, 5, 6),
+          coords = ((0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1)))->SiteMesh:
+    # 4---5---6
+    # | 1 | 2 |
+    # 1---2---3
+    return SiteMesh(node_tags, coords, ele_tags, ele_nodes, [1]*len(ele_tags))
+
+
+def _checks(issues:list)->dict:
+    return {issue.check: (issue.severity, issue.tags.tolist()) for issue in issues}
+
+
+def test_valid_site():
+    mesh = _mesh()
+    issues = validate_site(mesh, mat_tags=[1], mass=[[1, 1.0, 1.0]], fixed=[1, 2, 3], eqdof=[[1, 3], [4, 6]])
+    assert issues == []
+    raise_for_errors(issues)
+    assert np.all(quad_corner_jacobians(mesh) > 0)
+    assert quad_aspect_ratios(mesh).tolist() == [1.0, 1.0]
+
+
+def test_negative_mass():
+    checks = _checks(validate_site(_mesh(), mass=[[1, 1.0, 1.0], [5, -1.0, 1.0], [6, np.nan, 1.0], [9, 1.0, 1.0]]))
+    assert checks == {'negative mass': ('error', [5, 6]), 'mass nodes': ('error', [9])}
+
+
+def test_missing_nodes():
+    checks = _checks(validate_site(_mesh(ele_nodes=((1, 2, 5, 4), (2, 3, 7, 5)))))
+    # node 6 is then unused, element 2 is left out of the geometry checks
+    assert checks == {'missing element nodes': ('error', [2]), 'orphan nodes': ('warning', [6])}
+    with pytest.raises(MeshValidationError) as error:
+        raise_for_errors(validate_site(_mesh(ele_nodes=((1, 2, 5, 4), (2, 3, 7, 5)))))
+    assert [issue.check for issue in error.value.issues] == ['missing element nodes']
+
+
+def test_inverted_quads():
+    checks = _checks(validate_site(_mesh(ele_nodes=((1, 4, 5, 2), (2, 3, 6, 5)))))
+    assert checks == {'inverted quads': ('error', [1])}
+    # crossed diagonals: the Jacobian changes sign
+    checks = _checks(validate_site(_mesh(ele_nodes=((1, 2, 4, 5), (2, 3, 6, 5)))))
+    assert checks == {'distorted quads': ('error', [1])}
+
+
+def test_duplicate_tags():
+    mesh = _mesh(ele_tags=(3, 3), node_tags=(1, 2, 3, 4, 5, 5))
+    checks = _checks(validate_site(mesh))
+    assert checks['duplicate node tags'] == ('error', [5])
+    assert checks['duplicate element tags'] == ('error', [3])
+
+
+def test_orphan_eqdof_pairs():
+    checks = _checks(validate_site(_mesh(), eqdof=[[1, 3], [4, 8], [9, 6], [2, 2], [3, 1]]))
+    assert checks == {'orphan equalDOF': ('error', [8, 9]), 'self-tied equalDOF': ('error', [2]),
+                      'duplicate equalDOF': ('warning', [1, 3])}
+
+
+def test_aspect_ratio():
+    coords = ((0, 0), (12, 0), (13, 0), (0, 1), (12, 1), (13, 1))
+    checks = _checks(validate_site(_mesh(coords=coords), max_aspect=10.0))
+    assert checks == {'aspect ratio': ('warning', [1])}
+    assert validate_site(_mesh(coords=coords), max_aspect=20.0) == []